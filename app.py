@@ -1,13 +1,32 @@
-from flask import Flask, render_template, request, jsonify, session, redirect, url_for, make_response
+from flask import (
+    Flask, render_template, request, jsonify, session, redirect, url_for, make_response,
+    Response, stream_with_context, send_from_directory, abort
+)
 from flask_wtf.csrf import CSRFProtect, generate_csrf
 from flask_login import LoginManager, login_user, logout_user, login_required, current_user
+import base64
+import click
 import datetime
 import re
 import functools
+import hashlib
 import logging
-from database import db, init_db, logger as db_logger
-from models import User, Entry, DiaryItem, create_initial_data
-from sqlalchemy import select, desc
+import mimetypes
+import os
+from database import db, init_db, init_change_journal, logger as db_logger
+from live_feed import LiveFeedHub, FeedEvent
+from compression import ResponseCompressor
+from assets import AssetBuilder, AssetManifest, BUNDLES
+from models import (
+    User, Entry, DiaryItem, RollupManager, ActivityManager, MetricManager, ChangeFeedManager,
+    ArchiveManager, BodyManager, BodyStorage, DiaryExporter, EntryDTO, DiaryItemDTO, UserDTO,
+    create_initial_data
+)
+from models.archive_manager import ArchivedEntry
+from models.entry_body import load_entry_bodies, load_item_bodies
+from serializer import Serializer, SerializerJSONProvider, row_encoder
+from sqlalchemy import select, desc, func, tuple_
+from sqlalchemy.orm import selectinload, joinedload
 
 # ロガーの設定
 logging.basicConfig(level=logging.DEBUG)
@@ -43,6 +62,13 @@ def add_security_headers(response):
         response.set_cookie('csrf_token', generate_csrf())
     return response
 
+# レスポンスの圧縮（JSON・静的ファイル・エクスポート・SSE。HTMLは対象外）
+@app.after_request
+def compress_response(response):
+    if not app.config['COMPRESS_RESPONSES']:
+        return response
+    return response_compressor.apply(response, request.accept_encodings)
+
 # デバッグ用ミドルウェア
 @app.before_request
 def log_request_info():
@@ -55,10 +81,61 @@ def log_response_info(response):
     logger.debug('Response Headers: %s', dict(response.headers))
     return response
 
-# データベース初期化
+# データベース初期化（古いエントリーはATTACHしたアーカイブDBへ移動する）
+app.config.setdefault('SQLALCHEMY_DATABASE_URI', os.environ.get('LIFELOG_DATABASE_URL'))
+app.config.setdefault(
+    'ARCHIVE_DATABASE',
+    os.environ.get('LIFELOG_ARCHIVE_DATABASE', os.path.join(app.instance_path, 'archive.db'))
+)
+app.config.setdefault('ARCHIVE_AFTER_DAYS', 90)
 init_db(app)
 
+# 変更ジャーナル（ポイントインタイムリカバリ用。ディレクトリを指定した場合のみ有効）
+app.config.setdefault('CHANGE_JOURNAL_DIR', os.environ.get('LIFELOG_JOURNAL_DIR'))
+app.config.setdefault(
+    'CHANGE_JOURNAL_ARCHIVE_DIR',
+    os.path.join(app.root_path, 'manage_test_data', 'backups', 'journal')
+)
+init_change_journal(app)
+
+# 大きな本文の格納（しきい値のバイト数を超える本文は本文テーブルへ圧縮して格納する）
+app.config.setdefault('BODY_OFFROW_THRESHOLD', BodyStorage.THRESHOLD)
+app.config.setdefault('BODY_COMPRESSION', BodyStorage.CODEC)  # zlib / zstd
+BodyStorage.configure(app.config['BODY_OFFROW_THRESHOLD'], app.config['BODY_COMPRESSION'])
+
+# JSONのシリアライズ（未指定の場合はorjsonがあれば使用し、なければ標準のjsonを使用する）
+app.config.setdefault('JSON_BACKEND', None)  # orjson / json
+Serializer.configure(app.config['JSON_BACKEND'])
+app.json = SerializerJSONProvider(app)
+# テンプレートの tojson も同じシリアライザを使う（Jinja環境はCSRFProtectの初期化時に作成済み）
+app.jinja_env.policies['json.dumps_function'] = app.json.dumps
+
+# レスポンスの圧縮（brotliはパッケージがある場合のみ使用する）
+app.config.setdefault('COMPRESS_RESPONSES', True)
+app.config.setdefault('COMPRESS_MIN_SIZE', ResponseCompressor.MIN_SIZE)  # これ未満のバイト数は圧縮しない
+app.config.setdefault('COMPRESS_LEVEL', ResponseCompressor.LEVELS['gzip'])  # gzipの圧縮レベル（1〜9）
+app.config.setdefault('COMPRESS_BROTLI_LEVEL', ResponseCompressor.LEVELS['br'])  # brotliの品質（0〜11）
+response_compressor = ResponseCompressor(
+    min_size=app.config['COMPRESS_MIN_SIZE'],
+    level=app.config['COMPRESS_LEVEL'],
+    brotli_level=app.config['COMPRESS_BROTLI_LEVEL']
+)
+
+# ビルド済みの静的ファイル（flask build-assets で作成。未ビルドの場合は元のファイルを結合して配信する）
+app.config.setdefault('ASSET_DIR', os.path.join(app.static_folder, 'dist'))
+app.config.setdefault('ASSET_MAX_AGE', 365 * 24 * 60 * 60)  # ハッシュ付きのファイルのキャッシュ期間（秒）
+asset_manifest = AssetManifest(app.config['ASSET_DIR'])
+# ビルド時に作成する圧縮済みファイルの拡張子（優先順）
+PRECOMPRESSED = {'br': '.br', 'gzip': '.gz'}
+
 MAX_LOGIN_ATTEMPTS = 3  # ログイン試行回数を3回に変更
+ENTRIES_PER_PAGE = 10  # 1ページあたりの表示件数
+app.config.setdefault('MAX_ENTRY_BATCH_SIZE', 50)  # 一括投稿の最大件数
+app.config.setdefault('CHANGE_FEED_BATCH_SIZE', 100)  # 差分同期で1回に返す最大件数
+app.config.setdefault('LIVE_FEED_POLL_INTERVAL', 1.0)  # 他のワーカーの変更を拾う間隔（秒）
+app.config.setdefault('LIVE_FEED_HEARTBEAT', 15.0)  # 無通信時のハートビート間隔（秒）
+app.config.setdefault('LIVE_FEED_QUEUE_SIZE', 100)  # 購読者ごとに溜められるイベント数
+app.config.setdefault('LIVE_FEED_MAX_SUBSCRIBERS', 10000)  # 1ワーカーあたりの最大購読数
 
 # 管理者必須デコレータ
 def admin_required(f):
@@ -69,11 +146,370 @@ def admin_required(f):
         return f(*args, **kwargs)
     return decorated_function
 
+def can_edit_entry(entry):
+    """現在のユーザーがエントリーを編集可能か判定"""
+    return can_edit(entry.user_id, entry.user.is_visible)
+
+def can_edit(user_id, is_visible):
+    """現在のユーザーが投稿者(user_id)のエントリーを編集可能か判定"""
+    return current_user.is_authenticated and (
+        current_user.is_admin or (user_id == current_user.id and is_visible)
+    )
+
+def entry_data(entry):
+    """エントリーを閲覧者によらない辞書に変換（ライブフィード用。can_editは配信時に決める）"""
+    return EntryDTO.from_entry(entry).to_dict()
+
+def entry_to_dto(entry):
+    """エントリーをレスポンス用のDTOに変換"""
+    return EntryDTO.from_entry(entry, can_edit_entry(entry))
+
+# fields= で選択できるエントリーの項目と、その列（can_editは投稿者の列から求める）
+ENTRY_FIELDS = {
+    'id': Entry.id,
+    'title': Entry.title,
+    'content': Entry.content,
+    'excerpt': Entry.excerpt,
+    'notes': Entry.notes,
+    'created_at': Entry.created_at,
+    'updated_at': Entry.updated_at,
+    'author_name': User.name,
+    'author_userid': User.userid,
+    'is_visible': User.is_visible,
+    'user_id': Entry.user_id,
+    'can_edit': None
+}
+# include= で追加できる関連
+ENTRY_INCLUDES = ('items', 'item_count')
+# view=excerpt（一覧用の抜粋と活動項目数のみ）
+EXCERPT_FIELDS = ['id', 'title', 'excerpt', 'created_at', 'updated_at', 'author_name',
+                  'author_userid', 'is_visible', 'user_id', 'can_edit']
+EXCERPT_PROJECTION = (EXCERPT_FIELDS, ['item_count'])
+
+def parse_fieldset(name, allowed):
+    """カンマ区切りの項目指定を検証して一覧を返す（未指定の場合はNone、不明な項目はValueError）"""
+    value = request.args.get(name)
+    if value is None:
+        return None
+    names = [field.strip() for field in value.split(',') if field.strip()]
+    unknown = [field for field in names if field not in allowed]
+    if unknown:
+        raise ValueError(f'不明な項目です: {", ".join(unknown)}')
+    if not names and name == 'fields':
+        raise ValueError('項目を指定してください')
+    return names
+
+def parse_entry_projection():
+    """fields= / include= / view= から(項目, 関連)を決める（いずれも未指定の場合は全文のNone）"""
+    fields = parse_fieldset('fields', ENTRY_FIELDS)
+    include = parse_fieldset('include', ENTRY_INCLUDES)
+    if fields is None and include is None:
+        if request.args.get('view') == 'excerpt':
+            return EXCERPT_PROJECTION
+        return None
+    return fields if fields is not None else list(ENTRY_FIELDS), include or []
+
+def load_entries(query, projection):
+    """エントリーの一覧を読み込む（項目指定時は必要な列だけをCoreの行で取得する）"""
+    if projection is None:
+        query = query.options(joinedload(Entry.user), selectinload(Entry.items))
+        return db.session.execute(query).scalars().all()
+    fields, _ = projection
+    # カーソルの作成とアーカイブとの並べ替えのため、idとsort_tsは常に取得する
+    columns = {'id': Entry.id, 'sort_ts': Entry.sort_ts}
+    for field in fields:
+        for name in (('user_id', 'is_visible') if field == 'can_edit' else (field,)):
+            columns[name] = ENTRY_FIELDS[name]
+    return db.session.execute(
+        query.with_only_columns(*[column.label(name) for name, column in columns.items()])
+    ).all()
+
+def archived_values(entry):
+    """アーカイブのエントリーを項目名の辞書に変換"""
+    return {
+        **{name: getattr(entry, name) for name in (
+            'id', 'title', 'content', 'excerpt', 'notes', 'created_at', 'updated_at', 'user_id'
+        )},
+        'author_name': entry.user.name,
+        'author_userid': entry.user.userid,
+        'is_visible': entry.user.is_visible
+    }
+
+def project_entries(rows, projection):
+    """load_entriesの行（とアーカイブのエントリー）を指定された項目の辞書に変換"""
+    fields, include = projection
+    hot_ids = [row.id for row in rows if not isinstance(row, ArchivedEntry)]
+
+    # 本文・活動項目は行の分だけまとめて読み込む（大きな本文は本文テーブルから展開）
+    bodies = {}
+    if hot_ids and ('content' in fields or 'notes' in fields):
+        bodies = load_entry_bodies(db.session, hot_ids)
+    items = {}
+    if hot_ids and 'items' in include:
+        item_table = DiaryItem.__table__
+        item_rows = db.session.execute(
+            select(item_table.c.id, item_table.c.entry_id, item_table.c.item_name,
+                   item_table.c.item_content)
+            .filter(item_table.c.entry_id.in_(hot_ids)).order_by(item_table.c.id)
+        ).all()
+        item_bodies = load_item_bodies(db.session, [item.id for item in item_rows])
+        for item in item_rows:
+            items.setdefault(item.entry_id, []).append(
+                DiaryItemDTO(item.item_name, item_bodies.get(item.id, item.item_content))
+            )
+    counts = {}
+    if hot_ids and 'item_count' in include:
+        counts = dict(db.session.execute(
+            select(DiaryItem.entry_id, func.count()).filter(
+                DiaryItem.entry_id.in_(hot_ids)
+            ).group_by(DiaryItem.entry_id)
+        ).all())
+
+    results = []
+    for row in rows:
+        if isinstance(row, ArchivedEntry):
+            values = archived_values(row)
+            entry_items = [DiaryItemDTO.from_item(item) for item in row.items]
+        else:
+            values = row._mapping
+            entry_items = items.get(row.id, [])
+        data = {}
+        for field in fields:
+            if field == 'can_edit':
+                data[field] = can_edit(values['user_id'], values['is_visible'])
+            elif field in ('content', 'notes'):
+                data[field] = bodies.get((values['id'], field), values[field])
+            else:
+                data[field] = values[field]
+        if 'items' in include:
+            data['items'] = entry_items
+        if 'item_count' in include:
+            data['item_count'] = len(entry_items) if isinstance(row, ArchivedEntry) else counts.get(row.id, 0)
+        results.append(data)
+    return results
+
+# fields= で選択できるユーザーの項目（未指定の場合はcreated_at以外とentries_countを返す）
+USER_FIELDS = {
+    'id': User.id,
+    'userid': User.userid,
+    'name': User.name,
+    'is_admin': User.is_admin,
+    'is_locked': User.is_locked,
+    'is_visible': User.is_visible,
+    'login_attempts': User.login_attempts,
+    'last_login_attempt': User.last_login_attempt,
+    'created_at': User.created_at
+}
+USER_INCLUDES = ('entries_count',)
+# 未指定時の項目はUserDTOの順（created_at以外）
+USER_DEFAULT_FIELDS = [field for field in UserDTO.__slots__ if field in USER_FIELDS]
+
+def entries_count_column():
+    """ユーザーごとのエントリー数（アーカイブ済みを含む）の相関サブクエリ"""
+    count = select(func.count(Entry.id)).filter(Entry.user_id == User.id).scalar_subquery()
+    archived = ArchiveManager().count_subquery(User.id)
+    return count + archived if archived is not None else count
+
+def entries_to_list(entries, projection):
+    """一覧のエントリーをレスポンス用の辞書の一覧に変換"""
+    if projection is None:
+        return [entry_to_dto(entry) for entry in entries]
+    return project_entries(entries, projection)
+
+def entry_etag(entry_id, sort_ts, updated_at, user_id, is_visible, name, userid):
+    """単一エントリーのETag（更新日時・投稿者の表示情報・閲覧者の編集権限から作成）"""
+    source = '|'.join(str(value) for value in (
+        entry_id, sort_ts, updated_at, user_id, is_visible, name, userid,
+        can_edit(user_id, is_visible)
+    ))
+    return hashlib.sha1(source.encode('utf-8')).hexdigest()
+
+def load_feed_events(since, limit):
+    """ライブフィードに配信する変更を読み込む（ポーリングスレッドから呼ばれる）"""
+    with app.app_context():
+        changes = ChangeFeedManager().get_changes(since, limit)
+        entry_ids = [change.entry_id for change in changes if change.op == ChangeFeedManager.UPSERT]
+        entries = {}
+        if entry_ids:
+            query = select(Entry).filter(Entry.id.in_(entry_ids)).options(
+                joinedload(Entry.user),
+                selectinload(Entry.items)
+            )
+            entries = {entry.id: entry for entry in db.session.execute(query).scalars()}
+        events = []
+        for change in changes:
+            entry = entries.get(change.entry_id)
+            events.append(FeedEvent(
+                change.seq, change.entry_id, change.user_id,
+                entry_data(entry) if entry else None,
+                entry.user.is_visible if entry else True
+            ))
+        return events
+
+def latest_feed_seq():
+    """ライブフィードの配信開始位置（最新の変更通番）"""
+    with app.app_context():
+        return ChangeFeedManager().latest_seq()
+
+# ライブフィードの配信ハブ（最初の購読時にポーリングを開始する）
+live_feed = LiveFeedHub(
+    load_feed_events,
+    latest_feed_seq,
+    poll_interval=app.config['LIVE_FEED_POLL_INTERVAL'],
+    heartbeat_interval=app.config['LIVE_FEED_HEARTBEAT'],
+    max_queue=app.config['LIVE_FEED_QUEUE_SIZE'],
+    max_subscribers=app.config['LIVE_FEED_MAX_SUBSCRIBERS']
+)
+
+def encode_cursor(entry):
+    """キーセットページネーション用のカーソルを生成"""
+    raw = f'{entry.sort_ts.isoformat()}|{entry.id}'
+    return base64.urlsafe_b64encode(raw.encode('utf-8')).decode('ascii')
+
+def decode_cursor(cursor):
+    """カーソルを(sort_ts, id)に復元（不正な場合はValueError）"""
+    try:
+        raw = base64.urlsafe_b64decode(cursor.encode('ascii')).decode('utf-8')
+        sort_ts, entry_id = raw.split('|')
+        return datetime.datetime.fromisoformat(sort_ts), int(entry_id)
+    except (UnicodeError, ValueError, TypeError) as e:
+        raise ValueError(f'Invalid cursor: {cursor}') from e
+
+def validate_entry_payload(data):
+    """投稿データを検証し、エラーメッセージ（問題がなければNone）を返す"""
+    if not isinstance(data, dict):
+        return '投稿データの形式が正しくありません'
+    title = data.get('title')
+    content = data.get('content')
+    notes = data.get('notes', '')
+    items = data.get('items', [])
+    if not title or not isinstance(title, str) or not title.strip():
+        return 'タイトルが空です'
+    if len(title) > 100:
+        return 'タイトルは100文字以内で入力してください'
+    if not content or not isinstance(content, str) or not content.strip():
+        return '内容が空です'
+    if notes is not None and not isinstance(notes, str):
+        return 'メモの形式が正しくありません'
+    if not isinstance(items, list):
+        return '活動項目の形式が正しくありません'
+    for item in items:
+        if not isinstance(item, dict):
+            return '活動項目の形式が正しくありません'
+        item_name = item.get('item_name')
+        item_content = item.get('item_content')
+        if not isinstance(item_name, str) or not item_name.strip() or len(item_name) > 100:
+            return '活動項目名が正しくありません'
+        if not isinstance(item_content, str) or not item_content.strip():
+            return '活動項目の内容が空です'
+    return None
+
+def find_visible_author(userid):
+    """閲覧可能な投稿者を取得（退会済みユーザーは管理者のみ）"""
+    stmt = select(User).filter_by(userid=userid)
+    author = db.session.execute(stmt).scalar_one_or_none()
+    is_admin = current_user.is_authenticated and current_user.is_admin
+    if not author or (not author.is_visible and not is_admin):
+        return None
+    return author
+
+def filter_by_activity(query):
+    """activityパラメータ指定時、その活動項目を含むエントリーに絞り込む"""
+    activity = request.args.get('activity')
+    if not activity:
+        return query
+    entry_ids = select(DiaryItem.entry_id).filter(DiaryItem.item_name == activity)
+    return query.filter(Entry.id.in_(entry_ids))
+
+def parse_date_param(name):
+    """YYYY-MM-DD形式のクエリパラメータを日付に変換（未指定はNone）"""
+    value = request.args.get(name)
+    if not value:
+        return None
+    return datetime.datetime.strptime(value, '%Y-%m-%d')
+
+def find_entry_for_write(entry_id):
+    """編集・削除対象のエントリーを取得（アーカイブ済みの場合はホットに戻す）
+
+    権限がなく更新しなかった場合は、リクエスト終了時のロールバックでアーカイブに残る。
+    """
+    stmt = select(Entry).join(User).filter(Entry.id == entry_id)
+    entry = db.session.execute(stmt).scalar_one_or_none()
+    if entry is None:
+        archive_manager = ArchiveManager()
+        if archive_manager.is_attached() and archive_manager.restore_entries([entry_id]):
+            logger.debug('Entry restored from archive: %d', entry_id)
+            entry = db.session.execute(stmt).scalar_one_or_none()
+    return entry
+
+def fetch_entries_page(query, cursor=None, per_page=ENTRIES_PER_PAGE, archive_filters=None,
+                       projection=None):
+    """sort_ts降順のキーセットページネーションで1ページ分を取得
+
+    archive_filters（ArchiveManager.filter_entriesの検索条件）を指定した場合、
+    ホットのエントリーで1ページに満たなければアーカイブDBの続きで補う。
+    projection（parse_entry_projectionの結果）を指定した場合は必要な列だけを読み込む。
+    """
+    position = decode_cursor(cursor) if cursor else None
+    if position:
+        query = query.filter(tuple_(Entry.sort_ts, Entry.id) < tuple_(*position))
+    query = query.order_by(desc(Entry.sort_ts), desc(Entry.id)).limit(per_page + 1)
+    entries = load_entries(query, projection)
+    if archive_filters is not None and len(entries) <= per_page:
+        archive_manager = ArchiveManager()
+        if archive_manager.is_attached():
+            archived = archive_manager.get_page(per_page + 1, position, **archive_filters)
+            entries = sorted(
+                entries + archived, key=lambda entry: (entry.sort_ts, entry.id), reverse=True
+            )[:per_page + 1]
+    has_next = len(entries) > per_page
+    entries = entries[:per_page]
+    next_cursor = encode_cursor(entries[-1]) if has_next else None
+    return entries, next_cursor
+
+@app.template_global()
+def asset_url(name):
+    """バンドルのURL（ビルド済みの場合はハッシュ付きのファイル名）"""
+    return url_for('serve_asset', filename=asset_manifest.get(name) or name)
+
+@app.route('/assets/<path:filename>')
+def serve_asset(filename):
+    directory = app.config['ASSET_DIR']
+    mimetype = mimetypes.guess_type(filename)[0]
+    if asset_manifest.is_built(filename):
+        # 内容が変わるとファイル名が変わるため、再検証なしでキャッシュさせる
+        available = [encoding for encoding, suffix in PRECOMPRESSED.items()
+                     if os.path.exists(os.path.join(directory, filename + suffix))]
+        encoding = request.accept_encodings.best_match(available)
+        response = send_from_directory(
+            directory, filename + PRECOMPRESSED[encoding] if encoding else filename,
+            mimetype=mimetype, max_age=app.config['ASSET_MAX_AGE']
+        )
+        if encoding:
+            response.headers['Content-Encoding'] = encoding
+        response.vary.add('Accept-Encoding')
+        response.cache_control.public = True
+        response.cache_control.immutable = True
+        return response
+    if filename in BUNDLES:
+        # 未ビルド（開発時）は元のファイルを結合して返し、毎回再検証させる
+        logger.debug('Serving unbuilt asset bundle: %s', filename)
+        response = make_response(AssetBuilder(app.static_folder, directory).source(filename))
+        response.mimetype = mimetype
+        response.headers['Cache-Control'] = 'no-cache'
+        return response
+    abort(404)
+
 @app.route('/')
 @login_required
 def index():
     logger.debug('Accessing index page')
-    return render_template('index.html')
+    # 最初のページ（GET /entries?view=excerpt と同じ内容）を埋め込み、一覧の取得を待たずに表示させる
+    initial_feed = entries_page_data(
+        visible_entries_query(), 1, EXCERPT_PROJECTION,
+        {'visible_only': not current_user.is_admin}
+    )
+    return render_template('index.html', initial_feed=initial_feed)
 
 @app.route('/login', methods=['GET'])
 def login():
@@ -216,29 +652,60 @@ def deactivate_account():
 
     # ユーザーを不可視に設定
     user.is_visible = False
+    ActivityManager().set_user_visibility(user.id, False)
+    ChangeFeedManager().record_user(user.id)
     db.session.commit()
+    live_feed.notify()
     logger.debug('Account deactivated successfully')
     return jsonify({'message': '退会処理が完了しました'})
 
+@app.route('/api/user/export', methods=['GET'])
+@login_required
+def export_entries():
+    logger.debug('Export request received')
+    export_format = request.args.get('format', 'ndjson')
+    if export_format not in DiaryExporter.FORMATS:
+        logger.debug('Unsupported export format: %s', export_format)
+        return jsonify({'error': '出力形式はndjson, csv, mdのいずれかを指定してください'}), 400
+
+    exporter = DiaryExporter(current_user.id)
+    content_type, extension = DiaryExporter.FORMATS[export_format]
+    filename = f'lifelog_{current_user.userid}.{extension}'
+    response = Response(
+        stream_with_context(exporter.iter_format(export_format)),
+        content_type=content_type
+    )
+    response.headers['Content-Disposition'] = f'attachment; filename="{filename}"'
+    logger.debug('Streaming export: %s', filename)
+    return response
+
 @app.route('/api/admin/users', methods=['GET'])
 @admin_required
 def get_users():
     logger.debug('Admin user list request received')
-    stmt = select(User).filter(User.userid != current_user.userid).order_by(User.userid)
-    users = db.session.execute(stmt).scalars().all()
-    
-    user_list = [{
-        'id': user.id,
-        'userid': user.userid,
-        'name': user.name,
-        'is_admin': user.is_admin,
-        'is_locked': user.is_locked,
-        'is_visible': user.is_visible,
-        'login_attempts': user.login_attempts,
-        'last_login_attempt': user.last_login_attempt.isoformat() if user.last_login_attempt else None,
-        'entries_count': db.session.query(Entry).filter_by(user_id=user.id).count()
-    } for user in users]
-    
+    try:
+        fields = parse_fieldset('fields', USER_FIELDS)
+        include = parse_fieldset('include', USER_INCLUDES)
+    except ValueError as e:
+        logger.debug('Invalid fieldset: %s', str(e))
+        return jsonify({'error': str(e)}), 400
+    default = fields is None and include is None
+    if default:
+        include = ['entries_count']
+
+    # 指定された項目の列だけを取得し、投稿数は相関サブクエリで1回のクエリにまとめる
+    columns = [USER_FIELDS[field].label(field) for field in fields or USER_DEFAULT_FIELDS]
+    if include and 'entries_count' in include:
+        columns.append(entries_count_column().label('entries_count'))
+    stmt = select(*columns).filter(User.userid != current_user.userid).order_by(User.userid)
+
+    # 既定の項目ではDTO、項目指定時は列名の辞書にする（日時はSerializerがそのまま出力する）
+    result = db.session.execute(stmt)
+    if default:
+        user_list = [UserDTO(*row) for row in result]
+    else:
+        user_list = row_encoder(result.keys())(result)
+
     logger.debug('User list retrieved: %d users', len(user_list))
     return jsonify(user_list)
 
@@ -287,71 +754,383 @@ def toggle_visibility(user_id):
         return jsonify({'error': '管理者アカウントは削除できません'}), 403
         
     user.is_visible = not user.is_visible
+    ActivityManager().set_user_visibility(user.id, user.is_visible)
+    ChangeFeedManager().record_user(user.id)
     db.session.commit()
+    live_feed.notify()
     
     action = '復元' if user.is_visible else '削除'
     logger.debug('Visibility toggled: %s -> %s', action, user.is_visible)
     return jsonify({'message': f'ユーザーを{action}しました'})
 
-@app.route('/entries', methods=['GET'])
-def get_entries():
-    logger.debug('Get entries request received')
-    page = request.args.get('page', 1, type=int)
-    per_page = 10
-
+def visible_entries_query():
+    """閲覧者が見られるエントリーのクエリ"""
     if current_user.is_authenticated and current_user.is_admin:
         logger.debug('Admin user requesting all entries')
         # 管理者は全ての投稿を表示（退会ユーザーの投稿も含む）
-        query = select(Entry).join(User).order_by(
-            desc(Entry.updated_at if Entry.updated_at is not None else Entry.created_at)
-        )
-    else:
-        logger.debug('Regular user or non-logged-in user requesting entries')
-        # 未ログインユーザーまたは一般ユーザーは可視状態のユーザーの投稿のみ表示
-        query = select(Entry).join(User).filter(User.is_visible == True).order_by(
-            desc(Entry.updated_at if Entry.updated_at is not None else Entry.created_at)
-        )
-    
-    # 総エントリー数を取得
-    total = db.session.execute(query).scalars().all()
-    total_entries = len(total)
-    total_pages = (total_entries + per_page - 1) // per_page
+        return select(Entry).join(User)
+    logger.debug('Regular user or non-logged-in user requesting entries')
+    # 未ログインユーザーまたは一般ユーザーは可視状態のユーザーの投稿のみ表示
+    return select(Entry).join(User).filter(User.is_visible == True)
+
+def listed_entry(entry_id):
+    """一覧（view=excerpt）と同じ形のエントリー（投稿・更新の応答。クライアントのキャッシュを置き換える）"""
+    rows = load_entries(select(Entry).join(User).filter(Entry.id == entry_id), EXCERPT_PROJECTION)
+    return entries_to_list(rows, EXCERPT_PROJECTION)[0]
+
+def entries_page_data(query, page, projection, archive_filters):
+    """ページ番号指定の一覧のレスポンス（GET /entries とホーム画面への埋め込みで共通）"""
+    # 総エントリー数を取得（アーカイブ済みのエントリーを含む）
+    hot_entries = db.session.execute(
+        select(func.count()).select_from(query.subquery())
+    ).scalar()
+    archive_manager = ArchiveManager()
+    archive_attached = archive_manager.is_attached()
+    total_entries = hot_entries
+    if archive_attached:
+        total_entries += archive_manager.count(**archive_filters)
+    total_pages = (total_entries + ENTRIES_PER_PAGE - 1) // ENTRIES_PER_PAGE
 
     # ページネーション適用
-    query = query.offset((page - 1) * per_page).limit(per_page)
-    entries = db.session.execute(query).scalars().all()
+    query = query.order_by(desc(Entry.sort_ts), desc(Entry.id)).offset(
+        (page - 1) * ENTRIES_PER_PAGE
+    ).limit(ENTRIES_PER_PAGE)
+    entries = load_entries(query, projection)
+    # アーカイブのエントリーはホットのものより古いため、ホットの件数を超えた分をアーカイブから取得
+    if archive_attached and len(entries) < ENTRIES_PER_PAGE and total_entries > hot_entries:
+        entries += archive_manager.get_page(
+            ENTRIES_PER_PAGE - len(entries),
+            offset=max(0, (page - 1) * ENTRIES_PER_PAGE - hot_entries),
+            **archive_filters
+        )
     logger.debug('Retrieved %d entries', len(entries))
 
-    response_data = {
-        'entries': [{
-        'id': entry.id,
-        'title': entry.title,
-        'content': entry.content,
-        'notes': entry.notes,
-        'items': [{
-            'item_name': item.item_name,
-            'item_content': item.item_content
-        } for item in entry.items],
-        'created_at': entry.created_at.isoformat() if entry.created_at else None,
-        'updated_at': entry.updated_at.isoformat() if entry.updated_at else None,
-        'author_name': entry.user.name,
-        'author_userid': entry.user.userid,
-        'is_visible': entry.user.is_visible,
-        'user_id': entry.user_id,
-        'can_edit': current_user.is_authenticated and (
-            current_user.is_admin or (entry.user_id == current_user.id and entry.user.is_visible)
-        )
-    } for entry in entries],
+    return {
+        'entries': entries_to_list(entries, projection),
         'pagination': {
             'current_page': page,
             'total_pages': total_pages,
             'total_entries': total_entries,
             'has_prev': page > 1,
-            'has_next': page < total_pages
+            'has_next': page < total_pages,
+            'next_cursor': encode_cursor(entries[-1]) if entries and page < total_pages else None
         }
     }
 
-    return jsonify(response_data)
+@app.route('/entries', methods=['GET'])
+def get_entries():
+    logger.debug('Get entries request received')
+    page = request.args.get('page', 1, type=int)
+    try:
+        projection = parse_entry_projection()
+    except ValueError as e:
+        logger.debug('Invalid fieldset: %s', str(e))
+        return jsonify({'error': str(e)}), 400
+
+    query = visible_entries_query()
+
+    # 期間指定（from/to）と日付ジャンプ（jump）はsort_tsの範囲検索に変換
+    try:
+        date_from = parse_date_param('from')
+        date_to = parse_date_param('to')
+        jump = parse_date_param('jump')
+    except ValueError:
+        logger.debug('Invalid date parameter: %s', dict(request.args))
+        return jsonify({'error': '日付はYYYY-MM-DD形式で指定してください'}), 400
+
+    if date_from:
+        query = query.filter(Entry.sort_ts >= date_from)
+    if date_to:
+        query = query.filter(Entry.sort_ts < date_to + datetime.timedelta(days=1))
+    if jump:
+        query = query.filter(Entry.sort_ts < jump + datetime.timedelta(days=1))
+    query = filter_by_activity(query)
+
+    # ホットのエントリーを読み切った後はアーカイブDBを同じ条件で検索する
+    ends = [day + datetime.timedelta(days=1) for day in (date_to, jump) if day]
+    archive_filters = {
+        'visible_only': not (current_user.is_authenticated and current_user.is_admin),
+        'start': date_from,
+        'end': min(ends) if ends else None,
+        'activity': request.args.get('activity')
+    }
+
+    # カーソル指定または日付ジャンプの場合はキーセットページネーション
+    cursor = request.args.get('cursor')
+    if cursor or jump:
+        try:
+            entries, next_cursor = fetch_entries_page(
+                query, cursor, archive_filters=archive_filters, projection=projection
+            )
+        except ValueError:
+            logger.debug('Invalid cursor: %s', cursor)
+            return jsonify({'error': '無効なカーソルです'}), 400
+        logger.debug('Retrieved %d entries', len(entries))
+
+        return jsonify({
+            'entries': entries_to_list(entries, projection),
+            'pagination': {
+                'next_cursor': next_cursor,
+                'has_next': next_cursor is not None
+            }
+        })
+
+    return jsonify(entries_page_data(query, page, projection, archive_filters))
+
+@app.route('/entries/changes', methods=['GET'])
+def get_entry_changes():
+    logger.debug('Get entry changes request received')
+    since = request.args.get('since', 0, type=int)
+    batch_size = app.config['CHANGE_FEED_BATCH_SIZE']
+    limit = min(request.args.get('limit', batch_size, type=int), batch_size)
+    if since < 0 or limit < 1:
+        logger.debug('Invalid change feed parameters: %s', dict(request.args))
+        return jsonify({'error': '無効なパラメータです'}), 400
+
+    changes = ChangeFeedManager().get_changes(since, limit + 1)
+    has_more = len(changes) > limit
+    changes = changes[:limit]
+
+    # 変更されたエントリーをまとめて読み込む（削除済み・非表示のものは墓標として返す）
+    entry_ids = [change.entry_id for change in changes if change.op == ChangeFeedManager.UPSERT]
+    entries = {}
+    if entry_ids:
+        query = select(Entry).join(User).filter(Entry.id.in_(entry_ids)).options(
+            joinedload(Entry.user),
+            selectinload(Entry.items)
+        )
+        if not (current_user.is_authenticated and current_user.is_admin):
+            query = query.filter(User.is_visible == True)
+        entries = {entry.id: entry for entry in db.session.execute(query).scalars()}
+
+        # ホットにないものはアーカイブ済みの可能性がある
+        missing = [entry_id for entry_id in entry_ids if entry_id not in entries]
+        archive_manager = ArchiveManager()
+        if missing and archive_manager.is_attached():
+            for entry in archive_manager.get_entries(missing):
+                if entry.user.is_visible or (current_user.is_authenticated and current_user.is_admin):
+                    entries[entry.id] = entry
+
+    results = []
+    for change in changes:
+        entry = entries.get(change.entry_id)
+        results.append({
+            'seq': change.seq,
+            'id': change.entry_id,
+            'op': ChangeFeedManager.UPSERT if entry else ChangeFeedManager.DELETE,
+            'entry': entry_to_dto(entry) if entry else None
+        })
+    logger.debug('Retrieved %d changes since %d', len(results), since)
+
+    return jsonify({
+        'changes': results,
+        'next_since': changes[-1].seq if changes else since,
+        'has_more': has_more
+    })
+
+@app.route('/entries/stream', methods=['GET'])
+def stream_entries():
+    logger.debug('Entry stream request received')
+    # ストリーム中はリクエストコンテキストを保持しないため、閲覧者の情報を先に取り出す
+    if current_user.is_authenticated:
+        subscriber = live_feed.subscribe(current_user.id, current_user.is_admin)
+    else:
+        subscriber = live_feed.subscribe()
+    if subscriber is None:
+        logger.debug('Too many live feed subscribers')
+        return jsonify({'error': '接続数が上限に達しています'}), 503
+
+    def generate():
+        try:
+            yield from live_feed.stream(subscriber)
+        finally:
+            live_feed.unsubscribe(subscriber)
+
+    return Response(generate(), mimetype='text/event-stream', headers={
+        'Cache-Control': 'no-cache',
+        'X-Accel-Buffering': 'no'
+    })
+
+@app.route('/users/<userid>/entries', methods=['GET'])
+def get_user_entries(userid):
+    logger.debug('Get user entries request received: %s', userid)
+    author = find_visible_author(userid)
+    if not author:
+        logger.debug('User not found or not visible: %s', userid)
+        return jsonify({'error': 'ユーザーが見つかりません'}), 404
+
+    try:
+        projection = parse_entry_projection()
+    except ValueError as e:
+        logger.debug('Invalid fieldset: %s', str(e))
+        return jsonify({'error': str(e)}), 400
+
+    query = filter_by_activity(select(Entry).join(User).filter(Entry.user_id == author.id))
+    archive_filters = {'user_id': author.id, 'activity': request.args.get('activity')}
+    try:
+        entries, next_cursor = fetch_entries_page(
+            query, request.args.get('cursor'), archive_filters=archive_filters,
+            projection=projection
+        )
+    except ValueError:
+        logger.debug('Invalid cursor: %s', request.args.get('cursor'))
+        return jsonify({'error': '無効なカーソルです'}), 400
+    logger.debug('Retrieved %d entries for user %s', len(entries), userid)
+
+    return jsonify({
+        'entries': entries_to_list(entries, projection),
+        'pagination': {
+            'next_cursor': next_cursor,
+            'has_next': next_cursor is not None
+        }
+    })
+
+@app.route('/users/<userid>/activity', methods=['GET'])
+def get_user_activity(userid):
+    logger.debug('Get user activity request received: %s', userid)
+    author = find_visible_author(userid)
+    if not author:
+        logger.debug('User not found or not visible: %s', userid)
+        return jsonify({'error': 'ユーザーが見つかりません'}), 404
+
+    year = request.args.get('year', datetime.date.today().year, type=int)
+    if not datetime.MINYEAR <= year <= datetime.MAXYEAR:
+        return jsonify({'error': '無効な年です'}), 400
+
+    rollups = RollupManager().get_daily(
+        author.id, datetime.date(year, 1, 1), datetime.date(year, 12, 31)
+    )
+    return jsonify({
+        'year': year,
+        'days': [{
+            'date': rollup.day.isoformat(),
+            'entry_count': rollup.entry_count,
+            'item_count': rollup.item_count
+        } for rollup in rollups]
+    })
+
+@app.route('/users/<userid>/archive', methods=['GET'])
+def get_user_archive(userid):
+    logger.debug('Get user archive request received: %s', userid)
+    author = find_visible_author(userid)
+    if not author:
+        logger.debug('User not found or not visible: %s', userid)
+        return jsonify({'error': 'ユーザーが見つかりません'}), 404
+
+    months = RollupManager().get_monthly(author.id)
+    return jsonify({
+        'months': [{
+            'month': row.month,
+            'entry_count': row.entry_count,
+            'item_count': row.item_count
+        } for row in months]
+    })
+
+@app.route('/activities', methods=['GET'])
+def get_top_activities():
+    logger.debug('Get top activities request received')
+    limit = min(request.args.get('limit', 10, type=int), 100)
+    if limit < 1:
+        logger.debug('Invalid limit: %s', dict(request.args))
+        return jsonify({'error': '無効なパラメータです'}), 400
+    activities = ActivityManager().get_top(limit=limit)
+    return jsonify({
+        'activities': [{
+            'item_name': row.item_name,
+            'count': row.item_count
+        } for row in activities]
+    })
+
+@app.route('/users/<userid>/activities', methods=['GET'])
+def get_user_top_activities(userid):
+    logger.debug('Get user top activities request received: %s', userid)
+    author = find_visible_author(userid)
+    if not author:
+        logger.debug('User not found or not visible: %s', userid)
+        return jsonify({'error': 'ユーザーが見つかりません'}), 404
+
+    limit = min(request.args.get('limit', 10, type=int), 100)
+    if limit < 1:
+        logger.debug('Invalid limit: %s', dict(request.args))
+        return jsonify({'error': '無効なパラメータです'}), 400
+    activities = ActivityManager().get_top(author.id, limit=limit)
+    return jsonify({
+        'activities': [{
+            'item_name': row.item_name,
+            'count': row.item_count
+        } for row in activities]
+    })
+
+@app.route('/activities/<path:item_name>/frequency', methods=['GET'])
+def get_activity_frequency(item_name):
+    logger.debug('Get activity frequency request received: %s', item_name)
+    manager = ActivityManager()
+    userid = request.args.get('userid')
+    if userid:
+        author = find_visible_author(userid)
+        if not author:
+            logger.debug('User not found or not visible: %s', userid)
+            return jsonify({'error': 'ユーザーが見つかりません'}), 404
+        months = manager.get_monthly(item_name, author.id)
+    else:
+        months = manager.get_monthly(item_name)
+
+    return jsonify({
+        'item_name': item_name,
+        'months': [{
+            'month': row.month,
+            'count': row.item_count
+        } for row in months]
+    })
+
+@app.route('/users/<userid>/metrics', methods=['GET'])
+def get_user_metrics(userid):
+    logger.debug('Get user metrics request received: %s', userid)
+    author = find_visible_author(userid)
+    if not author:
+        logger.debug('User not found or not visible: %s', userid)
+        return jsonify({'error': 'ユーザーが見つかりません'}), 404
+
+    keys = MetricManager().get_keys(author.id)
+    return jsonify({
+        'metrics': [{
+            'key': row.key,
+            'unit': row.unit,
+            'count': row.count
+        } for row in keys]
+    })
+
+@app.route('/users/<userid>/metrics/series', methods=['GET'])
+def get_user_metric_series(userid):
+    logger.debug('Get user metric series request received: %s', userid)
+    author = find_visible_author(userid)
+    if not author:
+        logger.debug('User not found or not visible: %s', userid)
+        return jsonify({'error': 'ユーザーが見つかりません'}), 404
+
+    key = request.args.get('key')
+    unit = request.args.get('unit', '')
+    window = request.args.get('window', 7, type=int)
+    if not key:
+        return jsonify({'error': '項目名を指定してください'}), 400
+    if window < 1:
+        return jsonify({'error': '移動平均の期間は1以上を指定してください'}), 400
+
+    manager = MetricManager()
+    timestamps, values = manager.get_series(author.id, key, unit)
+    stats = manager.compute_stats(timestamps, values, window)
+    rolling_avg = stats.pop('rolling_avg')
+    return jsonify({
+        'key': key,
+        'unit': unit,
+        'window': window,
+        'points': [{
+            'recorded_at': timestamp.isoformat(),
+            'value': value,
+            'rolling_avg': average
+        } for timestamp, value, average in zip(timestamps.tolist(), values.tolist(), rolling_avg)],
+        'stats': stats
+    })
 
 @app.route('/entries', methods=['POST'])
 @login_required
@@ -400,22 +1179,152 @@ def add_entry():
             db.session.add(diary_item)
             logger.debug('Diary item added to entry %d', entry.id)
 
+        RollupManager().apply(
+            entry.user_id, entry.created_at.date(), entries=1, items=len(items)
+        )
+        ActivityManager().apply(
+            entry.user_id, entry.created_at, [item['item_name'] for item in items]
+        )
+        MetricManager().replace_entry_metrics(
+            entry, [(item['item_name'], item['item_content']) for item in items]
+        )
+        ChangeFeedManager().record([entry])
+
         db.session.commit()
+        live_feed.notify()
         logger.debug('Entry creation successful')
-        return jsonify({'message': '投稿が完了しました'})
+        return jsonify({'message': '投稿が完了しました', 'entry': listed_entry(entry.id)})
     except Exception as e:
         logger.error('Error creating entry: %s', str(e))
         db.session.rollback()
         return jsonify({'error': '投稿に失敗しました'}), 500
 
+@app.route('/entries/batch', methods=['POST'])
+@login_required
+def add_entries_batch():
+    logger.debug('Batch add entries request received')
+    payload = request.get_json(silent=True) or {}
+    drafts = payload.get('entries') if isinstance(payload, dict) else None
+    max_batch_size = app.config['MAX_ENTRY_BATCH_SIZE']
+
+    if not isinstance(drafts, list) or not drafts:
+        logger.debug('Entries array is missing or empty')
+        return jsonify({'error': '投稿データがありません'}), 400
+    if len(drafts) > max_batch_size:
+        logger.debug('Batch too large: %d', len(drafts))
+        return jsonify({'error': f'一度に投稿できるのは{max_batch_size}件までです'}), 400
+
+    user = db.session.get(User, current_user.id)
+    if not user or not user.is_visible:
+        logger.debug('User account is invalid')
+        return jsonify({'error': 'アカウントが無効です'}), 403
+
+    # 保存前に全件を検証し、正しいものだけをまとめて保存する
+    results = [None] * len(drafts)
+    valid = []
+    for index, draft in enumerate(drafts):
+        error = validate_entry_payload(draft)
+        if error:
+            results[index] = {'index': index, 'error': error}
+        else:
+            valid.append((index, draft))
+    logger.debug('Batch validated: %d valid, %d invalid', len(valid), len(drafts) - len(valid))
+
+    try:
+        now = datetime.datetime.now()
+        entries = [Entry(
+            user_id=current_user.id,
+            title=draft['title'],
+            content=draft['content'],
+            notes=draft.get('notes') or '',
+            created_at=now
+        ) for _, draft in valid]
+        db.session.add_all(entries)
+        db.session.flush()  # エントリーをまとめてINSERTしIDを生成
+
+        db.session.add_all([
+            DiaryItem(
+                entry=entry,
+                item_name=item['item_name'],
+                item_content=item['item_content'],
+                created_at=now
+            )
+            for entry, (_, draft) in zip(entries, valid)
+            for item in draft.get('items', [])
+        ])
+        db.session.flush()  # 活動項目をまとめてINSERT
+
+        RollupManager().apply_entries(entries)
+        ActivityManager().apply_entries(entries)
+        MetricManager().add_entries(entries)
+        ChangeFeedManager().record(entries)
+
+        db.session.commit()
+        live_feed.notify()
+    except Exception as e:
+        logger.error('Error creating entries: %s', str(e))
+        db.session.rollback()
+        return jsonify({'error': '投稿に失敗しました'}), 500
+
+    for entry, (index, _) in zip(entries, valid):
+        results[index] = {'index': index, 'id': entry.id}
+    logger.debug('Batch creation successful: %d entries', len(entries))
+    return jsonify({
+        'message': f'{len(entries)}件の投稿が完了しました',
+        'results': results
+    })
+
+@app.route('/entries/<int:entry_id>', methods=['GET'])
+def get_entry(entry_id):
+    logger.debug('Get entry request received: %d', entry_id)
+    is_admin = current_user.is_authenticated and current_user.is_admin
+
+    # 主キーでETagに必要な列だけを先に読み、一致すれば本文・活動項目を読まずに304を返す
+    entry = None
+    row = db.session.execute(
+        select(Entry.id, Entry.sort_ts, Entry.updated_at, Entry.user_id,
+               User.is_visible, User.name, User.userid).join(User).filter(Entry.id == entry_id)
+    ).one_or_none()
+    if row is None:
+        archive_manager = ArchiveManager()
+        archived = archive_manager.get_entries([entry_id]) if archive_manager.is_attached() else []
+        if not archived:
+            logger.debug('Entry not found: %d', entry_id)
+            return jsonify({'error': '投稿が見つかりません'}), 404
+        entry = archived[0]
+        row = (entry.id, entry.sort_ts, entry.updated_at, entry.user_id,
+               entry.user.is_visible, entry.user.name, entry.user.userid)
+    if not row[4] and not is_admin:
+        logger.debug('Entry author is not visible: %d', entry_id)
+        return jsonify({'error': '投稿が見つかりません'}), 404
+
+    etag = entry_etag(*row)
+    # 圧縮したレスポンスには弱いETagを付けるため、弱い比較で判定する
+    if request.if_none_match.contains_weak(etag):
+        logger.debug('Entry not modified: %d', entry_id)
+        response = Response(status=304)
+    else:
+        if entry is None:
+            entry = db.session.execute(
+                select(Entry).filter(Entry.id == entry_id).options(
+                    joinedload(Entry.user),
+                    selectinload(Entry.items)
+                )
+            ).scalar_one()
+        response = jsonify(entry_to_dto(entry))
+    # 編集権限は閲覧者ごとに異なるため共有キャッシュには置かず、毎回ETagで再検証する
+    response.set_etag(etag)
+    response.headers['Cache-Control'] = 'private, no-cache'
+    response.vary.add('Cookie')
+    return response
+
 @app.route('/entries/<int:entry_id>', methods=['PUT'])
 @login_required
 def update_entry(entry_id):
     logger.debug('Update entry request received: %d', entry_id)
     logger.debug('Request JSON: %s', request.json)
     
-    stmt = select(Entry).join(User).filter(Entry.id == entry_id)
-    entry = db.session.execute(stmt).scalar_one_or_none()
+    entry = find_entry_for_write(entry_id)
     
     if not entry:
         logger.debug('Entry not found: %d', entry_id)
@@ -455,6 +1364,20 @@ def update_entry(entry_id):
             db.session.delete(item)
         logger.debug('Existing diary items deleted')
 
+        RollupManager().apply(
+            entry.user_id, entry.created_at.date(), items=len(items) - len(existing_items)
+        )
+        activity_manager = ActivityManager()
+        activity_manager.apply(
+            entry.user_id, entry.created_at, [item.item_name for item in existing_items], sign=-1
+        )
+        activity_manager.apply(
+            entry.user_id, entry.created_at, [item['item_name'] for item in items]
+        )
+        MetricManager().replace_entry_metrics(
+            entry, [(item['item_name'], item['item_content']) for item in items]
+        )
+
         # 新しい活動項目を追加
         for item in items:
             diary_item = DiaryItem(
@@ -465,10 +1388,12 @@ def update_entry(entry_id):
             )
             db.session.add(diary_item)
         logger.debug('New diary items added')
+        ChangeFeedManager().record([entry])
 
         db.session.commit()
+        live_feed.notify()
         logger.debug('Entry update successful')
-        return jsonify({'message': '更新が完了しました'})
+        return jsonify({'message': '更新が完了しました', 'entry': listed_entry(entry.id)})
     except Exception as e:
         logger.error('Error updating entry: %s', str(e))
         db.session.rollback()
@@ -478,8 +1403,7 @@ def update_entry(entry_id):
 @login_required
 def delete_entry(entry_id):
     logger.debug('Delete entry request received: %d', entry_id)
-    stmt = select(Entry).join(User).filter(Entry.id == entry_id)
-    entry = db.session.execute(stmt).scalar_one_or_none()
+    entry = find_entry_for_write(entry_id)
     
     if not entry:
         logger.debug('Entry not found: %d', entry_id)
@@ -493,8 +1417,17 @@ def delete_entry(entry_id):
         return jsonify({'error': '削除権限がありません'}), 403
 
     try:
+        RollupManager().apply(
+            entry.user_id, entry.created_at.date(), entries=-1, items=-len(entry.items)
+        )
+        ActivityManager().apply(
+            entry.user_id, entry.created_at, [item.item_name for item in entry.items], sign=-1
+        )
+        MetricManager().delete_entry_metrics(entry.id)
+        ChangeFeedManager().record([entry], ChangeFeedManager.DELETE)
         db.session.delete(entry)
         db.session.commit()
+        live_feed.notify()
         logger.debug('Entry deleted successfully')
         return jsonify({'message': '削除が完了しました'})
     except Exception as e:
@@ -502,5 +1435,68 @@ def delete_entry(entry_id):
         db.session.rollback()
         return jsonify({'error': '削除に失敗しました'}), 500
 
+@app.cli.command('rebuild-rollups')
+def rebuild_rollups_command():
+    """日別活動集計をentriesから再作成"""
+    count = RollupManager().rebuild()
+    db.session.commit()
+    print(f'活動集計を再作成しました: {count}件')
+
+@app.cli.command('rebuild-activities')
+def rebuild_activities_command():
+    """活動項目の頻度集計をdiary_itemsから再作成"""
+    count = ActivityManager().rebuild()
+    db.session.commit()
+    print(f'活動項目の集計を再作成しました: {count}件')
+
+@app.cli.command('rebuild-changes')
+def rebuild_changes_command():
+    """差分同期用の変更通番を既存のエントリーから記録し直す"""
+    count = ChangeFeedManager().rebuild()
+    db.session.commit()
+    print(f'変更通番を記録し直しました: {count}件')
+
+@app.cli.command('archive-entries')
+@click.option('--days', type=int, help='この日数より前のエントリーを移動（デフォルト: ARCHIVE_AFTER_DAYS）')
+def archive_entries_command(days):
+    """古いエントリーをアーカイブDBへ移動"""
+    days = days if days is not None else app.config['ARCHIVE_AFTER_DAYS']
+    before = datetime.datetime.now() - datetime.timedelta(days=days)
+    archive_manager = ArchiveManager()
+    total = 0
+    # 書き込みロックを長時間保持しないよう、バッチごとにコミットする
+    while True:
+        count = archive_manager.archive_batch(before)
+        db.session.commit()
+        if not count:
+            break
+        total += count
+    print(f'エントリーをアーカイブしました: {total}件')
+
+@app.cli.command('backfill-metrics')
+def backfill_metrics_command():
+    """既存のエントリーから数値を抽出し直す"""
+    count = MetricManager().backfill()
+    db.session.commit()
+    print(f'数値を抽出しました: {count}件')
+
+@app.cli.command('compact-bodies')
+def compact_bodies_command():
+    """既存のエントリーの本文を現在の設定（しきい値・圧縮方式）で格納し直す"""
+    count = BodyManager().compact()
+    db.session.commit()
+    stats = BodyManager().stats()
+    print(f'本文を格納し直しました: {count}件 '
+          f'（本文テーブル: {stats["bodies"]}件, {stats["raw_bytes"]} → {stats["stored_bytes"]}バイト）')
+
+@app.cli.command('build-assets')
+def build_assets_command():
+    """CSS・JavaScriptをページごとに結合・縮小し、ハッシュ付きのファイル名と圧縮済みファイルを書き出す"""
+    manifest = AssetBuilder(app.static_folder, app.config['ASSET_DIR']).build()
+    asset_manifest.load()
+    for name, filename in manifest.items():
+        print(f'{name} -> {filename}')
+    print(f'静的ファイルをビルドしました: {len(manifest)}件')
+
 if __name__ == '__main__':
     app.run(host='0.0.0.0', debug=True)
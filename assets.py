@@ -0,0 +1,263 @@
+"""静的ファイル（CSS・JavaScript）のビルド
+
+ページごとのバンドルに結合・縮小し、内容のハッシュを含むファイル名で書き出す。
+あわせて .gz（と brotli パッケージがあれば .br）の圧縮済みファイルと、
+バンドル名からファイル名を引くマニフェスト（manifest.json）を作成する。
+ファイル名は内容が変わると変わるため、配信時は immutable でキャッシュさせられる。
+"""
+import gzip
+import hashlib
+import json
+import os
+
+try:
+    import brotli
+except ImportError:  # brotliは任意（未インストール時は .gz のみ作成）
+    brotli = None
+
+# バンドル名と結合する static/ のファイル（テンプレートからは asset_url(バンドル名) で参照する）
+BUNDLES = {
+    'common.css': ['main.css'],                 # ホーム・ログイン・登録
+    'admin.css': ['main.css', 'admin.css'],     # 管理者画面
+    'settings.css': ['main.css', 'user.css'],   # 設定画面
+    'index.js': ['script.js']                   # ホーム
+}
+
+MANIFEST = 'manifest.json'
+
+# ファイル名に含めるハッシュの桁数
+HASH_LENGTH = 12
+
+WHITESPACE = ' \t\r\n\f\v'
+
+def is_word(char) -> bool:
+    return bool(char) and (char.isalnum() or char in '_$' or ord(char) > 127)
+
+def skip_string(source, i):
+    """引用符で始まる文字列の終わりの次の位置"""
+    quote = source[i]
+    i += 1
+    while i < len(source):
+        if source[i] == '\\':
+            i += 2
+            continue
+        if source[i] == quote:
+            return i + 1
+        if source[i] == '\n' and quote != '`':
+            break
+        i += 1
+    raise ValueError(f'Unterminated string at {i}')
+
+def minify_css(source: str) -> str:
+    """コメントと不要な空白・最後のセミコロンを削除"""
+    out = []
+    space = False
+    i, n = 0, len(source)
+    while i < n:
+        char = source[i]
+        if char in WHITESPACE or source.startswith('/*', i):
+            if char in WHITESPACE:
+                i += 1
+            else:
+                end = source.find('*/', i + 2)
+                if end < 0:
+                    raise ValueError(f'Unterminated comment at {i}')
+                i = end + 2
+            space = True
+            continue
+        prev = out[-1][-1] if out else ''
+        # 直前・直後が区切り文字の空白は不要（セレクタの「 :」は意味を持つため残す）
+        if space and prev and prev not in '{};,>:(' and char not in '{};,>)':
+            out.append(' ')
+        space = False
+        if char in '"\'':
+            end = skip_string(source, i)
+            out.append(source[i:end])
+            i = end
+            continue
+        if char == '}' and prev == ';':
+            out.pop()
+        out.append(char)
+        i += 1
+    return ''.join(out)
+
+# 直後の / が正規表現の始まりになる記号・キーワード
+REGEX_PRECEDERS = set('(,=:[!&|?{};+-*%<>~^')
+REGEX_KEYWORDS = {'return', 'typeof', 'case', 'do', 'else', 'in', 'of', 'new', 'delete', 'void',
+                  'throw', 'instanceof', 'yield', 'await'}
+
+def minify_js(source: str) -> str:
+    """コメントと行頭・行末の空白、空行を削除（自動セミコロン挿入に影響しないよう改行は残す）"""
+    out = []
+    # テンプレートリテラルの ${ } ごとの波括弧の深さ
+    templates = []
+    i, n = 0, len(source)
+
+    def last_token():
+        k = len(out) - 1
+        while k >= 0 and out[k] in (' ', '\n'):
+            k -= 1
+        if k < 0:
+            return ''
+        if not is_word(out[k]):
+            return out[k]
+        start = k
+        while start > 0 and is_word(out[start - 1]):
+            start -= 1
+        return ''.join(out[start:k + 1])
+
+    def copy_template(i):
+        """テンプレートリテラルの文字列部分を写し、終わりまたは ${ の次の位置を返す"""
+        start = i
+        while i < n:
+            if source[i] == '\\':
+                i += 2
+            elif source[i] == '`':
+                out.extend(source[start:i + 1])
+                return i + 1
+            elif source.startswith('${', i):
+                out.extend(source[start:i + 2])
+                templates.append(0)
+                return i + 2
+            else:
+                i += 1
+        raise ValueError(f'Unterminated template literal at {start}')
+
+    while i < n:
+        char = source[i]
+        if char in WHITESPACE or source.startswith('//', i) or source.startswith('/*', i):
+            newline = False
+            while i < n:
+                if source[i] in WHITESPACE:
+                    newline = newline or source[i] == '\n'
+                    i += 1
+                elif source.startswith('//', i):
+                    end = source.find('\n', i)
+                    i = n if end < 0 else end
+                elif source.startswith('/*', i):
+                    end = source.find('*/', i + 2)
+                    if end < 0:
+                        raise ValueError(f'Unterminated comment at {i}')
+                    newline = newline or '\n' in source[i:end]
+                    i = end + 2
+                else:
+                    break
+            prev = out[-1] if out else ''
+            following = source[i] if i < n else ''
+            if newline:
+                if prev and prev != '\n':
+                    out.append('\n')
+            elif (is_word(prev) and is_word(following)) or (prev == following and prev in '+-'):
+                out.append(' ')
+            continue
+
+        if char in '"\'':
+            end = skip_string(source, i)
+            out.extend(source[i:end])
+            i = end
+        elif char == '`':
+            out.append(char)
+            i = copy_template(i + 1)
+        elif char == '{' and templates:
+            templates[-1] += 1
+            out.append(char)
+            i += 1
+        elif char == '}' and templates and templates[-1] == 0:
+            # ${ } の終わり: テンプレートリテラルの続きを写す
+            templates.pop()
+            out.append(char)
+            i = copy_template(i + 1)
+        elif char == '/':
+            token = last_token()
+            if token == '' or token in REGEX_PRECEDERS or token in REGEX_KEYWORDS:
+                start = i
+                i += 1
+                in_class = False
+                while i < n and (in_class or source[i] != '/'):
+                    if source[i] == '\\':
+                        i += 1
+                    elif source[i] == '[':
+                        in_class = True
+                    elif source[i] == ']':
+                        in_class = False
+                    elif source[i] == '\n':
+                        raise ValueError(f'Unterminated regular expression at {start}')
+                    i += 1
+                out.extend(source[start:i + 1])
+                i += 1
+            else:
+                out.append(char)
+                i += 1
+        else:
+            if char == '}' and templates:
+                templates[-1] -= 1
+            out.append(char)
+            i += 1
+    return ''.join(out).strip('\n') + '\n'
+
+MINIFIERS = {'.css': minify_css, '.js': minify_js}
+
+class AssetBuilder:
+    """バンドルの作成とビルド（ハッシュ付きのファイル・圧縮済みファイル・マニフェストの書き出し）"""
+
+    def __init__(self, static_dir, output_dir, bundles=None):
+        self.static_dir = static_dir
+        self.output_dir = output_dir
+        self.bundles = bundles if bundles is not None else BUNDLES
+
+    def source(self, name) -> str:
+        """バンドルの元ファイルを結合した内容（縮小前）"""
+        contents = []
+        for filename in self.bundles[name]:
+            with open(os.path.join(self.static_dir, filename), encoding='utf-8') as f:
+                contents.append(f.read())
+        return '\n'.join(contents)
+
+    def build(self) -> dict:
+        """すべてのバンドルを書き出してマニフェストを返す（古いビルドのファイルは削除する）"""
+        os.makedirs(self.output_dir, exist_ok=True)
+        manifest = {}
+        written = {MANIFEST}
+        for name in self.bundles:
+            stem, ext = os.path.splitext(name)
+            data = MINIFIERS[ext](self.source(name)).encode('utf-8')
+            digest = hashlib.sha256(data).hexdigest()[:HASH_LENGTH]
+            filename = f'{stem}.{digest}{ext}'
+            variants = {filename: data, f'{filename}.gz': gzip.compress(data, 9, mtime=0)}
+            if brotli is not None:
+                variants[f'{filename}.br'] = brotli.compress(data, quality=11)
+            for path, content in variants.items():
+                with open(os.path.join(self.output_dir, path), 'wb') as f:
+                    f.write(content)
+            written.update(variants)
+            manifest[name] = filename
+
+        with open(os.path.join(self.output_dir, MANIFEST), 'w', encoding='utf-8') as f:
+            json.dump(manifest, f, indent=2, sort_keys=True)
+        for path in os.listdir(self.output_dir):
+            if path not in written:
+                os.remove(os.path.join(self.output_dir, path))
+        return manifest
+
+class AssetManifest:
+    """ビルド済みのバンドル名からハッシュ付きのファイル名を引く（未ビルドの場合は空）"""
+
+    def __init__(self, directory):
+        self.directory = directory
+        self.files = {}
+        self.load()
+
+    def load(self):
+        path = os.path.join(self.directory, MANIFEST)
+        try:
+            with open(path, encoding='utf-8') as f:
+                self.files = json.load(f)
+        except FileNotFoundError:
+            self.files = {}
+
+    def get(self, name):
+        return self.files.get(name)
+
+    def is_built(self, filename) -> bool:
+        """ビルドで書き出したファイル名か"""
+        return filename in self.files.values()
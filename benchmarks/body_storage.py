@@ -0,0 +1,159 @@
+#!/usr/bin/env python
+"""
+本文の格納方式によるDBサイズと一覧走査速度のベンチマーク
+
+すべての本文を行内に置く場合と、大きな本文を本文テーブルへ圧縮して置く場合とで、
+DBファイルのサイズ・フィード一覧の走査時間・全文の読み込み時間を比較する。
+
+使用方法:
+    $ python -m benchmarks.body_storage [--entries 5000] [--body-bytes 8000] [--codec zlib]
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from sqlalchemy import create_engine, select, text
+from sqlalchemy.orm import Session, selectinload
+from database import db
+from models import User, Entry, DiaryItem, BodyStorage
+
+SENTENCES = [
+    '朝6時に起きてジョギングをした。',
+    '今日は一日中雨が降っていたので、家で本を読んで過ごした。',
+    '仕事の打ち合わせが長引き、帰宅が遅くなった。',
+    '体重：72.5kg',
+    '夕食は友人と近所のイタリアンに行った。パスタがとても美味しかった。',
+    '新しいプロジェクトの設計について考えをまとめた。',
+    '睡眠：7時間',
+    '週末の予定を立てた。天気が良ければ山に登りたい。',
+]
+
+def make_body(rng, size):
+    """指定バイト数程度の日記らしい本文を作成"""
+    lines = []
+    length = 0
+    while length < size:
+        line = rng.choice(SENTENCES)
+        lines.append(line)
+        length += len(line.encode('utf-8')) + 1
+    return '\n'.join(lines)
+
+def build(path, entries, body_bytes, threshold, seed=0):
+    """ベンチマーク用のDBを作成してファイルサイズを返す"""
+    BodyStorage.threshold = threshold
+    rng = random.Random(seed)
+    engine = create_engine(f'sqlite:///{path}')
+    db.metadata.create_all(engine)
+    with Session(engine) as session:
+        user = User(userid='bench', name='Bench', password='Bench1234')
+        session.add(user)
+        session.flush()
+        started = datetime(2024, 1, 1)
+        for i in range(entries):
+            entry = Entry(
+                user_id=user.id,
+                title=f'Entry {i}',
+                content=make_body(rng, rng.randint(body_bytes // 2, body_bytes * 3 // 2)),
+                notes=make_body(rng, 100),
+                created_at=started + timedelta(hours=i)
+            )
+            session.add(entry)
+            session.flush()
+            session.add(DiaryItem(entry_id=entry.id, item_name='運動',
+                                  item_content=make_body(rng, body_bytes // 4),
+                                  created_at=entry.created_at))
+        session.commit()
+        session.execute(text('VACUUM'))
+    engine.dispose()
+    return os.path.getsize(path)
+
+def scan_feed(path, page_size):
+    """フィード一覧（ID・タイトル・抜粋・日時）をキーセットで最後まで走査する時間"""
+    engine = create_engine(f'sqlite:///{path}')
+    entries = Entry.__table__
+    started = time.perf_counter()
+    with engine.connect() as conn:
+        cursor = None
+        while True:
+            stmt = select(entries.c.id, entries.c.title, entries.c.excerpt, entries.c.sort_ts)
+            if cursor:
+                stmt = stmt.filter(
+                    (entries.c.sort_ts < cursor[0])
+                    | ((entries.c.sort_ts == cursor[0]) & (entries.c.id < cursor[1]))
+                )
+            rows = conn.execute(
+                stmt.order_by(entries.c.sort_ts.desc(), entries.c.id.desc()).limit(page_size)
+            ).all()
+            if not rows:
+                break
+            cursor = (rows[-1].sort_ts, rows[-1].id)
+    elapsed = time.perf_counter() - started
+    engine.dispose()
+    return elapsed
+
+def load_full(path, page_size):
+    """全文（本文・メモ・活動項目）をORMで読み込む時間（展開のコストを含む）"""
+    engine = create_engine(f'sqlite:///{path}')
+    started = time.perf_counter()
+    total = 0
+    with Session(engine) as session:
+        last_id = 0
+        while True:
+            page = session.execute(
+                select(Entry).filter(Entry.id > last_id).order_by(Entry.id).limit(page_size)
+                .options(selectinload(Entry.items))
+            ).scalars().all()
+            if not page:
+                break
+            for entry in page:
+                total += len(entry.content) + len(entry.notes)
+                total += sum(len(item.item_content) for item in entry.items)
+            last_id = page[-1].id
+            session.expunge_all()
+    elapsed = time.perf_counter() - started
+    engine.dispose()
+    return elapsed
+
+def run(entries=5000, body_bytes=8000, page_size=50, codec=BodyStorage.CODEC, directory=None):
+    """行内・本文テーブルの両方で計測し、結果の一覧を返す"""
+    saved = (BodyStorage.threshold, BodyStorage.codec, BodyStorage.level)
+    results = []
+    try:
+        BodyStorage.configure(codec=codec)
+        with tempfile.TemporaryDirectory(dir=directory) as tmp:
+            for label, threshold in (('inline', sys.maxsize), ('off-row', BodyStorage.THRESHOLD)):
+                path = os.path.join(tmp, f'{label}.db')
+                results.append({
+                    'storage': label,
+                    'size': build(path, entries, body_bytes, threshold),
+                    'scan': scan_feed(path, page_size),
+                    'load': load_full(path, page_size)
+                })
+    finally:
+        BodyStorage.threshold, BodyStorage.codec, BodyStorage.level = saved
+    return results
+
+def main():
+    parser = argparse.ArgumentParser(description='本文の格納方式のベンチマーク')
+    parser.add_argument('--entries', type=int, default=5000, help='エントリー数')
+    parser.add_argument('--body-bytes', type=int, default=8000, help='本文の平均バイト数')
+    parser.add_argument('--page-size', type=int, default=50, help='1ページの件数')
+    parser.add_argument('--codec', default=BodyStorage.CODEC, choices=['zlib', 'zstd'],
+                        help='圧縮方式')
+    args = parser.parse_args()
+
+    results = run(args.entries, args.body_bytes, args.page_size, args.codec)
+    print(f'{args.entries} entries, ~{args.body_bytes} bytes/body, codec={args.codec}')
+    print(f'{"storage":<8} {"size (KB)":>10} {"feed scan (ms)":>15} {"full load (ms)":>15}')
+    for result in results:
+        print(f'{result["storage"]:<8} {result["size"] / 1024:>10.0f} '
+              f'{result["scan"] * 1000:>15.1f} {result["load"] * 1000:>15.1f}')
+
+if __name__ == '__main__':
+    main()
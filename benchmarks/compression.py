@@ -0,0 +1,95 @@
+#!/usr/bin/env python
+"""
+レスポンス圧縮のCPUコストと削減できるバイト数のベンチマーク
+
+フィードのページ（全文・抜粋）、管理者画面のユーザー一覧、エクスポート（NDJSONのストリーミング）、
+ライブフィード（SSE、イベントごとにフラッシュ）の代表的なレスポンスについて、
+方式・圧縮レベルごとの圧縮後のサイズと圧縮時間を比較する。
+brotliパッケージがインストールされていない場合はgzipのみ計測する。
+
+使用方法:
+    $ python -m benchmarks.compression [--entries 1000] [--repeat 5]
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from models import EntryDTO, UserDTO
+from serializer import Serializer
+from compression import ResponseCompressor, brotli
+from benchmarks.serializer import make_entries, make_users
+
+# 計測する(方式, 圧縮レベル)
+LEVELS = [('gzip', 1), ('gzip', 6), ('gzip', 9), ('br', 1), ('br', 4), ('br', 11)]
+
+def make_payloads(entries):
+    """代表的なレスポンスを(名前, チャンクの一覧, フラッシュするか)で返す"""
+    feed = make_entries(10, body_bytes=1500)
+    excerpt_fields = ('id', 'title', 'excerpt', 'created_at', 'author_name', 'author_userid')
+    export = make_entries(entries, body_bytes=1000)
+    events = make_entries(50, body_bytes=300)
+    return [
+        ('feed page', [Serializer.dumps({
+            'entries': [EntryDTO.from_entry(entry) for entry in feed], 'has_next': True
+        })], False),
+        ('excerpt page', [Serializer.dumps({
+            'entries': [{field: getattr(entry, field, None) for field in excerpt_fields}
+                        for entry in feed], 'has_next': True
+        })], False),
+        ('admin users', [Serializer.dumps([UserDTO(*row) for row in make_users(entries)])], False),
+        ('export', [Serializer.dumps(EntryDTO.from_entry(entry)) + b'\n' for entry in export], False),
+        ('sse', [b'id: %d\nevent: upsert\ndata: ' % i + Serializer.dumps(EntryDTO.from_entry(entry))
+                 + b'\n\n' for i, entry in enumerate(events)], True)
+    ]
+
+def measure(compressor, chunks, encoding, flush, repeat):
+    """最短の圧縮時間（秒）と圧縮後のバイト数"""
+    best = None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        if len(chunks) == 1:
+            size = len(compressor.compress(chunks[0], encoding))
+        else:
+            size = sum(len(data) for data in compressor.iter_compressed(chunks, encoding, flush))
+        elapsed = time.perf_counter() - started
+        best = elapsed if best is None else min(best, elapsed)
+    return best, size
+
+def run(entries=1000, repeat=5, levels=LEVELS):
+    """各レスポンス・方式・圧縮レベルで計測し、結果の一覧を返す"""
+    results = []
+    for payload, chunks, flush in make_payloads(entries):
+        size = sum(len(chunk) for chunk in chunks)
+        for encoding, level in levels:
+            if encoding == 'br' and brotli is None:
+                continue
+            compressor = ResponseCompressor(level=level, brotli_level=level)
+            elapsed, compressed = measure(compressor, chunks, encoding, flush, repeat)
+            results.append({'payload': payload, 'encoding': encoding, 'level': level,
+                            'size': size, 'compressed': compressed, 'time': elapsed})
+    return results
+
+def main():
+    parser = argparse.ArgumentParser(description='レスポンス圧縮のベンチマーク')
+    parser.add_argument('--entries', type=int, default=1000,
+                        help='エクスポートのエントリー数・一覧のユーザー数')
+    parser.add_argument('--repeat', type=int, default=5, help='繰り返し回数（最短時間を採用）')
+    args = parser.parse_args()
+
+    results = run(args.entries, args.repeat)
+    if brotli is None:
+        print('brotli is not installed: gzip only')
+    print(f'{"payload":<13} {"codec":<8} {"size (KB)":>10} {"out (KB)":>9} {"ratio":>6} '
+          f'{"cpu (ms)":>9} {"saved KB/ms":>12}')
+    for result in results:
+        saved = (result['size'] - result['compressed']) / 1024
+        print(f'{result["payload"]:<13} {result["encoding"] + "-" + str(result["level"]):<8} '
+              f'{result["size"] / 1024:>10.1f} {result["compressed"] / 1024:>9.1f} '
+              f'{result["compressed"] / result["size"]:>6.2f} {result["time"] * 1000:>9.2f} '
+              f'{saved / max(result["time"] * 1000, 1e-6):>12.0f}')
+
+if __name__ == '__main__':
+    main()
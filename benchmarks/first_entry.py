@@ -0,0 +1,135 @@
+#!/usr/bin/env python
+"""
+ホーム画面の最初のエントリーが表示されるまでの時間のベンチマーク
+
+従来はHTML（空の一覧）を返した後、script.jsが GET /entries?page=1&view=excerpt を
+もう1回リクエストしてから描画していた。最初のページをHTMLに埋め込むと1往復で描画できる。
+サーバーでの処理時間を計測し、ネットワークの往復時間（RTT）ごとに最初のエントリーの
+表示までの時間を見積もる（CSS・JavaScriptはハッシュ付きのファイル名でキャッシュ済みとする）。
+
+ベンチマーク用のDBは一時ディレクトリに作成する（アプリのDBは使用しない）。
+DBの設定は環境変数 LIFELOG_DATABASE_URL・LIFELOG_ARCHIVE_DATABASE で渡すため、
+アプリを読み込んでいない新しいプロセスで実行する。
+
+使用方法:
+    $ python -m benchmarks.first_entry [--entries 1000] [--rtt 0 50 150 300]
+"""
+import argparse
+import logging
+import os
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+def measure(func, repeat):
+    """最短の実行時間（秒）と結果のバイト数"""
+    best = None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        body = func()
+        elapsed = time.perf_counter() - started
+        best = elapsed if best is None else min(best, elapsed)
+    return best, len(body)
+
+def populate(app, db, entries):
+    """ベンチマーク用のユーザーとエントリーを作成"""
+    from models import User, Entry, DiaryItem
+    from benchmarks.body_storage import make_body
+    import random
+
+    rng = random.Random(0)
+    with app.app_context():
+        user = User(userid='bench', name='Bench', password='Bench1234')
+        db.session.add(user)
+        db.session.flush()
+        started = datetime(2024, 1, 1)
+        for i in range(entries):
+            entry = Entry(user_id=user.id, title=f'Entry {i}', content=make_body(rng, 1500),
+                          notes=make_body(rng, 100), created_at=started + timedelta(hours=i))
+            db.session.add(entry)
+            db.session.flush()
+            db.session.add(DiaryItem(entry_id=entry.id, item_name='運動',
+                                     item_content=make_body(rng, 60),
+                                     created_at=entry.created_at))
+        db.session.commit()
+
+def run(entries=1000, rtts=(0, 50, 150, 300), repeat=20, directory=None):
+    """サーバーでの処理時間を計測し、RTTごとの見積もりの一覧を返す"""
+    if 'app' in sys.modules:
+        # DBの設定はアプリの読み込み時に決まるため、一時DBを使うには新しいプロセスで実行する
+        raise RuntimeError('app is already imported: run this benchmark in a new process')
+    with tempfile.TemporaryDirectory(dir=directory) as tmp:
+        os.environ['LIFELOG_DATABASE_URL'] = f'sqlite:///{os.path.join(tmp, "diary.db")}'
+        os.environ['LIFELOG_ARCHIVE_DATABASE'] = os.path.join(tmp, 'archive.db')
+        logging.disable(logging.CRITICAL)
+        try:
+            from flask import render_template
+            from app import app, entries_page_data, visible_entries_query, EXCERPT_PROJECTION
+            from database import db
+            populate(app, db, entries)
+            client = app.test_client()
+
+            def render(initial_feed=None):
+                with app.test_request_context('/'):
+                    return render_template('index.html', initial_feed=initial_feed)
+
+            def render_with_feed():
+                with app.test_request_context('/'):
+                    initial_feed = entries_page_data(
+                        visible_entries_query(), 1, EXCERPT_PROJECTION, {'visible_only': True}
+                    )
+                    return render_template('index.html', initial_feed=initial_feed)
+
+            shell, shell_size = measure(render, repeat)
+            api, api_size = measure(
+                lambda: client.get('/entries?page=1&view=excerpt').get_data(), repeat
+            )
+            inline, inline_size = measure(render_with_feed, repeat)
+        finally:
+            logging.disable(logging.NOTSET)
+            with app.app_context():
+                db.session.remove()
+                db.engine.dispose()
+
+    results = []
+    for rtt in rtts:
+        rtt /= 1000
+        results.append({
+            'rtt': rtt,
+            # HTML → 一覧のAPI の2往復
+            'before': rtt + shell + rtt + api,
+            # 最初のページを埋め込んだHTML の1往復
+            'after': rtt + inline,
+            'requests_before': 2,
+            'requests_after': 1,
+            'bytes_before': shell_size + api_size,
+            'bytes_after': inline_size,
+            'server_before': shell + api,
+            'server_after': inline
+        })
+    return results
+
+def main():
+    parser = argparse.ArgumentParser(description='最初のエントリーの表示までの時間のベンチマーク')
+    parser.add_argument('--entries', type=int, default=1000, help='エントリー数')
+    parser.add_argument('--rtt', type=int, nargs='+', default=[0, 50, 150, 300],
+                        help='ネットワークの往復時間（ミリ秒）')
+    parser.add_argument('--repeat', type=int, default=20, help='繰り返し回数（最短時間を採用）')
+    args = parser.parse_args()
+
+    results = run(args.entries, args.rtt, args.repeat)
+    first = results[0]
+    print(f'{args.entries} entries: server {first["server_before"] * 1000:.1f}ms '
+          f'({first["requests_before"]} requests, {first["bytes_before"] / 1024:.1f}KB) -> '
+          f'{first["server_after"] * 1000:.1f}ms '
+          f'({first["requests_after"]} request, {first["bytes_after"] / 1024:.1f}KB)')
+    print(f'{"rtt (ms)":>8} {"before (ms)":>12} {"after (ms)":>11}')
+    for result in results:
+        print(f'{result["rtt"] * 1000:>8.0f} {result["before"] * 1000:>12.1f} '
+              f'{result["after"] * 1000:>11.1f}')
+
+if __name__ == '__main__':
+    main()
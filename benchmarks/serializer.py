@@ -0,0 +1,157 @@
+#!/usr/bin/env python
+"""
+JSONレスポンスの作成速度のベンチマーク
+
+エントリー・ユーザーの一覧について、行ごとに辞書を組み立てて .isoformat() を呼び
+Flask標準の jsonify でエンコードする従来の方法と、DTOを Serializer で直接バイト列に
+エンコードする方法とで、レスポンス1件の作成時間とサイズを行数ごとに比較する。
+orjsonがインストールされていない場合は標準のjsonのバックエンドのみ計測する。
+
+使用方法:
+    $ python -m benchmarks.serializer [--rows 10 100 10000] [--repeat 5]
+"""
+import argparse
+import os
+import random
+import sys
+import time
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from flask import Flask
+from flask.json.provider import DefaultJSONProvider
+from models import EntryDTO, UserDTO
+from serializer import Serializer, SerializerJSONProvider, orjson
+from benchmarks.body_storage import make_body
+
+def make_entries(rows, seed=0, body_bytes=300):
+    """ORMのエントリーと同じ属性を持つオブジェクトを作成（DBの読み込みは計測に含めない）"""
+    rng = random.Random(seed)
+    users = [SimpleNamespace(name=f'ユーザー{i}', userid=f'user{i}', is_visible=True)
+             for i in range(10)]
+    started = datetime(2024, 1, 1, 9, 0, 0, 123456)
+    entries = []
+    for i in range(rows):
+        user = rng.choice(users)
+        content = make_body(rng, body_bytes)
+        entries.append(SimpleNamespace(
+            id=i + 1, title=f'Entry {i}', content=content, excerpt=content[:120],
+            notes=make_body(rng, 60), user_id=users.index(user) + 1, user=user,
+            items=[SimpleNamespace(item_name='運動', item_content=make_body(rng, 40))
+                   for _ in range(rng.randint(0, 3))],
+            created_at=started + timedelta(hours=i),
+            updated_at=started + timedelta(hours=i, minutes=5) if i % 3 == 0 else None
+        ))
+    return entries
+
+def make_users(rows):
+    """管理者画面のユーザー一覧のCoreの行（UserDTO.__slots__の順のタプル）"""
+    return [
+        (i + 1, f'user{i}', f'ユーザー{i}', i % 10 == 0, i % 7 == 0, True, i % 3,
+         datetime(2024, 1, 1, 9, 0) + timedelta(minutes=i) if i % 3 else None, i * 5)
+        for i in range(rows)
+    ]
+
+def legacy_entry(entry, can_edit):
+    """従来のレスポンス用の辞書（行ごとの辞書の組み立てと .isoformat()）"""
+    return {
+        'id': entry.id,
+        'title': entry.title,
+        'content': entry.content,
+        'excerpt': entry.excerpt,
+        'notes': entry.notes,
+        'items': [{
+            'item_name': item.item_name,
+            'item_content': item.item_content
+        } for item in entry.items],
+        'created_at': entry.created_at.isoformat() if entry.created_at else None,
+        'updated_at': entry.updated_at.isoformat() if entry.updated_at else None,
+        'author_name': entry.user.name,
+        'author_userid': entry.user.userid,
+        'is_visible': entry.user.is_visible,
+        'user_id': entry.user_id,
+        'can_edit': can_edit
+    }
+
+def legacy_user(row):
+    user = dict(zip(UserDTO.__slots__, row))
+    user['last_login_attempt'] = (
+        user['last_login_attempt'].isoformat() if user['last_login_attempt'] else None
+    )
+    return user
+
+def measure(func, repeat):
+    """最短の実行時間（秒）とレスポンスのバイト数"""
+    best = None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        body = func()
+        elapsed = time.perf_counter() - started
+        best = elapsed if best is None else min(best, elapsed)
+    return best, len(body)
+
+def run(rows=(10, 100, 10000), repeat=5):
+    """各行数・各方法で計測し、結果の一覧を返す"""
+    app = Flask(__name__)
+    legacy = DefaultJSONProvider(app)
+    provider = SerializerJSONProvider(app)
+    backends = [backend for backend in Serializer.BACKENDS
+                if backend != 'orjson' or orjson is not None]
+    saved = Serializer.backend
+    results = []
+    try:
+        with app.app_context():
+            for count in rows:
+                entries = make_entries(count)
+                users = make_users(count)
+                paths = {
+                    'entries': {
+                        'jsonify': lambda: legacy.response(
+                            [legacy_entry(entry, False) for entry in entries]
+                        ).get_data(),
+                        'dto': lambda: provider.response(
+                            [EntryDTO.from_entry(entry) for entry in entries]
+                        ).get_data()
+                    },
+                    'users': {
+                        'jsonify': lambda: legacy.response(
+                            [legacy_user(row) for row in users]
+                        ).get_data(),
+                        'dto': lambda: provider.response(
+                            [UserDTO(*row) for row in users]
+                        ).get_data()
+                    }
+                }
+                for payload, funcs in paths.items():
+                    elapsed, size = measure(funcs['jsonify'], repeat)
+                    results.append({'payload': payload, 'rows': count, 'path': 'jsonify',
+                                    'time': elapsed, 'size': size})
+                    for backend in backends:
+                        Serializer.configure(backend)
+                        elapsed, size = measure(funcs['dto'], repeat)
+                        results.append({'payload': payload, 'rows': count, 'path': f'dto+{backend}',
+                                        'time': elapsed, 'size': size})
+    finally:
+        Serializer.backend = saved
+    return results
+
+def main():
+    parser = argparse.ArgumentParser(description='JSONレスポンスの作成速度のベンチマーク')
+    parser.add_argument('--rows', type=int, nargs='+', default=[10, 100, 10000], help='行数')
+    parser.add_argument('--repeat', type=int, default=5, help='繰り返し回数（最短時間を採用）')
+    args = parser.parse_args()
+
+    results = run(args.rows, args.repeat)
+    print(f'{"payload":<8} {"rows":>6} {"path":<12} {"time (ms)":>10} {"size (KB)":>10} {"speedup":>8}')
+    baseline = {}
+    for result in results:
+        key = (result['payload'], result['rows'])
+        baseline.setdefault(key, result['time'])
+        print(f'{result["payload"]:<8} {result["rows"]:>6} {result["path"]:<12} '
+              f'{result["time"] * 1000:>10.3f} {result["size"] / 1024:>10.1f} '
+              f'{baseline[key] / result["time"]:>7.1f}x')
+
+if __name__ == '__main__':
+    main()
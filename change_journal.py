@@ -0,0 +1,385 @@
+"""変更ジャーナル（ポイントインタイムリカバリ用）
+
+users / entries / diary_items（と圧縮した本文）への変更を行単位でJSON Linesのセグメントに追記する。
+アーカイブDBとの間のエントリーの移動はエントリーIDの一覧として記録する。
+セグメント名には書き込み元（アプリ以外はsource）を含め、アプリと管理ツールが同じディレクトリへ書き込める。
+書き込みはバックグラウンドスレッドがまとめて行い（グループコミット）、セグメントが
+一定サイズを超えるとgzip圧縮してアーカイブディレクトリへ移動する。
+"""
+import atexit
+import base64
+import datetime
+import gzip
+import heapq
+import json
+import logging
+import os
+import shutil
+import threading
+from itertools import chain, groupby
+
+from sqlalchemy import event, inspect
+
+logger = logging.getLogger('change_journal')
+
+# ジャーナル対象のテーブル
+JOURNALED_TABLES = ('users', 'entries', 'diary_items', 'entry_bodies', 'diary_item_bodies')
+
+SEGMENT_PREFIX = 'journal_'
+SEGMENT_SUFFIX = '.jsonl'
+ARCHIVE_SUFFIX = '.jsonl.gz'
+SEGMENT_TIMESTAMP_FORMAT = '%Y%m%d_%H%M%S_%f'
+
+# SQLAlchemyがSQLiteに保存する日時の形式（復元時にそのまま書き戻す）
+SQLITE_DATETIME_FORMAT = '%Y-%m-%d %H:%M:%S.%f'
+
+# アーカイブDBをATTACHするスキーマ名（models.archive_manager.ARCHIVE_SCHEMA と同じ）
+ARCHIVE_SCHEMA = 'archive'
+
+# エントリーの移動の操作と（移動元, 移動先）のスキーマ
+MOVE_OPS = {'archive': ('main', ARCHIVE_SCHEMA), 'restore': (ARCHIVE_SCHEMA, 'main')}
+
+class ChangeJournal:
+    """追記専用の変更ジャーナル"""
+
+    # セグメントを切り替えるサイズ（4MB）
+    SEGMENT_BYTES = 4 * 1024 * 1024
+
+    def __init__(self, journal_dir, archive_dir=None, segment_bytes=None, durable=True, source=None):
+        self.journal_dir = journal_dir
+        self.archive_dir = archive_dir or journal_dir
+        self.segment_bytes = segment_bytes or self.SEGMENT_BYTES
+        self.durable = durable
+        self.source = source
+        os.makedirs(self.journal_dir, exist_ok=True)
+        os.makedirs(self.archive_dir, exist_ok=True)
+
+        self.cond = threading.Condition()
+        self.buffer = []
+        self.appended = 0  # 追記要求の通番
+        self.flushed = 0   # 書き込み済みの通番
+        self.closed = False
+        self.segment = None
+        self.segment_path = None
+
+        # 前回の実行で残った自身のセグメントをアーカイブ（他の書き込み元のセグメントは書き込み中の場合がある）
+        for filename in sorted(os.listdir(self.journal_dir)):
+            if (filename.startswith(SEGMENT_PREFIX) and filename.endswith(SEGMENT_SUFFIX)
+                    and parse_segment_name(filename)[1] == self.source):
+                self.archive_segment(os.path.join(self.journal_dir, filename))
+
+        self.thread = threading.Thread(target=self.flush_loop, name='change-journal', daemon=True)
+        self.thread.start()
+        atexit.register(self.close)
+
+    def append(self, records):
+        """レコードを追記（durableなら書き込み完了まで待機）"""
+        if not records:
+            return
+        with self.cond:
+            if self.closed:
+                raise RuntimeError('変更ジャーナルは終了しています')
+            # 時刻は通番と同じロック内で付与し、ファイル上の順序と一致させる
+            ts = datetime.datetime.now().isoformat()
+            self.buffer.extend({'ts': ts, **record} for record in records)
+            self.appended += 1
+            sequence = self.appended
+            self.cond.notify_all()
+            if self.durable:
+                while self.flushed < sequence:
+                    self.cond.wait()
+
+    def flush_loop(self):
+        """バッファをまとめて書き込むバックグラウンド処理"""
+        while True:
+            with self.cond:
+                while not self.buffer and not self.closed:
+                    self.cond.wait()
+                if not self.buffer:
+                    return
+                batch, self.buffer = self.buffer, []
+                sequence = self.appended
+
+            try:
+                self.write_batch(batch)
+            except Exception as e:
+                logger.error('Failed to write change journal: %s', str(e))
+
+            with self.cond:
+                self.flushed = sequence
+                self.cond.notify_all()
+
+    def write_batch(self, batch):
+        """1回の書き込みとfsyncでバッチ全体を永続化"""
+        if self.segment is None:
+            started = datetime.datetime.fromisoformat(batch[0]['ts'])
+            source = f'.{self.source}' if self.source else ''
+            self.segment_path = os.path.join(
+                self.journal_dir,
+                f'{SEGMENT_PREFIX}{started.strftime(SEGMENT_TIMESTAMP_FORMAT)}{source}{SEGMENT_SUFFIX}'
+            )
+            self.segment = open(self.segment_path, 'a', encoding='utf-8')
+
+        self.segment.write(''.join(
+            json.dumps(record, ensure_ascii=False, separators=(',', ':')) + '\n'
+            for record in batch
+        ))
+        self.segment.flush()
+        os.fsync(self.segment.fileno())
+
+        if self.segment.tell() >= self.segment_bytes:
+            self.rotate()
+
+    def rotate(self):
+        """現在のセグメントを閉じてアーカイブ"""
+        if self.segment is None:
+            return
+        self.segment.close()
+        self.segment = None
+        self.archive_segment(self.segment_path)
+
+    def archive_segment(self, path):
+        """セグメントをgzip圧縮してアーカイブディレクトリへ移動"""
+        filename = os.path.basename(path)[:-len(SEGMENT_SUFFIX)] + ARCHIVE_SUFFIX
+        archive_path = os.path.join(self.archive_dir, filename)
+        tmp_path = f'{archive_path}.tmp'
+        with open(path, 'rb') as src, gzip.open(tmp_path, 'wb') as dst:
+            shutil.copyfileobj(src, dst)
+        os.replace(tmp_path, archive_path)
+        os.remove(path)
+        logger.info('Change journal segment archived: %s', archive_path)
+
+    def close(self):
+        """未書き込みのレコードを書き出して終了"""
+        with self.cond:
+            if self.closed:
+                return
+            self.closed = True
+            self.cond.notify_all()
+        self.thread.join()
+        if self.segment is not None:
+            self.segment.close()
+            self.segment = None
+
+def serialize_value(value):
+    """列の値をSQLiteに保存される形式に変換"""
+    if isinstance(value, datetime.datetime):
+        return value.strftime(SQLITE_DATETIME_FORMAT)
+    if isinstance(value, datetime.date):
+        return value.isoformat()
+    if isinstance(value, bool):
+        return int(value)
+    if isinstance(value, bytes):
+        # BLOBはJSONで表せないためBase64で保存する
+        return {'base64': base64.b64encode(value).decode('ascii')}
+    return value
+
+def deserialize_value(value):
+    """serialize_valueで変換した値をSQLiteに書き戻す形式に戻す"""
+    if isinstance(value, dict):
+        return base64.b64decode(value['base64'])
+    return value
+
+def row_image(obj):
+    """ORMオブジェクトの全列の値を取得"""
+    mapper = inspect(obj).mapper
+    return {
+        attr.columns[0].name: serialize_value(getattr(obj, attr.key))
+        for attr in mapper.column_attrs
+    }
+
+def attach_journal(session, journal):
+    """セッションのコミット時に変更をジャーナルへ書き込むよう設定"""
+
+    @event.listens_for(session, 'after_begin')
+    def start_changes(session, transaction, connection):
+        # record_moveがジャーナルの有効なセッションか判定できるよう、トランザクションの開始時に用意する
+        session.info.setdefault('change_journal', [])
+
+    @event.listens_for(session, 'after_flush')
+    def collect_changes(session, flush_context):
+        pending = session.info.setdefault('change_journal', [])
+        for obj in list(session.new) + list(session.dirty):
+            table = inspect(obj).mapper.local_table.name
+            if table in JOURNALED_TABLES:
+                pending.append({'table': table, 'op': 'upsert', 'row': row_image(obj)})
+        for obj in session.deleted:
+            table = inspect(obj).mapper.local_table.name
+            if table in JOURNALED_TABLES:
+                pending.append({'table': table, 'op': 'delete', 'row': {'id': obj.id}})
+
+    @event.listens_for(session, 'after_commit')
+    def write_changes(session):
+        pending = session.info.pop('change_journal', None)
+        if pending:
+            journal.append(pending)
+
+    @event.listens_for(session, 'after_rollback')
+    def discard_changes(session):
+        session.info.pop('change_journal', None)
+
+def is_journaled(session):
+    """セッションの変更がジャーナルに書き込まれるか（トランザクション中のみ判定できる）"""
+    return 'change_journal' in session.info
+
+def record_move(session, op, entry_ids, rows=()):
+    """アーカイブDBとの間のエントリーの移動をコミット時にジャーナルへ書き込む（無効なら何もしない）
+
+    Coreの一括更新はフラッシュの対象にならないため、移動したエントリーのIDを記録する。
+    rows（テーブル名と列の値の組）を指定すると、移動後の行の内容もupsertとして記録する。
+    """
+    pending = session.info.get('change_journal')
+    if pending is None:
+        return
+    pending.append({'table': 'entries', 'op': op, 'row': {'ids': list(entry_ids)}})
+    for table, row in rows:
+        pending.append({
+            'table': table,
+            'op': 'upsert',
+            'row': {name: serialize_value(value) for name, value in row.items()}
+        })
+
+def record_rows(session, objects):
+    """一括保存（bulk_save_objects）したオブジェクトをコミット時にジャーナルへ書き込む（無効なら何もしない）
+
+    一括保存はフラッシュの対象にならないため、保存後の行の内容をupsertとして記録する。
+    """
+    pending = session.info.get('change_journal')
+    if pending is None:
+        return
+    for obj in objects:
+        table = inspect(obj).mapper.local_table.name
+        if table in JOURNALED_TABLES:
+            pending.append({'table': table, 'op': 'upsert', 'row': row_image(obj)})
+
+def record_deletes(session, table, ids):
+    """Coreの一括削除（query.delete）で削除した行をコミット時にジャーナルへ書き込む（無効なら何もしない）"""
+    pending = session.info.get('change_journal')
+    if pending is None:
+        return
+    pending.extend({'table': table, 'op': 'delete', 'row': {'id': row_id}} for row_id in ids)
+
+def parse_segment_name(filename):
+    """セグメントのファイル名から開始時刻と書き込み元（アプリはNone）を取得"""
+    stem = filename[len(SEGMENT_PREFIX):].split('.jsonl')[0]
+    started, _, source = stem.partition('.')
+    return datetime.datetime.strptime(started, SEGMENT_TIMESTAMP_FORMAT), source or None
+
+def segment_paths(directories):
+    """ジャーナルセグメントを時刻順に取得（同じセグメントはアーカイブを優先）"""
+    segments = {}
+    for directory in directories:
+        if not directory or not os.path.isdir(directory):
+            continue
+        for filename in os.listdir(directory):
+            if not filename.startswith(SEGMENT_PREFIX):
+                continue
+            for suffix in (ARCHIVE_SUFFIX, SEGMENT_SUFFIX):
+                if filename.endswith(suffix):
+                    stem = filename[:-len(suffix)]
+                    if stem not in segments or suffix == ARCHIVE_SUFFIX:
+                        segments[stem] = os.path.join(directory, filename)
+                    break
+    return [segments[stem] for stem in sorted(segments)]
+
+def read_segment(path, since=None, until=None):
+    """セグメントからsince以降until以前のレコードを書き込み順に返す"""
+    opener = gzip.open if path.endswith(ARCHIVE_SUFFIX) else open
+    with opener(path, 'rt', encoding='utf-8') as f:
+        for line in f:
+            if not line.strip():
+                continue
+            try:
+                record = json.loads(line)
+            except ValueError:
+                # 書き込み途中で終了した末尾の行は無視
+                logger.warning('Skipping broken journal line in %s', path)
+                continue
+            ts = datetime.datetime.fromisoformat(record['ts'])
+            if since and ts < since:
+                continue
+            if until and ts > until:
+                return
+            yield record
+
+def read_records(directories, since=None, until=None):
+    """since以降until以前のレコードを時刻順に返す（書き込み元ごとのセグメントを時刻で合流）"""
+    segments = {}
+    for path in segment_paths(directories):
+        started, source = parse_segment_name(os.path.basename(path))
+        segments.setdefault(source, []).append((started, path))
+
+    streams = []
+    for source_segments in segments.values():
+        paths = [
+            path for index, (_, path) in enumerate(source_segments)
+            # 同じ書き込み元の次のセグメントがsinceより前に始まっていれば、このセグメントは対象外
+            if not (since and index + 1 < len(source_segments) and source_segments[index + 1][0] < since)
+        ]
+        streams.append(chain.from_iterable(read_segment(path, since, until) for path in paths))
+    yield from heapq.merge(*streams, key=lambda record: datetime.datetime.fromisoformat(record['ts']))
+
+def is_archive_attached(conn):
+    """sqlite3接続にアーカイブDBがATTACHされているか判定"""
+    return conn.execute(
+        'SELECT 1 FROM pragma_database_list WHERE name = ?', (ARCHIVE_SCHEMA,)
+    ).fetchone() is not None
+
+def move_entries(conn, op, entry_ids):
+    """エントリーと活動項目をホットとアーカイブの間で移動（移動先に同じIDがあれば置き換える）"""
+    source, target = MOVE_OPS[op]
+    marks = ', '.join('?' * len(entry_ids))
+    for table, key in (('entries', 'id'), ('diary_items', 'entry_id')):
+        # アーカイブのテーブルの列はホットの列の一部
+        columns = ', '.join(
+            row[1] for row in conn.execute(f'PRAGMA {ARCHIVE_SCHEMA}.table_info({table})')
+        )
+        conn.execute(
+            f'INSERT OR REPLACE INTO {target}.{table} ({columns}) '
+            f'SELECT {columns} FROM {source}.{table} WHERE {key} IN ({marks})',
+            entry_ids
+        )
+    for table, key in (('diary_items', 'entry_id'), ('entries', 'id')):
+        conn.execute(f'DELETE FROM {source}.{table} WHERE {key} IN ({marks})', entry_ids)
+
+def reconcile_archive(conn):
+    """ホットとアーカイブの両方にあるエントリーをホットから削除し、削除件数を返す（コミットは呼び出し側）
+
+    アーカイブDBを含まないバックアップから復元した場合などに残る重複を、アーカイブを優先して解消する。
+    """
+    if not is_archive_attached(conn):
+        return 0
+    archived = f'SELECT id FROM {ARCHIVE_SCHEMA}.entries'
+    conn.execute(f'DELETE FROM main.diary_items WHERE entry_id IN ({archived})')
+    return conn.execute(f'DELETE FROM main.entries WHERE id IN ({archived})').rowcount
+
+def replay(conn, records):
+    """レコードをsqlite3接続に適用し、適用件数を返す（コミットは呼び出し側）
+
+    アーカイブDBがATTACHされていない場合、エントリーの移動は適用せずホットに残す。
+    """
+    count = 0
+    archive_attached = is_archive_attached(conn)
+    # 同じテーブル・操作・列が続く範囲をexecutemanyでまとめて適用
+    for (table, op, columns), group in groupby(
+        records, key=lambda r: (r['table'], r['op'], tuple(r['row']))
+    ):
+        if table not in JOURNALED_TABLES:
+            continue
+        if op in MOVE_OPS:
+            for record in group:
+                if archive_attached:
+                    move_entries(conn, op, record['row']['ids'])
+                count += 1
+            continue
+        rows = [tuple(map(deserialize_value, record['row'].values())) for record in group]
+        if op == 'upsert':
+            conn.executemany(
+                f'INSERT OR REPLACE INTO {table} ({", ".join(columns)}) '
+                f'VALUES ({", ".join("?" * len(columns))})',
+                rows
+            )
+        elif op == 'delete':
+            conn.executemany(f'DELETE FROM {table} WHERE id = ?', rows)
+        count += len(rows)
+    return count
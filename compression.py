@@ -0,0 +1,134 @@
+"""レスポンスの圧縮（gzip / brotli）
+
+Accept-Encodingで受け付けられる方式のうち、brotli（パッケージがある場合）、gzipの順で選ぶ。
+小さなレスポンスや圧縮済みのレスポンスはそのまま返し、エクスポートやSSEなどの
+ストリーミングのレスポンスはチャンクごとに逐次圧縮する（SSEはイベントごとにフラッシュする）。
+"""
+import zlib
+from werkzeug.wsgi import ClosingIterator
+
+try:
+    import brotli
+except ImportError:  # brotliは任意（未インストール時はgzipのみ使用）
+    brotli = None
+
+# 圧縮するContent-Type（CSRFトークンを含むHTMLはBREACH対策のため圧縮しない）
+COMPRESSIBLE_MIMETYPES = frozenset({
+    'application/json',
+    'application/x-ndjson',
+    'application/javascript',
+    'text/javascript',
+    'text/css',
+    'text/csv',
+    'text/markdown',
+    'text/plain',
+    'text/event-stream',
+    'image/svg+xml'
+})
+
+# 1チャンクごとにフラッシュするContent-Type（届いたイベントをすぐに表示させる）
+FLUSH_MIMETYPES = frozenset({'text/event-stream'})
+
+class StreamCompressor:
+    """gzip / brotli の逐次圧縮"""
+
+    __slots__ = ('encoding', 'compressor')
+
+    def __init__(self, encoding, level):
+        self.encoding = encoding
+        if encoding == 'br':
+            self.compressor = brotli.Compressor(quality=level)
+        else:
+            self.compressor = zlib.compressobj(level, zlib.DEFLATED, 31)
+
+    def compress(self, data: bytes) -> bytes:
+        if self.encoding == 'br':
+            return self.compressor.process(data)
+        return self.compressor.compress(data)
+
+    def flush(self) -> bytes:
+        """ここまでの入力をすべて出力する（ストリームは続けられる）"""
+        if self.encoding == 'br':
+            return self.compressor.flush()
+        return self.compressor.flush(zlib.Z_SYNC_FLUSH)
+
+    def finish(self) -> bytes:
+        if self.encoding == 'br':
+            return self.compressor.finish()
+        return self.compressor.flush()
+
+class ResponseCompressor:
+    """Accept-Encodingに応じてレスポンスを圧縮する（after_requestから呼ぶ）"""
+
+    MIN_SIZE = 500
+    LEVELS = {'gzip': 6, 'br': 4}
+
+    def __init__(self, min_size=MIN_SIZE, level=None, brotli_level=None,
+                 mimetypes=COMPRESSIBLE_MIMETYPES):
+        self.min_size = min_size
+        self.levels = {
+            'gzip': level if level is not None else self.LEVELS['gzip'],
+            'br': brotli_level if brotli_level is not None else self.LEVELS['br']
+        }
+        self.mimetypes = mimetypes
+        # サーバー側の優先順（同じqの場合は先のものを選ぶ）
+        self.encodings = ['br', 'gzip'] if brotli is not None else ['gzip']
+
+    def negotiate(self, accept_encodings):
+        """使用する方式（受け付けられる方式がなければNone）"""
+        return accept_encodings.best_match(self.encodings)
+
+    def compress(self, data: bytes, encoding: str) -> bytes:
+        if encoding == 'br':
+            return brotli.compress(data, quality=self.levels['br'])
+        return zlib.compress(data, self.levels['gzip'], wbits=31)
+
+    def iter_compressed(self, chunks, encoding, flush=False):
+        """チャンクを逐次圧縮して返す（空の出力は返さない）"""
+        compressor = StreamCompressor(encoding, self.levels[encoding])
+        for chunk in chunks:
+            if isinstance(chunk, str):
+                chunk = chunk.encode('utf-8')
+            data = compressor.compress(chunk)
+            if flush:
+                data += compressor.flush()
+            if data:
+                yield data
+        yield compressor.finish()
+
+    def apply(self, response, accept_encodings):
+        """レスポンスを圧縮する（対象外の場合はそのまま返す）"""
+        if (response.status_code < 200 or response.status_code in (204, 206, 304)
+                or 'Content-Encoding' in response.headers
+                or response.mimetype not in self.mimetypes):
+            return response
+
+        # 静的ファイルは読み込んでから圧縮し、Content-Lengthを付けたまま返す
+        if response.direct_passthrough:
+            response.direct_passthrough = False
+            response.get_data()
+        streamed = response.is_streamed
+        if not streamed and response.calculate_content_length() < self.min_size:
+            return response
+
+        response.vary.add('Accept-Encoding')
+        encoding = self.negotiate(accept_encodings)
+        if encoding is None:
+            return response
+
+        if streamed:
+            chunks = response.response
+            response.response = ClosingIterator(
+                self.iter_compressed(chunks, encoding, response.mimetype in FLUSH_MIMETYPES),
+                getattr(chunks, 'close', None)
+            )
+            response.headers.pop('Content-Length', None)
+        else:
+            response.set_data(self.compress(response.get_data(), encoding))
+        response.headers['Content-Encoding'] = encoding
+
+        # 圧縮後のバイト列は元と異なるため、強いETagは弱いETagにする
+        etag, weak = response.get_etag()
+        if etag and not weak:
+            response.set_etag(etag, weak=True)
+        return response
@@ -1,7 +1,8 @@
 from flask_sqlalchemy import SQLAlchemy
 from sqlalchemy.orm import DeclarativeBase
-from sqlalchemy import event
+from sqlalchemy import create_engine, event
 import logging
+import os
 
 # ロガーの設定
 logging.basicConfig(level=logging.DEBUG)
@@ -12,6 +13,52 @@ class Base(DeclarativeBase):
 
 db = SQLAlchemy(model_class=Base)
 
+# アプリケーションが使用するデータベースファイル（Flaskのinstanceフォルダ配下）
+DB_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'instance', 'diary.db')
+
+# 古いエントリーを移動するアーカイブDB（アプリのDBにATTACHして使う）
+ARCHIVE_DB_PATH = os.path.join(os.path.dirname(DB_PATH), 'archive.db')
+
+def get_db(db_path=None, archive_path=None):
+    """Flaskアプリ外（管理ツール等）から使うエンジンを取得
+
+    アプリのDBを開く場合は、アーカイブDBも合わせてATTACHする。
+    """
+    db_path = db_path or DB_PATH
+    engine = create_engine(f'sqlite:///{db_path}')
+    if archive_path is None and os.path.abspath(db_path) == DB_PATH:
+        archive_path = ARCHIVE_DB_PATH
+    if archive_path:
+        attach_archive(engine, archive_path)
+    return engine
+
+def attach_archive(engine, archive_path):
+    """接続ごとにアーカイブDBをATTACHし、アーカイブのテーブルを作成"""
+    from models.archive_manager import (
+        ARCHIVE_SCHEMA, archive_metadata, add_missing_columns, add_missing_indexes
+    )
+
+    os.makedirs(os.path.dirname(os.path.abspath(archive_path)), exist_ok=True)
+
+    @event.listens_for(engine, 'connect')
+    def attach(dbapi_connection, connection_record):
+        dbapi_connection.execute(f'ATTACH DATABASE ? AS {ARCHIVE_SCHEMA}', (archive_path,))
+
+    archive_metadata.create_all(engine)
+    with engine.begin() as conn:
+        add_missing_columns(conn)
+        add_missing_indexes(conn)
+
+def attached_archive_path(engine):
+    """エンジンにATTACHしたアーカイブDBのファイルパス（ATTACHしていなければNone）"""
+    from models.archive_manager import ARCHIVE_SCHEMA
+
+    with engine.connect() as conn:
+        path = conn.exec_driver_sql(
+            'SELECT file FROM pragma_database_list WHERE name = ?', (ARCHIVE_SCHEMA,)
+        ).scalar()
+    return path or None
+
 def setup_event_listeners(app):
     """イベントリスナーの設定"""
     with app.app_context():
@@ -60,10 +107,36 @@ def init_db(app):
         from models.user import User
         from models.entry import Entry
         from models.diary_item import DiaryItem
+        from models.activity_rollup import ActivityRollup
+        from models.activity_frequency import ActivityFrequency
+        from models.entry_metric import EntryMetric
 
         # イベントリスナーの設定
         setup_event_listeners(app)
 
+        # アーカイブDBは接続プールに接続ができる前にATTACHを設定する
+        archive_path = app.config.get('ARCHIVE_DATABASE')
+        if archive_path:
+            attach_archive(db.engine, archive_path)
+            logger.debug("Archive database attached: %s", archive_path)
+
         logger.debug("Creating all tables")
         db.create_all()
         logger.debug("Database initialization complete")
+
+def init_change_journal(app):
+    """変更ジャーナルの書き込みを有効化（CHANGE_JOURNAL_DIR設定時のみ）"""
+    journal_dir = app.config.get('CHANGE_JOURNAL_DIR')
+    if not journal_dir:
+        return None
+
+    from change_journal import ChangeJournal, attach_journal
+    journal = ChangeJournal(
+        journal_dir,
+        archive_dir=app.config.get('CHANGE_JOURNAL_ARCHIVE_DIR'),
+        segment_bytes=app.config.get('CHANGE_JOURNAL_SEGMENT_BYTES')
+    )
+    attach_journal(db.session, journal)
+    app.extensions['change_journal'] = journal
+    logger.debug("Change journal enabled: %s", journal_dir)
+    return journal
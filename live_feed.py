@@ -0,0 +1,179 @@
+"""ライブフィード（Server-Sent Events）の配信ハブ
+
+エントリーの変更は entry_changes の変更通番から読み込み、購読者ごとのキューへ配信する。
+投稿・更新・削除の後に notify() で同じプロセスのポーリングを即座に起こし、
+他のワーカープロセスでの変更は一定間隔のポーリングで拾う（SQLiteが共有の配信経路になる）。
+"""
+import logging
+import threading
+from collections import deque
+from serializer import Serializer
+
+logger = logging.getLogger('live_feed')
+
+def format_event(event, data, event_id=None):
+    """SSEのイベントを文字列に変換"""
+    lines = []
+    if event_id is not None:
+        lines.append(f'id: {event_id}')
+    lines.append(f'event: {event}')
+    lines.append(f'data: {Serializer.dumps(data).decode("utf-8")}')
+    return '\n'.join(lines) + '\n\n'
+
+class FeedEvent:
+    """配信する変更（SSEの文字列は購読者数によらず1回だけ作成する）"""
+
+    __slots__ = ('seq', 'entry_id', 'user_id', 'visible', 'public', 'editable', 'tombstone')
+
+    def __init__(self, seq, entry_id, user_id, entry=None, visible=True):
+        self.seq = seq
+        self.entry_id = entry_id
+        self.user_id = user_id
+        self.visible = visible
+        self.tombstone = format_event('delete', {'id': entry_id}, seq)
+        if entry is None:
+            self.public = self.editable = None
+        else:
+            self.public = format_event('upsert', {**entry, 'can_edit': False}, seq)
+            self.editable = format_event('upsert', {**entry, 'can_edit': True}, seq)
+
+    def render(self, subscriber):
+        """購読者の権限に応じたイベントを選択"""
+        if self.public is None or (not self.visible and not subscriber.is_admin):
+            return self.tombstone
+        if subscriber.is_admin or (self.visible and self.user_id == subscriber.user_id):
+            return self.editable
+        return self.public
+
+class Subscriber:
+    """1接続分の購読（上限を超えて溜まった場合はoverflowedになる）"""
+
+    def __init__(self, user_id=None, is_admin=False, max_queue=100):
+        self.user_id = user_id
+        self.is_admin = is_admin
+        self.max_queue = max_queue
+        self.queue = deque()
+        self.ready = threading.Event()
+        self.overflowed = False
+        self.last_seq = 0
+
+    def put(self, event):
+        """イベントを追加（上限に達した購読者は以降受け取らない）"""
+        if self.overflowed:
+            return
+        if len(self.queue) >= self.max_queue:
+            self.overflowed = True
+        else:
+            self.queue.append(event)
+        self.ready.set()
+
+class LiveFeedHub:
+    """変更通番をポーリングして購読者へ配信するハブ
+
+    loader(since, limit) は since より後の FeedEvent の一覧を、latest() は最新の通番を返す。
+    """
+
+    POLL_INTERVAL = 1.0
+    HEARTBEAT_INTERVAL = 15.0
+    BATCH_SIZE = 100
+
+    def __init__(self, loader, latest, poll_interval=None, heartbeat_interval=None,
+                 max_queue=100, max_subscribers=10000):
+        self.loader = loader
+        self.latest = latest
+        self.poll_interval = poll_interval or self.POLL_INTERVAL
+        self.heartbeat_interval = heartbeat_interval or self.HEARTBEAT_INTERVAL
+        self.max_queue = max_queue
+        self.max_subscribers = max_subscribers
+        self.lock = threading.Lock()
+        self.subscribers = set()
+        self.wake = threading.Event()
+        self.last_seq = None
+        self.thread = None
+        self.closed = False
+
+    def subscribe(self, user_id=None, is_admin=False):
+        """購読を開始（上限を超える場合はNone）"""
+        with self.lock:
+            if len(self.subscribers) >= self.max_subscribers:
+                return None
+            if self.last_seq is None:
+                self.last_seq = self.latest()
+            subscriber = Subscriber(user_id, is_admin, self.max_queue)
+            subscriber.last_seq = self.last_seq
+            self.subscribers.add(subscriber)
+            if self.thread is None:
+                self.thread = threading.Thread(target=self.poll_loop, name='live-feed', daemon=True)
+                self.thread.start()
+        logger.debug('Live feed subscribed: %d subscribers', len(self.subscribers))
+        return subscriber
+
+    def unsubscribe(self, subscriber):
+        """購読を終了"""
+        with self.lock:
+            self.subscribers.discard(subscriber)
+            if not self.subscribers:
+                # 購読者がいない間は通番を追わず、次の購読開始時に最新から再開する
+                self.last_seq = None
+        logger.debug('Live feed unsubscribed: %d subscribers', len(self.subscribers))
+
+    def notify(self):
+        """同じプロセスでの書き込み後にポーリングを即座に実行させる"""
+        self.wake.set()
+
+    def publish(self, events):
+        """イベントを全購読者のキューへ追加"""
+        if not events:
+            return
+        with self.lock:
+            subscribers = list(self.subscribers)
+            self.last_seq = events[-1].seq
+        for subscriber in subscribers:
+            for event in events:
+                subscriber.put(event)
+
+    def poll(self):
+        """前回以降の変更を読み込んで配信し、配信件数を返す"""
+        total = 0
+        while True:
+            with self.lock:
+                since = self.last_seq
+            if since is None:
+                return total
+            events = self.loader(since, self.BATCH_SIZE)
+            self.publish(events)
+            total += len(events)
+            if len(events) < self.BATCH_SIZE:
+                return total
+
+    def poll_loop(self):
+        """変更通番のポーリングを続けるバックグラウンド処理"""
+        while not self.closed:
+            self.wake.wait(self.poll_interval)
+            self.wake.clear()
+            try:
+                self.poll()
+            except Exception as e:
+                logger.error('Failed to poll live feed: %s', str(e))
+
+    def stream(self, subscriber):
+        """購読者のSSEストリーム（溢れた場合はresyncを送って終了）"""
+        yield 'retry: 3000\n' + format_event('ready', {'since': subscriber.last_seq})
+        while not self.closed:
+            if not subscriber.ready.wait(self.heartbeat_interval):
+                yield ': heartbeat\n\n'
+                continue
+            subscriber.ready.clear()
+            while subscriber.queue:
+                event = subscriber.queue.popleft()
+                subscriber.last_seq = event.seq
+                yield event.render(subscriber)
+            if subscriber.overflowed:
+                # 取りこぼした変更は /entries/changes?since= で取得し直してもらう
+                yield format_event('resync', {'since': subscriber.last_seq})
+                return
+
+    def close(self):
+        """ポーリングを停止"""
+        self.closed = True
+        self.wake.set()
@@ -9,6 +9,7 @@
     generate (gen)  テストデータの生成
     clear (clr)     DBデータの削除
     insert (ins)    テストデータの挿入
+    backup (bak)    DBのオンラインバックアップ
     interactive (i) 対話モードを起動
 
 オプションの詳細は各コマンドの --help を参照してください。
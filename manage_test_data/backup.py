@@ -1,36 +1,129 @@
+import gzip
+import hashlib
 import json
 import logging
+import mmap
 import os
 import shutil
-from datetime import datetime
-from typing import Dict, Optional
+import sqlite3
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import closing
+from datetime import datetime, timedelta
+from itertools import repeat
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+
+try:
+    import zstandard
+except ImportError:  # zstdは任意（未インストール時はgzipのみ使用可能）
+    zstandard = None
+
+from .catalog import BackupCatalog
 
 logger = logging.getLogger(__name__)
 
+# 進捗コールバックの型（コピー済みページ数, 総ページ数）
+ProgressCallback = Callable[[int, int], None]
+
+def progress_logger(interval: int = 10) -> ProgressCallback:
+    """進捗率がinterval%進むごとにログを出力するコールバックを作成"""
+    last = {'percent': -interval}
+
+    def log_progress(copied: int, total: int) -> None:
+        percent = copied * 100 // total if total else 100
+        if percent - last['percent'] >= interval or copied == total:
+            last['percent'] = percent
+            logger.info(f'バックアップ進捗: {copied}/{total}ページ ({percent}%)')
+
+    return log_progress
+
 class BackupError(Exception):
     """バックアップ操作エラー"""
     pass
 
+def verify_in_worker(backup_dir: str, backup_path: str, integrity: bool) -> Dict:
+    """プロセスプールからバックアップ1件を検証"""
+    return DatabaseBackup(backup_dir).verify_backup(backup_path, integrity)
+
 class DatabaseBackup:
-    """データベースバックアップ管理クラス"""
+    """データベースバックアップ管理クラス
+
+    バックアップはチャンク単位で圧縮して1ファイルに連結し、各チャンクの
+    SHA-256を記録したマニフェスト（{name}.manifest.json）を併せて保存する。
+    増分モードではページ境界で区切ったチャンクをハッシュ名でchunks/に一度だけ
+    保存し、バックアップごとにはチャンクの一覧（{name}.chunks.json）のみを書き出す。
+    アーカイブDBは同じ形式の付随するバックアップ（{name}.archive）として保存し、
+    本体のマニフェストにファイル名を記録する。
+    チャンクの参照数はカタログで管理し、参照されなくなったチャンクだけを削除する。
+    """
 
     # ファイル名のフォーマット
     BACKUP_NAME_FORMAT = 'diary_backup_{timestamp}'
     PRE_RESTORE_NAME_FORMAT = 'pre_restore_backup_{timestamp}'
     TIMESTAMP_FORMAT = '%Y%m%d_%H%M%S'
     DATETIME_FORMAT = '%Y/%m/%d %H:%M:%S'
+    MANIFEST_SUFFIX = '.manifest.json'
+    ARCHIVE_NAME_SUFFIX = '.archive'
+    INCREMENTAL_SUFFIX = '.chunks.json'
+    CATALOG_NAME = 'catalog.db'
 
-    # ファイルサイズ制限（100MB）
-    MAX_BACKUP_SIZE = 100 * 1024 * 1024
+    # 圧縮方式ごとの拡張子と既定の圧縮レベル（'none'は旧形式の非圧縮バックアップ）
+    EXTENSIONS = {'gzip': '.db.gz', 'zstd': '.db.zst', 'none': '.db'}
+    DEFAULT_LEVELS = {'gzip': 6, 'zstd': 3, 'none': 0}
+    COMPRESSION = 'gzip'
+
+    # 圧縮・検証の単位となるチャンクサイズ（4MB）
+    CHUNK_SIZE = 4 * 1024 * 1024
+
+    # 増分モードのチャンク保存先と、1チャンクあたりのページ数
+    CHUNK_STORE_DIR = 'chunks'
+    CHUNK_EXTENSIONS = {'gzip': '.gz', 'zstd': '.zst', 'none': ''}
+    INCREMENTAL_CHUNK_PAGES = 16
+
+    # 未参照でも削除しないチャンクの経過秒数（実行中の増分バックアップはマニフェストより先に
+    # チャンクを書き出すため、作成・再利用から間もないチャンクは削除しない）
+    CHUNK_GC_GRACE = 24 * 60 * 60
+
+    # 空き容量チェック時に確保しておく余裕（10MB）
+    FREE_SPACE_MARGIN = 10 * 1024 * 1024
 
     # 必須メタデータフィールド
     REQUIRED_METADATA = ['operation', 'timestamp']
 
-    def __init__(self, backup_dir: str):
+    # オンラインバックアップの1ステップあたりのページ数と、ステップ間の待機秒数
+    PAGES_PER_STEP = 256
+    STEP_SLEEP = 0.05
+
+    def __init__(self, backup_dir: str, pages_per_step: Optional[int] = None,
+                 step_sleep: Optional[float] = None, compression: Optional[str] = None,
+                 level: Optional[int] = None, chunk_size: Optional[int] = None,
+                 incremental: bool = False):
         self.backup_dir = backup_dir
+        self.chunk_dir = os.path.join(backup_dir, self.CHUNK_STORE_DIR)
+        self.incremental = incremental
+        self.pages_per_step = self.PAGES_PER_STEP if pages_per_step is None else pages_per_step
+        self.step_sleep = self.STEP_SLEEP if step_sleep is None else step_sleep
+        self.compression = compression or self.COMPRESSION
+        self.chunk_size = chunk_size or self.CHUNK_SIZE
+        if self.pages_per_step < 1:
+            raise BackupError('1ステップあたりのページ数は1以上である必要があります')
+        if self.step_sleep < 0:
+            raise BackupError('ステップ間の待機時間は0以上である必要があります')
+        if self.compression not in self.EXTENSIONS:
+            raise BackupError(f'未対応の圧縮方式です: {self.compression}')
+        if self.compression == 'zstd' and zstandard is None:
+            raise BackupError('zstdを使用するにはzstandardパッケージが必要です')
+        self.level = self.DEFAULT_LEVELS[self.compression] if level is None else level
         os.makedirs(backup_dir, exist_ok=True)
         logger.info(f'バックアップディレクトリを初期化: {backup_dir}')
 
+        # カタログが無ければ（チャンクの参照数を持たない旧形式の場合も）既存のバックアップから作成
+        self.catalog = BackupCatalog(os.path.join(backup_dir, self.CATALOG_NAME))
+        if self.catalog.is_new:
+            self.rebuild_catalog()
+
     def validate_metadata(self, metadata: Dict) -> None:
         """メタデータの検証"""
         for field in self.REQUIRED_METADATA:
@@ -48,31 +141,319 @@ class DatabaseBackup:
                 f'(expected format: {self.DATETIME_FORMAT})'
             )
 
-    def check_file_size(self, file_path: str) -> None:
-        """ファイルサイズの検証"""
-        size = os.path.getsize(file_path)
-        if size > self.MAX_BACKUP_SIZE:
+    def check_free_space(self, directory: str, required: int) -> None:
+        """書き込み先の空き容量の検証"""
+        free = shutil.disk_usage(directory).free
+        if free < required + self.FREE_SPACE_MARGIN:
             raise BackupError(
-                f'ファイルサイズが制限を超えています: {size} bytes '
-                f'(max: {self.MAX_BACKUP_SIZE} bytes)'
+                f'空き容量が不足しています: {free} bytes '
+                f'(required: {required + self.FREE_SPACE_MARGIN} bytes)'
             )
 
-    def create_backup(self, db_path: str, metadata: Optional[Dict] = None) -> str:
-        """データベースのバックアップを作成"""
+    @classmethod
+    def split_backup_name(cls, filename: str) -> Optional[str]:
+        """バックアップファイル名からバックアップ名を取り出す（対象外ならNone）"""
+        if filename == cls.CATALOG_NAME:
+            return None
+        for extension in (cls.INCREMENTAL_SUFFIX, *cls.EXTENSIONS.values()):
+            if filename.endswith(extension):
+                return filename[:-len(extension)]
+        return None
+
+    def manifest_path(self, backup_path: str) -> str:
+        """バックアップファイルに対応するマニフェストのパス"""
+        if backup_path.endswith(self.INCREMENTAL_SUFFIX):
+            return backup_path
+        backup_name = self.split_backup_name(os.path.basename(backup_path))
+        return os.path.join(os.path.dirname(backup_path), f'{backup_name}{self.MANIFEST_SUFFIX}')
+
+    def load_manifest(self, backup_path: str) -> Optional[Dict]:
+        """マニフェストの読み込み（旧形式のバックアップではNone）"""
+        manifest_path = self.manifest_path(backup_path)
+        if not os.path.exists(manifest_path):
+            return None
+        with open(manifest_path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+
+    def build_info(self, backup_path: str) -> Dict:
+        """カタログに登録するバックアップ情報を作成"""
+        backup_name = self.split_backup_name(os.path.basename(backup_path))
+        metadata_path = os.path.join(os.path.dirname(backup_path), f'{backup_name}.json')
+        manifest = self.load_manifest(backup_path)
+
+        info = {
+            'filename': os.path.basename(backup_path),
+            'created_at': datetime.fromtimestamp(
+                os.path.getctime(backup_path)
+            ).strftime(self.DATETIME_FORMAT),
+            'size': os.path.getsize(backup_path),
+            'compression': manifest['compression'] if manifest else 'none',
+            'incremental': bool(manifest and manifest.get('type') == 'incremental')
+        }
+
+        # メタデータファイルが存在する場合は読み込む
+        if os.path.exists(metadata_path):
+            with open(metadata_path, 'r', encoding='utf-8') as f:
+                metadata = json.load(f)
+                self.validate_metadata(metadata)
+                info['metadata'] = metadata
+        return info
+
+    def chunk_name(self, digest: str, compression: str) -> str:
+        """増分モードのチャンクのファイル名（カタログの参照数のキー）"""
+        return f'{digest}{self.CHUNK_EXTENSIONS[compression]}'
+
+    def chunk_path(self, digest: str, compression: str) -> str:
+        """増分モードのチャンクの保存先パス"""
+        return self.chunk_file(self.chunk_name(digest, compression))
+
+    def chunk_file(self, name: str) -> str:
+        """チャンク名から保存先パスを取得"""
+        return os.path.join(self.chunk_dir, name[:2], name)
+
+    def manifest_chunks(self, manifest: Dict) -> List[str]:
+        """増分バックアップのマニフェストが参照するチャンク名の一覧"""
+        return [
+            self.chunk_name(chunk['sha256'], manifest['compression'])
+            for chunk in manifest['chunks']
+        ]
+
+    def compress_chunk(self, data: bytes) -> bytes:
+        """チャンクを設定された方式で圧縮"""
+        if self.compression == 'gzip':
+            return gzip.compress(data, compresslevel=self.level, mtime=0)
+        if self.compression == 'zstd':
+            return zstandard.ZstdCompressor(level=self.level).compress(data)
+        return data
+
+    @staticmethod
+    def decompress_chunk(data: bytes, compression: str) -> bytes:
+        """チャンクを展開"""
+        if compression == 'gzip':
+            return gzip.decompress(data)
+        if compression == 'zstd':
+            if zstandard is None:
+                raise BackupError('zstdのバックアップを展開するにはzstandardパッケージが必要です')
+            return zstandard.ZstdDecompressor().decompress(data)
+        return data
+
+    def write_chunks(self, src_path: str, dst_path: str) -> Dict:
+        """ファイルを固定長チャンクに分けて圧縮しながら書き出し、マニフェストを返す"""
+        total_hash = hashlib.sha256()
+        chunks = []
+        offset = 0
+        size = 0
+        with open(src_path, 'rb') as src, open(dst_path, 'wb') as dst:
+            while True:
+                data = src.read(self.chunk_size)
+                if not data:
+                    break
+                compressed = self.compress_chunk(data)
+                dst.write(compressed)
+                total_hash.update(data)
+                chunks.append({
+                    'offset': offset,
+                    'length': len(compressed),
+                    'size': len(data),
+                    'sha256': hashlib.sha256(data).hexdigest()
+                })
+                offset += len(compressed)
+                size += len(data)
+
+        return {
+            'version': 1,
+            'compression': self.compression,
+            'level': self.level,
+            'chunk_size': self.chunk_size,
+            'size': size,
+            'sha256': total_hash.hexdigest(),
+            'chunks': chunks
+        }
+
+    def write_incremental_chunks(self, src_path: str) -> Dict:
+        """ページ境界で区切ったチャンクのうち未保存のものだけを書き出し、マニフェストを返す"""
+        with sqlite3.connect(src_path) as conn:
+            page_size = conn.execute('PRAGMA page_size').fetchone()[0]
+        conn.close()
+        chunk_size = page_size * self.INCREMENTAL_CHUNK_PAGES
+
+        total_hash = hashlib.sha256()
+        chunks = []
+        size = 0
+        stored = 0
+        with open(src_path, 'rb') as src:
+            for data in iter(lambda: src.read(chunk_size), b''):
+                digest = hashlib.sha256(data).hexdigest()
+                total_hash.update(data)
+                chunks.append({'size': len(data), 'sha256': digest})
+                size += len(data)
+
+                path = self.chunk_path(digest, self.compression)
+                try:
+                    # 既存のチャンクは更新日時を進め、並行するガベージコレクションから保護する
+                    os.utime(path)
+                    continue
+                except FileNotFoundError:
+                    pass
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                tmp_path = f'{path}.tmp'
+                with open(tmp_path, 'wb') as f:
+                    f.write(self.compress_chunk(data))
+                os.replace(tmp_path, path)
+                stored += 1
+
+        logger.info(f'新規チャンクを保存: {stored}/{len(chunks)}件')
+        return {
+            'version': 1,
+            'type': 'incremental',
+            'compression': self.compression,
+            'level': self.level,
+            'chunk_size': chunk_size,
+            'page_size': page_size,
+            'size': size,
+            'sha256': total_hash.hexdigest(),
+            'chunks': chunks
+        }
+
+    def write_backup(self, src_path: str, backup_name: str, incremental: bool = False,
+                     snapshot_at: Optional[datetime] = None,
+                     archive_path: Optional[str] = None) -> str:
+        """ファイルを圧縮バックアップとマニフェストとして保存（archive_pathは付随して保存）"""
+        archive_backup = None
+        if archive_path:
+            archive_backup = self.write_backup(
+                archive_path, f'{backup_name}{self.ARCHIVE_NAME_SUFFIX}', incremental
+            )
+        if incremental:
+            backup_path = os.path.join(self.backup_dir, f'{backup_name}{self.INCREMENTAL_SUFFIX}')
+            manifest = self.write_incremental_chunks(src_path)
+            # マニフェストより先に参照数を増やし、途中で失敗しても参照中のチャンクが削除されないようにする
+            self.catalog.add_chunks(backup_name, self.manifest_chunks(manifest))
+        else:
+            backup_path = os.path.join(
+                self.backup_dir, f'{backup_name}{self.EXTENSIONS[self.compression]}'
+            )
+            manifest = self.write_chunks(src_path, backup_path)
+        if snapshot_at:
+            # スナップショット開始時刻（変更ジャーナルの適用開始位置）
+            manifest['snapshot_at'] = snapshot_at.isoformat()
+        if archive_backup:
+            manifest['archive'] = os.path.basename(archive_backup)
+        manifest_path = self.manifest_path(backup_path)
+        tmp_path = f'{manifest_path}.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(manifest, f, ensure_ascii=False, indent=2)
+        os.replace(tmp_path, manifest_path)
+        return backup_path
+
+    def iter_stored_chunks(self, backup_path: str, manifest: Dict):
+        """マニフェストの各チャンクの圧縮データを順に返す"""
+        if manifest.get('type') == 'incremental':
+            for chunk in manifest['chunks']:
+                path = self.chunk_path(chunk['sha256'], manifest['compression'])
+                if not os.path.exists(path):
+                    raise BackupError(f'チャンクが見つかりません: {chunk["sha256"]}')
+                with open(path, 'rb') as f:
+                    yield f.read()
+            return
+
+        if not manifest['chunks']:
+            return
+        # 連結ファイルはメモリマップし、チャンクをオフセットで切り出す
+        with open(backup_path, 'rb') as f, \
+                mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+            for chunk in manifest['chunks']:
+                yield mapped[chunk['offset']:chunk['offset'] + chunk['length']]
+
+    def read_chunks(self, backup_path: str, manifest: Optional[Dict]):
+        """バックアップを展開しながらチャンク単位で返す（SHA-256を検証）"""
+        if manifest is None:
+            # 旧形式（非圧縮のコピー）
+            with open(backup_path, 'rb') as f:
+                for data in iter(lambda: f.read(self.chunk_size), b''):
+                    yield data
+            return
+
+        total_hash = hashlib.sha256()
+        stored_chunks = self.iter_stored_chunks(backup_path, manifest)
+        for index, (chunk, compressed) in enumerate(zip(manifest['chunks'], stored_chunks)):
+            data = self.decompress_chunk(compressed, manifest['compression'])
+            if len(data) != chunk['size'] or hashlib.sha256(data).hexdigest() != chunk['sha256']:
+                raise BackupError(f'チャンクのチェックサムが一致しません: {index}')
+            total_hash.update(data)
+            yield data
+        if total_hash.hexdigest() != manifest['sha256']:
+            raise BackupError('バックアップ全体のチェックサムが一致しません')
+
+    def copy_database(self, src_path: str, dst_path: str,
+                      progress: Optional[ProgressCallback] = None) -> None:
+        """SQLiteのバックアップAPIで稼働中のデータベースを複製
+
+        pages_per_stepページずつコピーし、ステップ間でstep_sleep秒待機して
+        書き込みロックを長時間保持しないようにする。WALの内容も含めて
+        一貫したスナップショットが作成される。
+        """
+        src = sqlite3.connect(f'{Path(src_path).resolve().as_uri()}?mode=ro', uri=True)
+        try:
+            dst = sqlite3.connect(dst_path)
+            try:
+                def on_step(status, remaining, total):
+                    if progress:
+                        progress(total - remaining, total)
+                    if remaining and self.step_sleep:
+                        time.sleep(self.step_sleep)
+
+                src.backup(dst, pages=self.pages_per_step, progress=on_step)
+            finally:
+                dst.close()
+        finally:
+            src.close()
+
+    def create_backup(self, db_path: str, metadata: Optional[Dict] = None,
+                      progress: Optional[ProgressCallback] = None,
+                      archive_path: Optional[str] = None) -> str:
+        """データベース（archive_path指定時はアーカイブDBも）のバックアップを作成
+
+        アーカイブDBのスナップショットは本体の後に作成する。間にアーカイブへ移動したエントリーは
+        両方に含まれ、復元時にアーカイブを優先して重複が解消される（reconcile_archive）。
+        """
         if not os.path.exists(db_path):
             raise BackupError(f'データベースファイルが見つかりません: {db_path}')
+        if archive_path and not os.path.exists(archive_path):
+            archive_path = None
 
-        # ファイルサイズの検証
-        self.check_file_size(db_path)
+        # スナップショットと圧縮後のファイルを置ける空き容量があるか検証
+        db_size = 0
+        for path in filter(None, (db_path, archive_path)):
+            for suffix in ('', '-wal'):
+                if os.path.exists(f'{path}{suffix}'):
+                    db_size += os.path.getsize(f'{path}{suffix}')
+        self.check_free_space(self.backup_dir, db_size * 2)
 
         # バックアップファイル名の生成
         timestamp = datetime.now().strftime(self.TIMESTAMP_FORMAT)
         backup_name = self.BACKUP_NAME_FORMAT.format(timestamp=timestamp)
-        
+        snapshot_path = os.path.join(self.backup_dir, f'{backup_name}.snapshot')
+        archive_snapshot_path = os.path.join(
+            self.backup_dir, f'{backup_name}{self.ARCHIVE_NAME_SUFFIX}.snapshot'
+        )
+        extension = self.INCREMENTAL_SUFFIX if self.incremental else self.EXTENSIONS[self.compression]
+        db_backup_path = os.path.join(self.backup_dir, f'{backup_name}{extension}')
+        archive_backup_path = os.path.join(
+            self.backup_dir, f'{backup_name}{self.ARCHIVE_NAME_SUFFIX}{extension}'
+        )
+        metadata_path = os.path.join(self.backup_dir, f'{backup_name}.json')
+
         try:
-            # データベースファイルのコピー
-            db_backup_path = os.path.join(self.backup_dir, f'{backup_name}.db')
-            shutil.copy2(db_path, db_backup_path)
+            # オンラインバックアップで一貫したスナップショットを作成し、圧縮して保存
+            snapshot_at = datetime.now()
+            self.copy_database(db_path, snapshot_path, progress)
+            if archive_path:
+                self.copy_database(archive_path, archive_snapshot_path)
+            self.write_backup(
+                snapshot_path, backup_name, self.incremental, snapshot_at,
+                archive_snapshot_path if archive_path else None
+            )
             logger.info(f'データベースファイルをバックアップ: {db_backup_path}')
 
             # メタデータの保存
@@ -84,98 +465,261 @@ class DatabaseBackup:
                 })
                 self.validate_metadata(metadata)
 
-                metadata_path = os.path.join(self.backup_dir, f'{backup_name}.json')
                 with open(metadata_path, 'w', encoding='utf-8') as f:
                     json.dump(metadata, f, ensure_ascii=False, indent=2)
                 logger.info(f'メタデータを保存: {metadata_path}')
 
+            self.catalog.add(backup_name, self.build_info(db_backup_path))
             return db_backup_path
 
         except Exception as e:
             # エラー時はバックアップファイルを削除
-            if os.path.exists(db_backup_path):
-                os.remove(db_backup_path)
+            for backup_path in (db_backup_path, archive_backup_path):
+                for path in (backup_path, self.manifest_path(backup_path)):
+                    if os.path.exists(path):
+                        os.remove(path)
+                self.catalog.release_chunks(self.split_backup_name(os.path.basename(backup_path)))
             if metadata and os.path.exists(metadata_path):
                 os.remove(metadata_path)
             raise BackupError(f'バックアップの作成に失敗しました: {str(e)}')
 
-    def restore_backup(self, backup_path: str, target_path: str) -> None:
-        """バックアップからデータベースを復元"""
+        finally:
+            for path in (snapshot_path, archive_snapshot_path):
+                if os.path.exists(path):
+                    os.remove(path)
+
+    def archive_backup_path(self, backup_path: str, manifest: Optional[Dict]) -> Optional[str]:
+        """バックアップに付随するアーカイブDBのバックアップのパス（含まない場合はNone）"""
+        if not manifest or not manifest.get('archive'):
+            return None
+        return os.path.join(os.path.dirname(backup_path), manifest['archive'])
+
+    def restore_backup(self, backup_path: str, target_path: str,
+                       archive_target: Optional[str] = None) -> None:
+        """バックアップからデータベースを復元（archive_target指定時はアーカイブDBも復元）
+
+        アーカイブDBを含まないバックアップでは、archive_targetの既存のアーカイブDBをそのまま残す。
+        """
         if not os.path.exists(backup_path):
             raise BackupError(f'バックアップファイルが見つかりません: {backup_path}')
 
-        # ファイルサイズの検証
-        self.check_file_size(backup_path)
+        manifest = self.load_manifest(backup_path)
+        # (バックアップ, マニフェスト, 復元先) の組（本体、アーカイブDBの順）
+        restores = [(backup_path, manifest, target_path)]
+        archive_backup = self.archive_backup_path(backup_path, manifest)
+        if archive_target and archive_backup:
+            if not os.path.exists(archive_backup):
+                raise BackupError(f'アーカイブDBのバックアップが見つかりません: {archive_backup}')
+            restores.append((archive_backup, self.load_manifest(archive_backup), archive_target))
+        elif archive_target:
+            logger.info(f'アーカイブDBを含まないバックアップのため既存のアーカイブDBを使用: {archive_target}')
 
         try:
+            # 展開先と既存データベースのバックアップを置ける空き容量があるか検証
+            for path, restore_manifest, target in restores:
+                size = restore_manifest['size'] if restore_manifest else os.path.getsize(path)
+                self.check_free_space(os.path.dirname(os.path.abspath(target)), size)
+
             # 既存のデータベースファイルのバックアップを作成
             if os.path.exists(target_path):
+                existing_archive = None
+                if archive_target and os.path.exists(archive_target):
+                    existing_archive = archive_target
+                self.check_free_space(self.backup_dir, sum(
+                    os.path.getsize(path) for path in filter(None, (target_path, existing_archive))
+                ))
                 timestamp = datetime.now().strftime(self.TIMESTAMP_FORMAT)
-                pre_restore_backup = os.path.join(
-                    self.backup_dir,
-                    f'{self.PRE_RESTORE_NAME_FORMAT.format(timestamp=timestamp)}.db'
+                pre_restore_name = self.PRE_RESTORE_NAME_FORMAT.format(timestamp=timestamp)
+                pre_restore_backup = self.write_backup(
+                    target_path, pre_restore_name, archive_path=existing_archive
                 )
-                shutil.copy2(target_path, pre_restore_backup)
+                self.catalog.add(pre_restore_name, self.build_info(pre_restore_backup))
                 logger.info(f'既存データベースをバックアップ: {pre_restore_backup}')
 
-            # バックアップからの復元
-            shutil.copy2(backup_path, target_path)
-            logger.info(f'バックアップを復元: {backup_path} -> {target_path}')
+            # 検証しながら一時ファイルへ展開し、すべて完了してから置き換える
+            for path, restore_manifest, target in restores:
+                with open(f'{target}.restoring', 'wb') as f:
+                    for data in self.read_chunks(path, restore_manifest):
+                        f.write(data)
+            for path, _, target in restores:
+                os.replace(f'{target}.restoring', target)
+
+                # 復元前のWAL・共有メモリファイルが残っていると復元後のDBが壊れるため削除
+                for suffix in ('-wal', '-shm'):
+                    if os.path.exists(f'{target}{suffix}'):
+                        os.remove(f'{target}{suffix}')
+                logger.info(f'バックアップを復元: {path} -> {target}')
 
         except Exception as e:
+            for _, _, target in restores:
+                if os.path.exists(f'{target}.restoring'):
+                    os.remove(f'{target}.restoring')
             raise BackupError(f'バックアップの復元に失敗しました: {str(e)}')
 
-    def list_backups(self) -> Dict[str, Dict]:
-        """利用可能なバックアップの一覧を取得"""
-        backups = {}
-        
+    def check_database(self, db_path: str, integrity: bool = False) -> None:
+        """PRAGMA quick_check（integrity=Trueならintegrity_check）でDBファイルを検査"""
+        pragma = 'integrity_check' if integrity else 'quick_check'
+        with closing(sqlite3.connect(f'{Path(db_path).resolve().as_uri()}?mode=ro', uri=True)) as conn:
+            rows = conn.execute(f'PRAGMA {pragma}').fetchall()
+        if rows != [('ok',)]:
+            raise BackupError(
+                f'{pragma}でエラーが検出されました: {"; ".join(str(row[0]) for row in rows[:5])}'
+            )
+
+    def verify_backup(self, backup_path: str, integrity: bool = False) -> Dict:
+        """バックアップをマニフェストと照合し、一時的に復元してDBとして検査"""
+        result = {
+            'name': self.split_backup_name(os.path.basename(backup_path)),
+            'path': backup_path,
+            'ok': False,
+            'error': None,
+            'size': 0
+        }
+        started = time.perf_counter()
+
         try:
-            # .dbファイルとそれに対応する.jsonファイルを探す
-            for filename in os.listdir(self.backup_dir):
-                if filename.endswith('.db'):
-                    backup_name = filename[:-3]  # .dbを除いた部分
-                    backup_path = os.path.join(self.backup_dir, filename)
-                    metadata_path = os.path.join(self.backup_dir, f'{backup_name}.json')
-                    
-                    backup_info = {
-                        'path': backup_path,
-                        'created_at': datetime.fromtimestamp(
-                            os.path.getctime(backup_path)
-                        ).strftime(self.DATETIME_FORMAT),
-                        'size': os.path.getsize(backup_path)
-                    }
-
-                    # メタデータファイルが存在する場合は読み込む
-                    if os.path.exists(metadata_path):
-                        with open(metadata_path, 'r', encoding='utf-8') as f:
-                            metadata = json.load(f)
-                            self.validate_metadata(metadata)
-                            backup_info['metadata'] = metadata
-
-                    backups[backup_name] = backup_info
+            # 付随するアーカイブDBのバックアップも合わせて検証する
+            path = backup_path
+            while path:
+                manifest = self.load_manifest(path)
+                restored_size = manifest['size'] if manifest else os.path.getsize(path)
+                self.check_free_space(self.backup_dir, restored_size)
+
+                with tempfile.TemporaryDirectory(dir=self.backup_dir) as tmp_dir:
+                    tmp_path = os.path.join(tmp_dir, 'verify.db')
+                    with open(tmp_path, 'wb') as f:
+                        for data in self.read_chunks(path, manifest):
+                            f.write(data)
+                            result['size'] += len(data)
+                    self.check_database(tmp_path, integrity)
+                path = self.archive_backup_path(path, manifest)
+            result['ok'] = True
 
+        except Exception as e:
+            result['error'] = str(e)
+
+        result['seconds'] = time.perf_counter() - started
+        result['mb_per_sec'] = (
+            result['size'] / (1024 * 1024) / result['seconds'] if result['seconds'] else 0.0
+        )
+        return result
+
+    def verify_backups(self, names: Optional[List[str]] = None, workers: Optional[int] = None,
+                       integrity: bool = False) -> Dict:
+        """複数のバックアップをプロセスプールで並列に検証し、結果とスループットを返す"""
+        backups = self.list_backups()
+        if names:
+            missing = [name for name in names if name not in backups]
+            if missing:
+                raise BackupError(f'バックアップが見つかりません: {", ".join(missing)}')
+            backups = {name: backups[name] for name in names}
+        paths = [info['path'] for info in backups.values()]
+
+        started = time.perf_counter()
+        if workers == 1 or len(paths) <= 1:
+            results = [self.verify_backup(path, integrity) for path in paths]
+        else:
+            with ProcessPoolExecutor(max_workers=workers) as pool:
+                results = list(pool.map(
+                    verify_in_worker, repeat(self.backup_dir), paths, repeat(integrity)
+                ))
+        seconds = time.perf_counter() - started
+
+        size = sum(result['size'] for result in results)
+        summary = {
+            'ok': all(result['ok'] for result in results),
+            'results': results,
+            'size': size,
+            'seconds': seconds,
+            'mb_per_sec': size / (1024 * 1024) / seconds if seconds else 0.0
+        }
+        logger.info(
+            f'バックアップを検証: {len(results)}件 '
+            f'(失敗: {sum(not result["ok"] for result in results)}件, '
+            f'{summary["mb_per_sec"]:.1f}MB/s)'
+        )
+        return summary
+
+    def list_backups(self, start: Optional[datetime] = None, end: Optional[datetime] = None,
+                     operation: Optional[str] = None) -> Dict[str, Dict]:
+        """利用可能なバックアップの一覧をカタログから取得（作成日時順、endは含まない）"""
+        try:
+            backups = self.catalog.query(start=start, end=end, operation=operation)
+            for info in backups.values():
+                info['path'] = os.path.join(self.backup_dir, info['filename'])
             return backups
 
         except Exception as e:
             raise BackupError(f'バックアップ一覧の取得に失敗しました: {str(e)}')
 
+    def scan_backups(self) -> Dict[str, Dict]:
+        """バックアップディレクトリを走査してバックアップ情報を取得"""
+        backups = {}
+        for filename in sorted(os.listdir(self.backup_dir)):
+            backup_name = self.split_backup_name(filename)
+            # 付随するアーカイブDBのバックアップは本体と合わせて扱う
+            if backup_name is not None and not backup_name.endswith(self.ARCHIVE_NAME_SUFFIX):
+                backups[backup_name] = self.build_info(os.path.join(self.backup_dir, filename))
+        return backups
+
+    def scan_chunks(self):
+        """増分バックアップごとの参照するチャンク名と、保存済みのチャンク名の一覧を取得"""
+        backup_chunks = {}
+        for filename in os.listdir(self.backup_dir):
+            if filename.endswith(self.INCREMENTAL_SUFFIX):
+                manifest = self.load_manifest(os.path.join(self.backup_dir, filename))
+                backup_chunks[self.split_backup_name(filename)] = self.manifest_chunks(manifest)
+        stored_chunks = [
+            filename
+            for _, _, filenames in os.walk(self.chunk_dir)
+            for filename in filenames
+        ]
+        return backup_chunks, stored_chunks
+
+    def rebuild_catalog(self) -> int:
+        """ディレクトリの内容からカタログ（チャンクの参照数を含む）を作り直し、登録件数を返す"""
+        try:
+            return self.catalog.rebuild(self.scan_backups().items(), *self.scan_chunks())
+
+        except Exception as e:
+            raise BackupError(f'カタログの再作成に失敗しました: {str(e)}')
+
     def delete_backup(self, backup_name: str) -> None:
-        """指定されたバックアップを削除"""
-        db_path = os.path.join(self.backup_dir, f'{backup_name}.db')
+        """指定されたバックアップ（付随するアーカイブDBのバックアップを含む）を削除"""
+        names = (backup_name, f'{backup_name}{self.ARCHIVE_NAME_SUFFIX}')
         json_path = os.path.join(self.backup_dir, f'{backup_name}.json')
+        manifest_paths = [
+            os.path.join(self.backup_dir, f'{name}{self.MANIFEST_SUFFIX}') for name in names
+        ]
+        data_paths = [
+            path for path in (
+                os.path.join(self.backup_dir, f'{name}{extension}')
+                for name in names
+                for extension in (self.INCREMENTAL_SUFFIX, *self.EXTENSIONS.values())
+            )
+            if os.path.exists(path)
+        ]
 
-        if not os.path.exists(db_path):
+        if not data_paths:
+            self.catalog.remove(backup_name)
             raise BackupError(f'バックアップファイルが見つかりません: {backup_name}')
 
         try:
-            # データベースファイルの削除
-            os.remove(db_path)
-            logger.info(f'バックアップファイルを削除: {db_path}')
-
-            # メタデータファイルが存在する場合は削除
-            if os.path.exists(json_path):
-                os.remove(json_path)
-                logger.info(f'メタデータファイルを削除: {json_path}')
+            # バックアップファイルの削除
+            for db_path in data_paths:
+                os.remove(db_path)
+                logger.info(f'バックアップファイルを削除: {db_path}')
+
+            # マニフェスト・メタデータファイルが存在する場合は削除
+            for path in (*manifest_paths, json_path):
+                if os.path.exists(path):
+                    os.remove(path)
+                    logger.info(f'メタデータファイルを削除: {path}')
+
+            # マニフェストを削除してからチャンクの参照数を減らす
+            for name in names:
+                self.catalog.release_chunks(name)
+            self.catalog.remove(backup_name)
 
         except Exception as e:
             raise BackupError(f'バックアップの削除に失敗しました: {str(e)}')
@@ -186,19 +730,47 @@ class DatabaseBackup:
             raise BackupError('保持日数は0以上である必要があります')
 
         try:
-            current_time = datetime.now()
-            backups = self.list_backups()
+            # 経過日数がkeep_daysを超えたもの（keep_days + 1日以上前）だけをカタログから取得
+            cutoff = datetime.now() - timedelta(days=keep_days + 1)
+            backups = self.catalog.query(end=cutoff + timedelta(seconds=1))
             deleted_count = 0
 
-            for backup_name, info in backups.items():
-                created_at = datetime.strptime(info['created_at'], self.DATETIME_FORMAT)
-                age_days = (current_time - created_at).days
-
-                if age_days > keep_days:
-                    self.delete_backup(backup_name)
-                    deleted_count += 1
+            for backup_name in backups:
+                self.delete_backup(backup_name)
+                deleted_count += 1
 
             logger.info(f'古いバックアップを削除: {deleted_count}件')
 
+            # どのバックアップからも参照されなくなったチャンクを削除
+            self.collect_garbage()
+
         except Exception as e:
             raise BackupError(f'古いバックアップの削除に失敗しました: {str(e)}')
+
+    def collect_garbage(self, grace: Optional[float] = None) -> int:
+        """増分バックアップから参照されていないチャンクを削除し、削除件数を返す
+
+        対象はカタログで参照数が0になったチャンクのみで、マニフェストやチャンクの
+        ディレクトリは走査しない（書きかけのまま残ったファイルはカタログの再作成で対象になる）。
+        更新日時がgrace秒（既定はCHUNK_GC_GRACE）以内のチャンクは、実行中のバックアップが
+        再利用している可能性があるため残す。
+        """
+        grace = self.CHUNK_GC_GRACE if grace is None else grace
+        cutoff = time.time() - grace
+
+        deleted_count = 0
+        removed = []
+        for name in self.catalog.unreferenced_chunks():
+            path = self.chunk_file(name)
+            try:
+                if os.path.getmtime(path) > cutoff:
+                    continue
+                os.remove(path)
+                deleted_count += 1
+            except FileNotFoundError:
+                pass
+            removed.append(name)
+        self.catalog.remove_chunks(removed)
+
+        logger.info(f'未参照のチャンクを削除: {deleted_count}件')
+        return deleted_count
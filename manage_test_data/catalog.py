@@ -0,0 +1,201 @@
+import json
+import logging
+import sqlite3
+from collections import Counter
+from contextlib import closing
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional
+
+logger = logging.getLogger(__name__)
+
+class BackupCatalog:
+    """バックアップの一覧を保持するSQLiteカタログ
+
+    作成・削除のたびにトランザクションで更新し、日時や操作タイプでの絞り込みを
+    インデックスで行う。ディレクトリを走査せずに一覧・世代管理ができる。
+    増分バックアップのチャンクは参照数を保持し、マニフェストを読まずに未参照のものを取得できる。
+    """
+
+    DATETIME_FORMAT = '%Y/%m/%d %H:%M:%S'
+
+    SCHEMA = [
+        '''CREATE TABLE IF NOT EXISTS backups (
+            name TEXT PRIMARY KEY,
+            filename TEXT NOT NULL,
+            created_at TEXT NOT NULL,
+            size INTEGER NOT NULL,
+            compression TEXT NOT NULL,
+            incremental INTEGER NOT NULL DEFAULT 0,
+            operation TEXT,
+            metadata TEXT
+        )''',
+        'CREATE INDEX IF NOT EXISTS ix_backups_created_at ON backups (created_at)',
+        'CREATE INDEX IF NOT EXISTS ix_backups_operation ON backups (operation, created_at)',
+        # 増分バックアップ（付随するアーカイブDBのバックアップを含む）が参照するチャンク
+        '''CREATE TABLE IF NOT EXISTS backup_chunks (
+            backup TEXT NOT NULL,
+            chunk TEXT NOT NULL,
+            PRIMARY KEY (backup, chunk)
+        )''',
+        # チャンクごとの参照するバックアップ数（0のものがガベージコレクションの対象）
+        '''CREATE TABLE IF NOT EXISTS chunks (
+            name TEXT PRIMARY KEY,
+            refs INTEGER NOT NULL DEFAULT 0
+        )''',
+        'CREATE INDEX IF NOT EXISTS ix_chunks_unreferenced ON chunks (name) WHERE refs <= 0',
+    ]
+
+    COLUMNS = ('name', 'filename', 'created_at', 'size', 'compression',
+               'incremental', 'operation', 'metadata')
+
+    def __init__(self, path: str):
+        self.path = path
+        with closing(self.connect()) as conn, conn:
+            # チャンクの参照数を持たない（新規・旧形式の）カタログは再作成が必要
+            self.is_new = conn.execute(
+                "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'chunks'"
+            ).fetchone() is None
+            for statement in self.SCHEMA:
+                conn.execute(statement)
+
+    def connect(self) -> sqlite3.Connection:
+        """カタログへの接続を取得"""
+        return sqlite3.connect(self.path)
+
+    @classmethod
+    def to_row(cls, name: str, info: Dict) -> tuple:
+        """バックアップ情報をテーブルの行に変換"""
+        metadata = info.get('metadata')
+        return (
+            name,
+            info['filename'],
+            info['created_at'],
+            info['size'],
+            info['compression'],
+            int(info.get('incremental', False)),
+            metadata.get('operation') if metadata else None,
+            json.dumps(metadata, ensure_ascii=False) if metadata else None,
+        )
+
+    @classmethod
+    def from_row(cls, row: tuple) -> Dict:
+        """テーブルの行をバックアップ情報に変換"""
+        info = dict(zip(cls.COLUMNS, row))
+        info['incremental'] = bool(info['incremental'])
+        del info['name'], info['operation']
+        metadata = info.pop('metadata')
+        if metadata:
+            info['metadata'] = json.loads(metadata)
+        return info
+
+    def add(self, name: str, info: Dict) -> None:
+        """バックアップを登録（同名があれば置き換え）"""
+        with closing(self.connect()) as conn, conn:
+            conn.execute(
+                f'INSERT OR REPLACE INTO backups ({", ".join(self.COLUMNS)}) '
+                f'VALUES ({", ".join("?" * len(self.COLUMNS))})',
+                self.to_row(name, info)
+            )
+
+    def remove(self, name: str) -> None:
+        """バックアップの登録を削除"""
+        with closing(self.connect()) as conn, conn:
+            conn.execute('DELETE FROM backups WHERE name = ?', (name,))
+
+    @staticmethod
+    def release(conn: sqlite3.Connection, backup: str) -> None:
+        """バックアップが参照するチャンクの参照数を減らし、参照の記録を削除"""
+        conn.execute(
+            'UPDATE chunks SET refs = refs - 1 '
+            'WHERE name IN (SELECT chunk FROM backup_chunks WHERE backup = ?)',
+            (backup,)
+        )
+        conn.execute('DELETE FROM backup_chunks WHERE backup = ?', (backup,))
+
+    def add_chunks(self, backup: str, chunks: Iterable[str]) -> None:
+        """増分バックアップが参照するチャンクを登録し、参照数を増やす（同名があれば置き換え）"""
+        chunks = sorted(set(chunks))
+        with closing(self.connect()) as conn, conn:
+            self.release(conn, backup)
+            conn.executemany(
+                'INSERT INTO backup_chunks (backup, chunk) VALUES (?, ?)',
+                [(backup, chunk) for chunk in chunks]
+            )
+            conn.executemany(
+                'INSERT INTO chunks (name, refs) VALUES (?, 1) '
+                'ON CONFLICT (name) DO UPDATE SET refs = refs + 1',
+                [(chunk,) for chunk in chunks]
+            )
+
+    def release_chunks(self, backup: str) -> None:
+        """削除したバックアップが参照していたチャンクの参照数を減らす"""
+        with closing(self.connect()) as conn, conn:
+            self.release(conn, backup)
+
+    def unreferenced_chunks(self) -> List[str]:
+        """どのバックアップからも参照されていないチャンク名の一覧"""
+        with closing(self.connect()) as conn:
+            return [row[0] for row in conn.execute('SELECT name FROM chunks WHERE refs <= 0')]
+
+    def remove_chunks(self, chunks: Iterable[str]) -> None:
+        """削除したチャンクの登録を削除（その間に再び参照されたものは残す）"""
+        with closing(self.connect()) as conn, conn:
+            conn.executemany(
+                'DELETE FROM chunks WHERE name = ? AND refs <= 0',
+                [(chunk,) for chunk in chunks]
+            )
+
+    def query(self, start: Optional[datetime] = None, end: Optional[datetime] = None,
+              operation: Optional[str] = None, incremental: Optional[bool] = None) -> Dict[str, Dict]:
+        """条件に合うバックアップを作成日時順に取得（endは含まない）"""
+        conditions = []
+        params = []
+        if start:
+            conditions.append('created_at >= ?')
+            params.append(start.strftime(self.DATETIME_FORMAT))
+        if end:
+            conditions.append('created_at < ?')
+            params.append(end.strftime(self.DATETIME_FORMAT))
+        if operation:
+            conditions.append('operation = ?')
+            params.append(operation)
+        if incremental is not None:
+            conditions.append('incremental = ?')
+            params.append(int(incremental))
+        where = f'WHERE {" AND ".join(conditions)}' if conditions else ''
+
+        with closing(self.connect()) as conn:
+            rows = conn.execute(
+                f'SELECT {", ".join(self.COLUMNS)} FROM backups {where} ORDER BY created_at, name',
+                params
+            ).fetchall()
+        return {row[0]: self.from_row(row) for row in rows}
+
+    def rebuild(self, backups: Iterable, backup_chunks: Optional[Dict[str, Iterable[str]]] = None,
+                stored_chunks: Iterable[str] = ()) -> int:
+        """(バックアップ名, 情報)の一覧でカタログを作り直し、登録件数を返す
+
+        backup_chunksは増分バックアップごとの参照するチャンク名、stored_chunksは保存済みの
+        チャンク名の一覧で、参照数を数え直す（参照されていないものは参照数0で登録）。
+        """
+        rows = [self.to_row(name, info) for name, info in backups]
+        refs = Counter({chunk: 0 for chunk in stored_chunks})
+        references = [
+            (backup, chunk)
+            for backup, chunks in (backup_chunks or {}).items()
+            for chunk in set(chunks)
+        ]
+        refs.update(chunk for _, chunk in references)
+        with closing(self.connect()) as conn, conn:
+            conn.execute('DELETE FROM backups')
+            conn.executemany(
+                f'INSERT INTO backups ({", ".join(self.COLUMNS)}) '
+                f'VALUES ({", ".join("?" * len(self.COLUMNS))})',
+                rows
+            )
+            conn.execute('DELETE FROM backup_chunks')
+            conn.execute('DELETE FROM chunks')
+            conn.executemany('INSERT INTO backup_chunks (backup, chunk) VALUES (?, ?)', references)
+            conn.executemany('INSERT INTO chunks (name, refs) VALUES (?, ?)', refs.items())
+        logger.info(f'バックアップカタログを再作成: {len(rows)}件 (チャンク: {len(refs)}件)')
+        return len(rows)
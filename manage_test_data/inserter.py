@@ -3,8 +3,12 @@ from datetime import datetime
 from typing import Dict, List, Set, Tuple
 from sqlalchemy import and_
 from sqlalchemy.orm import Session
+from sqlalchemy.orm.attributes import set_committed_value
 
-from models import Entry, DiaryItem, User
+from models import (
+    Entry, DiaryItem, User, RollupManager, ActivityManager, MetricManager, ChangeFeedManager
+)
+from change_journal import is_journaled, record_rows, record_deletes
 
 logger = logging.getLogger(__name__)
 
@@ -77,19 +81,59 @@ class DataInserter:
             notes=entry_data['notes'],
             created_at=date
         )
-
-        # 活動項目の追加
-        if 'items' in entry_data:
-            for item_data in entry_data['items']:
-                item = DiaryItem(
-                    item_name=item_data['item_name'],
-                    item_content=item_data['item_content'],
-                    created_at=date
-                )
-                entry.items.append(item)
+        # 一括保存後のエントリーはセッション外となり関連を遅延読み込みできないため、
+        # 作成時点の関連を読み込み済みとして設定する
+        set_committed_value(entry, 'bodies', dict(entry.bodies))
+        set_committed_value(entry, 'items', [])
 
         return entry
 
+    def create_items(self, entry: Entry, entry_data: Dict) -> List[DiaryItem]:
+        """活動項目の作成（エントリーIDの採番後に呼び出す）"""
+        items = [
+            DiaryItem(
+                entry_id=entry.id,
+                item_name=item_data['item_name'],
+                item_content=item_data['item_content'],
+                created_at=entry.created_at
+            )
+            for item_data in entry_data.get('items', [])
+        ]
+        for item in items:
+            set_committed_value(item, 'body', item.body)
+        set_committed_value(entry, 'items', items)
+        return items
+
+    def save_batch(self, batch: List[Tuple[Entry, Dict]]) -> None:
+        """エントリーのバッチを保存し、集計・数値を同じトランザクションで更新"""
+        entries = [entry for entry, _ in batch]
+        # 活動項目・数値の保存にエントリーIDが必要なため採番結果を受け取る
+        self.session.bulk_save_objects(entries, return_defaults=True)
+        # 一括保存は関連を辿らないため、活動項目と本文テーブルに格納する大きな本文は別に保存する
+        items = []
+        for entry, entry_data in batch:
+            items.extend(self.create_items(entry, entry_data))
+        self.session.bulk_save_objects(items, return_defaults=True)
+        bodies = []
+        for entry in entries:
+            for body in entry.bodies.values():
+                body.entry_id = entry.id
+                bodies.append(body)
+        item_bodies = []
+        for item in items:
+            if item.body is not None:
+                item.body.item_id = item.id
+                item_bodies.append(item.body)
+        # 本文の行もジャーナルに記録するため採番結果を受け取る
+        self.session.bulk_save_objects(bodies, return_defaults=True)
+        self.session.bulk_save_objects(item_bodies, return_defaults=True)
+        # 一括保存はフラッシュを通らないため、変更ジャーナルへは明示的に記録する
+        record_rows(self.session, entries + items + bodies + item_bodies)
+        RollupManager(self.session).apply_entries(entries)
+        ActivityManager(self.session).apply_entries(entries)
+        MetricManager(self.session).add_entries(entries)
+        ChangeFeedManager(self.session).record(entries)
+
     def insert_entries(self, entries: List[Dict], dry_run: bool = False) -> int:
         """エントリーの一括挿入"""
         if not entries:
@@ -121,20 +165,20 @@ class DataInserter:
                     continue
 
                 entry = self.create_entry(entry_data, user)
-                batch.append(entry)
+                batch.append((entry, entry_data))
                 inserted_count += 1
 
                 # バッチサイズに達したらコミット
                 if len(batch) >= self.BATCH_SIZE:
                     if not dry_run:
-                        self.session.bulk_save_objects(batch)
+                        self.save_batch(batch)
                         self.session.commit()
                         logger.info(f'{len(batch)}件のエントリーを挿入')
                     batch = []
 
             # 残りのバッチを処理
             if batch and not dry_run:
-                self.session.bulk_save_objects(batch)
+                self.save_batch(batch)
                 self.session.commit()
                 logger.info(f'{len(batch)}件のエントリーを挿入')
 
@@ -214,7 +258,17 @@ class DataInserter:
                 query = query.join(User).filter(User.userid == user_id)
 
             count = query.count()
+            # 一括削除はフラッシュを通らないため、削除するIDを変更ジャーナルへ明示的に記録する
+            if is_journaled(self.session):
+                record_deletes(self.session, 'entries', [
+                    entry_id for entry_id, in query.with_entities(Entry.id)
+                ])
             query.delete(synchronize_session=False)
+            # 一括削除は集計の差分が追えないため再作成する
+            RollupManager(self.session).rebuild()
+            ActivityManager(self.session).rebuild()
+            MetricManager(self.session).delete_orphans()
+            ChangeFeedManager(self.session).record_orphans()
             self.session.commit()
 
             logger.info(f'{count}件のエントリーを削除')
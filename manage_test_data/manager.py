@@ -1,9 +1,12 @@
 #!/usr/bin/env python
+import argparse
 import json
 import logging
 import os
+import sqlite3
 import sys
-from datetime import datetime
+from contextlib import closing
+from datetime import datetime, timedelta
 from typing import Dict, List, Optional
 
 import yaml
@@ -12,12 +15,19 @@ from sqlalchemy.orm import Session
 # プロジェクトのルートディレクトリをPYTHONPATHに追加
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 
-from models import Entry, DiaryItem, User
-from database import get_db
+from models import (
+    Entry, DiaryItem, User, RollupManager, ActivityManager, MetricManager, ChangeFeedManager,
+    BodyManager
+)
+from database import get_db, attached_archive_path
+from change_journal import (
+    ARCHIVE_SCHEMA, ChangeJournal, attach_journal, is_journaled, read_records, record_deletes,
+    replay, reconcile_archive
+)
 
 from .generator import TestDataGenerator
 from .validator import DataValidator
-from .backup import DatabaseBackup
+from .backup import DatabaseBackup, progress_logger
 from .inserter import DataInserter
 
 # ロギング設定
@@ -38,6 +48,7 @@ class TestDataManager:
         self.load_config()
         self.db = get_db()
         self.validator = DataValidator()
+        self.journal = None
 
     def load_config(self):
         """設定ファイルの読み込み"""
@@ -73,7 +84,15 @@ class TestDataManager:
             },
             'database': {
                 'backup_before_clear': True,
-                'backup_dir': self.backup_dir
+                'backup_dir': self.backup_dir,
+                'backup_pages_per_step': DatabaseBackup.PAGES_PER_STEP,
+                'backup_step_sleep': DatabaseBackup.STEP_SLEEP,
+                'backup_compression': DatabaseBackup.COMPRESSION,
+                'backup_compression_level': None,
+                'backup_chunk_size': DatabaseBackup.CHUNK_SIZE,
+                'backup_incremental': False,
+                'journal_dir': None,
+                'journal_archive_dir': os.path.join(self.backup_dir, 'journal')
             }
         }
         
@@ -146,7 +165,7 @@ class TestDataManager:
             self.backup_database()
 
         # 削除対象の特定
-        with Session(self.db) as session:
+        with self.open_session() as session:
             query = session.query(Entry)
             
             if not all_data:
@@ -181,26 +200,172 @@ class TestDataManager:
                     logger.info('削除をキャンセルしました')
                     return
 
-            # データの削除
+            # データの削除（一括削除はフラッシュを通らないため、IDを変更ジャーナルへ明示的に記録する）
+            if is_journaled(session):
+                record_deletes(session, 'entries', [
+                    entry_id for entry_id, in query.with_entities(Entry.id)
+                ])
             query.delete(synchronize_session=False)
+            RollupManager(session).rebuild()
+            ActivityManager(session).rebuild()
+            MetricManager(session).delete_orphans()
+            BodyManager(session).delete_orphans()
+            ChangeFeedManager(session).record_orphans()
             session.commit()
             
             logger.info(f'{count}件のデータを削除しました')
 
-    def backup_database(self) -> None:
+    def journal_directories(self) -> List[Optional[str]]:
+        """変更ジャーナルのアーカイブと書き込み中のセグメントのディレクトリ"""
+        db_config = self.config['database']
+        return [
+            db_config.get('journal_archive_dir') or os.path.join(self.backup_dir, 'journal'),
+            db_config.get('journal_dir') or os.environ.get('LIFELOG_JOURNAL_DIR')
+        ]
+
+    def open_session(self) -> Session:
+        """書き込み用のセッション（変更ジャーナルのディレクトリ設定時はコミット時に記録）"""
+        session = Session(self.db)
+        archive_dir, journal_dir = self.journal_directories()
+        if journal_dir:
+            if self.journal is None:
+                # アプリと同じディレクトリへ別のセグメントとして書き込む
+                self.journal = ChangeJournal(journal_dir, archive_dir=archive_dir, source='manage')
+            attach_journal(session, self.journal)
+        return session
+
+    def get_backup(self) -> DatabaseBackup:
+        """設定に従ってバックアップ管理オブジェクトを作成"""
+        db_config = self.config['database']
+        return DatabaseBackup(
+            db_config.get('backup_dir', self.backup_dir),
+            pages_per_step=db_config.get('backup_pages_per_step'),
+            step_sleep=db_config.get('backup_step_sleep'),
+            compression=db_config.get('backup_compression'),
+            level=db_config.get('backup_compression_level'),
+            chunk_size=db_config.get('backup_chunk_size'),
+            incremental=db_config.get('backup_incremental', False)
+        )
+
+    def backup_database(self, description: str = 'データ削除前の自動バックアップ',
+                        progress=None) -> str:
         """データベースのバックアップを作成"""
-        timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-        backup_path = os.path.join(self.backup_dir, f'diary_backup_{timestamp}.db')
-        
-        # データベースのバックアップを作成
-        backup = DatabaseBackup(self.backup_dir)
+        backup = self.get_backup()
         metadata = {
             'operation': 'backup',
             'timestamp': datetime.now().strftime('%Y/%m/%d %H:%M:%S'),
-            'description': 'データ削除前の自動バックアップ'
+            'description': description
         }
-        backup.create_backup('instance/diary.db', metadata)
+        backup_path = backup.create_backup(
+            self.db.url.database, metadata, progress=progress,
+            archive_path=attached_archive_path(self.db)
+        )
         logger.info(f'データベースのバックアップを作成しました: {backup_path}')
+        return backup_path
+
+    def list_backups(self, start_date: Optional[str] = None, end_date: Optional[str] = None,
+                     operation: Optional[str] = None) -> Dict[str, Dict]:
+        """バックアップの一覧を取得（日付はYYYY/MM/DD、終了日を含む）"""
+        start = self.validator.validate_date(start_date) if start_date else None
+        end = self.validator.validate_date(end_date) + timedelta(days=1) if end_date else None
+        return self.get_backup().list_backups(start=start, end=end, operation=operation)
+
+    def rebuild_backup_catalog(self) -> int:
+        """バックアップカタログをディレクトリの内容から再作成"""
+        count = self.get_backup().rebuild_catalog()
+        logger.info(f'バックアップカタログを再作成しました: {count}件')
+        return count
+
+    def verify_backups(self, names: Optional[List[str]] = None, workers: Optional[int] = None,
+                       integrity: bool = False) -> Dict:
+        """バックアップの整合性を並列に検証"""
+        return self.get_backup().verify_backups(names, workers=workers, integrity=integrity)
+
+    def restore_database(self, backup_name: Optional[str] = None, until: Optional[str] = None,
+                         target: Optional[str] = None, confirm: bool = True,
+                         archive_target: Optional[str] = None) -> int:
+        """バックアップから復元し、until指定時は変更ジャーナルをその時刻まで適用
+
+        アーカイブDBはバックアップに含まれていればarchive_target（既定はアプリのDBに
+        ATTACHしているアーカイブDB、--target指定時は指定した場合のみ）へ復元する。
+        """
+        until_dt = None
+        if until:
+            try:
+                until_dt = datetime.strptime(until, '%Y/%m/%d %H:%M:%S')
+            except ValueError:
+                raise ValueError(f'無効な日時フォーマット: {until} (YYYY/MM/DD HH:MM:SS)')
+
+        backup = self.get_backup()
+        if backup_name:
+            backups = backup.list_backups()
+            if backup_name not in backups:
+                raise ValueError(f'バックアップが見つかりません: {backup_name}')
+            info = backups[backup_name]
+        else:
+            # until以前に作成された最新のバックアップを基点にする
+            end = until_dt + timedelta(seconds=1) if until_dt else None
+            candidates = backup.list_backups(end=end, operation='backup')
+            if not candidates:
+                raise ValueError('基点となるバックアップがありません')
+            backup_name, info = list(candidates.items())[-1]
+
+        manifest = backup.load_manifest(info['path'])
+        if manifest and manifest.get('snapshot_at'):
+            since = datetime.fromisoformat(manifest['snapshot_at'])
+        else:
+            since = datetime.strptime(info['created_at'], '%Y/%m/%d %H:%M:%S')
+        if until_dt and since > until_dt:
+            raise ValueError(f'指定日時より後に作成されたバックアップです: {backup_name}')
+
+        if target is None:
+            target = self.db.url.database
+            archive_target = archive_target or attached_archive_path(self.db)
+        if confirm:
+            msg = f'{target} を {backup_name} から復元します'
+            msg += f'（{until} まで変更を適用）' if until else ''
+            if input(msg + '\n続行しますか？ (y/N): ').lower() != 'y':
+                logger.info('復元をキャンセルしました')
+                return 0
+
+        # 置き換える前のファイルを参照する接続を残さない
+        self.db.dispose()
+        backup.restore_backup(info['path'], target, archive_target)
+        logger.info(f'バックアップを復元しました: {backup_name}')
+
+        # 変更ジャーナル（アーカイブDBとの間の移動を含む）を1トランザクションでまとめて適用し、
+        # ホットとアーカイブの両方に残ったエントリーはアーカイブを優先する
+        directories = self.journal_directories()
+        if archive_target and not os.path.exists(archive_target):
+            archive_target = None
+        count = 0
+        with closing(sqlite3.connect(target)) as conn:
+            conn.execute('PRAGMA synchronous = OFF')
+            if archive_target:
+                conn.execute(f'ATTACH DATABASE ? AS {ARCHIVE_SCHEMA}', (archive_target,))
+            with conn:
+                if until_dt:
+                    count = replay(conn, read_records(directories, since, until_dt))
+                duplicates = reconcile_archive(conn)
+        if duplicates:
+            logger.info(f'アーカイブと重複したエントリーをホットから削除しました: {duplicates}件')
+        if until_dt is None and not duplicates:
+            return 0
+
+        # 集計テーブルは適用後のデータから再作成し、一括削除で残った本文は削除時と同様に削除
+        engine = get_db(target, archive_target)
+        with Session(engine) as session:
+            BodyManager(session).delete_orphans()
+            RollupManager(session).rebuild()
+            ActivityManager(session).rebuild()
+            MetricManager(session).backfill()
+            ChangeFeedManager(session).rebuild()
+            session.commit()
+        engine.dispose()
+
+        if until_dt:
+            logger.info(f'変更ジャーナルを適用しました: {count}件 ({since} - {until_dt})')
+        return count
 
     def insert_data(self, file: str, dry_run: bool = False, skip_validation: bool = False) -> None:
         """テストデータの挿入"""
@@ -216,7 +381,7 @@ class TestDataManager:
             self.validator.validate_test_data(data)
 
         # データ挿入の実行
-        with Session(self.db) as session:
+        with self.open_session() as session:
             inserter = DataInserter(session)
             
             # 競合チェック
@@ -325,3 +490,113 @@ class TestDataManager:
             )
         except Exception as e:
             logger.error(f'データ挿入に失敗しました: {e}')
+
+def main():
+    """コマンドライン引数に応じて各操作を実行"""
+    parser = argparse.ArgumentParser(description='テストデータ管理ツール')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    gen = subparsers.add_parser('generate', aliases=['gen'], help='テストデータの生成')
+    gen.add_argument('--start', required=True, help='開始日 (YYYY/MM/DD)')
+    gen.add_argument('--end', required=True, help='終了日 (YYYY/MM/DD)')
+    gen.add_argument('--rate', type=int, default=100, help='データ生成率 (1-100)')
+    gen.add_argument('--items-per-entry', type=int, default=3, help='活動項目数')
+    gen.add_argument('--output', help='出力JSONファイル名')
+
+    clr = subparsers.add_parser('clear', aliases=['clr'], help='DBデータの削除')
+    clr.add_argument('--all', action='store_true', help='全データを削除')
+    clr.add_argument('--start', help='削除開始日 (YYYY/MM/DD)')
+    clr.add_argument('--end', help='削除終了日 (YYYY/MM/DD)')
+    clr.add_argument('--user', help='対象ユーザーID')
+    clr.add_argument('--confirm', action='store_true', help='削除確認をスキップ')
+
+    ins = subparsers.add_parser('insert', aliases=['ins'], help='テストデータの挿入')
+    ins.add_argument('--file', required=True, help='挿入するJSONファイル')
+    ins.add_argument('--dry-run', action='store_true', help='検証のみ実行')
+    ins.add_argument('--skip-validation', action='store_true', help='バリデーションをスキップ')
+
+    bak = subparsers.add_parser('backup', aliases=['bak'], help='DBのオンラインバックアップ')
+    bak.add_argument('--pages-per-step', type=int, help='1ステップでコピーするページ数')
+    bak.add_argument('--sleep', type=float, help='ステップ間の待機秒数')
+    bak.add_argument('--compression', choices=list(DatabaseBackup.EXTENSIONS),
+                     help='圧縮方式')
+    bak.add_argument('--level', type=int, help='圧縮レベル')
+    bak.add_argument('--incremental', action='store_true',
+                     help='変更されたチャンクのみを保存する増分バックアップ')
+    bak.add_argument('--keep-days', type=int, help='指定日数より古いバックアップを削除')
+    bak.add_argument('--quiet', action='store_true', help='進捗を表示しない')
+
+    lst = subparsers.add_parser('list-backups', aliases=['ls'], help='バックアップの一覧')
+    lst.add_argument('--start', help='作成日の開始 (YYYY/MM/DD)')
+    lst.add_argument('--end', help='作成日の終了 (YYYY/MM/DD)')
+    lst.add_argument('--operation', help='操作タイプ (backup など)')
+
+    subparsers.add_parser('rebuild-catalog', help='バックアップカタログの再作成')
+
+    res = subparsers.add_parser('restore', help='バックアップからの復元')
+    res.add_argument('--backup', help='基点とするバックアップ名（省略時は最新）')
+    res.add_argument('--until', help='この日時まで変更ジャーナルを適用 (YYYY/MM/DD HH:MM:SS)')
+    res.add_argument('--target', help='復元先のDBファイル（デフォルト: アプリのDB）')
+    res.add_argument('--archive-target',
+                     help='アーカイブDBの復元先（デフォルト: アプリのDBのアーカイブDB）')
+    res.add_argument('--confirm', action='store_true', help='復元確認をスキップ')
+
+    ver = subparsers.add_parser('verify', help='バックアップの整合性検証')
+    ver.add_argument('names', nargs='*', help='検証するバックアップ名（省略時は全件）')
+    ver.add_argument('--workers', type=int, help='並列プロセス数（デフォルト: CPU数）')
+    ver.add_argument('--integrity', action='store_true',
+                     help='quick_checkの代わりにintegrity_checkを実行')
+
+    subparsers.add_parser('interactive', aliases=['i'], help='対話モードを起動')
+
+    args = parser.parse_args()
+    manager = TestDataManager()
+
+    if args.command in ('generate', 'gen'):
+        manager.generate_data(args.start, args.end, args.rate, args.items_per_entry, args.output)
+    elif args.command in ('clear', 'clr'):
+        manager.clear_data(args.start, args.end, args.user, args.all, confirm=not args.confirm)
+    elif args.command in ('insert', 'ins'):
+        manager.insert_data(args.file, args.dry_run, args.skip_validation)
+    elif args.command in ('backup', 'bak'):
+        if args.pages_per_step is not None:
+            manager.config['database']['backup_pages_per_step'] = args.pages_per_step
+        if args.sleep is not None:
+            manager.config['database']['backup_step_sleep'] = args.sleep
+        if args.compression is not None:
+            manager.config['database']['backup_compression'] = args.compression
+        if args.level is not None:
+            manager.config['database']['backup_compression_level'] = args.level
+        if args.incremental:
+            manager.config['database']['backup_incremental'] = True
+        manager.backup_database(
+            description='定期バックアップ',
+            progress=None if args.quiet else progress_logger()
+        )
+        if args.keep_days is not None:
+            manager.get_backup().cleanup_old_backups(args.keep_days)
+    elif args.command in ('list-backups', 'ls'):
+        backups = manager.list_backups(args.start, args.end, args.operation)
+        for name, info in backups.items():
+            operation = info.get('metadata', {}).get('operation', '-')
+            print(f"{info['created_at']}  {operation:<12} {info['size']:>12}  {name}")
+        print(f'{len(backups)}件')
+    elif args.command == 'rebuild-catalog':
+        manager.rebuild_backup_catalog()
+    elif args.command == 'restore':
+        manager.restore_database(args.backup, args.until, args.target, confirm=not args.confirm,
+                                 archive_target=args.archive_target)
+    elif args.command == 'verify':
+        summary = manager.verify_backups(args.names, args.workers, args.integrity)
+        for result in summary['results']:
+            status = 'OK' if result['ok'] else f"NG: {result['error']}"
+            print(f"{result['name']}  {result['size']:>12}  {result['mb_per_sec']:8.1f}MB/s  {status}")
+        print(f"{len(summary['results'])}件  {summary['size']}バイト  "
+              f"{summary['seconds']:.2f}秒  {summary['mb_per_sec']:.1f}MB/s")
+        if not summary['ok']:
+            sys.exit(1)
+    else:
+        manager.interactive()
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,44 @@
+"""Add entries.sort_ts and per-user timeline index
+
+Revision ID: 3b7e1c9a2d40
+Revises: 612831183f49
+Create Date: 2026-10-19 10:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '3b7e1c9a2d40'
+down_revision: Union[str, None] = '612831183f49'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # SQLiteは非定数のデフォルト値を持つ列を追加できないため、
+    # NULL許可で追加して値を埋めてから、テーブルを作り直してNOT NULLにする
+    op.add_column('entries', sa.Column('sort_ts', sa.DateTime(), nullable=True))
+    # 既存データは更新日時（未更新の場合は作成日時）で埋める
+    op.execute('UPDATE entries SET sort_ts = COALESCE(updated_at, created_at)')
+    with op.batch_alter_table('entries', table_kwargs={'sqlite_autoincrement': True}) as batch_op:
+        batch_op.alter_column(
+            'sort_ts',
+            existing_type=sa.DateTime(),
+            nullable=False,
+            server_default=sa.func.current_timestamp()
+        )
+    op.create_index(
+        'ix_entries_user_sort_ts',
+        'entries',
+        ['user_id', sa.text('sort_ts DESC'), sa.text('id DESC')]
+    )
+
+
+def downgrade() -> None:
+    op.drop_index('ix_entries_user_sort_ts', table_name='entries')
+    with op.batch_alter_table('entries', table_kwargs={'sqlite_autoincrement': True}) as batch_op:
+        batch_op.drop_column('sort_ts')
@@ -0,0 +1,51 @@
+"""Add activity_frequencies table and diary_items item_name index
+
+Revision ID: 5e9b3d1f7a26
+Revises: c41a7e2b9f03
+Create Date: 2026-10-19 13:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '5e9b3d1f7a26'
+down_revision: Union[str, None] = 'c41a7e2b9f03'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_index(
+        'ix_diary_items_item_name_entry_id',
+        'diary_items',
+        ['item_name', 'entry_id']
+    )
+    op.create_table(
+        'activity_frequencies',
+        sa.Column('user_id', sa.Integer(), primary_key=True),
+        sa.Column('item_name', sa.String(100), primary_key=True),
+        sa.Column('month', sa.String(7), primary_key=True),
+        sa.Column('item_count', sa.Integer(), nullable=False, server_default='0')
+    )
+    # 既存データから集計を作成（user_id=0は全ユーザーの合計）
+    op.execute(
+        "INSERT INTO activity_frequencies (user_id, item_name, month, item_count) "
+        "SELECT e.user_id, i.item_name, strftime('%Y-%m', e.created_at), COUNT(i.id) "
+        "FROM diary_items i JOIN entries e ON i.entry_id = e.id "
+        "GROUP BY e.user_id, i.item_name, strftime('%Y-%m', e.created_at)"
+    )
+    op.execute(
+        "INSERT INTO activity_frequencies (user_id, item_name, month, item_count) "
+        "SELECT 0, i.item_name, strftime('%Y-%m', e.created_at), COUNT(i.id) "
+        "FROM diary_items i JOIN entries e ON i.entry_id = e.id "
+        "GROUP BY i.item_name, strftime('%Y-%m', e.created_at)"
+    )
+
+
+def downgrade() -> None:
+    op.drop_table('activity_frequencies')
+    op.drop_index('ix_diary_items_item_name_entry_id', table_name='diary_items')
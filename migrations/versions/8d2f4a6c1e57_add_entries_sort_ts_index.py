@@ -0,0 +1,30 @@
+"""Add global feed index on entries.sort_ts
+
+Revision ID: 8d2f4a6c1e57
+Revises: 3b7e1c9a2d40
+Create Date: 2026-10-19 11:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '8d2f4a6c1e57'
+down_revision: Union[str, None] = '3b7e1c9a2d40'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_index(
+        'ix_entries_sort_ts',
+        'entries',
+        [sa.text('sort_ts DESC'), sa.text('id DESC')]
+    )
+
+
+def downgrade() -> None:
+    op.drop_index('ix_entries_sort_ts', table_name='entries')
@@ -0,0 +1,44 @@
+"""Add entry_metrics table
+
+Revision ID: a7c2e5f81b34
+Revises: 5e9b3d1f7a26
+Create Date: 2026-10-19 14:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a7c2e5f81b34'
+down_revision: Union[str, None] = '5e9b3d1f7a26'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # 既存データの抽出は `flask backfill-metrics` で行う
+    op.create_table(
+        'entry_metrics',
+        sa.Column('id', sa.Integer(), primary_key=True),
+        sa.Column('entry_id', sa.Integer(), sa.ForeignKey('entries.id'), nullable=False),
+        sa.Column('user_id', sa.Integer(), sa.ForeignKey('users.id'), nullable=False),
+        sa.Column('key', sa.String(100), nullable=False),
+        sa.Column('unit', sa.String(20), nullable=False, server_default=''),
+        sa.Column('value', sa.Float(), nullable=False),
+        sa.Column('recorded_at', sa.DateTime(), nullable=False)
+    )
+    op.create_index('ix_entry_metrics_entry_id', 'entry_metrics', ['entry_id'])
+    op.create_index(
+        'ix_entry_metrics_series',
+        'entry_metrics',
+        ['user_id', 'key', 'unit', 'recorded_at']
+    )
+
+
+def downgrade() -> None:
+    op.drop_index('ix_entry_metrics_series', table_name='entry_metrics')
+    op.drop_index('ix_entry_metrics_entry_id', table_name='entry_metrics')
+    op.drop_table('entry_metrics')
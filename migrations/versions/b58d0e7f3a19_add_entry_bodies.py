@@ -0,0 +1,59 @@
+"""Add entry_bodies / diary_item_bodies tables and entries.excerpt
+
+Revision ID: b58d0e7f3a19
+Revises: e3f19b6a4c58
+Create Date: 2026-10-19 18:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b58d0e7f3a19'
+down_revision: Union[str, None] = 'e3f19b6a4c58'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'entry_bodies',
+        sa.Column('id', sa.Integer(), primary_key=True),
+        sa.Column('entry_id', sa.Integer(), sa.ForeignKey('entries.id'), nullable=False),
+        sa.Column('field', sa.String(20), nullable=False),
+        sa.Column('codec', sa.String(10), nullable=False),
+        sa.Column('size', sa.Integer(), nullable=False),
+        sa.Column('data', sa.LargeBinary(), nullable=False),
+        sa.UniqueConstraint('entry_id', 'field')
+    )
+    op.create_table(
+        'diary_item_bodies',
+        sa.Column('id', sa.Integer(), primary_key=True),
+        sa.Column('item_id', sa.Integer(), sa.ForeignKey('diary_items.id'), nullable=False,
+                  unique=True),
+        sa.Column('codec', sa.String(10), nullable=False),
+        sa.Column('size', sa.Integer(), nullable=False),
+        sa.Column('data', sa.LargeBinary(), nullable=False)
+    )
+    op.add_column(
+        'entries',
+        sa.Column('excerpt', sa.String(120), nullable=False, server_default='')
+    )
+    # 改行・タブを空白にした先頭部分で抜粋を埋める
+    # （本文テーブルへの移動と正確な抜粋の作成は flask compact-bodies で行う）
+    op.execute(
+        "UPDATE entries SET excerpt = substr(trim(replace(replace(replace("
+        "content, char(13), ''), char(10), ' '), char(9), ' ')), 1, 120)"
+    )
+
+
+def downgrade() -> None:
+    # 本文テーブルに格納した本文を行内に戻してから削除する場合は、
+    # 事前にしきい値を大きくして flask compact-bodies を実行すること
+    with op.batch_alter_table('entries') as batch_op:
+        batch_op.drop_column('excerpt')
+    op.drop_table('diary_item_bodies')
+    op.drop_table('entry_bodies')
@@ -0,0 +1,41 @@
+"""Add activity_rollups table
+
+Revision ID: c41a7e2b9f03
+Revises: 8d2f4a6c1e57
+Create Date: 2026-10-19 12:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c41a7e2b9f03'
+down_revision: Union[str, None] = '8d2f4a6c1e57'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'activity_rollups',
+        sa.Column('user_id', sa.Integer(), sa.ForeignKey('users.id'), primary_key=True),
+        sa.Column('day', sa.Date(), primary_key=True),
+        sa.Column('entry_count', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('item_count', sa.Integer(), nullable=False, server_default='0')
+    )
+    # 既存データから集計を作成
+    op.execute(
+        'INSERT INTO activity_rollups (user_id, day, entry_count, item_count) '
+        'SELECT e.user_id, date(e.created_at), COUNT(e.id), COALESCE(SUM(i.item_count), 0) '
+        'FROM entries e LEFT JOIN ('
+        'SELECT entry_id, COUNT(id) AS item_count FROM diary_items GROUP BY entry_id'
+        ') i ON i.entry_id = e.id '
+        'GROUP BY e.user_id, date(e.created_at)'
+    )
+
+
+def downgrade() -> None:
+    op.drop_table('activity_rollups')
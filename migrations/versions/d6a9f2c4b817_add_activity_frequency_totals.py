@@ -0,0 +1,52 @@
+"""Add all-time activity frequency rows and exclude hidden users from the global rows
+
+Revision ID: d6a9f2c4b817
+Revises: b58d0e7f3a19
+Create Date: 2026-10-19 20:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd6a9f2c4b817'
+down_revision: Union[str, None] = 'b58d0e7f3a19'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # 全体集計（user_id=0）はユーザー別の集計から作り直す
+    op.execute('DELETE FROM activity_frequencies WHERE user_id = 0')
+    # 全期間の合計行（month='total'）
+    op.execute(
+        "INSERT INTO activity_frequencies (user_id, item_name, month, item_count) "
+        "SELECT user_id, item_name, 'total', SUM(item_count) FROM activity_frequencies "
+        "GROUP BY user_id, item_name"
+    )
+    # 全体集計は表示中のユーザーのみ
+    op.execute(
+        "INSERT INTO activity_frequencies (user_id, item_name, month, item_count) "
+        "SELECT 0, f.item_name, f.month, SUM(f.item_count) "
+        "FROM activity_frequencies f JOIN users u ON u.id = f.user_id "
+        "WHERE u.is_visible = 1 "
+        "GROUP BY f.item_name, f.month"
+    )
+    op.create_index(
+        'ix_activity_frequencies_top',
+        'activity_frequencies',
+        ['user_id', 'month', sa.text('item_count DESC'), 'item_name']
+    )
+
+
+def downgrade() -> None:
+    op.drop_index('ix_activity_frequencies_top', table_name='activity_frequencies')
+    op.execute("DELETE FROM activity_frequencies WHERE user_id = 0 OR month = 'total'")
+    op.execute(
+        "INSERT INTO activity_frequencies (user_id, item_name, month, item_count) "
+        "SELECT 0, item_name, month, SUM(item_count) FROM activity_frequencies "
+        "GROUP BY item_name, month"
+    )
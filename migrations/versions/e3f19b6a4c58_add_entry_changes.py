@@ -0,0 +1,39 @@
+"""Add entry_changes table
+
+Revision ID: e3f19b6a4c58
+Revises: a7c2e5f81b34
+Create Date: 2026-10-19 16:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e3f19b6a4c58'
+down_revision: Union[str, None] = 'a7c2e5f81b34'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'entry_changes',
+        sa.Column('seq', sa.Integer(), primary_key=True),
+        sa.Column('entry_id', sa.Integer(), nullable=False, unique=True),
+        sa.Column('user_id', sa.Integer(), nullable=False),
+        sa.Column('op', sa.String(10), nullable=False),
+        sa.Column('changed_at', sa.DateTime(), nullable=False),
+        sqlite_autoincrement=True
+    )
+    # 既存のエントリーを表示順に記録
+    op.execute(
+        "INSERT INTO entry_changes (entry_id, user_id, op, changed_at) "
+        "SELECT id, user_id, 'upsert', sort_ts FROM entries ORDER BY sort_ts, id"
+    )
+
+
+def downgrade() -> None:
+    op.drop_table('entry_changes')
@@ -0,0 +1,27 @@
+"""Add entries (user_id, id) index for exports
+
+Revision ID: f2b8c5d19e63
+Revises: d6a9f2c4b817
+Create Date: 2026-10-19 21:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f2b8c5d19e63'
+down_revision: Union[str, None] = 'd6a9f2c4b817'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # アーカイブDBのインデックスはATTACH時に作成される
+    op.create_index('ix_entries_user_id', 'entries', ['user_id', 'id'])
+
+
+def downgrade() -> None:
+    op.drop_index('ix_entries_user_id', table_name='entries')
@@ -2,7 +2,24 @@ from models.base import Base
 from models.user import User
 from models.entry import Entry
 from models.diary_item import DiaryItem
+from models.activity_rollup import ActivityRollup
+from models.activity_frequency import ActivityFrequency
+from models.entry_metric import EntryMetric
+from models.entry_change import EntryChange
+from models.entry_body import EntryBody, DiaryItemBody, BodyStorage
 from models.user_manager import UserManager
+from models.rollup_manager import RollupManager
+from models.activity_manager import ActivityManager
+from models.metric_manager import MetricManager
+from models.change_feed_manager import ChangeFeedManager
+from models.archive_manager import ArchiveManager
+from models.body_manager import BodyManager
+from models.diary_exporter import DiaryExporter
+from models.dto import EntryDTO, DiaryItemDTO, UserDTO
 from models.init_data import create_initial_data
 
-__all__ = ['Base', 'User', 'Entry', 'DiaryItem', 'UserManager', 'create_initial_data']
+__all__ = ['Base', 'User', 'Entry', 'DiaryItem', 'ActivityRollup', 'ActivityFrequency',
+           'EntryMetric', 'EntryChange', 'EntryBody', 'DiaryItemBody', 'BodyStorage',
+           'UserManager', 'RollupManager', 'ActivityManager', 'MetricManager',
+           'ChangeFeedManager', 'ArchiveManager', 'BodyManager', 'DiaryExporter', 'EntryDTO',
+           'DiaryItemDTO', 'UserDTO', 'create_initial_data']
@@ -0,0 +1,33 @@
+from sqlalchemy import Integer, String, Index
+from sqlalchemy.orm import Mapped, mapped_column
+from database import db
+from models.base import Base
+
+# 全ユーザー（非表示のユーザーを除く）合計の集計行に使うuser_id
+GLOBAL_USER_ID = 0
+# 全期間の合計の集計行に使うmonth
+TOTAL_MONTH = 'total'
+
+class ActivityFrequency(db.Model, Base):
+    """ユーザー・活動項目名・月ごとの活動項目数の集計"""
+    __tablename__ = 'activity_frequencies'
+
+    # 主キー(user_id, item_name, month)の前方一致で月別推移を取得する
+    # user_idがGLOBAL_USER_IDの行は全ユーザーの合計を表すため外部キーは張らない
+    user_id: Mapped[int] = mapped_column(Integer, primary_key=True)
+    item_name: Mapped[str] = mapped_column(String(100), primary_key=True)
+    month: Mapped[str] = mapped_column(String(7), primary_key=True)  # YYYY-MM または TOTAL_MONTH
+    item_count: Mapped[int] = mapped_column(Integer, nullable=False, default=0, server_default='0')
+
+    def __repr__(self):
+        return f"<ActivityFrequency {self.user_id} {self.item_name} {self.month}>"
+
+
+# ランキング用のインデックス（全期間の合計行を件数の多い順に読む）
+Index(
+    'ix_activity_frequencies_top',
+    ActivityFrequency.user_id,
+    ActivityFrequency.month,
+    ActivityFrequency.item_count.desc(),
+    ActivityFrequency.item_name
+)
@@ -0,0 +1,165 @@
+from collections import Counter
+from sqlalchemy import select, delete, func, literal, union_all
+from sqlalchemy.dialects.sqlite import insert
+from database import db, logger
+from models.activity_frequency import ActivityFrequency, GLOBAL_USER_ID, TOTAL_MONTH
+from models.archive_manager import ArchiveManager
+from models.user import User
+
+class ActivityManager:
+    """活動項目名（DiaryItem.item_name）の頻度集計の更新と取得
+
+    集計の更新は呼び出し元のトランザクション内で行い、コミットは呼び出し元に任せる。
+    """
+
+    def __init__(self, session=None):
+        self.session = session if session is not None else db.session
+
+    @staticmethod
+    def month_of(timestamp) -> str:
+        return timestamp.strftime('%Y-%m')
+
+    def apply(self, user_id: int, timestamp, item_names, sign: int = 1) -> None:
+        """エントリー1件分の活動項目名を集計に加算（sign=-1で減算）"""
+        counts = Counter()
+        for name in item_names:
+            counts[(user_id, name, self.month_of(timestamp))] += sign
+        self.apply_many(counts)
+
+    def apply_many(self, counts) -> None:
+        """{(user_id, item_name, month): 増減数}形式の増減分を加算
+
+        全期間の合計行と、表示中のユーザーであれば全体集計も更新する。
+        """
+        user_ids = {user_id for user_id, _, _ in counts}
+        hidden = set(self.session.execute(
+            select(User.id).filter(User.id.in_(user_ids), User.is_visible == False)
+        ).scalars()) if user_ids else set()
+
+        totals = Counter()
+        for (user_id, item_name, month), delta in counts.items():
+            owners = (user_id,) if user_id in hidden else (user_id, GLOBAL_USER_ID)
+            for owner in owners:
+                totals[(owner, item_name, month)] += delta
+                totals[(owner, item_name, TOTAL_MONTH)] += delta
+        self.upsert(totals)
+
+    def upsert(self, totals) -> None:
+        """{(user_id, item_name, month): 増減数}形式の増減分をそのまま加算"""
+        rows = [
+            {'user_id': user_id, 'item_name': item_name, 'month': month, 'item_count': delta}
+            for (user_id, item_name, month), delta in totals.items()
+            if delta
+        ]
+        if not rows:
+            return
+
+        stmt = insert(ActivityFrequency)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[
+                ActivityFrequency.user_id,
+                ActivityFrequency.item_name,
+                ActivityFrequency.month
+            ],
+            set_={'item_count': ActivityFrequency.item_count + stmt.excluded.item_count}
+        )
+        self.session.execute(stmt, rows)
+        logger.debug(f"Activity frequencies updated: {len(rows)} rows")
+
+    def set_user_visibility(self, user_id: int, visible: bool) -> None:
+        """ユーザーの表示・非表示の切り替えに合わせて全体集計に加算・減算"""
+        sign = 1 if visible else -1
+        rows = self.session.execute(
+            select(
+                ActivityFrequency.item_name,
+                ActivityFrequency.month,
+                ActivityFrequency.item_count
+            ).filter(
+                ActivityFrequency.user_id == user_id,
+                ActivityFrequency.item_count != 0
+            )
+        ).all()
+        self.upsert({
+            (GLOBAL_USER_ID, row.item_name, row.month): sign * row.item_count
+            for row in rows
+        })
+
+    def apply_entries(self, entries, sign: int = 1) -> None:
+        """エントリーの一覧から活動項目の増減分を求めて加算（一括インポート用）"""
+        counts = Counter()
+        for entry in entries:
+            for item in entry.items:
+                counts[(entry.user_id, item.item_name, self.month_of(entry.created_at))] += sign
+        self.apply_many(counts)
+
+    def rebuild(self) -> int:
+        """diary_items（アーカイブを含む）から集計を再作成し、作成した行数を返す"""
+        archive_manager = ArchiveManager(self.session)
+        entries = archive_manager.all_entries()
+        items = archive_manager.all_items()
+        month = func.strftime('%Y-%m', entries.c.created_at)
+        per_month = select(
+            entries.c.user_id,
+            items.c.item_name,
+            month.label('month'),
+            func.count(items.c.id).label('item_count')
+        ).join(entries, items.c.entry_id == entries.c.id).group_by(
+            entries.c.user_id, items.c.item_name, month
+        ).subquery()
+        # 全期間の合計行
+        per_user = union_all(
+            select(per_month),
+            select(
+                per_month.c.user_id,
+                per_month.c.item_name,
+                literal(TOTAL_MONTH),
+                func.sum(per_month.c.item_count)
+            ).group_by(per_month.c.user_id, per_month.c.item_name)
+        ).subquery()
+        # 全体集計は表示中のユーザーのみ
+        overall = select(
+            literal(GLOBAL_USER_ID),
+            per_user.c.item_name,
+            per_user.c.month,
+            func.sum(per_user.c.item_count)
+        ).join(User, User.id == per_user.c.user_id).filter(
+            User.is_visible == True
+        ).group_by(per_user.c.item_name, per_user.c.month)
+
+        columns = ['user_id', 'item_name', 'month', 'item_count']
+        table = ActivityFrequency.__table__
+        self.session.execute(delete(ActivityFrequency))
+        self.session.execute(table.insert().from_select(columns, select(per_user)))
+        self.session.execute(table.insert().from_select(columns, overall))
+        count = self.session.execute(select(func.count()).select_from(ActivityFrequency)).scalar()
+        logger.info(f"Activity frequencies rebuilt: {count} rows")
+        return count
+
+    def get_top(self, user_id: int = GLOBAL_USER_ID, limit: int = 10):
+        """よく行われている活動項目を多い順に取得（user_id省略時は全ユーザー）"""
+        # 全期間の合計行をインデックスの順に先頭から読む
+        stmt = select(
+            ActivityFrequency.item_name,
+            ActivityFrequency.item_count
+        ).filter(
+            ActivityFrequency.user_id == user_id,
+            ActivityFrequency.month == TOTAL_MONTH,
+            ActivityFrequency.item_count > 0
+        ).order_by(
+            ActivityFrequency.item_count.desc(),
+            ActivityFrequency.item_name
+        ).limit(limit)
+        return self.session.execute(stmt).all()
+
+    def get_monthly(self, item_name: str, user_id: int = GLOBAL_USER_ID):
+        """指定した活動項目の月別件数を古い月から順に取得"""
+        stmt = select(
+            ActivityFrequency.month,
+            ActivityFrequency.item_count
+        ).filter(
+            ActivityFrequency.item_name == item_name,
+            ActivityFrequency.user_id == user_id,
+            ActivityFrequency.month != TOTAL_MONTH,
+            ActivityFrequency.item_count > 0
+        ).order_by(ActivityFrequency.month)
+        return self.session.execute(stmt).all()
@@ -0,0 +1,18 @@
+from datetime import date
+from sqlalchemy import Integer, Date, ForeignKey
+from sqlalchemy.orm import Mapped, mapped_column
+from database import db
+from models.base import Base
+
+class ActivityRollup(db.Model, Base):
+    """ユーザー・日付ごとの投稿数と活動項目数の集計"""
+    __tablename__ = 'activity_rollups'
+
+    # (user_id, day)の主キーがそのまま年単位の範囲検索に使われる
+    user_id: Mapped[int] = mapped_column(Integer, ForeignKey('users.id'), primary_key=True)
+    day: Mapped[date] = mapped_column(Date, primary_key=True)
+    entry_count: Mapped[int] = mapped_column(Integer, nullable=False, default=0, server_default='0')
+    item_count: Mapped[int] = mapped_column(Integer, nullable=False, default=0, server_default='0')
+
+    def __repr__(self):
+        return f"<ActivityRollup {self.user_id} {self.day}>"
@@ -0,0 +1,304 @@
+from datetime import datetime
+from sqlalchemy import (
+    MetaData, Table, Column, Integer, String, Text, DateTime, Index,
+    select, insert, delete, func, text, tuple_, union_all
+)
+from change_journal import is_journaled, record_move
+from database import db, logger
+from models.entry import Entry
+from models.diary_item import DiaryItem
+from models.user import User
+from models.entry_body import load_entry_bodies, load_item_bodies
+
+# アーカイブDBはATTACHしたスキーマ名で参照する
+ARCHIVE_SCHEMA = 'archive'
+
+archive_metadata = MetaData()
+
+# entries / diary_items と同じ列構成（外部キーはATTACH先をまたげないため設定しない）
+# 圧縮した本文（entry_bodies / diary_item_bodies）はホット側に残したまま参照する
+archived_entries = Table(
+    'entries', archive_metadata,
+    Column('id', Integer, primary_key=True, autoincrement=False),
+    Column('user_id', Integer, nullable=False),
+    Column('title', String(100), nullable=False),
+    Column('content', Text, nullable=False),
+    Column('notes', Text, nullable=False, server_default=''),
+    Column('excerpt', String(120), nullable=False, server_default=''),
+    Column('created_at', DateTime, nullable=False),
+    Column('updated_at', DateTime),
+    Column('sort_ts', DateTime, nullable=False),
+    schema=ARCHIVE_SCHEMA
+)
+Index('ix_entries_sort_ts', archived_entries.c.sort_ts.desc(), archived_entries.c.id.desc())
+Index('ix_entries_user_sort_ts', archived_entries.c.user_id,
+      archived_entries.c.sort_ts.desc(), archived_entries.c.id.desc())
+Index('ix_entries_user_id', archived_entries.c.user_id, archived_entries.c.id)
+
+archived_items = Table(
+    'diary_items', archive_metadata,
+    Column('id', Integer, primary_key=True, autoincrement=False),
+    Column('entry_id', Integer, nullable=False, index=True),
+    Column('item_name', String(100), nullable=False),
+    Column('item_content', Text, nullable=False),
+    Column('created_at', DateTime, nullable=False),
+    schema=ARCHIVE_SCHEMA
+)
+Index('ix_diary_items_item_name_entry_id', archived_items.c.item_name, archived_items.c.entry_id)
+
+ENTRY_COLUMNS = [column.name for column in archived_entries.columns]
+ITEM_COLUMNS = [column.name for column in archived_items.columns]
+
+def add_missing_columns(conn):
+    """作成済みのアーカイブのテーブルに後から追加した列を追加"""
+    for table in archive_metadata.sorted_tables:
+        existing = {
+            row[1] for row in conn.exec_driver_sql(
+                f'PRAGMA {ARCHIVE_SCHEMA}.table_info({table.name})'
+            )
+        }
+        for column in table.columns:
+            if column.name in existing:
+                continue
+            ddl = (f'ALTER TABLE {ARCHIVE_SCHEMA}.{table.name} '
+                   f'ADD COLUMN {column.name} {column.type.compile(conn.dialect)}')
+            # SQLiteではNOT NULLの列の追加に既定値が必要
+            if column.server_default is not None:
+                if not column.nullable:
+                    ddl += ' NOT NULL'
+                ddl += f" DEFAULT '{column.server_default.arg}'"
+            conn.exec_driver_sql(ddl)
+
+def add_missing_indexes(conn):
+    """作成済みのアーカイブのテーブルに後から追加したインデックスを作成"""
+    for table in archive_metadata.sorted_tables:
+        for index in table.indexes:
+            index.create(conn, checkfirst=True)
+
+def is_archive_attached(conn) -> bool:
+    """セッション・接続にアーカイブDBがATTACHされているか判定"""
+    return conn.execute(
+        text('SELECT 1 FROM pragma_database_list WHERE name = :name'),
+        {'name': ARCHIVE_SCHEMA}
+    ).first() is not None
+
+class ArchivedItem:
+    """アーカイブ済みの活動項目（読み取り専用）"""
+
+    __slots__ = ('id', 'entry_id', 'item_name', 'item_content', 'created_at')
+
+    def __init__(self, row, item_content=None):
+        for name in self.__slots__:
+            setattr(self, name, getattr(row, name))
+        if item_content is not None:
+            self.item_content = item_content
+
+class ArchivedEntry:
+    """アーカイブ済みのエントリー（Entryと同じ属性で読み取り専用）"""
+
+    __slots__ = ('id', 'user_id', 'title', 'content', 'notes', 'excerpt', 'created_at',
+                 'updated_at', 'sort_ts', 'items', 'user')
+
+    def __init__(self, row, items, user, bodies=None):
+        for name in ENTRY_COLUMNS:
+            setattr(self, name, getattr(row, name))
+        # 本文テーブルに格納された本文・メモで置き換える
+        for field, text in (bodies or {}).items():
+            setattr(self, field, text)
+        self.items = items
+        self.user = user
+
+    def __repr__(self):
+        return f"<ArchivedEntry {self.title}>"
+
+class ArchiveManager:
+    """古いエントリーのアーカイブDBへの移動と、アーカイブからの読み込み
+
+    更新は呼び出し元のトランザクション内で行い、コミットは呼び出し元に任せる。
+    移動はsort_tsの古い順に行うため、アーカイブのエントリーは常にホットのものより古い。
+    変更ジャーナルが有効なセッションでは、移動もコミット時にジャーナルへ記録される。
+    """
+
+    # 1回の移動で扱うエントリー数
+    BATCH_SIZE = 1000
+
+    def __init__(self, session=None):
+        self.session = session if session is not None else db.session
+
+    def is_attached(self) -> bool:
+        return is_archive_attached(self.session)
+
+    def archive_batch(self, before: datetime, limit: int = None) -> int:
+        """sort_tsがbefore より古いエントリーを最大limit件移動し、移動した件数を返す"""
+        # 最大IDのエントリー・活動項目は残し、ホット側でIDが再利用されないようにする
+        # （本文テーブルはIDで参照するため、戻すときも同じIDを使う）
+        max_id = select(func.max(Entry.id)).scalar_subquery()
+        max_item_owner = select(DiaryItem.entry_id).filter(
+            DiaryItem.id == select(func.max(DiaryItem.id)).scalar_subquery()
+        )
+        entry_ids = self.session.execute(
+            select(Entry.id).filter(
+                Entry.sort_ts < before, Entry.id < max_id, Entry.id.not_in(max_item_owner)
+            ).order_by(
+                Entry.sort_ts, Entry.id
+            ).limit(limit or self.BATCH_SIZE)
+        ).scalars().all()
+        if not entry_ids:
+            return 0
+
+        entries = Entry.__table__
+        items = DiaryItem.__table__
+        self.session.execute(insert(archived_entries).from_select(
+            ENTRY_COLUMNS,
+            select(*[entries.c[name] for name in ENTRY_COLUMNS]).filter(entries.c.id.in_(entry_ids))
+        ))
+        self.session.execute(insert(archived_items).from_select(
+            ITEM_COLUMNS,
+            select(*[items.c[name] for name in ITEM_COLUMNS]).filter(items.c.entry_id.in_(entry_ids))
+        ))
+        self.session.execute(delete(items).where(items.c.entry_id.in_(entry_ids)))
+        self.session.execute(delete(entries).where(entries.c.id.in_(entry_ids)))
+        record_move(self.session, 'archive', entry_ids)
+        logger.info(f"Entries archived: {len(entry_ids)}")
+        return len(entry_ids)
+
+    def restore_entries(self, entry_ids) -> int:
+        """アーカイブのエントリーをホットに戻し、戻した件数を返す（編集・削除時）"""
+        entry_ids = self.session.execute(
+            select(archived_entries.c.id).filter(archived_entries.c.id.in_(list(entry_ids)))
+        ).scalars().all()
+        if not entry_ids:
+            return 0
+
+        # 戻した行の内容も記録する（バックアップのホットとアーカイブのスナップショットの間に
+        # 戻された場合、どちらのスナップショットにも行がなく、IDだけでは復元できないため）
+        journaled_rows = []
+        if is_journaled(self.session):
+            for table, key in ((archived_entries, archived_entries.c.id),
+                               (archived_items, archived_items.c.entry_id)):
+                journaled_rows.extend(
+                    (table.name, row) for row in
+                    self.session.execute(select(table).filter(key.in_(entry_ids))).mappings()
+                )
+
+        entries = Entry.__table__
+        items = DiaryItem.__table__
+        self.session.execute(insert(entries).from_select(
+            ENTRY_COLUMNS,
+            select(*[archived_entries.c[name] for name in ENTRY_COLUMNS]).filter(
+                archived_entries.c.id.in_(entry_ids)
+            )
+        ))
+        self.session.execute(insert(items).from_select(
+            ITEM_COLUMNS,
+            select(*[archived_items.c[name] for name in ITEM_COLUMNS]).filter(
+                archived_items.c.entry_id.in_(entry_ids)
+            )
+        ))
+        self.session.execute(delete(archived_items).where(archived_items.c.entry_id.in_(entry_ids)))
+        self.session.execute(delete(archived_entries).where(archived_entries.c.id.in_(entry_ids)))
+        record_move(self.session, 'restore', entry_ids, journaled_rows)
+        logger.info(f"Entries restored from archive: {len(entry_ids)}")
+        return len(entry_ids)
+
+    def filter_entries(self, stmt, user_id=None, visible_only=False, start=None, end=None,
+                       activity=None):
+        """アーカイブのエントリーの検索条件を追加（endは含まない）"""
+        if user_id is not None:
+            stmt = stmt.filter(archived_entries.c.user_id == user_id)
+        if visible_only:
+            stmt = stmt.filter(archived_entries.c.user_id.in_(
+                select(User.id).filter(User.is_visible == True)
+            ))
+        if start:
+            stmt = stmt.filter(archived_entries.c.sort_ts >= start)
+        if end:
+            stmt = stmt.filter(archived_entries.c.sort_ts < end)
+        if activity:
+            stmt = stmt.filter(archived_entries.c.id.in_(
+                select(archived_items.c.entry_id).filter(archived_items.c.item_name == activity)
+            ))
+        return stmt
+
+    def get_page(self, limit: int, cursor=None, offset: int = 0, **filters):
+        """sort_ts降順で最大limit件取得（cursorは(sort_ts, id)、検索条件はfilter_entries）"""
+        stmt = self.filter_entries(select(archived_entries), **filters)
+        if cursor:
+            stmt = stmt.filter(
+                tuple_(archived_entries.c.sort_ts, archived_entries.c.id) < tuple_(*cursor)
+            )
+        stmt = stmt.order_by(
+            archived_entries.c.sort_ts.desc(), archived_entries.c.id.desc()
+        ).offset(offset).limit(limit)
+        return self.load(self.session.execute(stmt).all())
+
+    def count(self, **filters) -> int:
+        """検索条件に合うアーカイブのエントリー数"""
+        stmt = self.filter_entries(select(func.count()).select_from(archived_entries), **filters)
+        return self.session.execute(stmt).scalar()
+
+    def count_subquery(self, user_id_column):
+        """user_id_columnの投稿者ごとのアーカイブのエントリー数（相関サブクエリ、ATTACHしていなければNone）"""
+        if not self.is_attached():
+            return None
+        return select(func.count()).select_from(archived_entries).filter(
+            archived_entries.c.user_id == user_id_column
+        ).scalar_subquery()
+
+    def get_entries(self, entry_ids):
+        """IDを指定してアーカイブのエントリーを取得"""
+        rows = self.session.execute(
+            select(archived_entries).filter(archived_entries.c.id.in_(list(entry_ids)))
+        ).all()
+        return self.load(rows)
+
+    def load(self, rows):
+        """行に活動項目と投稿者をまとめて読み込みArchivedEntryに変換"""
+        if not rows:
+            return []
+        entry_ids = [row.id for row in rows]
+        item_rows = self.session.execute(
+            select(archived_items).filter(archived_items.c.entry_id.in_(entry_ids)).order_by(
+                archived_items.c.id
+            )
+        ).all()
+        item_bodies = load_item_bodies(self.session, [item.id for item in item_rows])
+        items = {}
+        for item in item_rows:
+            items.setdefault(item.entry_id, []).append(ArchivedItem(item, item_bodies.get(item.id)))
+        bodies = {}
+        for (entry_id, field), text in load_entry_bodies(self.session, entry_ids).items():
+            bodies.setdefault(entry_id, {})[field] = text
+        users = {
+            user.id: user for user in self.session.execute(
+                select(User).filter(User.id.in_({row.user_id for row in rows}))
+            ).scalars()
+        }
+        return [
+            ArchivedEntry(row, items.get(row.id, []), users.get(row.user_id), bodies.get(row.id))
+            for row in rows
+        ]
+
+    def all_entries(self):
+        """ホットとアーカイブを合わせたエントリー（id, user_id, created_at, sort_ts）"""
+        columns = ('id', 'user_id', 'created_at', 'sort_ts')
+        hot = select(*[Entry.__table__.c[name] for name in columns])
+        if not self.is_attached():
+            return hot.subquery()
+        archived = select(*[archived_entries.c[name] for name in columns])
+        return union_all(hot, archived).subquery()
+
+    def all_items(self):
+        """ホットとアーカイブを合わせた活動項目（id, entry_id, item_name）"""
+        columns = ('id', 'entry_id', 'item_name')
+        hot = select(*[DiaryItem.__table__.c[name] for name in columns])
+        if not self.is_attached():
+            return hot.subquery()
+        archived = select(*[archived_items.c[name] for name in columns])
+        return union_all(hot, archived).subquery()
+
+    def archived_ids(self):
+        """アーカイブのエントリーIDのサブクエリ（ATTACHしていなければNone）"""
+        if not self.is_attached():
+            return None
+        return select(archived_entries.c.id)
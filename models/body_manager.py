@@ -0,0 +1,72 @@
+from sqlalchemy import select, delete, func
+from sqlalchemy.orm import selectinload
+from database import db, logger
+from models.entry import Entry
+from models.diary_item import DiaryItem
+from models.entry_body import EntryBody, DiaryItemBody
+from models.archive_manager import ArchiveManager, archived_items
+
+class BodyManager:
+    """本文テーブル（圧縮した大きな本文）の管理
+
+    更新は呼び出し元のトランザクション内で行い、コミットは呼び出し元に任せる。
+    """
+
+    # 1回に読み込むエントリー数
+    BATCH_SIZE = 500
+
+    def __init__(self, session=None):
+        self.session = session if session is not None else db.session
+
+    def compact(self) -> int:
+        """既存のエントリーを現在の設定で格納し直し、処理した件数を返す
+
+        しきい値を超える行内の本文は本文テーブルへ移し、しきい値以下になった本文は行内に戻す。
+        抜粋も作成し直す。
+        """
+        total = 0
+        last_id = 0
+        while True:
+            entries = self.session.execute(
+                select(Entry).filter(Entry.id > last_id).order_by(Entry.id).limit(
+                    self.BATCH_SIZE
+                ).options(selectinload(Entry.items))
+            ).scalars().all()
+            if not entries:
+                break
+            for entry in entries:
+                entry.content = entry.content
+                entry.notes = entry.notes
+                for item in entry.items:
+                    item.item_content = item.item_content
+            self.session.flush()
+            total += len(entries)
+            last_id = entries[-1].id
+            self.session.expunge_all()
+            logger.info(f"Bodies compacted up to entry {last_id}: {total} entries")
+        return total
+
+    def delete_orphans(self) -> None:
+        """一括削除などで削除されたエントリー・活動項目の本文を削除（アーカイブ済みのものは残す）"""
+        stmt = delete(EntryBody).where(~EntryBody.entry_id.in_(select(Entry.id)))
+        archived_ids = ArchiveManager(self.session).archived_ids()
+        if archived_ids is not None:
+            stmt = stmt.where(~EntryBody.entry_id.in_(archived_ids))
+        self.session.execute(stmt)
+
+        stmt = delete(DiaryItemBody).where(~DiaryItemBody.item_id.in_(select(DiaryItem.id)))
+        if archived_ids is not None:
+            stmt = stmt.where(~DiaryItemBody.item_id.in_(select(archived_items.c.id)))
+        self.session.execute(stmt)
+
+    def stats(self) -> dict:
+        """本文テーブルの件数と圧縮前後のバイト数"""
+        stats = {'bodies': 0, 'raw_bytes': 0, 'stored_bytes': 0}
+        for model in (EntryBody, DiaryItemBody):
+            count, raw, stored = self.session.execute(
+                select(func.count(model.id), func.sum(model.size), func.sum(func.length(model.data)))
+            ).one()
+            stats['bodies'] += count
+            stats['raw_bytes'] += raw or 0
+            stats['stored_bytes'] += stored or 0
+        return stats
@@ -0,0 +1,88 @@
+from datetime import datetime
+from sqlalchemy import select, delete, func, literal
+from database import db, logger
+from models.entry import Entry
+from models.entry_change import EntryChange
+from models.archive_manager import ArchiveManager
+
+class ChangeFeedManager:
+    """差分同期用の変更通番の記録と取得
+
+    記録は呼び出し元のトランザクション内で行い、コミットは呼び出し元に任せる。
+    エントリーごとに最新の変更だけを残すため、通番順に読めば全件の同期にも使える。
+    """
+
+    UPSERT = 'upsert'
+    DELETE = 'delete'
+
+    def __init__(self, session=None):
+        self.session = session if session is not None else db.session
+
+    def record(self, entries, op: str = UPSERT) -> None:
+        """エントリーの一覧の変更を新しい通番で記録"""
+        self.record_many([(entry.id, entry.user_id) for entry in entries], op)
+
+    def record_many(self, pairs, op: str = UPSERT) -> None:
+        """(entry_id, user_id)の一覧の変更を新しい通番で記録"""
+        pairs = list(pairs)
+        if not pairs:
+            return
+        now = datetime.now()
+        # 古い通番を削除してから挿入し、エントリーの変更を常に末尾へ移す
+        self.session.execute(
+            delete(EntryChange).where(EntryChange.entry_id.in_([entry_id for entry_id, _ in pairs]))
+        )
+        self.session.execute(EntryChange.__table__.insert(), [
+            {'entry_id': entry_id, 'user_id': user_id, 'op': op, 'changed_at': now}
+            for entry_id, user_id in pairs
+        ])
+        logger.debug(f"Entry changes recorded: {len(pairs)} {op}")
+
+    def record_user(self, user_id: int) -> None:
+        """ユーザーの全エントリーを変更として記録（表示状態の切り替え時）"""
+        entry_ids = select(Entry.id).filter(Entry.user_id == user_id)
+        self.session.execute(delete(EntryChange).where(EntryChange.entry_id.in_(entry_ids)))
+        self.session.execute(EntryChange.__table__.insert().from_select(
+            ['entry_id', 'user_id', 'op', 'changed_at'],
+            select(Entry.id, Entry.user_id, literal(self.UPSERT), literal(datetime.now())).filter(
+                Entry.user_id == user_id
+            ).order_by(Entry.id)
+        ))
+
+    def record_orphans(self) -> None:
+        """一括削除などで削除されたエントリーの墓標を記録（アーカイブ済みのものは除く）"""
+        stmt = select(EntryChange.entry_id, EntryChange.user_id).filter(
+            EntryChange.op == self.UPSERT,
+            ~EntryChange.entry_id.in_(select(Entry.id))
+        ).order_by(EntryChange.seq)
+        archived_ids = ArchiveManager(self.session).archived_ids()
+        if archived_ids is not None:
+            stmt = stmt.filter(~EntryChange.entry_id.in_(archived_ids))
+        orphans = self.session.execute(stmt).all()
+        self.record_many(orphans, self.DELETE)
+
+    def get_changes(self, since: int = 0, limit: int = 100):
+        """since より後の変更を通番順に最大limit件取得"""
+        stmt = select(EntryChange).filter(EntryChange.seq > since).order_by(
+            EntryChange.seq
+        ).limit(limit)
+        return self.session.execute(stmt).scalars().all()
+
+    def latest_seq(self) -> int:
+        """最新の通番（変更がなければ0）"""
+        return self.session.execute(select(func.max(EntryChange.seq))).scalar() or 0
+
+    def rebuild(self) -> int:
+        """既存の墓標を残したまま全エントリーの変更を記録し直し、記録した件数を返す"""
+        entries = ArchiveManager(self.session).all_entries()
+        self.session.execute(delete(EntryChange).where(
+            (EntryChange.op == self.UPSERT) | EntryChange.entry_id.in_(select(entries.c.id))
+        ))
+        result = self.session.execute(EntryChange.__table__.insert().from_select(
+            ['entry_id', 'user_id', 'op', 'changed_at'],
+            select(entries.c.id, entries.c.user_id, literal(self.UPSERT), entries.c.sort_ts).order_by(
+                entries.c.sort_ts, entries.c.id
+            )
+        ))
+        logger.info(f"Entry changes rebuilt: {result.rowcount} rows")
+        return result.rowcount
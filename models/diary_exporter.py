@@ -0,0 +1,162 @@
+import csv
+import io
+import json
+from sqlalchemy import select
+from database import db, logger
+from models.entry import Entry
+from models.diary_item import DiaryItem
+from models.archive_manager import archived_entries, archived_items, is_archive_attached
+from models.entry_body import load_entry_bodies, load_item_bodies
+from serializer import Serializer
+
+class DiaryExporter:
+    """ユーザーの日記全件をストリーミングで書き出す
+
+    エントリーはIDで区切ったバッチ単位で読み込み、活動項目はバッチごとに
+    まとめて取得するため、件数に関わらずメモリ使用量は一定に保たれる。
+    """
+
+    # 1バッチあたりのエントリー数
+    BATCH_SIZE = 500
+
+    # 出力形式ごとの(Content-Type, 拡張子)
+    FORMATS = {
+        'ndjson': ('application/x-ndjson; charset=utf-8', 'ndjson'),
+        'csv': ('text/csv; charset=utf-8', 'csv'),
+        'md': ('text/markdown; charset=utf-8', 'md')
+    }
+
+    CSV_COLUMNS = ['id', 'title', 'content', 'notes', 'items', 'created_at', 'updated_at']
+
+    def __init__(self, user_id: int, batch_size: int = None, engine=None):
+        self.user_id = user_id
+        self.batch_size = batch_size or self.BATCH_SIZE
+        self.engine = engine if engine is not None else db.engine
+
+    def iter_entries(self):
+        """エントリーを新しい順（ID降順）に辞書で返す
+
+        BATCH_SIZE件ごとに短い読み取りトランザクションで読み込み、書き出す前に閉じる。
+        ダウンロード中に読み取りトランザクションを開いたままにすると、ロールバックジャーナルの
+        SQLiteでは共有ロックで他の書き込みのコミットがすべて失敗するため。
+        WALにしないのは、アーカイブDBへの移動（ATTACHした2つのDBをまたぐトランザクション）が
+        WALではDBごとにしかアトミックにならないため。
+        バッチの境界はIDで区切り、ホットとアーカイブを同じバッチで読む。編集でsort_tsが
+        変わっても、バッチの間にアーカイブへの移動・戻しがあっても、漏れや重複は起きない。
+        各バッチはインデックス(user_id, id)の範囲読みで、ユーザーの全件を走査しない。
+        """
+        exported = 0
+        cursor = None
+        while True:
+            with self.engine.connect() as conn:
+                batch = self.read_batch(conn, cursor)
+                conn.rollback()
+            if not batch:
+                break
+            yield from batch
+            exported += len(batch)
+            cursor = batch[-1]['id']
+        logger.info(f"Exported {exported} entries for user {self.user_id}")
+
+    def read_batch(self, conn, cursor):
+        """IDがcursorより小さいエントリーを最大batch_size件読み込む（ホットとアーカイブの両方から）"""
+        sources = [(Entry.__table__, DiaryItem.__table__)]
+        if is_archive_attached(conn):
+            sources.append((archived_entries, archived_items))
+
+        rows = {}
+        for entries, item_table in sources:
+            stmt = select(
+                entries.c.id,
+                entries.c.title,
+                entries.c.content,
+                entries.c.notes,
+                entries.c.created_at,
+                entries.c.updated_at
+            ).filter(entries.c.user_id == self.user_id)
+            if cursor is not None:
+                stmt = stmt.filter(entries.c.id < cursor)
+            stmt = stmt.order_by(entries.c.id.desc()).limit(self.batch_size)
+            # 両方にある場合（移動の途中で止まった場合）はアーカイブを優先する
+            for row in conn.execute(stmt):
+                rows[row.id] = (row, item_table)
+        entry_ids = sorted(rows, reverse=True)[:self.batch_size]
+        if not entry_ids:
+            return []
+
+        items = {}
+        item_rows = []
+        for item_table in {item_table for _, item_table in rows.values()}:
+            ids = [entry_id for entry_id in entry_ids if rows[entry_id][1] is item_table]
+            item_rows += conn.execute(
+                select(item_table.c.id, item_table.c.entry_id, item_table.c.item_name,
+                       item_table.c.item_content)
+                .filter(item_table.c.entry_id.in_(ids))
+                .order_by(item_table.c.entry_id, item_table.c.id)
+            ).all()
+        # 大きな本文は圧縮された本文テーブルから展開する
+        bodies = load_entry_bodies(conn, entry_ids)
+        item_bodies = load_item_bodies(conn, [item.id for item in item_rows])
+        for item in item_rows:
+            items.setdefault(item.entry_id, []).append({
+                'item_name': item.item_name,
+                'item_content': item_bodies.get(item.id, item.item_content)
+            })
+
+        batch = []
+        for entry_id in entry_ids:
+            row = rows[entry_id][0]
+            batch.append({
+                'id': row.id,
+                'title': row.title,
+                'content': bodies.get((row.id, 'content'), row.content),
+                'notes': bodies.get((row.id, 'notes'), row.notes),
+                'items': items.get(row.id, []),
+                'created_at': row.created_at.isoformat() if row.created_at else None,
+                'updated_at': row.updated_at.isoformat() if row.updated_at else None
+            })
+        return batch
+
+    def iter_ndjson(self):
+        for entry in self.iter_entries():
+            yield Serializer.dumps(entry).decode('utf-8') + '\n'
+
+    def iter_csv(self):
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        # Excelで文字化けしないようBOMを付与
+        buffer.write('\ufeff')
+        writer.writerow(self.CSV_COLUMNS)
+        for entry in self.iter_entries():
+            entry['items'] = json.dumps(entry['items'], ensure_ascii=False)
+            writer.writerow([entry[column] for column in self.CSV_COLUMNS])
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+        if buffer.tell():
+            yield buffer.getvalue()
+
+    def iter_markdown(self):
+        for entry in self.iter_entries():
+            lines = [f"# {entry['title']}", '', f"作成: {entry['created_at']}"]
+            if entry['updated_at']:
+                lines.append(f"最終更新: {entry['updated_at']}")
+            lines.extend(['', entry['content'], ''])
+            if entry['notes']:
+                lines.extend(['## メモ', '', entry['notes'], ''])
+            if entry['items']:
+                lines.extend(['## 活動項目', ''])
+                for item in entry['items']:
+                    lines.append(f"### {item['item_name']}")
+                    lines.extend(['', item['item_content'], ''])
+            yield '\n'.join(lines) + '\n'
+
+    def iter_format(self, export_format: str):
+        """指定形式のチャンクを返すイテレーターを取得"""
+        if export_format == 'ndjson':
+            return self.iter_ndjson()
+        if export_format == 'csv':
+            return self.iter_csv()
+        if export_format == 'md':
+            return self.iter_markdown()
+        raise ValueError(f'Unsupported export format: {export_format}')
@@ -1,8 +1,9 @@
 from datetime import datetime
-from sqlalchemy import Integer, String, Text, ForeignKey, DateTime
-from sqlalchemy.orm import Mapped, mapped_column, relationship, validates
+from sqlalchemy import Integer, String, Text, ForeignKey, DateTime, Index
+from sqlalchemy.orm import Mapped, mapped_column, relationship, synonym, validates
 from database import db
 from models.base import Base
+from models.entry_body import BodyStorage, DiaryItemBody
 
 class DiaryItem(db.Model, Base):
     __tablename__ = 'diary_items'
@@ -10,7 +11,8 @@ class DiaryItem(db.Model, Base):
     id: Mapped[int] = mapped_column(Integer, primary_key=True)
     entry_id: Mapped[int] = mapped_column(Integer, ForeignKey('entries.id'), nullable=False)
     item_name: Mapped[str] = mapped_column(String(100), nullable=False)
-    item_content: Mapped[str] = mapped_column(Text, nullable=False)
+    # 内容が大きい場合は diary_item_bodies に格納し、ここは空文字になる
+    _item_content: Mapped[str] = mapped_column('item_content', Text, nullable=False)
     created_at: Mapped[datetime] = mapped_column(
         DateTime,
         nullable=False,
@@ -20,6 +22,12 @@ class DiaryItem(db.Model, Base):
 
     # リレーションシップ
     entry: Mapped["Entry"] = relationship("Entry", back_populates="items")
+    body: Mapped[DiaryItemBody] = relationship(
+        DiaryItemBody,
+        uselist=False,
+        cascade="all, delete-orphan",
+        lazy='selectin'
+    )
 
     def __init__(self, **kwargs):
         # entryオブジェクトが渡された場合、entry_idを設定
@@ -60,7 +68,24 @@ class DiaryItem(db.Model, Base):
             raise ValueError('Item name must be 100 characters or less')
         return value
 
-    @validates('item_content')
+    def _get_item_content(self):
+        return self.body.text if self.body is not None else self._item_content
+
+    def _set_item_content(self, value):
+        value = self.validate_item_content('item_content', value)
+        packed = BodyStorage.pack(value)
+        if packed is None:
+            self.body = None
+            self._item_content = value
+            return
+        if self.body is None:
+            self.body = DiaryItemBody()
+        self.body.store(packed)
+        self._item_content = ''
+
+    # 格納場所によらず全文を読み書きする
+    item_content = synonym('_item_content', descriptor=property(_get_item_content, _set_item_content))
+
     def validate_item_content(self, key, value):
         if value is None:
             raise ValueError('Item content cannot be None')
@@ -72,3 +97,7 @@ class DiaryItem(db.Model, Base):
 
     def __repr__(self):
         return f"<DiaryItem {self.item_name}>"
+
+
+# 活動項目名による絞り込み用のインデックス
+Index('ix_diary_items_item_name_entry_id', DiaryItem.item_name, DiaryItem.entry_id)
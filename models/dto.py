@@ -0,0 +1,59 @@
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Optional
+
+# レスポンス用のDTO（__slots__のdataclass）
+# Serializer がオブジェクトとしてそのまま出力するため、日時はdatetimeのまま保持する
+
+@dataclass(slots=True)
+class DiaryItemDTO:
+    """活動項目のレスポンス"""
+    item_name: str
+    item_content: str
+
+    @classmethod
+    def from_item(cls, item):
+        return cls(item.item_name, item.item_content)
+
+@dataclass(slots=True)
+class EntryDTO:
+    """エントリーのレスポンス（Entry・ArchivedEntryのどちらからも作成できる）"""
+    id: int
+    title: str
+    content: str
+    excerpt: str
+    notes: str
+    items: list
+    created_at: Optional[datetime]
+    updated_at: Optional[datetime]
+    author_name: str
+    author_userid: str
+    is_visible: bool
+    user_id: int
+    can_edit: bool = False
+
+    @classmethod
+    def from_entry(cls, entry, can_edit=False):
+        user = entry.user
+        return cls(
+            entry.id, entry.title, entry.content, entry.excerpt, entry.notes,
+            [DiaryItemDTO(item.item_name, item.item_content) for item in entry.items],
+            entry.created_at, entry.updated_at, user.name, user.userid, user.is_visible,
+            entry.user_id, can_edit
+        )
+
+    def to_dict(self) -> dict:
+        return {name: getattr(self, name) for name in self.__slots__}
+
+@dataclass(slots=True)
+class UserDTO:
+    """管理者画面のユーザー一覧のレスポンス（__slots__の順の列の行から作成する）"""
+    id: int
+    userid: str
+    name: str
+    is_admin: bool
+    is_locked: bool
+    is_visible: bool
+    login_attempts: int
+    last_login_attempt: Optional[datetime]
+    entries_count: int
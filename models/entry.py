@@ -1,8 +1,10 @@
 from datetime import datetime
-from sqlalchemy import Integer, String, Text, ForeignKey, DateTime
-from sqlalchemy.orm import Mapped, mapped_column, relationship, validates
+from sqlalchemy import Integer, String, Text, ForeignKey, DateTime, Index
+from sqlalchemy.orm import Mapped, mapped_column, relationship, synonym, validates
+from sqlalchemy.orm.collections import attribute_keyed_dict
 from database import db
 from models.base import Base
+from models.entry_body import BodyStorage, EntryBody, make_excerpt
 
 class Entry(db.Model, Base):
     __tablename__ = 'entries'
@@ -10,13 +12,22 @@ class Entry(db.Model, Base):
     id: Mapped[int] = mapped_column(Integer, primary_key=True)
     user_id: Mapped[int] = mapped_column(Integer, ForeignKey('users.id'), nullable=False)
     title: Mapped[str] = mapped_column(String(100), nullable=False)
-    content: Mapped[str] = mapped_column(Text, nullable=False)
-    notes: Mapped[str] = mapped_column(
+    # 本文・メモが大きい場合は entry_bodies に格納し、ここは空文字になる
+    _content: Mapped[str] = mapped_column('content', Text, nullable=False)
+    _notes: Mapped[str] = mapped_column(
+        'notes',
         Text,
         nullable=False,
         default='',
         server_default=''
     )
+    # 一覧表示用の本文の抜粋
+    excerpt: Mapped[str] = mapped_column(
+        String(120),
+        nullable=False,
+        default='',
+        server_default=''
+    )
     created_at: Mapped[datetime] = mapped_column(
         DateTime,
         nullable=False,
@@ -24,10 +35,23 @@ class Entry(db.Model, Base):
         server_default=db.func.current_timestamp()
     )
     updated_at: Mapped[datetime] = mapped_column(DateTime, nullable=True)
+    # 表示順の基準日時（更新日時、未更新の場合は作成日時）
+    sort_ts: Mapped[datetime] = mapped_column(
+        DateTime,
+        nullable=False,
+        default=datetime.now,
+        server_default=db.func.current_timestamp()
+    )
 
     # リレーションシップ
     user: Mapped["User"] = relationship("User", back_populates="entries")
     items: Mapped[list["DiaryItem"]] = relationship("DiaryItem", back_populates="entry", cascade="all, delete-orphan")
+    bodies: Mapped[dict[str, EntryBody]] = relationship(
+        EntryBody,
+        collection_class=attribute_keyed_dict('field'),
+        cascade="all, delete-orphan",
+        lazy='selectin'
+    )
 
     def __init__(self, **kwargs):
         super().__init__(**kwargs)
@@ -39,6 +63,15 @@ class Entry(db.Model, Base):
     def __repr__(self):
         return f"<Entry {self.title}>"
 
+    @validates('created_at', 'updated_at')
+    def validate_timestamps(self, key, value):
+        # sort_tsは更新日時を優先し、未更新の場合は作成日時に合わせる
+        if key == 'updated_at' and value is not None:
+            self.sort_ts = value
+        elif key == 'created_at' and self.updated_at is None:
+            self.sort_ts = value
+        return value
+
     @validates('title')
     def validate_title(self, key, title):
         if title is None:
@@ -51,7 +84,42 @@ class Entry(db.Model, Base):
             raise ValueError('Title must be 100 characters or less')
         return title
 
-    @validates('content')
+    def get_body(self, field):
+        """本文テーブルに格納されていれば展開して返す"""
+        body = self.bodies.get(field)
+        return body.text if body is not None else getattr(self, '_' + field)
+
+    def set_body(self, field, value):
+        """大きさに応じて行内か本文テーブルに格納"""
+        packed = BodyStorage.pack(value)
+        if packed is None:
+            self.bodies.pop(field, None)
+            setattr(self, '_' + field, value)
+            return
+        body = self.bodies.get(field)
+        if body is None:
+            body = self.bodies[field] = EntryBody(field=field)
+        body.store(packed)
+        setattr(self, '_' + field, '')
+
+    def _get_content(self):
+        return self.get_body('content')
+
+    def _set_content(self, content):
+        content = self.validate_content('content', content)
+        self.set_body('content', content)
+        self.excerpt = make_excerpt(content)
+
+    def _get_notes(self):
+        return self.get_body('notes')
+
+    def _set_notes(self, notes):
+        self.set_body('notes', self.validate_notes('notes', notes))
+
+    # 格納場所によらず全文を読み書きする（クエリでは行内の列として扱われる）
+    content = synonym('_content', descriptor=property(_get_content, _set_content))
+    notes = synonym('_notes', descriptor=property(_get_notes, _set_notes))
+
     def validate_content(self, key, content):
         if content is None:
             raise ValueError('Content cannot be None')
@@ -61,7 +129,6 @@ class Entry(db.Model, Base):
             raise ValueError('Content cannot be empty')
         return content
 
-    @validates('notes')
     def validate_notes(self, key, notes):
         if notes is None:
             return ''
@@ -85,3 +152,10 @@ class Entry(db.Model, Base):
             if hasattr(self, key):
                 setattr(self, key, value)
         self.updated_at = datetime.now()
+
+
+# フィード・ユーザー別タイムライン用のインデックス（キーセットページネーション）
+Index('ix_entries_sort_ts', Entry.sort_ts.desc(), Entry.id.desc())
+Index('ix_entries_user_sort_ts', Entry.user_id, Entry.sort_ts.desc(), Entry.id.desc())
+# エクスポート用のインデックス（ユーザーのエントリーをID順に区切って読む）
+Index('ix_entries_user_id', Entry.user_id, Entry.id)
@@ -0,0 +1,144 @@
+import zlib
+from sqlalchemy import Integer, String, LargeBinary, ForeignKey, UniqueConstraint, select
+from sqlalchemy.orm import Mapped, mapped_column
+from database import db
+from models.base import Base
+
+try:
+    import zstandard
+except ImportError:  # zstdは任意（未インストール時はzlibのみ使用可能）
+    zstandard = None
+
+# 一覧表示用の抜粋の最大文字数
+EXCERPT_LENGTH = 120
+
+def make_excerpt(text) -> str:
+    """本文の空白・改行をまとめた先頭部分"""
+    if not text:
+        return ''
+    return ' '.join(text.split())[:EXCERPT_LENGTH]
+
+class BodyStorage:
+    """大きな本文を別テーブルへ圧縮して格納する設定と圧縮・展開
+
+    UTF-8でTHRESHOLDバイトを超える本文は圧縮して本文テーブルに置き、
+    entries / diary_items の行には空文字のみ残して一覧の走査を軽くする。
+    """
+
+    THRESHOLD = 2048
+    CODEC = 'zlib'
+    LEVELS = {'zlib': 6, 'zstd': 3}
+    # 圧縮しても小さくならない場合はそのまま格納する
+    CODECS = ('zlib', 'zstd', 'none')
+
+    threshold = THRESHOLD
+    codec = CODEC
+    level = None
+
+    @classmethod
+    def configure(cls, threshold=None, codec=None, level=None):
+        """アプリ設定から格納方法を設定"""
+        codec = codec or cls.CODEC
+        if codec not in cls.CODECS:
+            raise ValueError(f'Unknown body codec: {codec}')
+        if codec == 'zstd' and zstandard is None:
+            raise ValueError('zstdを使用するにはzstandardパッケージが必要です')
+        cls.threshold = threshold if threshold is not None else cls.THRESHOLD
+        cls.codec = codec
+        cls.level = level
+
+    @classmethod
+    def compress(cls, data: bytes, codec: str) -> bytes:
+        level = cls.level if cls.level is not None else cls.LEVELS.get(codec)
+        if codec == 'zlib':
+            return zlib.compress(data, level)
+        if codec == 'zstd':
+            return zstandard.ZstdCompressor(level=level).compress(data)
+        return data
+
+    @staticmethod
+    def decompress(data: bytes, codec: str) -> str:
+        if codec == 'zlib':
+            data = zlib.decompress(data)
+        elif codec == 'zstd':
+            if zstandard is None:
+                raise ValueError('zstdで圧縮された本文の展開にはzstandardパッケージが必要です')
+            data = zstandard.ZstdDecompressor().decompress(data)
+        return data.decode('utf-8')
+
+    @classmethod
+    def pack(cls, text: str):
+        """本文を格納形式に変換し(codec, size, data)を返す（行内に置く場合はNone）"""
+        raw = text.encode('utf-8')
+        if len(raw) <= cls.threshold:
+            return None
+        data = cls.compress(raw, cls.codec)
+        if len(data) >= len(raw):
+            return 'none', len(raw), raw
+        return cls.codec, len(raw), data
+
+class BodyMixin:
+    """本文テーブルの共通列"""
+
+    # zlib / zstd / none
+    codec: Mapped[str] = mapped_column(String(10), nullable=False)
+    # 圧縮前のバイト数
+    size: Mapped[int] = mapped_column(Integer, nullable=False)
+    data: Mapped[bytes] = mapped_column(LargeBinary, nullable=False)
+
+    @property
+    def text(self) -> str:
+        return BodyStorage.decompress(self.data, self.codec)
+
+    def store(self, packed):
+        self.codec, self.size, self.data = packed
+
+class EntryBody(db.Model, Base, BodyMixin):
+    """エントリーの本文・メモのうち大きなもの（圧縮して格納）"""
+    __tablename__ = 'entry_bodies'
+    __table_args__ = (UniqueConstraint('entry_id', 'field'),)
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True)
+    # アーカイブ後もホット側に残るため、エントリーはentriesにない場合がある
+    entry_id: Mapped[int] = mapped_column(Integer, ForeignKey('entries.id'), nullable=False)
+    # 'content' または 'notes'
+    field: Mapped[str] = mapped_column(String(20), nullable=False)
+
+    def __repr__(self):
+        return f"<EntryBody {self.entry_id} {self.field}>"
+
+class DiaryItemBody(db.Model, Base, BodyMixin):
+    """活動項目の内容のうち大きなもの（圧縮して格納）"""
+    __tablename__ = 'diary_item_bodies'
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True)
+    item_id: Mapped[int] = mapped_column(
+        Integer, ForeignKey('diary_items.id'), nullable=False, unique=True
+    )
+
+    def __repr__(self):
+        return f"<DiaryItemBody {self.item_id}>"
+
+def load_entry_bodies(conn, entry_ids) -> dict:
+    """エントリーIDの一覧から{(entry_id, field): 本文}を取得（Core・アーカイブの読み込み用）"""
+    if not entry_ids:
+        return {}
+    table = EntryBody.__table__
+    rows = conn.execute(
+        select(table.c.entry_id, table.c.field, table.c.codec, table.c.data)
+        .filter(table.c.entry_id.in_(list(entry_ids)))
+    )
+    return {
+        (row.entry_id, row.field): BodyStorage.decompress(row.data, row.codec) for row in rows
+    }
+
+def load_item_bodies(conn, item_ids) -> dict:
+    """活動項目IDの一覧から{item_id: 内容}を取得"""
+    if not item_ids:
+        return {}
+    table = DiaryItemBody.__table__
+    rows = conn.execute(
+        select(table.c.item_id, table.c.codec, table.c.data)
+        .filter(table.c.item_id.in_(list(item_ids)))
+    )
+    return {row.item_id: BodyStorage.decompress(row.data, row.codec) for row in rows}
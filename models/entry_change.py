@@ -0,0 +1,22 @@
+from datetime import datetime
+from sqlalchemy import Integer, String, DateTime
+from sqlalchemy.orm import Mapped, mapped_column
+from database import db
+from models.base import Base
+
+class EntryChange(db.Model, Base):
+    """差分同期用のエントリー変更履歴（エントリーごとに最新の変更のみ保持）"""
+    __tablename__ = 'entry_changes'
+    # 削除済みの通番を再利用しないようAUTOINCREMENTを指定
+    __table_args__ = {'sqlite_autoincrement': True}
+
+    seq: Mapped[int] = mapped_column(Integer, primary_key=True)
+    # 削除後も墓標として残すため外部キーは設定しない
+    entry_id: Mapped[int] = mapped_column(Integer, nullable=False, unique=True)
+    user_id: Mapped[int] = mapped_column(Integer, nullable=False)
+    # 'upsert'（作成・更新）または 'delete'（削除）
+    op: Mapped[str] = mapped_column(String(10), nullable=False)
+    changed_at: Mapped[datetime] = mapped_column(DateTime, nullable=False, default=datetime.now)
+
+    def __repr__(self):
+        return f"<EntryChange {self.seq} {self.op} {self.entry_id}>"
@@ -0,0 +1,24 @@
+from datetime import datetime
+from sqlalchemy import Integer, String, Float, ForeignKey, DateTime, Index
+from sqlalchemy.orm import Mapped, mapped_column
+from database import db
+from models.base import Base
+
+class EntryMetric(db.Model, Base):
+    """メモ・活動項目から抽出した数値（例：体重：75kg）"""
+    __tablename__ = 'entry_metrics'
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True)
+    entry_id: Mapped[int] = mapped_column(Integer, ForeignKey('entries.id'), nullable=False, index=True)
+    user_id: Mapped[int] = mapped_column(Integer, ForeignKey('users.id'), nullable=False)
+    key: Mapped[str] = mapped_column(String(100), nullable=False)
+    unit: Mapped[str] = mapped_column(String(20), nullable=False, default='', server_default='')
+    value: Mapped[float] = mapped_column(Float, nullable=False)
+    recorded_at: Mapped[datetime] = mapped_column(DateTime, nullable=False)
+
+    def __repr__(self):
+        return f"<EntryMetric {self.key} {self.value}{self.unit}>"
+
+
+# ユーザー・項目ごとの時系列取得用のインデックス
+Index('ix_entry_metrics_series', EntryMetric.user_id, EntryMetric.key, EntryMetric.unit, EntryMetric.recorded_at)
@@ -3,6 +3,8 @@ from database import db
 from models.user import User
 from models.entry import Entry
 from models.diary_item import DiaryItem
+from models.rollup_manager import RollupManager
+from models.activity_manager import ActivityManager
 from sqlalchemy import select
 
 def create_initial_data():
@@ -58,6 +60,7 @@ def create_initial_data():
             created_at=datetime.now()
         )
         db.session.add(admin_entry)
+        RollupManager().apply(admin.id, admin_entry.created_at.date(), entries=1)
         db.session.commit()
 
     tetsu_entry1 = db.session.execute(
@@ -92,5 +95,11 @@ def create_initial_data():
             )
         ]
         db.session.add_all(tetsu_items)
+        RollupManager().apply(
+            tetsu.id, tetsu_entry1.created_at.date(), entries=1, items=len(tetsu_items)
+        )
+        ActivityManager().apply(
+            tetsu.id, tetsu_entry1.created_at, [item.item_name for item in tetsu_items]
+        )
 
     db.session.commit()
@@ -0,0 +1,197 @@
+import re
+import unicodedata
+import numpy as np
+from sqlalchemy import select, delete, func
+from sqlalchemy.orm import selectinload
+from database import db, logger
+from models.entry import Entry
+from models.entry_metric import EntryMetric
+from models.archive_manager import ArchiveManager
+
+# 「キー：数値単位」形式の行（例：体重：75kg、朝：10km（50分））
+# NFKC正規化後の文字列に適用するため、全角のコロン・括弧・数字は半角として扱う
+METRIC_PATTERN = re.compile(
+    r'^\s*(?P<key>[^:\n]{1,50}?)\s*:\s*'
+    r'(?P<value>[-+]?\d+(?:\.\d+)?)\s*(?P<unit>[^\d\s()、,]{0,20})'
+    r'(?:\s*\(\s*(?P<sub_value>[-+]?\d+(?:\.\d+)?)\s*(?P<sub_unit>[^\d\s()、,]{0,20})\s*\))?'
+)
+
+def parse_metrics(text: str):
+    """テキストから(キー, 数値, 単位)の一覧を抽出"""
+    metrics = []
+    if not text:
+        return metrics
+    for line in unicodedata.normalize('NFKC', text).splitlines():
+        match = METRIC_PATTERN.match(line)
+        if not match:
+            continue
+        key = match.group('key').strip()
+        metrics.append((key, float(match.group('value')), match.group('unit')))
+        # 括弧内の補足値（例：10km（50分）の50分）も同じキーで記録する
+        if match.group('sub_value') is not None:
+            metrics.append((key, float(match.group('sub_value')), match.group('sub_unit')))
+    return metrics
+
+def parse_entry_metrics(notes: str, items):
+    """メモと活動項目（(項目名, 内容)の一覧）から数値を抽出
+
+    活動項目の数値は「項目名/キー」（例：ランニング/朝）として区別する。
+    """
+    metrics = parse_metrics(notes)
+    for item_name, item_content in items:
+        metrics.extend(
+            (f'{item_name}/{key}', value, unit)
+            for key, value, unit in parse_metrics(item_content)
+        )
+    return metrics
+
+class MetricManager:
+    """エントリーから抽出した数値の保存と統計の計算
+
+    保存は呼び出し元のトランザクション内で行い、コミットは呼び出し元に任せる。
+    """
+
+    # バックフィル時の1バッチあたりのエントリー数
+    BATCH_SIZE = 500
+
+    def __init__(self, session=None):
+        self.session = session if session is not None else db.session
+
+    def add_entries(self, entries) -> int:
+        """新規エントリーの一覧から数値を抽出して一括保存（entry.itemsを参照）"""
+        rows = [
+            {
+                'entry_id': entry.id,
+                'user_id': entry.user_id,
+                'key': key[:100],
+                'unit': unit,
+                'value': value,
+                'recorded_at': entry.created_at
+            }
+            for entry in entries
+            for key, value, unit in parse_entry_metrics(
+                entry.notes, [(item.item_name, item.item_content) for item in entry.items]
+            )
+        ]
+        if rows:
+            self.session.execute(EntryMetric.__table__.insert(), rows)
+        return len(rows)
+
+    def replace_entry_metrics(self, entry, items) -> int:
+        """エントリーの数値を抽出し直して保存（itemsは(項目名, 内容)の一覧）"""
+        self.delete_entry_metrics(entry.id)
+        rows = [
+            {
+                'entry_id': entry.id,
+                'user_id': entry.user_id,
+                'key': key[:100],
+                'unit': unit,
+                'value': value,
+                'recorded_at': entry.created_at
+            }
+            for key, value, unit in parse_entry_metrics(entry.notes, items)
+        ]
+        if rows:
+            self.session.execute(EntryMetric.__table__.insert(), rows)
+        return len(rows)
+
+    def delete_entry_metrics(self, entry_id: int) -> None:
+        """エントリーの数値を削除"""
+        self.session.execute(delete(EntryMetric).where(EntryMetric.entry_id == entry_id))
+
+    def delete_orphans(self) -> None:
+        """一括削除などで削除されたエントリーの数値を削除（アーカイブ済みのものは残す）"""
+        stmt = delete(EntryMetric).where(~EntryMetric.entry_id.in_(select(Entry.id)))
+        archived_ids = ArchiveManager(self.session).archived_ids()
+        if archived_ids is not None:
+            stmt = stmt.where(~EntryMetric.entry_id.in_(archived_ids))
+        self.session.execute(stmt)
+
+    def backfill(self) -> int:
+        """既存の全エントリーから数値を抽出し直し、保存した件数を返す
+
+        アーカイブ済みのエントリーの数値はそのまま残す。
+        """
+        stmt = delete(EntryMetric)
+        archived_ids = ArchiveManager(self.session).archived_ids()
+        if archived_ids is not None:
+            stmt = stmt.where(~EntryMetric.entry_id.in_(archived_ids))
+        self.session.execute(stmt)
+        total = 0
+        last_id = 0
+        while True:
+            # 主キー順にバッチで読み込み、メモリ使用量を一定に保つ
+            entries = self.session.execute(
+                select(Entry).filter(Entry.id > last_id).order_by(Entry.id).limit(
+                    self.BATCH_SIZE
+                ).options(selectinload(Entry.items))
+            ).scalars().all()
+            if not entries:
+                break
+            total += self.add_entries(entries)
+            last_id = entries[-1].id
+            self.session.expunge_all()
+            logger.info(f"Metrics backfilled up to entry {last_id}: {total} metrics")
+        return total
+
+    def get_keys(self, user_id: int):
+        """ユーザーの記録済み項目（キー・単位・件数）を取得"""
+        stmt = select(
+            EntryMetric.key,
+            EntryMetric.unit,
+            func.count(EntryMetric.id).label('count')
+        ).filter(
+            EntryMetric.user_id == user_id
+        ).group_by(EntryMetric.key, EntryMetric.unit).order_by(EntryMetric.key, EntryMetric.unit)
+        return self.session.execute(stmt).all()
+
+    def get_series(self, user_id: int, key: str, unit: str):
+        """ユーザーの指定項目の時系列を(記録日時, 数値)の配列で取得"""
+        stmt = select(EntryMetric.recorded_at, EntryMetric.value).filter(
+            EntryMetric.user_id == user_id,
+            EntryMetric.key == key,
+            EntryMetric.unit == unit
+        ).order_by(EntryMetric.recorded_at, EntryMetric.id)
+        rows = self.session.execute(stmt).all()
+        timestamps = np.array([row.recorded_at for row in rows], dtype='datetime64[s]')
+        values = np.array([row.value for row in rows], dtype=np.float64)
+        return timestamps, values
+
+    @staticmethod
+    def compute_stats(timestamps, values, window: int = 7):
+        """時系列の移動平均・最小/最大・連続記録日数を計算
+
+        current_streakは最新の記録日で終わる連続記録日数、longest_streakは最長の連続記録日数。
+        """
+        if window < 1:
+            raise ValueError('Window must be positive')
+        count = len(values)
+        if count == 0:
+            return {
+                'count': 0, 'min': None, 'max': None, 'mean': None, 'latest': None,
+                'rolling_avg': [], 'current_streak': 0, 'longest_streak': 0
+            }
+
+        # 累積和による移動平均（系列の先頭は記録件数分で平均する）
+        cumsum = np.cumsum(np.insert(values, 0, 0.0))
+        indexes = np.arange(1, count + 1)
+        starts = np.maximum(indexes - window, 0)
+        rolling_avg = (cumsum[indexes] - cumsum[starts]) / (indexes - starts)
+
+        # 記録日の連続日数（同じ日の複数記録は1日として数える）
+        days = np.unique(timestamps.astype('datetime64[D]')).astype(np.int64)
+        breaks = np.flatnonzero(np.diff(days) != 1)
+        run_starts = np.concatenate(([0], breaks + 1))
+        run_ends = np.concatenate((breaks + 1, [len(days)]))
+        run_lengths = run_ends - run_starts
+
+        return {
+            'count': count,
+            'min': float(values.min()),
+            'max': float(values.max()),
+            'mean': float(values.mean()),
+            'latest': float(values[-1]),
+            'rolling_avg': rolling_avg.tolist(),
+            'current_streak': int(run_lengths[-1]),
+            'longest_streak': int(run_lengths.max())
+        }
@@ -0,0 +1,104 @@
+from collections import defaultdict
+from datetime import date
+from sqlalchemy import select, delete, func
+from sqlalchemy.dialects.sqlite import insert
+from database import db, logger
+from models.activity_rollup import ActivityRollup
+from models.archive_manager import ArchiveManager
+
+class RollupManager:
+    """日別活動集計（ヒートマップ・月別アーカイブ）の更新と取得
+
+    集計の更新は呼び出し元のトランザクション内で行い、コミットは呼び出し元に任せる。
+    """
+
+    def __init__(self, session=None):
+        self.session = session if session is not None else db.session
+
+    def apply(self, user_id: int, day: date, entries: int = 0, items: int = 0) -> None:
+        """指定ユーザー・日付の集計に増減分を加算"""
+        self.apply_many({(user_id, day): (entries, items)})
+
+    def apply_many(self, deltas: dict) -> None:
+        """{(user_id, day): (entries, items)}形式の増減分をまとめて加算"""
+        rows = [
+            {'user_id': user_id, 'day': day, 'entry_count': entries, 'item_count': items}
+            for (user_id, day), (entries, items) in deltas.items()
+            if entries or items
+        ]
+        if not rows:
+            return
+
+        stmt = insert(ActivityRollup)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[ActivityRollup.user_id, ActivityRollup.day],
+            set_={
+                'entry_count': ActivityRollup.entry_count + stmt.excluded.entry_count,
+                'item_count': ActivityRollup.item_count + stmt.excluded.item_count
+            }
+        )
+        self.session.execute(stmt, rows)
+        logger.debug(f"Activity rollups updated: {len(rows)} days")
+
+    def apply_entries(self, entries, sign: int = 1) -> None:
+        """エントリーの一覧から集計の増減分を求めて加算（一括インポート用）"""
+        deltas = defaultdict(lambda: [0, 0])
+        for entry in entries:
+            delta = deltas[(entry.user_id, entry.created_at.date())]
+            delta[0] += sign
+            delta[1] += sign * len(entry.items)
+        self.apply_many({key: tuple(value) for key, value in deltas.items()})
+
+    def rebuild(self) -> int:
+        """entries・diary_items（アーカイブを含む）から集計を再作成し、作成した行数を返す"""
+        archive_manager = ArchiveManager(self.session)
+        entries = archive_manager.all_entries()
+        items = archive_manager.all_items()
+        item_counts = select(
+            items.c.entry_id,
+            func.count(items.c.id).label('item_count')
+        ).group_by(items.c.entry_id).subquery()
+
+        day = func.date(entries.c.created_at)
+        source = select(
+            entries.c.user_id,
+            day,
+            func.count(entries.c.id),
+            func.coalesce(func.sum(item_counts.c.item_count), 0)
+        ).outerjoin(
+            item_counts, item_counts.c.entry_id == entries.c.id
+        ).group_by(entries.c.user_id, day)
+
+        self.session.execute(delete(ActivityRollup))
+        self.session.execute(
+            ActivityRollup.__table__.insert().from_select(
+                ['user_id', 'day', 'entry_count', 'item_count'], source
+            )
+        )
+        count = self.session.execute(select(func.count()).select_from(ActivityRollup)).scalar()
+        logger.info(f"Activity rollups rebuilt: {count} rows")
+        return count
+
+    def get_daily(self, user_id: int, start: date, end: date):
+        """指定期間（両端を含む）の日別集計を取得"""
+        stmt = select(ActivityRollup).filter(
+            ActivityRollup.user_id == user_id,
+            ActivityRollup.day >= start,
+            ActivityRollup.day <= end,
+            ActivityRollup.entry_count > 0
+        ).order_by(ActivityRollup.day)
+        return self.session.execute(stmt).scalars().all()
+
+    def get_monthly(self, user_id: int):
+        """月別の集計を新しい月から順に取得"""
+        month = func.strftime('%Y-%m', ActivityRollup.day)
+        stmt = select(
+            month.label('month'),
+            func.sum(ActivityRollup.entry_count).label('entry_count'),
+            func.sum(ActivityRollup.item_count).label('item_count')
+        ).filter(
+            ActivityRollup.user_id == user_id
+        ).group_by(month).having(
+            func.sum(ActivityRollup.entry_count) > 0
+        ).order_by(month.desc())
+        return self.session.execute(stmt).all()
@@ -0,0 +1,105 @@
+"""APIレスポンスのJSONシリアライズ
+
+orjsonがインストールされていれば使用し、なければ標準のjsonで同じ形式（UTF-8・空白なし）に出力する。
+日時はISO 8601の文字列、DTO（__slots__のdataclass）はオブジェクトとしてそのまま出力できるため、
+行ごとに .isoformat() を呼んだり辞書を組み立て直したりせずにバイト列へ変換できる。
+"""
+import datetime
+import decimal
+import json
+import operator
+import uuid
+from flask.json.provider import JSONProvider
+
+try:
+    import orjson
+except ImportError:  # orjsonは任意（未インストール時は標準のjsonを使用）
+    orjson = None
+
+# 数値などのキーは標準のjsonと同じく文字列にし、numpyの値もそのまま出力する
+ORJSON_OPTIONS = orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY if orjson is not None else 0
+
+def compile_encoder(cls):
+    """型ごとの変換関数を作成（DTOは属性名の解決を1回だけ行い、属性をまとめて取得する）"""
+    if issubclass(cls, (datetime.datetime, datetime.date, datetime.time)):
+        return cls.isoformat
+    slots = getattr(cls, '__slots__', None)
+    if slots is not None and hasattr(cls, '__dataclass_fields__'):
+        names = tuple(slots)
+        getter = operator.attrgetter(*names)
+        if len(names) == 1:
+            return lambda obj: {names[0]: getter(obj)}
+        return lambda obj: dict(zip(names, getter(obj)))
+    if issubclass(cls, (decimal.Decimal, uuid.UUID)):
+        return str
+    return None
+
+# 型ごとの変換関数（標準のjsonのdefaultから使用）
+_encoders = {}
+
+def default(obj):
+    """標準のjsonで扱えない値の変換（orjsonが標準で扱う型に合わせる）"""
+    cls = type(obj)
+    try:
+        encode = _encoders[cls]
+    except KeyError:
+        encode = _encoders[cls] = compile_encoder(cls)
+    if encode is None:
+        raise TypeError(f'Object of type {cls.__name__} is not JSON serializable')
+    return encode(obj)
+
+class Serializer:
+    """JSONのエンコード・デコード（バックエンドはアプリ設定 JSON_BACKEND で切り替え可能）"""
+
+    BACKENDS = ('orjson', 'json')
+
+    backend = 'orjson' if orjson is not None else 'json'
+
+    @classmethod
+    def configure(cls, backend=None):
+        """アプリ設定からバックエンドを設定（未指定の場合はorjsonがあれば使用）"""
+        backend = backend or ('orjson' if orjson is not None else 'json')
+        if backend not in cls.BACKENDS:
+            raise ValueError(f'Unknown JSON backend: {backend}')
+        if backend == 'orjson' and orjson is None:
+            raise ValueError('orjsonを使用するにはorjsonパッケージが必要です')
+        cls.backend = backend
+
+    @classmethod
+    def dumps(cls, obj) -> bytes:
+        """UTF-8のバイト列にエンコード"""
+        if cls.backend == 'orjson':
+            return orjson.dumps(obj, default=default, option=ORJSON_OPTIONS)
+        return json.dumps(
+            obj, ensure_ascii=False, separators=(',', ':'), default=default
+        ).encode('utf-8')
+
+    @classmethod
+    def loads(cls, data):
+        if cls.backend == 'orjson':
+            return orjson.loads(data)
+        return json.loads(data)
+
+def row_encoder(keys):
+    """Coreの行（タプル）を項目名の辞書に変換する関数を作成（項目名の解決は1回だけ行う）"""
+    keys = tuple(keys)
+
+    def encode(rows):
+        return [dict(zip(keys, row)) for row in rows]
+    return encode
+
+class SerializerJSONProvider(JSONProvider):
+    """jsonify・request.get_json を Serializer で処理するFlaskのJSONプロバイダ"""
+
+    mimetype = 'application/json'
+
+    def dumps(self, obj, **kwargs) -> str:
+        return Serializer.dumps(obj).decode('utf-8')
+
+    def loads(self, s, **kwargs):
+        return Serializer.loads(s)
+
+    def response(self, *args, **kwargs):
+        # 文字列を経由せず、エンコードしたバイト列をそのままレスポンスにする
+        obj = self._prepare_response_obj(args, kwargs)
+        return self._app.response_class(Serializer.dumps(obj), mimetype=self.mimetype)
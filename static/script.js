@@ -2,9 +2,75 @@
 let currentEditId = null;
 let currentPage = 1;
 
-// ページ読み込み時にエントリーを取得
+// 一覧は抜粋と活動項目数のみで取得し、全文は GET /entries/<id> で取得する
+const LIST_VIEW = 'view=excerpt';
+// 1ページのエントリー数（app.py の ENTRIES_PER_PAGE と同じ）
+const ENTRIES_PER_PAGE = 10;
+
+// 一覧のページのキャッシュ（キーは page=N・cursor=…・jump=… のクエリ。古いものから追い出す）
+const pageCache = new Map();
+const PAGE_CACHE_SIZE = 20;
+// キャッシュを新しいとみなす時間（他のユーザーの投稿を反映するため、過ぎたら取得し直す）
+const PAGE_CACHE_TTL = 60 * 1000;
+// 取得中のページ（同じページの先読みと表示で取得を共有する）
+const pageRequests = new Map();
+// キャッシュを破棄するたびに進める（破棄前に始めた取得の結果は保存しない）
+let cacheGeneration = 0;
+// 表示中のページのキー
+let currentKey = null;
+// 楽観的に追加したエントリーの仮のID（負の数。サーバーの応答で置き換える）
+let nextTempId = -1;
+// 一覧の取得回数（コンソールで feedStats を確認できる）
+const feedStats = { requests: 0, prefetches: 0, cacheHits: 0 };
+
+// 無限スクロールのカードの高さの初期値（表示後に実際の高さで置き換える）
+const ESTIMATED_ENTRY_HEIGHT = 200;
+// 表示範囲の前後にDOMに置いておく高さ（画面の高さに対する倍率）
+const VIRTUAL_BUFFER_SCREENS = 1;
+// 読み込み済みの末尾からこの件数以内を表示したら続きを読み込む
+const LOAD_AHEAD_ENTRIES = 10;
+
+// 無限スクロール（カーソルで続きを読み込み、表示範囲と前後のバッファのカードだけをDOMに置く）
+const virtualFeed = {
+    enabled: false,
+    generation: 0,           // 読み込み直すたびに進める（前の読み込みの結果は捨てる）
+    firstKey: 'page=1',      // 最初に読み込んだページ（最新または日付ジャンプ）
+    entries: [],
+    heights: [],             // カードごとの高さ（下の余白を含む）
+    offsets: [0],            // 先頭から各カードまでの高さの累計
+    offsetsDirty: false,
+    nextCursor: null,
+    hasNext: false,
+    loading: false,
+    error: false,
+    start: 0,                // DOMに置いているカードの範囲 [start, end)
+    end: 0,
+    nodes: new Map(),        // インデックス → 表示中のカード
+    pool: [],                // 範囲外になり再利用を待つカード
+    margin: null,
+    scheduled: false,
+    scrollCorrection: 0,
+    topSpacer: null,
+    bottomSpacer: null,
+    observer: null
+};
+
+// ページ読み込み時にエントリーを表示（埋め込まれた最初のページがあれば取得を待たずに描画）
 document.addEventListener('DOMContentLoaded', () => {
-    loadEntries();
+    const initialFeed = document.getElementById('initialFeed');
+    if (initialFeed) {
+        storePage('page=1', JSON.parse(initialFeed.textContent), cacheGeneration);
+    }
+    if (localStorage.getItem('infiniteScroll')) {
+        document.getElementById('infiniteScroll').checked = true;
+        startVirtualFeed('page=1');
+    } else if (initialFeed) {
+        displayPage('page=1', pageCache.get('page=1').data);
+    } else {
+        loadEntries();
+    }
+    window.addEventListener('scroll', scheduleVirtualUpdate, { passive: true });
+    window.addEventListener('resize', scheduleVirtualUpdate);
 });
 
 // ログアウト処理
@@ -57,6 +123,31 @@ async function postEntry() {
         return;
     }
 
+    // 応答を待たずに先頭ページへ仮のエントリーを追加して表示
+    const tempEntry = {
+        id: nextTempId--,
+        title,
+        excerpt: makeExcerpt(content),
+        created_at: localIsoString(),
+        updated_at: null,
+        ...(userSession.author || {}),
+        is_visible: true,
+        can_edit: false,
+        item_count: items.length,
+        pending: true
+    };
+    const optimistic = insertCachedEntry(tempEntry);
+    // 無限スクロールは最新から表示している場合のみ先頭に追加する（日付ジャンプ後は投稿後に最新を読み込む）
+    const virtualTop = virtualFeed.enabled && virtualFeed.firstKey === 'page=1';
+    document.getElementById('diaryTitle').value = '';
+    document.getElementById('diaryContent').value = '';
+    document.getElementById('diaryNotes').value = '';
+    document.getElementById('itemsList').innerHTML = '';
+    if (virtualTop) {
+        insertVirtualEntry(tempEntry);
+    }
+    showTopEntry(optimistic, virtualTop);
+
     try {
         const response = await fetch('/entries', {
             method: 'POST',
@@ -65,26 +156,44 @@ async function postEntry() {
             },
             body: JSON.stringify({ title, content, notes, items })
         });
+        const data = await response.json();
 
         if (response.ok) {
-            document.getElementById('diaryTitle').value = '';
-            document.getElementById('diaryContent').value = '';
-            document.getElementById('diaryNotes').value = '';
-            document.getElementById('itemsList').innerHTML = '';
-            loadEntries();
+            // 仮のエントリーをサーバーの内容で置き換える
+            if (virtualFeed.enabled && !virtualTop) {
+                replaceCachedEntry(tempEntry.id, data.entry);
+                startVirtualFeed('page=1');
+                window.scrollTo(0, 0);
+            } else if (optimistic || virtualTop) {
+                replaceCachedEntry(tempEntry.id, data.entry);
+            } else {
+                changePage(1);
+            }
         } else {
-            const data = await response.json();
             alert(data.error || '投稿に失敗しました');
             if (response.status === 401) {
                 window.location.href = '/login';
+                return;
             }
+            restoreForm(title, content, notes, items);
+            reloadFromServer();
         }
     } catch (error) {
         console.error('Error:', error);
         alert('エラーが発生しました');
+        restoreForm(title, content, notes, items);
+        reloadFromServer();
     }
 }
 
+// 失敗した投稿・更新の入力内容を戻す
+function restoreForm(title, content, notes, items) {
+    document.getElementById('diaryTitle').value = title;
+    document.getElementById('diaryContent').value = content;
+    document.getElementById('diaryNotes').value = notes;
+    setItems(items);
+}
+
 // 活動項目の設定
 function setItems(items = []) {
     const itemsList = document.getElementById('itemsList');
@@ -151,116 +260,486 @@ async function updateEntry() {
         return;
     }
 
+    // 更新すると表示順の基準日時が最新になるため、応答を待たずに一覧の先頭へ移して表示
+    const id = currentEditId;
+    const current = findCachedEntry(id);
+    const virtualTop = virtualFeed.enabled && virtualFeed.firstKey === 'page=1';
+    let optimistic = false;
+    if (current) {
+        optimistic = moveEntryToTop({
+            ...current,
+            title,
+            excerpt: makeExcerpt(content),
+            updated_at: localIsoString(),
+            item_count: items.length,
+            pending: true
+        });
+    }
+    cancelEdit();
+    showTopEntry(optimistic, virtualTop);
+
     try {
-        const response = await fetch(`/entries/${currentEditId}`, {
+        const response = await fetch(`/entries/${id}`, {
             method: 'PUT',
             headers: {
                 'Content-Type': 'application/json',
             },
             body: JSON.stringify({ title, content, notes, items })
         });
+        const data = await response.json();
 
         if (response.ok) {
-            cancelEdit();
-            loadEntries();
+            if (current) {
+                replaceCachedEntry(id, data.entry);
+            } else {
+                // キャッシュになかったエントリーは応答の内容で先頭へ移す
+                optimistic = moveEntryToTop(data.entry);
+                showTopEntry(optimistic, virtualTop);
+            }
+            if (virtualFeed.enabled && !virtualTop) {
+                startVirtualFeed('page=1');
+                window.scrollTo(0, 0);
+            } else if (!optimistic && !virtualFeed.enabled) {
+                changePage(1);
+            }
         } else {
-            const data = await response.json();
             alert(data.error || '更新に失敗しました');
             if (response.status === 401) {
                 window.location.href = '/login';
+                return;
             }
+            startEdit(id, title, content, notes, items);
+            reloadFromServer();
         }
     } catch (error) {
         console.error('Error:', error);
         alert('エラーが発生しました');
+        startEdit(id, title, content, notes, items);
+        reloadFromServer();
     }
 }
 
 // 日記エントリーを読み込み
 async function loadEntries(page = 1) {
+    await showPage(`page=${page}`);
+}
+
+// 指定日付以前のエントリーへジャンプ
+async function jumpToDate() {
+    const date = document.getElementById('jumpDate').value;
+    if (virtualFeed.enabled) {
+        startVirtualFeed(date ? `jump=${date}` : 'page=1');
+        window.scrollTo(0, 0);
+        return;
+    }
+    if (!date) {
+        changePage(1);
+        return;
+    }
+    await showPage(`jump=${date}`);
+    window.scrollTo(0, 0);
+}
+
+// カーソル位置から続きのエントリーを読み込み
+async function loadEntriesByCursor(cursor) {
+    await showPage(`cursor=${encodeURIComponent(cursor)}`);
+    window.scrollTo(0, 0);
+}
+
+// ページを表示（新しいキャッシュがあれば取得しない）
+async function showPage(key) {
     try {
-        const response = await fetch(`/entries?page=${page}`);
-        const data = await response.json();
-        
-        const entriesDiv = document.getElementById('entries');
-        const paginationDiv = document.getElementById('pagination');
-        entriesDiv.innerHTML = '';
-
-        // エントリーの表示
-        data.entries.forEach(entry => {
-            const entryElement = document.createElement('div');
-            entryElement.className = 'entry';
-            
-            // 日時の表示を整形
-            const createdAt = new Date(entry.created_at).toLocaleString('ja-JP');
-            let dateInfo = `<span class="date-label">作成:</span>${createdAt}`;
-            if (entry.updated_at) {
-                const updatedAt = new Date(entry.updated_at).toLocaleString('ja-JP');
-                dateInfo += `<span class="entry-updated"><span class="date-label">最終更新:</span>${updatedAt}</span>`;
-            }
+        displayPage(key, await fetchPage(key));
+    } catch (error) {
+        console.error('Error:', error);
+        alert(error.message);
+    }
+}
 
-            // アクションボタン（編集権限がある場合のみ表示）
-            let actionButtons = '';
-            if (entry.can_edit) {
-                const itemsJson = JSON.stringify(entry.items || []).replace(/'/g, "\\'");
-                actionButtons = `
-                    <div class="action-buttons">
-                        <button class="edit-btn" onclick='startEdit(${entry.id}, "${escapeHtml(entry.title)}", "${escapeHtml(entry.content)}", "${escapeHtml(entry.notes)}", ${itemsJson})'>編集</button>
-                        <button class="delete-btn" onclick="deleteEntry(${entry.id})">削除</button>
-                    </div>
-                `;
-            }
+// ページを描画して次のページを先読み
+function displayPage(key, data) {
+    currentKey = key;
+    showEntries(data);
+    prefetchNextPage(data.pagination);
+}
 
-            // メモの表示（存在する場合のみ）
-            let notesHtml = '';
-            if (entry.notes && entry.notes.trim()) {
-                notesHtml = `
-                    <div class="entry-notes">
-                        <span class="entry-notes-label">メモ</span>
-                        <div>${escapeHtml(entry.notes)}</div>
-                    </div>
-                `;
+// 表示中のページをキャッシュの内容で描画し直す（スクロール位置は保つ）
+function redisplayCurrentPage() {
+    if (virtualFeed.enabled) {
+        // 無限スクロールのカードは変更時に書き換え済み
+        return;
+    }
+    const cached = pageCache.get(currentKey);
+    if (cached) {
+        showEntries(cached.data);
+    }
+}
+
+// キャッシュが新しいか
+function isFresh(key) {
+    const cached = pageCache.get(key);
+    return cached !== undefined && Date.now() - cached.fetchedAt < PAGE_CACHE_TTL;
+}
+
+// ページのデータ（新しいキャッシュがあればそれを返し、なければ取得する）
+async function fetchPage(key) {
+    if (isFresh(key)) {
+        feedStats.cacheHits++;
+        return pageCache.get(key).data;
+    }
+    return requestPage(key);
+}
+
+// ページを取得してキャッシュに保存（取得中の同じページがあればその結果を待つ）
+function requestPage(key) {
+    if (!pageRequests.has(key)) {
+        const generation = cacheGeneration;
+        feedStats.requests++;
+        const request = fetch(`/entries?${key}&${LIST_VIEW}`)
+            .then(async response => {
+                const data = await response.json();
+                if (!response.ok) {
+                    throw new Error(data.error || 'エントリーの読み込みに失敗しました');
+                }
+                storePage(key, data, generation);
+                return data;
+            })
+            .finally(() => pageRequests.delete(key));
+        pageRequests.set(key, request);
+    }
+    return pageRequests.get(key);
+}
+
+// ページをキャッシュに保存（上限を超えたら最も古く使ったページを追い出す）
+function storePage(key, data, generation) {
+    if (generation !== cacheGeneration) {
+        return;
+    }
+    pageCache.delete(key);
+    pageCache.set(key, { data, fetchedAt: Date.now() });
+    while (pageCache.size > PAGE_CACHE_SIZE) {
+        pageCache.delete(pageCache.keys().next().value);
+    }
+}
+
+// 次のページのキー（なければnull）
+function nextPageKey(pagination) {
+    if (!pagination.has_next) {
+        return null;
+    }
+    if (pagination.current_page === undefined) {
+        return `cursor=${encodeURIComponent(pagination.next_cursor)}`;
+    }
+    return `page=${pagination.current_page + 1}`;
+}
+
+// 次のページをブラウザの空き時間に先読み（データ節約モードでは行わない）
+function prefetchNextPage(pagination) {
+    const key = nextPageKey(pagination);
+    if (!key || isFresh(key) || (navigator.connection && navigator.connection.saveData)) {
+        return;
+    }
+    const idle = window.requestIdleCallback || (callback => setTimeout(callback, 200));
+    idle(() => {
+        if (isFresh(key) || pageRequests.has(key)) {
+            return;
+        }
+        feedStats.prefetches++;
+        requestPage(key).catch(error => console.debug('Prefetch failed:', error));
+    });
+}
+
+// キャッシュを破棄して表示中のページを取得し直す（楽観的な変更が失敗したとき）
+function reloadFromServer() {
+    cacheGeneration++;
+    pageCache.clear();
+    if (virtualFeed.enabled) {
+        startVirtualFeed(virtualFeed.firstKey);
+        return;
+    }
+    showPage(currentKey || 'page=1');
+}
+
+// キャッシュ中のページ番号のページ（キーがpage=Nのもの）
+function numberedPages() {
+    const pages = new Map();
+    for (const [key, cached] of pageCache) {
+        if (key.startsWith('page=')) {
+            pages.set(cached.data.pagination.current_page, cached.data);
+        }
+    }
+    return pages;
+}
+
+// 総件数の変化をページ番号のページのページネーションに反映
+function adjustTotals(delta) {
+    for (const data of numberedPages().values()) {
+        const pagination = data.pagination;
+        pagination.total_entries += delta;
+        pagination.total_pages = Math.ceil(pagination.total_entries / ENTRIES_PER_PAGE);
+        pagination.has_next = pagination.current_page < pagination.total_pages;
+    }
+}
+
+// 先頭ページに新しいエントリーを追加（先頭ページがキャッシュになければfalse）
+function insertCachedEntry(entry) {
+    // 2ページ目以降と日付ジャンプは境界がずれるため破棄する（カーソルのページは古い側なので影響しない）
+    for (const key of [...pageCache.keys()]) {
+        if ((key.startsWith('page=') && key !== 'page=1') || key.startsWith('jump=')) {
+            pageCache.delete(key);
+        }
+    }
+    const first = pageCache.get('page=1');
+    if (!first) {
+        return false;
+    }
+    first.data.entries.unshift(entry);
+    if (first.data.entries.length > ENTRIES_PER_PAGE) {
+        first.data.entries.pop();
+    }
+    adjustTotals(1);
+    return true;
+}
+
+// キャッシュ中または無限スクロールのエントリー（なければnull）
+function findCachedEntry(id) {
+    for (const cached of pageCache.values()) {
+        const entry = cached.data.entries.find(current => current.id === id);
+        if (entry) {
+            return entry;
+        }
+    }
+    return virtualFeed.entries.find(entry => entry.id === id) || null;
+}
+
+// 更新したエントリーを元の位置から削除し、投稿と同じく先頭ページの先頭へ追加
+// （無限スクロールは最新から表示している場合のみ先頭に追加する。先頭ページがキャッシュになければfalse）
+function moveEntryToTop(entry) {
+    removeCachedEntry(entry.id);
+    if (virtualFeed.enabled && virtualFeed.firstKey === 'page=1') {
+        insertVirtualEntry(entry);
+    }
+    return insertCachedEntry(entry);
+}
+
+// 先頭に追加したエントリーを表示（ページ番号の表示では先頭ページへ移る）
+function showTopEntry(optimistic, virtualTop) {
+    if (virtualTop) {
+        window.scrollTo(0, 0);
+    } else if (optimistic && !virtualFeed.enabled) {
+        displayPage('page=1', pageCache.get('page=1').data);
+        window.scrollTo(0, 0);
+    } else {
+        redisplayCurrentPage();
+    }
+}
+
+// 仮のエントリーをサーバーの応答の内容で置き換えて描画し直す
+function replaceCachedEntry(id, entry) {
+    for (const cached of pageCache.values()) {
+        cached.data.entries = cached.data.entries.map(current => current.id === id ? entry : current);
+    }
+    updateVirtualEntry(id, () => entry);
+    redisplayCurrentPage();
+}
+
+// キャッシュからエントリーを削除（ページ番号のページは後ろのページの先頭を繰り上げる）
+function removeCachedEntry(id) {
+    const pages = numberedPages();
+    for (const [key, cached] of [...pageCache]) {
+        const entries = cached.data.entries;
+        const index = entries.findIndex(entry => entry.id === id);
+        if (index < 0) {
+            continue;
+        }
+        entries.splice(index, 1);
+        if (!key.startsWith('page=')) {
+            continue;
+        }
+        // 続きのページがキャッシュにある限り先頭を繰り上げ、1件足りなくなったページは破棄する
+        let page = cached.data.pagination.current_page;
+        while (pages.has(page + 1)) {
+            const next = pages.get(page + 1);
+            if (next.entries.length) {
+                pages.get(page).entries.push(next.entries.shift());
             }
+            page++;
+        }
+        if (pages.get(page).pagination.has_next && page !== cached.data.pagination.current_page) {
+            pageCache.delete(`page=${page}`);
+        }
+    }
+    adjustTotals(-1);
+    removeVirtualEntry(id);
+}
+
+// 一覧のレスポンス（エントリーとページネーション）を表示
+function showEntries(data) {
+    renderEntries(data.entries);
+    if (data.entries.length) {
+        markFirstEntry();
+    }
+
+    // ページネーションUIの更新
+    updatePagination(data.pagination);
+}
+
+// 最初のエントリーを表示するまでの時間を記録（DevToolsのPerformanceで確認できる）
+function markFirstEntry() {
+    if (performance.getEntriesByName('first-entry').length) {
+        return;
+    }
+    performance.mark('first-entry');
+    console.debug(`first entry: ${Math.round(performance.now())}ms`);
+}
+
+// エントリー一覧の描画
+function renderEntries(entries) {
+    const entriesDiv = document.getElementById('entries');
+    entriesDiv.innerHTML = '';
 
-            // 活動項目の表示（存在する場合のみ）
-            let itemsHtml = '';
-            if (entry.items && entry.items.length > 0) {
-                itemsHtml = `
-                    <div class="entry-items">
-                        <span class="items-label">活動項目</span>
-                        ${entry.items.map(item => `
-                            <div class="item">
-                                <div class="item-name">${escapeHtml(item.item_name)}</div>
-                                <div class="item-content">${escapeHtml(item.item_content)}</div>
-                            </div>
-                        `).join('')}
+    // エントリーの表示
+    entries.forEach(entry => {
+        const entryElement = document.createElement('div');
+        fillEntryCard(entryElement, entry);
+        entriesDiv.appendChild(entryElement);
+    });
+}
+
+// カードの要素にエントリーを描画（無限スクロールでは範囲外になったカードを別のエントリーに使い回す）
+function fillEntryCard(entryElement, entry) {
+    entryElement.entry = entry;
+    // 応答待ちの楽観的な変更は薄く表示し、操作できないようにする
+    entryElement.className = entry.pending ? 'entry entry-pending' : 'entry';
+
+    // 日時の表示を整形
+    const createdAt = new Date(entry.created_at).toLocaleString('ja-JP');
+    let dateInfo = `<span class="date-label">作成:</span>${createdAt}`;
+    if (entry.updated_at) {
+        const updatedAt = new Date(entry.updated_at).toLocaleString('ja-JP');
+        dateInfo += `<span class="entry-updated"><span class="date-label">最終更新:</span>${updatedAt}</span>`;
+    }
+
+    // アクションボタン（編集権限がある場合のみ表示）
+    let actionButtons = '';
+    if (entry.can_edit) {
+        actionButtons = `
+            <div class="action-buttons">
+                <button class="edit-btn" onclick="editEntry(${entry.id})">編集</button>
+                <button class="delete-btn" onclick="deleteEntry(${entry.id})">削除</button>
+            </div>
+        `;
+    }
+
+    // 活動項目は件数のみ表示し、全文と合わせて展開する（展開済みの場合は全文を表示）
+    let details;
+    if (entry.full) {
+        details = renderDetails(entry.full);
+    } else {
+        const itemCount = entry.item_count > 0
+            ? `<span class="entry-item-count">活動項目 ${entry.item_count}件</span>`
+            : '';
+        details = `
+            <div class="entry-details">
+                ${itemCount}
+                <button class="more-btn" onclick="expandEntry(${entry.id}, this)"
+                        ${entry.pending ? 'disabled' : ''}>続きを読む</button>
+            </div>
+        `;
+    }
+
+    entryElement.innerHTML = `
+        ${actionButtons}
+        <div class="entry-title">${escapeHtml(entry.title)}</div>
+        <div class="entry-author">投稿者: ${escapeHtml(entry.author_name)} (@${escapeHtml(entry.author_userid)})</div>
+        <div class="entry-content">${escapeHtml(entry.full ? entry.full.content : entry.excerpt)}</div>
+        ${details}
+        <div class="entry-dates">${dateInfo}</div>
+    `;
+}
+
+// メモ・活動項目の表示
+function renderDetails(entry) {
+    let html = '';
+    if (entry.notes && entry.notes.trim()) {
+        html += `
+            <div class="entry-notes">
+                <span class="entry-notes-label">メモ</span>
+                <div>${escapeHtml(entry.notes)}</div>
+            </div>
+        `;
+    }
+    if (entry.items && entry.items.length > 0) {
+        html += `
+            <div class="entry-items">
+                <span class="items-label">活動項目</span>
+                ${entry.items.map(item => `
+                    <div class="item">
+                        <div class="item-name">${escapeHtml(item.item_name)}</div>
+                        <div class="item-content">${escapeHtml(item.item_content)}</div>
                     </div>
-                `;
-            }
-            
-            entryElement.innerHTML = `
-                ${actionButtons}
-                <div class="entry-title">${escapeHtml(entry.title)}</div>
-                <div class="entry-author">投稿者: ${escapeHtml(entry.author_name)} (@${escapeHtml(entry.author_userid)})</div>
-                <div class="entry-content">${escapeHtml(entry.content)}</div>
-                ${notesHtml}
-                ${itemsHtml}
-                <div class="entry-dates">${dateInfo}</div>
-            `;
-            entriesDiv.appendChild(entryElement);
-        });
+                `).join('')}
+            </div>
+        `;
+    }
+    return html;
+}
+
+// エントリーの全文を取得（ETagで再検証されるため、変更がなければブラウザのキャッシュを使う）
+async function fetchEntry(id) {
+    const response = await fetch(`/entries/${id}`);
+    const data = await response.json();
+    if (!response.ok) {
+        throw new Error(data.error || 'エントリーの読み込みに失敗しました');
+    }
+    return data;
+}
 
-        // ページネーションUIの更新
-        updatePagination(data.pagination);
+// 抜粋を全文に置き換えて表示
+async function expandEntry(id, button) {
+    try {
+        const entry = await fetchEntry(id);
+        if (virtualFeed.enabled) {
+            // カードは使い回されるため、全文はエントリーのデータに持たせる
+            updateVirtualEntry(id, current => ({ ...current, full: entry }));
+            return;
+        }
+        const entryElement = button.closest('.entry');
+        entryElement.querySelector('.entry-content').innerHTML = escapeHtml(entry.content);
+        entryElement.querySelector('.entry-details').outerHTML = renderDetails(entry);
     } catch (error) {
         console.error('Error:', error);
-        alert('エントリーの読み込みに失敗しました');
+        alert(error.message);
+    }
+}
+
+// 全文を取得して編集モードを開始
+async function editEntry(id) {
+    try {
+        const entry = await fetchEntry(id);
+        startEdit(entry.id, entry.title, entry.content, entry.notes, entry.items);
+    } catch (error) {
+        console.error('Error:', error);
+        alert(error.message);
     }
 }
 
 // ページネーションUIの更新
 function updatePagination(pagination) {
     const paginationDiv = document.getElementById('pagination');
+
+    // カーソル方式（日付ジャンプ後）は先頭に戻るか続きを読み込む
+    if (pagination.current_page === undefined) {
+        paginationDiv.innerHTML = `
+            <button onclick="changePage(1)">最新へ</button>
+            <button onclick="loadEntriesByCursor('${pagination.next_cursor}')"
+                    ${!pagination.has_next ? 'disabled' : ''}>
+                次へ
+            </button>
+        `;
+        return;
+    }
+
     paginationDiv.innerHTML = `
         <button onclick="changePage(${pagination.current_page - 1})" 
                 ${!pagination.has_prev ? 'disabled' : ''}>
@@ -284,32 +763,338 @@ function changePage(page) {
     window.scrollTo(0, 0);
 }
 
+// 無限スクロールの切り替え（設定はブラウザに保存する）
+function setInfiniteScroll(enabled) {
+    localStorage.setItem('infiniteScroll', enabled ? '1' : '');
+    if (enabled) {
+        startVirtualFeed('page=1');
+    } else {
+        stopVirtualFeed();
+        changePage(1);
+    }
+    window.scrollTo(0, 0);
+}
+
+// 無限スクロールを指定したページから始める（page=1 は最新、jump=… は日付ジャンプ）
+function startVirtualFeed(key) {
+    const feed = virtualFeed;
+    const entriesDiv = document.getElementById('entries');
+    if (!feed.observer) {
+        feed.topSpacer = document.createElement('div');
+        feed.bottomSpacer = document.createElement('div');
+        feed.observer = new ResizeObserver(measureVirtualEntries);
+    }
+    releaseVirtualNodes();
+    feed.enabled = true;
+    feed.generation++;
+    feed.firstKey = key;
+    feed.entries = [];
+    feed.heights = [];
+    feed.offsetsDirty = true;
+    feed.nextCursor = null;
+    feed.hasNext = true;
+    feed.loading = false;
+    feed.error = false;
+    feed.start = feed.end = 0;
+    feed.topSpacer.style.height = feed.bottomSpacer.style.height = '0px';
+    entriesDiv.classList.add('virtual');
+    entriesDiv.replaceChildren(feed.topSpacer, feed.bottomSpacer);
+    loadMoreEntries(key);
+}
+
+// 無限スクロールを終了（カードと読み込んだエントリーを破棄する）
+function stopVirtualFeed() {
+    const feed = virtualFeed;
+    releaseVirtualNodes();
+    feed.enabled = false;
+    feed.generation++;
+    feed.entries = [];
+    feed.heights = [];
+    feed.pool = [];
+    const entriesDiv = document.getElementById('entries');
+    entriesDiv.classList.remove('virtual');
+    entriesDiv.innerHTML = '';
+}
+
+// 続きのエントリーを読み込む（keyを省略した場合は次のカーソルのページ）
+async function loadMoreEntries(key = null) {
+    const feed = virtualFeed;
+    if (feed.loading || !feed.hasNext) {
+        return;
+    }
+    const generation = feed.generation;
+    feed.loading = true;
+    updateVirtualStatus();
+    try {
+        const data = await fetchPage(key || `cursor=${encodeURIComponent(feed.nextCursor)}`);
+        if (generation !== feed.generation) {
+            return;
+        }
+        feed.entries.push(...data.entries);
+        feed.heights.push(...data.entries.map(() => ESTIMATED_ENTRY_HEIGHT));
+        feed.offsetsDirty = true;
+        feed.nextCursor = data.pagination.next_cursor;
+        feed.hasNext = Boolean(data.pagination.has_next && data.pagination.next_cursor);
+        if (feed.entries.length) {
+            markFirstEntry();
+        }
+        prefetchNextPage(data.pagination);
+    } catch (error) {
+        console.error('Error:', error);
+        if (generation === feed.generation) {
+            feed.error = true;
+        }
+    } finally {
+        if (generation === feed.generation) {
+            feed.loading = false;
+            updateVirtualStatus();
+            scheduleVirtualUpdate();
+        }
+    }
+}
+
+// 失敗した続きの読み込みをやり直す
+function retryLoadMore() {
+    virtualFeed.error = false;
+    loadMoreEntries();
+}
+
+// 無限スクロールの読み込み状況を表示（ページネーションの代わり）
+function updateVirtualStatus() {
+    const feed = virtualFeed;
+    const paginationDiv = document.getElementById('pagination');
+    if (feed.error) {
+        paginationDiv.innerHTML = `
+            <span class="page-info">読み込みに失敗しました</span>
+            <button onclick="retryLoadMore()">再読み込み</button>
+        `;
+    } else if (feed.loading) {
+        paginationDiv.innerHTML = '<span class="page-info">読み込み中...</span>';
+    } else if (!feed.hasNext) {
+        paginationDiv.innerHTML = `<span class="page-info">全${feed.entries.length}件を表示しました</span>`;
+    } else {
+        paginationDiv.innerHTML = '';
+    }
+}
+
+// スクロール・リサイズ・高さの変化の後、次の描画フレームで表示範囲を更新
+function scheduleVirtualUpdate() {
+    if (!virtualFeed.enabled || virtualFeed.scheduled) {
+        return;
+    }
+    virtualFeed.scheduled = true;
+    requestAnimationFrame(updateVirtualWindow);
+}
+
+// 各カードまでの高さの累計（高さが変わった場合のみ計算し直す）
+function virtualOffsets() {
+    const feed = virtualFeed;
+    if (feed.offsetsDirty) {
+        const offsets = new Array(feed.heights.length + 1);
+        offsets[0] = 0;
+        for (let i = 0; i < feed.heights.length; i++) {
+            offsets[i + 1] = offsets[i] + feed.heights[i];
+        }
+        feed.offsets = offsets;
+        feed.offsetsDirty = false;
+    }
+    return feed.offsets;
+}
+
+// 位置yを含むカードのインデックス（二分探索）
+function findVirtualIndex(offsets, y) {
+    let low = 0;
+    let high = offsets.length - 2;
+    while (low < high) {
+        const middle = (low + high + 1) >> 1;
+        if (offsets[middle] <= y) {
+            low = middle;
+        } else {
+            high = middle - 1;
+        }
+    }
+    return Math.max(low, 0);
+}
+
+// 画面と前後のバッファに入るカードだけをDOMに置き、範囲外は上下の余白の高さにまとめる
+function updateVirtualWindow() {
+    const feed = virtualFeed;
+    feed.scheduled = false;
+    if (!feed.enabled) {
+        return;
+    }
+    // 画面より上のカードの高さが変わった分はスクロール位置で打ち消す
+    if (feed.scrollCorrection) {
+        window.scrollBy(0, feed.scrollCorrection);
+        feed.scrollCorrection = 0;
+    }
+
+    const offsets = virtualOffsets();
+    const count = feed.entries.length;
+    const listTop = document.getElementById('entries').getBoundingClientRect().top + window.scrollY;
+    const buffer = window.innerHeight * VIRTUAL_BUFFER_SCREENS;
+    const viewTop = window.scrollY - listTop - buffer;
+    const viewBottom = window.scrollY - listTop + window.innerHeight + buffer;
+    const start = count ? findVirtualIndex(offsets, viewTop) : 0;
+    const end = count ? Math.min(count, findVirtualIndex(offsets, viewBottom) + 1) : 0;
+
+    renderVirtualRange(start, end);
+    feed.topSpacer.style.height = `${offsets[start]}px`;
+    feed.bottomSpacer.style.height = `${offsets[count] - offsets[end]}px`;
+
+    if (count - end < LOAD_AHEAD_ENTRIES && feed.hasNext && !feed.loading && !feed.error) {
+        loadMoreEntries();
+    }
+}
+
+// [start, end) のカードを表示（範囲外になったカードは回収して新しく入ったエントリーに使い回す）
+function renderVirtualRange(start, end) {
+    const feed = virtualFeed;
+    if (start === feed.start && end === feed.end && feed.nodes.size === end - start) {
+        return;
+    }
+    for (const [index, node] of feed.nodes) {
+        if (index < start || index >= end) {
+            feed.nodes.delete(index);
+            feed.observer.unobserve(node);
+            feed.pool.push(node);
+        }
+    }
+    const nodes = [];
+    for (let index = start; index < end; index++) {
+        let node = feed.nodes.get(index);
+        if (!node) {
+            node = feed.pool.pop() || document.createElement('div');
+            feed.nodes.set(index, node);
+            feed.observer.observe(node);
+        }
+        if (node.entry !== feed.entries[index]) {
+            fillEntryCard(node, feed.entries[index]);
+        }
+        node.dataset.index = index;
+        nodes.push(node);
+    }
+    document.getElementById('entries').replaceChildren(feed.topSpacer, ...nodes, feed.bottomSpacer);
+    feed.start = start;
+    feed.end = end;
+}
+
+// 表示中のカードの実際の高さを記録（ResizeObserverから呼ばれる。全文の展開もここで反映される）
+function measureVirtualEntries(records) {
+    const feed = virtualFeed;
+    for (const record of records) {
+        const node = record.target;
+        const index = Number(node.dataset.index);
+        if (feed.nodes.get(index) !== node || !node.isConnected) {
+            continue;
+        }
+        if (feed.margin === null) {
+            feed.margin = parseFloat(getComputedStyle(node).marginBottom) || 0;
+        }
+        const height = node.offsetHeight + feed.margin;
+        const delta = height - feed.heights[index];
+        if (delta) {
+            feed.heights[index] = height;
+            feed.offsetsDirty = true;
+            if (node.getBoundingClientRect().bottom < 0) {
+                feed.scrollCorrection += delta;
+            }
+        }
+    }
+    scheduleVirtualUpdate();
+}
+
+// 表示中のカードをすべて回収（エントリーの追加・削除でインデックスがずれる場合）
+function releaseVirtualNodes() {
+    const feed = virtualFeed;
+    for (const node of feed.nodes.values()) {
+        feed.observer.unobserve(node);
+        feed.pool.push(node);
+    }
+    feed.nodes.clear();
+    feed.start = feed.end = 0;
+}
+
+// 無限スクロールの先頭にエントリーを追加
+function insertVirtualEntry(entry) {
+    const feed = virtualFeed;
+    feed.entries.unshift(entry);
+    feed.heights.unshift(ESTIMATED_ENTRY_HEIGHT);
+    feed.offsetsDirty = true;
+    releaseVirtualNodes();
+    scheduleVirtualUpdate();
+}
+
+// 無限スクロールのエントリーを書き換え、表示中であればカードを描画し直す
+function updateVirtualEntry(id, update) {
+    const feed = virtualFeed;
+    const index = feed.enabled ? feed.entries.findIndex(entry => entry.id === id) : -1;
+    if (index < 0) {
+        return;
+    }
+    feed.entries[index] = update(feed.entries[index]);
+    const node = feed.nodes.get(index);
+    if (node) {
+        fillEntryCard(node, feed.entries[index]);
+    }
+}
+
+// 無限スクロールからエントリーを削除
+function removeVirtualEntry(id) {
+    const feed = virtualFeed;
+    const index = feed.enabled ? feed.entries.findIndex(entry => entry.id === id) : -1;
+    if (index < 0) {
+        return;
+    }
+    feed.entries.splice(index, 1);
+    feed.heights.splice(index, 1);
+    feed.offsetsDirty = true;
+    releaseVirtualNodes();
+    scheduleVirtualUpdate();
+}
+
 // 日記エントリーを削除
 async function deleteEntry(id) {
     if (!confirm('本当に削除しますか？')) {
         return;
     }
 
+    // 応答を待たずに一覧から削除して表示
+    removeCachedEntry(id);
+    redisplayCurrentPage();
+
     try {
         const response = await fetch(`/entries/${id}`, {
             method: 'DELETE'
         });
 
-        if (response.ok) {
-            loadEntries();
-        } else {
+        if (!response.ok) {
             const data = await response.json();
             alert(data.error || '削除に失敗しました');
             if (response.status === 401) {
                 window.location.href = '/login';
+                return;
             }
+            reloadFromServer();
         }
     } catch (error) {
         console.error('Error:', error);
         alert('エラーが発生しました');
+        reloadFromServer();
     }
 }
 
+// 一覧用の抜粋（サーバーの make_excerpt と同じく空白をまとめて先頭120文字）
+function makeExcerpt(text) {
+    return text.split(/\s+/).filter(Boolean).join(' ').slice(0, 120);
+}
+
+// 現在時刻のローカル時刻のISO 8601文字列（サーバーの日時と同じくタイムゾーンなし）
+function localIsoString() {
+    const now = new Date();
+    return new Date(now.getTime() - now.getTimezoneOffset() * 60000).toISOString().slice(0, 19);
+}
+
 // HTMLエスケープ
 function escapeHtml(unsafe) {
     if (!unsafe) return '';
@@ -1,6 +1,8 @@
 # tests/conftest.py
 import os
+import shutil
 import sys
+import tempfile
 import pytest
 from datetime import datetime
 from typing import Generator
@@ -12,6 +14,15 @@ from sqlalchemy.orm import scoped_session, sessionmaker
 project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 sys.path.insert(0, project_root)
 
+# app.py は読み込み時にDBを初期化するため、テストから読み込む前に一時ディレクトリのDBを指定する
+# （instance/ の diary.db・archive.db を作成・変更しない）
+test_db_dir = tempfile.mkdtemp(prefix='lifelog-test-')
+os.environ['LIFELOG_DATABASE_URL'] = f"sqlite:///{os.path.join(test_db_dir, 'diary.db')}"
+os.environ['LIFELOG_ARCHIVE_DATABASE'] = os.path.join(test_db_dir, 'archive.db')
+
+def pytest_unconfigure(config):
+    shutil.rmtree(test_db_dir, ignore_errors=True)
+
 # データベースモジュールをインポート
 from database import db
 
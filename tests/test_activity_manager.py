@@ -0,0 +1,122 @@
+import pytest
+from datetime import datetime
+from models.user import User
+from models.entry import Entry
+from models.diary_item import DiaryItem
+from models.activity_frequency import ActivityFrequency
+from models.activity_manager import ActivityManager
+from database import db
+
+class TestActivityManager:
+    def setup_method(self):
+        """各テストメソッドの前にテストユーザーを作成"""
+        self.activity_manager = ActivityManager()
+        with db.session() as session:
+            self.user = User(
+                userid='test_user',
+                name='Test User',
+                password='TestPass123',
+                created_at=datetime.now()
+            )
+            self.other = User(
+                userid='other_user',
+                name='Other User',
+                password='TestPass123',
+                created_at=datetime.now()
+            )
+            session.add_all([self.user, self.other])
+            session.commit()
+            self.user_id = self.user.id
+            self.other_id = self.other.id
+
+    def teardown_method(self):
+        """各テストメソッドの後にデータベースをクリア"""
+        with db.session() as session:
+            session.query(ActivityFrequency).delete()
+            session.query(DiaryItem).delete()
+            session.query(Entry).delete()
+            session.query(User).delete()
+            session.commit()
+
+    def test_apply_and_top(self, app):
+        """頻度の加算・減算とランキングのテスト"""
+        with app.app_context():
+            march = datetime(2024, 3, 1)
+            april = datetime(2024, 4, 1)
+            self.activity_manager.apply(self.user_id, march, ['筋トレ', 'ランニング'])
+            self.activity_manager.apply(self.user_id, april, ['筋トレ'])
+            self.activity_manager.apply(self.other_id, april, ['ランニング', '読書'])
+            self.activity_manager.apply(self.other_id, april, ['読書'], sign=-1)
+            db.session.commit()
+
+            top = self.activity_manager.get_top(self.user_id)
+            assert [(row.item_name, row.item_count) for row in top] == [('筋トレ', 2), ('ランニング', 1)]
+
+            top = self.activity_manager.get_top()
+            assert [(row.item_name, row.item_count) for row in top] == [('ランニング', 2), ('筋トレ', 2)]
+
+            months = self.activity_manager.get_monthly('筋トレ', self.user_id)
+            assert [(row.month, row.item_count) for row in months] == [('2024-03', 1), ('2024-04', 1)]
+
+    def test_rebuild(self, app):
+        """diary_itemsからの再作成テスト"""
+        with app.app_context():
+            entry = Entry(
+                user_id=self.user_id,
+                title='Test Entry',
+                content='Test Content',
+                created_at=datetime(2024, 3, 1)
+            )
+            db.session.add(entry)
+            db.session.flush()
+            db.session.add(DiaryItem(entry_id=entry.id, item_name='筋トレ', item_content='内容'))
+            db.session.add(DiaryItem(entry_id=entry.id, item_name='読書', item_content='内容'))
+            db.session.commit()
+
+            # ユーザー別・全体それぞれ月別2行 + 全期間の合計2行
+            assert self.activity_manager.rebuild() == 8
+            db.session.commit()
+
+            months = self.activity_manager.get_monthly('読書')
+            assert [(row.month, row.item_count) for row in months] == [('2024-03', 1)]
+            top = self.activity_manager.get_top(self.user_id)
+            assert [(row.item_name, row.item_count) for row in top] == [('筋トレ', 1), ('読書', 1)]
+
+            # 非表示のユーザーは全体集計に含めない
+            db.session.get(User, self.user_id).is_visible = False
+            assert self.activity_manager.rebuild() == 4
+            db.session.commit()
+            assert self.activity_manager.get_top() == []
+            assert len(self.activity_manager.get_top(self.user_id)) == 2
+
+    def test_hidden_user_excluded_from_global(self, app):
+        """非表示のユーザーの活動項目が全体集計に含まれないテスト"""
+        with app.app_context():
+            april = datetime(2024, 4, 1)
+            self.activity_manager.apply(self.user_id, april, ['筋トレ'])
+            self.activity_manager.apply(self.other_id, april, ['秘密の活動', '筋トレ'])
+            db.session.commit()
+
+            # 非表示にすると全体集計から除かれ、ユーザー別の集計は残る
+            db.session.get(User, self.other_id).is_visible = False
+            self.activity_manager.set_user_visibility(self.other_id, False)
+            db.session.commit()
+            top = self.activity_manager.get_top()
+            assert [(row.item_name, row.item_count) for row in top] == [('筋トレ', 1)]
+            assert self.activity_manager.get_monthly('秘密の活動') == []
+            top = self.activity_manager.get_top(self.other_id)
+            assert [(row.item_name, row.item_count) for row in top] == [('秘密の活動', 1), ('筋トレ', 1)]
+
+            # 非表示の間の追加も全体集計に含めない
+            self.activity_manager.apply(self.other_id, april, ['秘密の活動'])
+            db.session.commit()
+            assert [row.item_name for row in self.activity_manager.get_top()] == ['筋トレ']
+
+            # 復元すると非表示の間の分も含めて全体集計に戻る
+            db.session.get(User, self.other_id).is_visible = True
+            self.activity_manager.set_user_visibility(self.other_id, True)
+            db.session.commit()
+            top = self.activity_manager.get_top()
+            assert [(row.item_name, row.item_count) for row in top] == [('秘密の活動', 2), ('筋トレ', 2)]
+            months = self.activity_manager.get_monthly('秘密の活動')
+            assert [(row.month, row.item_count) for row in months] == [('2024-04', 2)]
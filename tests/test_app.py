@@ -1,6 +1,8 @@
 import pytest
 from flask import session
+import gzip
 import json
+import datetime
 import sys
 import os
 
@@ -9,7 +11,11 @@ project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 sys.path.insert(0, project_root)
 
 from app import app as flask_app
-from models import User, Entry, DiaryItem
+from models import (
+    User, Entry, DiaryItem, RollupManager, ActivityManager, MetricManager, ChangeFeedManager,
+    ArchiveManager
+)
+from models.archive_manager import archived_entries, archived_items
 from database import db
 
 @pytest.fixture
@@ -163,6 +169,10 @@ def test_create_entry(client, test_user):
     assert response.status_code == 200
     data = json.loads(response.data)
     assert data['message'] == '投稿が完了しました'
+    # 一覧（view=excerpt）と同じ形のエントリーを返す
+    assert data['entry']['title'] == 'Test Entry'
+    assert data['entry']['item_count'] == 1
+    assert data['entry']['can_edit'] is True
 
 def test_get_entries(client, test_user):
     """エントリー取得のテスト"""
@@ -215,6 +225,9 @@ def test_update_entry(client, test_user):
     assert response.status_code == 200
     data = json.loads(response.data)
     assert data['message'] == '更新が完了しました'
+    assert data['entry']['id'] == entry.id
+    assert data['entry']['title'] == 'Updated Title'
+    assert data['entry']['updated_at'] is not None
 
 def test_delete_entry(client, test_user):
     """エントリー削除のテスト"""
@@ -309,3 +322,542 @@ def test_admin_toggle_visibility(client, admin_user, test_user):
     assert response.status_code == 200
     data = json.loads(response.data)
     assert '削除' in data['message'] or '復元' in data['message']
+
+def test_get_user_entries(client, test_user):
+    """ユーザー別タイムラインのキーセットページネーションテスト"""
+    base = datetime.datetime(2024, 1, 1, 9, 0, 0)
+    for i in range(12):
+        db.session.add(Entry(
+            user_id=test_user.id,
+            title=f'Entry {i}',
+            content='Test Content',
+            created_at=base + datetime.timedelta(days=i)
+        ))
+    db.session.commit()
+
+    response = client.get('/users/testuser/entries')
+    assert response.status_code == 200
+    data = json.loads(response.data)
+    assert [e['title'] for e in data['entries']] == [f'Entry {i}' for i in range(11, 1, -1)]
+    assert data['pagination']['has_next'] is True
+
+    # カーソルで次のページを取得
+    response = client.get(f"/users/testuser/entries?cursor={data['pagination']['next_cursor']}")
+    data = json.loads(response.data)
+    assert [e['title'] for e in data['entries']] == ['Entry 1', 'Entry 0']
+    assert data['pagination']['has_next'] is False
+    assert data['pagination']['next_cursor'] is None
+
+def test_get_user_entries_not_visible(client, test_user):
+    """退会済み・存在しないユーザーのタイムラインは取得できない"""
+    test_user.is_visible = False
+    db.session.commit()
+
+    response = client.get('/users/testuser/entries')
+    assert response.status_code == 404
+    response = client.get('/users/nobody/entries')
+    assert response.status_code == 404
+
+def test_get_user_entries_invalid_cursor(client, test_user):
+    """不正なカーソルのテスト"""
+    response = client.get('/users/testuser/entries?cursor=invalid')
+    assert response.status_code == 400
+
+def test_get_entries_date_filters(client, test_user):
+    """期間指定・日付ジャンプのテスト"""
+    for day in range(1, 6):
+        db.session.add(Entry(
+            user_id=test_user.id,
+            title=f'March {day}',
+            content='Test Content',
+            created_at=datetime.datetime(2024, 3, day, 12, 0, 0)
+        ))
+    db.session.commit()
+
+    # 期間指定
+    response = client.get('/entries?from=2024-03-02&to=2024-03-04')
+    assert response.status_code == 200
+    data = json.loads(response.data)
+    assert [e['title'] for e in data['entries']] == ['March 4', 'March 3', 'March 2']
+    assert data['pagination']['total_entries'] == 3
+
+    # 日付ジャンプはカーソル付きで返る
+    response = client.get('/entries?jump=2024-03-03')
+    data = json.loads(response.data)
+    assert [e['title'] for e in data['entries']] == ['March 3', 'March 2', 'March 1']
+    assert data['pagination']['has_next'] is False
+
+def test_get_entries_invalid_date(client):
+    """不正な日付指定のテスト"""
+    response = client.get('/entries?jump=2024/03/03')
+    assert response.status_code == 400
+
+def test_get_user_activity(client, test_user):
+    """活動ヒートマップ・月別アーカイブのテスト"""
+    manager = RollupManager()
+    manager.apply(test_user.id, datetime.date(2024, 3, 1), entries=2, items=3)
+    manager.apply(test_user.id, datetime.date(2024, 4, 10), entries=1)
+    manager.apply(test_user.id, datetime.date(2023, 12, 31), entries=1)
+    db.session.commit()
+
+    response = client.get('/users/testuser/activity?year=2024')
+    assert response.status_code == 200
+    data = json.loads(response.data)
+    assert data['days'] == [
+        {'date': '2024-03-01', 'entry_count': 2, 'item_count': 3},
+        {'date': '2024-04-10', 'entry_count': 1, 'item_count': 0}
+    ]
+
+    response = client.get('/users/testuser/archive')
+    data = json.loads(response.data)
+    assert [m['month'] for m in data['months']] == ['2024-04', '2024-03', '2023-12']
+
+def test_get_entries_activity_filter(client, test_user):
+    """活動項目によるエントリーの絞り込みテスト"""
+    for title, item_name in [('Gym', '筋トレ'), ('Run', 'ランニング')]:
+        entry = Entry(user_id=test_user.id, title=title, content='Test Content')
+        db.session.add(entry)
+        db.session.flush()
+        db.session.add(DiaryItem(entry_id=entry.id, item_name=item_name, item_content='内容'))
+    db.session.commit()
+
+    response = client.get('/entries?activity=筋トレ')
+    data = json.loads(response.data)
+    assert [e['title'] for e in data['entries']] == ['Gym']
+
+    response = client.get('/users/testuser/entries?activity=ランニング')
+    data = json.loads(response.data)
+    assert [e['title'] for e in data['entries']] == ['Run']
+
+def test_get_top_activities(client, test_user):
+    """活動項目ランキング・月別推移のテスト"""
+    manager = ActivityManager()
+    manager.apply(test_user.id, datetime.datetime(2024, 3, 1), ['筋トレ', '読書'])
+    manager.apply(test_user.id, datetime.datetime(2024, 4, 1), ['筋トレ'])
+    db.session.commit()
+
+    response = client.get('/activities')
+    data = json.loads(response.data)
+    assert data['activities'][0] == {'item_name': '筋トレ', 'count': 2}
+
+    response = client.get('/users/testuser/activities?limit=1')
+    data = json.loads(response.data)
+    assert data['activities'] == [{'item_name': '筋トレ', 'count': 2}]
+
+    # 件数の下限（LIMIT -1 は無制限になるため受け付けない）
+    assert client.get('/activities?limit=-1').status_code == 400
+    assert client.get('/activities?limit=0').status_code == 400
+    assert client.get('/users/testuser/activities?limit=-1').status_code == 400
+
+    response = client.get('/activities/筋トレ/frequency?userid=testuser')
+    data = json.loads(response.data)
+    assert data['months'] == [{'month': '2024-03', 'count': 1}, {'month': '2024-04', 'count': 1}]
+
+def test_get_user_metric_series(client, test_user):
+    """数値の時系列・統計のテスト"""
+    manager = MetricManager()
+    for day, weight in [(1, '75kg'), (2, '74kg'), (3, '73kg')]:
+        entry = Entry(
+            user_id=test_user.id,
+            title='Test Entry',
+            content='Test Content',
+            notes=f'体重：{weight}',
+            created_at=datetime.datetime(2024, 3, day)
+        )
+        db.session.add(entry)
+        db.session.flush()
+        manager.replace_entry_metrics(entry, [])
+    db.session.commit()
+
+    response = client.get('/users/testuser/metrics')
+    data = json.loads(response.data)
+    assert data['metrics'] == [{'key': '体重', 'unit': 'kg', 'count': 3}]
+
+    response = client.get('/users/testuser/metrics/series?key=体重&unit=kg&window=2')
+    assert response.status_code == 200
+    data = json.loads(response.data)
+    assert [p['rolling_avg'] for p in data['points']] == [75.0, 74.5, 73.5]
+    assert data['stats']['min'] == 73.0
+    assert data['stats']['longest_streak'] == 3
+
+    response = client.get('/users/testuser/metrics/series')
+    assert response.status_code == 400
+
+def test_validate_entry_payload():
+    """一括投稿用の入力検証のテスト"""
+    from app import validate_entry_payload
+    assert validate_entry_payload({'title': 'T', 'content': 'C'}) is None
+    assert validate_entry_payload({
+        'title': 'T', 'content': 'C',
+        'items': [{'item_name': '筋トレ', 'item_content': 'スクワット'}]
+    }) is None
+    assert validate_entry_payload({'title': '', 'content': 'C'}) == 'タイトルが空です'
+    assert validate_entry_payload({'title': 'T', 'content': ' '}) == '内容が空です'
+    assert validate_entry_payload({
+        'title': 'T', 'content': 'C', 'items': [{'item_name': '', 'item_content': 'x'}]
+    }) == '活動項目名が正しくありません'
+    assert validate_entry_payload(['not', 'a', 'dict']) == '投稿データの形式が正しくありません'
+
+def test_add_entries_batch_requires_login(client):
+    """未ログイン時の一括投稿のテスト"""
+    response = client.post('/entries/batch', json={'entries': [{'title': 'T', 'content': 'C'}]})
+    assert response.status_code == 302
+    assert db.session.query(Entry).count() == 0
+
+def test_get_entry_changes(client, test_user):
+    """差分同期の変更フィードのテスト"""
+    entries = [
+        Entry(user_id=test_user.id, title=f'Entry {i}', content='Test Content')
+        for i in range(3)
+    ]
+    db.session.add_all(entries)
+    db.session.flush()
+    ChangeFeedManager().record(entries)
+    db.session.commit()
+
+    response = client.get('/entries/changes?limit=2')
+    assert response.status_code == 200
+    data = json.loads(response.data)
+    assert [c['entry']['title'] for c in data['changes']] == ['Entry 0', 'Entry 1']
+    assert data['has_more'] is True
+
+    # 続きの取得時は前回の通番以降の変更だけが返る
+    since = data['next_since']
+    entry_ids = [entry.id for entry in entries]
+    db.session.delete(entries[0])
+    ChangeFeedManager().record([entries[0]], ChangeFeedManager.DELETE)
+    db.session.commit()
+
+    response = client.get(f'/entries/changes?since={since}')
+    data = json.loads(response.data)
+    assert [(c['op'], c['id']) for c in data['changes']] == [
+        ('upsert', entry_ids[2]), ('delete', entry_ids[0])
+    ]
+    assert data['has_more'] is False
+
+    # 変更がなければ通番はそのまま
+    since = data['next_since']
+    data = json.loads(client.get(f'/entries/changes?since={since}').data)
+    assert data['changes'] == []
+    assert data['next_since'] == since
+
+def test_get_entry_changes_hidden_user(client, test_user):
+    """退会済みユーザーのエントリーは墓標として返る"""
+    entry = Entry(user_id=test_user.id, title='Entry', content='Test Content')
+    db.session.add(entry)
+    db.session.flush()
+    ChangeFeedManager().record([entry])
+    db.session.commit()
+
+    test_user.is_visible = False
+    ChangeFeedManager().record_user(test_user.id)
+    db.session.commit()
+
+    data = json.loads(client.get('/entries/changes').data)
+    assert data['changes'] == [{'seq': data['next_since'], 'id': entry.id, 'op': 'delete', 'entry': None}]
+
+def test_get_entry_changes_invalid(client):
+    """不正なパラメータのテスト"""
+    assert client.get('/entries/changes?since=-1').status_code == 400
+    assert client.get('/entries/changes?limit=0').status_code == 400
+
+def test_stream_entries(client, test_user):
+    """ライブフィードのSSE接続テスト"""
+    from app import live_feed
+    response = client.get('/entries/stream')
+    assert response.status_code == 200
+    assert response.mimetype == 'text/event-stream'
+    assert response.headers['Cache-Control'] == 'no-cache'
+
+    first = next(response.response)
+    first = first.decode('utf-8') if isinstance(first, bytes) else first
+    assert first.startswith('retry: 3000\nevent: ready\n')
+    assert len(live_feed.subscribers) == 1
+
+    # 切断すると購読が解除される
+    response.close()
+    assert len(live_feed.subscribers) == 0
+
+def test_get_entries_with_archive(client, test_user):
+    """アーカイブ済みのエントリーへのページングのテスト"""
+    base = datetime.datetime(2024, 1, 1, 9, 0, 0)
+    for i in range(15):
+        db.session.add(Entry(
+            user_id=test_user.id,
+            title=f'Entry {i}',
+            content='Test Content',
+            created_at=base + datetime.timedelta(days=i)
+        ))
+    db.session.commit()
+    try:
+        assert ArchiveManager().archive_batch(base + datetime.timedelta(days=8)) == 8
+        db.session.commit()
+
+        # ページ番号指定：2ページ目はホットの残りとアーカイブで構成される
+        data = json.loads(client.get('/entries?page=2').data)
+        assert data['pagination']['total_entries'] == 15
+        assert [e['title'] for e in data['entries']] == ['Entry 4', 'Entry 3', 'Entry 2', 'Entry 1', 'Entry 0']
+
+        # カーソル指定：ホットを読み切るとアーカイブに続く
+        data = json.loads(client.get('/entries?page=1').data)
+        data = json.loads(client.get(f"/entries?cursor={data['pagination']['next_cursor']}").data)
+        assert [e['title'] for e in data['entries']] == ['Entry 4', 'Entry 3', 'Entry 2', 'Entry 1', 'Entry 0']
+        assert data['pagination']['has_next'] is False
+
+        data = json.loads(client.get('/users/testuser/entries').data)
+        data = json.loads(client.get(
+            f"/users/testuser/entries?cursor={data['pagination']['next_cursor']}"
+        ).data)
+        assert [e['title'] for e in data['entries']][-1] == 'Entry 0'
+
+        # 差分同期ではアーカイブ済みのエントリーも削除扱いにならない
+        ChangeFeedManager().rebuild()
+        db.session.commit()
+        data = json.loads(client.get('/entries/changes').data)
+        assert {c['op'] for c in data['changes']} == {'upsert'}
+        assert len(data['changes']) == 15
+    finally:
+        db.session.execute(archived_items.delete())
+        db.session.execute(archived_entries.delete())
+        db.session.commit()
+
+def test_get_entries_excerpt_view(client, test_user):
+    """抜粋のみの一覧のテスト"""
+    entry = Entry(user_id=test_user.id, title='Long', content='本文\n' * 200, notes='メモ',
+                  created_at=datetime.datetime(2024, 1, 1))
+    db.session.add(entry)
+    db.session.flush()
+    for name in ('読書', '散歩'):
+        db.session.add(DiaryItem(entry_id=entry.id, item_name=name, item_content='30分'))
+    db.session.commit()
+
+    data = json.loads(client.get('/entries?view=excerpt').data)
+    summary = data['entries'][0]
+    assert summary['excerpt'] == ('本文 ' * 40)[:120]
+    assert summary['item_count'] == 2
+    assert 'content' not in summary and 'notes' not in summary and 'items' not in summary
+
+    data = json.loads(client.get('/users/testuser/entries?view=excerpt').data)
+    assert data['entries'][0]['item_count'] == 2
+
+def test_get_entry(client, test_user):
+    """単一エントリーの全文取得とETagによる再検証のテスト"""
+    entry = Entry(user_id=test_user.id, title='Detail', content='Full Content', notes='メモ',
+                  created_at=datetime.datetime(2024, 1, 1))
+    db.session.add(entry)
+    db.session.flush()
+    db.session.add(DiaryItem(entry_id=entry.id, item_name='読書', item_content='30分'))
+    db.session.commit()
+    entry_id = entry.id
+
+    response = client.get(f'/entries/{entry_id}')
+    assert response.status_code == 200
+    data = json.loads(response.data)
+    assert data['content'] == 'Full Content'
+    assert data['items'] == [{'item_name': '読書', 'item_content': '30分'}]
+    assert data['can_edit'] is False
+    etag = response.headers['ETag']
+    assert response.headers['Cache-Control'] == 'private, no-cache'
+
+    response = client.get(f'/entries/{entry_id}', headers={'If-None-Match': etag})
+    assert response.status_code == 304
+    assert response.headers['ETag'] == etag
+
+    # 更新するとETagが変わる
+    entry.update(title='Updated')
+    db.session.commit()
+    response = client.get(f'/entries/{entry_id}', headers={'If-None-Match': etag})
+    assert response.status_code == 200
+    assert response.headers['ETag'] != etag
+
+    assert client.get('/entries/9999').status_code == 404
+    test_user.is_visible = False
+    db.session.commit()
+    assert client.get(f'/entries/{entry_id}').status_code == 404
+
+def test_index_initial_feed(client, test_user):
+    """ホーム画面に埋め込む最初のページが GET /entries?view=excerpt と同じ内容であるテスト"""
+    for i in range(12):
+        db.session.add(Entry(user_id=test_user.id, title=f'Entry {i}', content=f'Content {i}',
+                             created_at=datetime.datetime(2024, 1, 1) + datetime.timedelta(days=i)))
+    db.session.commit()
+
+    with flask_app.test_request_context('/'):
+        from flask import render_template
+        from app import entries_page_data, visible_entries_query, EXCERPT_PROJECTION
+        initial_feed = entries_page_data(visible_entries_query(), 1, EXCERPT_PROJECTION,
+                                         {'visible_only': True})
+        html = render_template('index.html', initial_feed=initial_feed)
+    start = html.index('<script id="initialFeed" type="application/json">')
+    embedded = html[html.index('>', start) + 1:html.index('</script>', start)]
+    assert json.loads(embedded) == json.loads(client.get('/entries?view=excerpt').data)
+    assert len(json.loads(embedded)['entries']) == 10
+
+    # 埋め込みのない画面では従来どおり script.js が一覧を取得する
+    with flask_app.test_request_context('/'):
+        from flask import render_template
+        assert 'initialFeed' not in render_template('index.html')
+
+def test_listed_entry(client, test_user):
+    """投稿・更新の応答のエントリーが一覧（view=excerpt）の要素と同じであるテスト"""
+    entry = Entry(user_id=test_user.id, title='Entry', content='Content  with\n spaces')
+    db.session.add(entry)
+    db.session.flush()
+    db.session.add(DiaryItem(entry_id=entry.id, item_name='読書', item_content='1時間'))
+    db.session.commit()
+
+    with flask_app.test_request_context():
+        from app import listed_entry
+        listed = json.loads(flask_app.json.dumps(listed_entry(entry.id)))
+    assert listed == json.loads(client.get('/entries?view=excerpt').data)['entries'][0]
+    assert listed['excerpt'] == 'Content with spaces'
+    assert listed['item_count'] == 1
+
+@pytest.mark.slow
+def test_first_entry_benchmark():
+    """最初のエントリーの表示までの時間のベンチマーク（アプリを一時DBで読み込むため別プロセスで実行）"""
+    import subprocess
+    root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+    result = subprocess.run(
+        [sys.executable, '-m', 'benchmarks.first_entry', '--entries', '100', '--repeat', '3'],
+        cwd=root, capture_output=True, text=True, check=True
+    )
+    print(result.stdout)
+    assert '1 request' in result.stdout
+
+def test_compressed_responses(client, test_user):
+    """JSON・静的ファイルのgzip圧縮と、圧縮したエントリーのETagによる再検証のテスト"""
+    entry = Entry(user_id=test_user.id, title='Long', content='今日の出来事\n' * 200,
+                  created_at=datetime.datetime(2024, 1, 1))
+    db.session.add(entry)
+    db.session.commit()
+    headers = {'Accept-Encoding': 'gzip'}
+
+    response = client.get(f'/entries/{entry.id}', headers=headers)
+    assert response.headers['Content-Encoding'] == 'gzip'
+    assert json.loads(gzip.decompress(response.data))['title'] == 'Long'
+    etag = response.headers['ETag']
+    assert etag.startswith('W/')
+    response = client.get(f'/entries/{entry.id}', headers={**headers, 'If-None-Match': etag})
+    assert response.status_code == 304
+
+    response = client.get('/static/main.css', headers=headers)
+    assert response.headers['Content-Encoding'] == 'gzip'
+    assert gzip.decompress(response.data) == client.get('/static/main.css').data
+
+    # CSRFトークンを含むHTMLは圧縮しない
+    assert 'Content-Encoding' not in client.get('/login', headers=headers).headers
+
+def test_assets(client, tmp_path, monkeypatch):
+    """ビルド済みの静的ファイルが圧縮済みファイル・immutableで配信されるテスト"""
+    from app import asset_manifest
+    from assets import AssetBuilder
+
+    # 未ビルドの場合は元のファイルを結合して返す
+    response = client.get('/assets/admin.css')
+    assert response.status_code == 200
+    assert response.headers['Cache-Control'] == 'no-cache'
+    source = AssetBuilder(flask_app.static_folder, flask_app.config['ASSET_DIR']).source('admin.css')
+    assert response.get_data(as_text=True) == source
+    assert b'/assets/common.css' in client.get('/login').data
+
+    directory = str(tmp_path / 'dist')
+    monkeypatch.setitem(flask_app.config, 'ASSET_DIR', directory)
+    monkeypatch.setattr(asset_manifest, 'directory', directory)
+    manifest = AssetBuilder(flask_app.static_folder, directory).build()
+    asset_manifest.load()
+    try:
+        filename = manifest['common.css']
+        assert f'/assets/{filename}'.encode() in client.get('/login').data
+
+        response = client.get(f'/assets/{filename}', headers={'Accept-Encoding': 'gzip'})
+        assert response.status_code == 200
+        assert response.headers['Content-Encoding'] == 'gzip'
+        assert response.mimetype == 'text/css'
+        assert 'immutable' in response.headers['Cache-Control']
+        assert 'Accept-Encoding' in response.headers['Vary']
+        plain = client.get(f'/assets/{filename}')
+        assert 'Content-Encoding' not in plain.headers
+        assert gzip.decompress(response.data) == plain.data
+        response.close()
+        plain.close()
+
+        assert client.get('/assets/missing.css').status_code == 404
+    finally:
+        monkeypatch.undo()
+        asset_manifest.load()
+
+def test_get_entries_fieldsets(client, test_user):
+    """fields= / include= による項目の選択テスト"""
+    base = datetime.datetime(2024, 1, 1, 9, 0, 0)
+    long_content = '長い本文\n' * 1000
+    for i in range(12):
+        entry = Entry(user_id=test_user.id, title=f'Entry {i}',
+                      content=long_content if i == 11 else 'Test Content',
+                      created_at=base + datetime.timedelta(days=i))
+        db.session.add(entry)
+        db.session.flush()
+        db.session.add(DiaryItem(entry_id=entry.id, item_name='読書', item_content=f'{i}ページ'))
+    db.session.commit()
+
+    data = json.loads(client.get('/entries?fields=id,title').data)
+    assert set(data['entries'][0]) == {'id', 'title'}
+    assert data['pagination']['total_entries'] == 12
+
+    # 大きな本文は本文テーブルから展開され、活動項目も指定時のみ含まれる
+    data = json.loads(client.get('/entries?fields=title,content,can_edit&include=items').data)
+    latest = data['entries'][0]
+    assert latest['content'] == long_content
+    assert latest['can_edit'] is False
+    assert latest['items'] == [{'item_name': '読書', 'item_content': '11ページ'}]
+
+    data = json.loads(client.get('/entries?include=item_count').data)
+    assert data['entries'][0]['item_count'] == 1
+    assert 'items' not in data['entries'][0] and 'author_name' in data['entries'][0]
+
+    # カーソル指定・ユーザー別タイムラインでも同じ項目を返す
+    cursor = data['pagination']['next_cursor']
+    data = json.loads(client.get(f'/entries?cursor={cursor}&fields=title').data)
+    assert [e['title'] for e in data['entries']] == ['Entry 1', 'Entry 0']
+    data = json.loads(client.get('/users/testuser/entries?fields=author_userid').data)
+    assert data['entries'][0] == {'author_userid': 'testuser'}
+
+    assert client.get('/entries?fields=title,password').status_code == 400
+    assert client.get('/entries?include=comments').status_code == 400
+    assert client.get('/users/testuser/entries?fields=').status_code == 400
+
+def test_get_entries_fieldsets_with_archive(client, test_user):
+    """アーカイブ済みのエントリーにも項目の選択が適用されるテスト"""
+    base = datetime.datetime(2024, 1, 1, 9, 0, 0)
+    for i in range(3):
+        entry = Entry(user_id=test_user.id, title=f'Entry {i}', content=f'Content {i}',
+                      created_at=base + datetime.timedelta(days=i))
+        db.session.add(entry)
+        db.session.flush()
+        db.session.add(DiaryItem(entry_id=entry.id, item_name='散歩', item_content='20分'))
+    db.session.commit()
+    try:
+        assert ArchiveManager().archive_batch(base + datetime.timedelta(days=1)) == 1
+        db.session.commit()
+
+        data = json.loads(client.get('/entries?fields=title,content&include=items,item_count').data)
+        assert data['entries'][-1] == {
+            'title': 'Entry 0', 'content': 'Content 0',
+            'items': [{'item_name': '散歩', 'item_content': '20分'}], 'item_count': 1
+        }
+        assert json.loads(client.get('/entries?view=excerpt').data)['entries'][-1]['item_count'] == 1
+
+        with flask_app.test_request_context():
+            from app import entries_count_column
+            counts = db.session.execute(
+                db.select(User.userid, entries_count_column())
+            ).all()
+        assert counts == [('testuser', 3)]
+    finally:
+        db.session.execute(archived_items.delete())
+        db.session.execute(archived_entries.delete())
+        db.session.commit()
+
+def test_admin_get_users_requires_admin(client):
+    """ユーザー一覧は管理者以外は取得できない"""
+    assert client.get('/api/admin/users?fields=userid').status_code == 403
@@ -0,0 +1,116 @@
+import pytest
+from datetime import datetime
+from sqlalchemy import create_engine, select, func
+from sqlalchemy.orm import Session
+from models.user import User
+from models.entry import Entry
+from models.diary_item import DiaryItem
+from models.entry_metric import EntryMetric
+from models.activity_rollup import ActivityRollup
+from models.archive_manager import ArchiveManager, archived_entries, archived_items
+from models.rollup_manager import RollupManager
+from models.metric_manager import MetricManager
+from models.change_feed_manager import ChangeFeedManager
+from database import db, attach_archive
+
+class TestArchiveManager:
+    @pytest.fixture(autouse=True)
+    def setup_session(self, tmp_path):
+        """アーカイブDBをATTACHしたエンジンでテストデータを作成"""
+        self.engine = create_engine(f'sqlite:///{tmp_path / "diary.db"}')
+        attach_archive(self.engine, str(tmp_path / 'archive.db'))
+        db.metadata.create_all(self.engine)
+        self.session = Session(self.engine)
+
+        user = User(userid='archive', name='Archive', password='Archive123')
+        self.session.add(user)
+        self.session.flush()
+        self.user_id = user.id
+        for day in range(1, 6):
+            entry = Entry(user_id=user.id, title=f'Entry {day}', content='Test Content',
+                          notes=f'体重：{70 + day}kg', created_at=datetime(2024, 1, day))
+            self.session.add(entry)
+            self.session.flush()
+            self.session.add(DiaryItem(entry_id=entry.id, item_name='読書' if day % 2 else '散歩',
+                                       item_content='30分', created_at=datetime(2024, 1, day)))
+        self.session.flush()
+        self.entry_ids = self.session.execute(select(Entry.id).order_by(Entry.id)).scalars().all()
+        self.session.expunge_all()
+        MetricManager(self.session).backfill()
+        ChangeFeedManager(self.session).rebuild()
+        self.session.commit()
+        self.archive_manager = ArchiveManager(self.session)
+        yield
+        self.session.close()
+        self.engine.dispose()
+
+    def test_archive_batch(self):
+        """古いエントリーと活動項目がアーカイブに移動するテスト"""
+        assert self.archive_manager.is_attached()
+        assert self.archive_manager.archive_batch(datetime(2024, 1, 4), limit=2) == 2
+        assert self.archive_manager.archive_batch(datetime(2024, 1, 4), limit=2) == 1
+        assert self.archive_manager.archive_batch(datetime(2024, 1, 4)) == 0
+        self.session.commit()
+
+        assert self.session.execute(select(Entry.id).order_by(Entry.id)).scalars().all() == self.entry_ids[3:]
+        assert self.session.execute(select(func.count()).select_from(DiaryItem)).scalar() == 2
+        assert self.session.execute(select(func.count()).select_from(archived_items)).scalar() == 3
+        assert self.archive_manager.count() == 3
+
+    def test_archive_keeps_latest_id(self):
+        """最大IDのエントリーはIDの再利用を防ぐためホットに残る"""
+        self.session.execute(
+            Entry.__table__.update().values(sort_ts=datetime(2023, 1, 1))
+        )
+        assert self.archive_manager.archive_batch(datetime(2024, 1, 1)) == 4
+        self.session.commit()
+        assert self.session.execute(select(Entry.id)).scalars().all() == [self.entry_ids[-1]]
+
+    def test_get_page(self):
+        """アーカイブからのキーセットページネーションと検索条件のテスト"""
+        self.archive_manager.archive_batch(datetime(2024, 1, 6))
+        self.session.commit()
+
+        entries = self.archive_manager.get_page(2)
+        assert [entry.title for entry in entries] == ['Entry 4', 'Entry 3']
+        assert entries[0].user.userid == 'archive'
+        assert [item.item_name for item in entries[0].items] == ['散歩']
+
+        cursor = (entries[-1].sort_ts, entries[-1].id)
+        assert [e.title for e in self.archive_manager.get_page(5, cursor)] == ['Entry 2', 'Entry 1']
+        assert [e.title for e in self.archive_manager.get_page(5, activity='読書')] == ['Entry 3', 'Entry 1']
+        assert [e.title for e in self.archive_manager.get_page(5, offset=3)] == ['Entry 1']
+        assert self.archive_manager.get_page(5, user_id=self.user_id + 1) == []
+        assert self.archive_manager.count(start=datetime(2024, 1, 2), end=datetime(2024, 1, 4)) == 2
+
+        self.session.execute(User.__table__.update().values(is_visible=False))
+        assert self.archive_manager.get_page(5, visible_only=True) == []
+
+    def test_restore_entries(self):
+        """アーカイブのエントリーをホットに戻すテスト"""
+        self.archive_manager.archive_batch(datetime(2024, 1, 6))
+        assert self.archive_manager.restore_entries([self.entry_ids[0], 999]) == 1
+        self.session.commit()
+
+        entry = self.session.get(Entry, self.entry_ids[0])
+        assert entry.title == 'Entry 1'
+        assert [item.item_name for item in entry.items] == ['読書']
+        assert self.archive_manager.get_entries([self.entry_ids[0]]) == []
+
+    def test_rebuild_includes_archive(self):
+        """集計の再作成・孤立データの削除がアーカイブ済みのエントリーを考慮するテスト"""
+        self.archive_manager.archive_batch(datetime(2024, 1, 4))
+        self.session.commit()
+
+        assert RollupManager(self.session).rebuild() == 5
+        counts = self.session.execute(
+            select(func.sum(ActivityRollup.entry_count), func.sum(ActivityRollup.item_count))
+        ).one()
+        assert tuple(counts) == (5, 5)
+
+        MetricManager(self.session).delete_orphans()
+        assert self.session.execute(select(func.count()).select_from(EntryMetric)).scalar() == 5
+
+        latest = ChangeFeedManager(self.session).latest_seq()
+        ChangeFeedManager(self.session).record_orphans()
+        assert ChangeFeedManager(self.session).get_changes(latest) == []
@@ -0,0 +1,103 @@
+import gzip
+import json
+import os
+import pytest
+from assets import AssetBuilder, AssetManifest, minify_css, minify_js, MANIFEST
+
+class TestMinify:
+    def test_minify_css(self):
+        """コメント・空白・最後のセミコロンが削除され、文字列と意味のある空白は残るテスト"""
+        source = """/* 共通 */
+body {
+    font-family: 'Helvetica Neue', Arial;
+    margin: 0 auto;
+}
+.nav a :hover { content: "a  b"; }
+@media (max-width: 600px) and (min-width: 100px) {
+    .a > .b { width: calc(100% - 10px); }
+}
+"""
+        assert minify_css(source) == (
+            "body{font-family:'Helvetica Neue',Arial;margin:0 auto}"
+            '.nav a :hover{content:"a  b"}'
+            '@media (max-width:600px) and (min-width:100px){.a>.b{width:calc(100% - 10px)}}'
+        )
+
+    def test_minify_js(self):
+        """コメントと不要な空白が削除され、文字列・テンプレートリテラル・正規表現は残るテスト"""
+        source = """// 先頭のコメント
+const a = 1; /* 途中の
+コメント */
+function f(x) {
+    return x
+        .replace(/\\/\\/ a/g, '//  b')
+        .replace(/[/]/g, "/* c */");
+}
+const html = `
+    <p>${ items.map(item => `<li>${ item }</li>`).join('') }</p>
+`;
+let b = a - -1, c = a / 2 / 1;
+"""
+        assert minify_js(source) == """const a=1;
+function f(x){
+return x
+.replace(/\\/\\/ a/g,'//  b')
+.replace(/[/]/g,"/* c */");
+}
+const html=`
+    <p>${items.map(item=>`<li>${item}</li>`).join('')}</p>
+`;
+let b=a- -1,c=a/2/1;
+"""
+
+    def test_minify_errors(self):
+        """閉じていない文字列・コメントはエラーになるテスト"""
+        with pytest.raises(ValueError):
+            minify_js("const a = 'abc;\n")
+        with pytest.raises(ValueError):
+            minify_css('body { /* a }')
+
+class TestAssetBuilder:
+    @pytest.fixture(autouse=True)
+    def setup_files(self, tmp_path):
+        """元のファイルとビルド先を作成"""
+        self.static_dir = tmp_path / 'static'
+        self.static_dir.mkdir()
+        (self.static_dir / 'a.css').write_text('body {\n    margin: 0;\n}\n', encoding='utf-8')
+        (self.static_dir / 'b.css').write_text('.b { color: red; }\n', encoding='utf-8')
+        (self.static_dir / 'app.js').write_text('// app\nconst a = 1;\n', encoding='utf-8')
+        self.output_dir = str(tmp_path / 'dist')
+        self.builder = AssetBuilder(str(self.static_dir), self.output_dir, {
+            'page.css': ['a.css', 'b.css'], 'page.js': ['app.js']
+        })
+
+    def test_build(self):
+        """ハッシュ付きのファイル・圧縮済みファイル・マニフェストが作成されるテスト"""
+        manifest = self.builder.build()
+        css = manifest['page.css']
+        assert css.startswith('page.') and css.endswith('.css')
+        with open(os.path.join(self.output_dir, css), encoding='utf-8') as f:
+            assert f.read() == 'body{margin:0}.b{color:red}'
+        with open(os.path.join(self.output_dir, css + '.gz'), 'rb') as f:
+            assert gzip.decompress(f.read()) == b'body{margin:0}.b{color:red}'
+        with open(os.path.join(self.output_dir, MANIFEST), encoding='utf-8') as f:
+            assert json.load(f) == manifest
+
+        loaded = AssetManifest(self.output_dir)
+        assert loaded.get('page.js') == manifest['page.js']
+        assert loaded.is_built(css) and not loaded.is_built('page.css')
+
+    def test_rebuild(self):
+        """内容が変わるとファイル名が変わり、古いファイルが削除されるテスト"""
+        old = self.builder.build()['page.css']
+        assert self.builder.build()['page.css'] == old
+        (self.static_dir / 'b.css').write_text('.b { color: blue; }\n', encoding='utf-8')
+        new = self.builder.build()['page.css']
+        assert new != old
+        assert not os.path.exists(os.path.join(self.output_dir, old))
+        assert not os.path.exists(os.path.join(self.output_dir, old + '.gz'))
+
+    def test_unbuilt(self):
+        """未ビルドの場合はマニフェストが空で、元のファイルを結合できるテスト"""
+        assert AssetManifest(self.output_dir).get('page.css') is None
+        assert self.builder.source('page.css') == 'body {\n    margin: 0;\n}\n\n.b { color: red; }\n'
@@ -0,0 +1,98 @@
+from datetime import datetime
+from models.user import User
+from models.entry import Entry
+from models.diary_item import DiaryItem
+from models.entry_change import EntryChange
+from models.change_feed_manager import ChangeFeedManager
+from database import db
+
+class TestChangeFeedManager:
+    def setup_method(self):
+        """各テストメソッドの前にデータベースをクリアし、テストユーザーを作成"""
+        self.change_feed_manager = ChangeFeedManager()
+        with db.session() as session:
+            session.query(EntryChange).delete()
+            session.query(DiaryItem).delete()
+            session.query(Entry).delete()
+            session.commit()
+
+            self.user = User(
+                userid='test_user',
+                name='Test User',
+                password='TestPass123',
+                created_at=datetime.now()
+            )
+            session.add(self.user)
+            session.commit()
+            self.user_id = self.user.id
+
+    def teardown_method(self):
+        """各テストメソッドの後にデータベースをクリア"""
+        with db.session() as session:
+            session.query(EntryChange).delete()
+            session.query(DiaryItem).delete()
+            session.query(Entry).delete()
+            session.query(User).delete()
+            session.commit()
+
+    def create_entries(self, count):
+        entries = [
+            Entry(user_id=self.user_id, title=f'Entry {i}', content='Test Content',
+                  created_at=datetime(2024, 3, i + 1))
+            for i in range(count)
+        ]
+        db.session.add_all(entries)
+        db.session.flush()
+        return entries
+
+    def test_record_keeps_latest_change(self, app):
+        """同じエントリーの変更は最新の通番だけが残る"""
+        with app.app_context():
+            first, second = self.create_entries(2)
+            self.change_feed_manager.record([first, second])
+            self.change_feed_manager.record([first])
+            db.session.commit()
+
+            changes = self.change_feed_manager.get_changes()
+            assert [(c.entry_id, c.op) for c in changes] == [(second.id, 'upsert'), (first.id, 'upsert')]
+            assert self.change_feed_manager.latest_seq() == changes[-1].seq
+
+            # 通番以降の変更だけを取得できる
+            since = changes[0].seq
+            assert [c.entry_id for c in self.change_feed_manager.get_changes(since)] == [first.id]
+            assert self.change_feed_manager.get_changes(since, limit=0) == []
+
+    def test_record_orphans(self, app):
+        """一括削除されたエントリーの墓標の記録テスト"""
+        with app.app_context():
+            entries = self.create_entries(3)
+            self.change_feed_manager.record(entries)
+            db.session.commit()
+            entry_ids = [entry.id for entry in entries]
+            latest = self.change_feed_manager.latest_seq()
+
+            db.session.query(Entry).filter(Entry.id != entry_ids[1]).delete()
+            self.change_feed_manager.record_orphans()
+            db.session.commit()
+
+            changes = self.change_feed_manager.get_changes(latest)
+            assert [(c.entry_id, c.op) for c in changes] == [
+                (entry_ids[0], 'delete'), (entry_ids[2], 'delete')
+            ]
+
+    def test_rebuild(self, app):
+        """墓標を残したまま変更通番を記録し直すテスト"""
+        with app.app_context():
+            entries = self.create_entries(3)
+            entry_ids = [entry.id for entry in entries]
+            db.session.delete(entries[2])
+            self.change_feed_manager.record([entries[2]], ChangeFeedManager.DELETE)
+            db.session.commit()
+
+            assert self.change_feed_manager.rebuild() == 2
+            db.session.commit()
+
+            changes = self.change_feed_manager.get_changes()
+            assert [(c.entry_id, c.op) for c in changes] == [
+                (entry_ids[2], 'delete'), (entry_ids[0], 'upsert'), (entry_ids[1], 'upsert')
+            ]
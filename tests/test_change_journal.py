@@ -0,0 +1,353 @@
+import os
+import shutil
+import sqlite3
+import time
+from datetime import datetime
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from change_journal import (
+    ChangeJournal, attach_journal, read_records, replay, reconcile_archive, segment_paths
+)
+from models.user import User
+from models.entry import Entry
+from models.diary_item import DiaryItem
+from models.archive_manager import ArchiveManager
+from manage_test_data.inserter import DataInserter
+from database import db, attach_archive
+
+class TestChangeJournal:
+    def setup_method(self):
+        """各テストメソッドの前にジャーナル一覧を初期化"""
+        self.journals = []
+
+    def teardown_method(self):
+        """各テストメソッドの後にジャーナルを終了"""
+        for journal in self.journals:
+            journal.close()
+
+    def open_journal(self, tmp_path, **kwargs):
+        journal = ChangeJournal(
+            str(tmp_path / 'journal'), archive_dir=str(tmp_path / 'archive'), **kwargs
+        )
+        self.journals.append(journal)
+        return journal
+
+    def test_append_and_rotate(self, tmp_path):
+        """追記・セグメントの切り替えとアーカイブのテスト"""
+        journal = self.open_journal(tmp_path, segment_bytes=200)
+        for i in range(10):
+            journal.append([{'table': 'entries', 'op': 'delete', 'row': {'id': i}}])
+        journal.close()
+
+        archived = os.listdir(tmp_path / 'archive')
+        assert len(archived) > 1
+        assert all(name.endswith('.jsonl.gz') for name in archived)
+
+        records = list(read_records([str(tmp_path / 'archive'), str(tmp_path / 'journal')]))
+        assert [record['row']['id'] for record in records] == list(range(10))
+        timestamps = [record['ts'] for record in records]
+        assert timestamps == sorted(timestamps)
+
+    def test_group_commit(self, tmp_path):
+        """複数スレッドからの追記がまとめて書き込まれるテスト"""
+        import threading
+        journal = self.open_journal(tmp_path)
+        threads = [
+            threading.Thread(target=journal.append, args=([
+                {'table': 'entries', 'op': 'delete', 'row': {'id': i}}
+            ],))
+            for i in range(50)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        assert journal.flushed == journal.appended == 50
+
+        journal.close()
+        records = list(read_records([str(tmp_path / 'archive'), str(tmp_path / 'journal')]))
+        assert sorted(record['row']['id'] for record in records) == list(range(50))
+
+    def test_point_in_time_replay(self, app, tmp_path):
+        """ベースのDBにジャーナルを指定時刻まで適用するテスト"""
+        db_path = tmp_path / 'diary.db'
+        engine = create_engine(f'sqlite:///{db_path}')
+        db.metadata.create_all(engine)
+        Session = sessionmaker(bind=engine)
+        journal = self.open_journal(tmp_path)
+        attach_journal(Session, journal)
+
+        with Session() as session:
+            user = User(userid='journal', name='Journal', password='Journal123')
+            session.add(user)
+            session.commit()
+            user_id = user.id
+
+        # この時点のDBをベースのバックアップとする
+        engine.dispose()
+        base_path = tmp_path / 'base.db'
+        shutil.copy(db_path, base_path)
+        since = datetime.now()
+
+        with Session() as session:
+            entry = Entry(user_id=user_id, title='first', content='1', created_at=datetime.now())
+            session.add(entry)
+            session.flush()
+            session.add(DiaryItem(entry_id=entry.id, item_name='読書', item_content='30分',
+                                  created_at=datetime.now()))
+            session.commit()
+            entry_id = entry.id
+        time.sleep(0.01)
+        until = datetime.now()
+        time.sleep(0.01)
+        with Session() as session:
+            session.delete(session.get(Entry, entry_id))
+            session.add(Entry(user_id=user_id, title='second', content='2', created_at=datetime.now()))
+            session.commit()
+        with Session() as session:
+            # ロールバックした変更は記録されない
+            session.add(Entry(user_id=user_id, title='rolled back', content='x', created_at=datetime.now()))
+            session.flush()
+            session.rollback()
+        engine.dispose()
+        journal.close()
+
+        directories = [str(tmp_path / 'archive'), str(tmp_path / 'journal')]
+        assert segment_paths(directories)
+        assert not any(
+            record['row'].get('title') == 'rolled back' for record in read_records(directories)
+        )
+
+        with sqlite3.connect(base_path) as conn:
+            count = replay(conn, read_records(directories, since, until))
+            titles = [row[0] for row in conn.execute('SELECT title FROM entries')]
+            items = conn.execute('SELECT item_name, entry_id FROM diary_items').fetchall()
+        conn.close()
+        assert count == 2
+        assert titles == ['first']
+        assert items == [('読書', entry_id)]
+
+        with sqlite3.connect(base_path) as conn:
+            replay(conn, read_records(directories, since))
+            titles = [row[0] for row in conn.execute('SELECT title FROM entries')]
+            items = conn.execute('SELECT COUNT(*) FROM diary_items').fetchone()[0]
+        conn.close()
+        assert titles == ['second']
+        assert items == 0
+
+    def test_replay_bulk_import_and_delete(self, app, tmp_path):
+        """管理ツールの一括挿入・一括削除がジャーナルに記録され、指定時刻まで復元できるテスト"""
+        db_path = tmp_path / 'diary.db'
+        engine = create_engine(f'sqlite:///{db_path}')
+        db.metadata.create_all(engine)
+        Session = sessionmaker(bind=engine)
+        journal = self.open_journal(tmp_path, source='manage')
+        attach_journal(Session, journal)
+
+        with Session() as session:
+            session.add(User(userid='importer', name='Importer', password='Importer123'))
+            session.commit()
+        engine.dispose()
+        base_path = tmp_path / 'base.db'
+        shutil.copy(db_path, base_path)
+        since = datetime.now()
+
+        long_content = '腕立て 30回\n' * 300
+        entries = [
+            {'user_id': 'importer', 'date': f'2024/03/0{day}', 'title': f'day{day}', 'content': '内容',
+             'notes': '', 'items': [{'item_name': '筋トレ', 'item_content': long_content},
+                                    {'item_name': 'ランニング', 'item_content': '5km'}]}
+            for day in (1, 2)
+        ]
+        with Session() as session:
+            assert DataInserter(session).insert_entries(entries) == 2
+        time.sleep(0.01)
+        until = datetime.now()
+        time.sleep(0.01)
+        with Session() as session:
+            assert DataInserter(session).delete_entries(start_date=datetime(2024, 3, 2)) == 1
+        engine.dispose()
+        journal.close()
+
+        def table_rows(conn):
+            return {
+                table: conn.execute(f'SELECT * FROM {table} ORDER BY id').fetchall()
+                for table in ('entries', 'diary_items', 'diary_item_bodies')
+            }
+
+        directories = [str(tmp_path / 'archive'), str(tmp_path / 'journal')]
+        with sqlite3.connect(base_path) as conn:
+            replay(conn, read_records(directories, since, until))
+            restored = table_rows(conn)
+        conn.close()
+        assert [row[2] for row in restored['entries']] == ['day1', 'day2']
+        assert len(restored['diary_items']) == 4
+        assert len(restored['diary_item_bodies']) == 2
+
+        with sqlite3.connect(base_path) as conn:
+            replay(conn, read_records(directories, since))
+            restored = table_rows(conn)
+        conn.close()
+        with sqlite3.connect(db_path) as conn:
+            live = table_rows(conn)
+        conn.close()
+        assert [row[2] for row in restored['entries']] == ['day1']
+        assert restored == live
+
+    def test_read_records_merges_sources(self, tmp_path):
+        """アプリと管理ツールのセグメントを時刻順に合流し、他の書き込み元のセグメントは残すテスト"""
+        app_journal = self.open_journal(tmp_path)
+        app_journal.append([{'table': 'entries', 'op': 'delete', 'row': {'id': 1}}])
+        manage_journal = self.open_journal(tmp_path, source='manage')
+        manage_journal.append([{'table': 'entries', 'op': 'delete', 'row': {'id': 2}}])
+        app_journal.append([{'table': 'entries', 'op': 'delete', 'row': {'id': 3}}])
+        manage_journal.close()
+
+        # 管理ツールの次回の起動はアプリの書き込み中のセグメントをアーカイブしない
+        self.open_journal(tmp_path, source='manage').close()
+        assert any(
+            name.endswith('.jsonl') and '.manage' not in name
+            for name in os.listdir(tmp_path / 'journal')
+        )
+        app_journal.close()
+
+        directories = [str(tmp_path / 'archive'), str(tmp_path / 'journal')]
+        assert [record['row']['id'] for record in read_records(directories)] == [1, 2, 3]
+        since = datetime.fromisoformat(
+            next(record['ts'] for record in read_records(directories) if record['row']['id'] == 2)
+        )
+        assert [record['row']['id'] for record in read_records(directories, since)] == [2, 3]
+
+    def open_archive_database(self, tmp_path):
+        """アーカイブDBをATTACHしたDBにジャーナルを設定し、エントリー3件を作成"""
+        engine = create_engine(f'sqlite:///{tmp_path / "diary.db"}')
+        attach_archive(engine, str(tmp_path / 'archive.db'))
+        db.metadata.create_all(engine)
+        Session = sessionmaker(bind=engine)
+        attach_journal(Session, self.open_journal(tmp_path))
+        with Session() as session:
+            user = User(userid='journal', name='Journal', password='Journal123')
+            session.add(user)
+            session.flush()
+            for day in range(1, 4):
+                entry = Entry(user_id=user.id, title=f'Entry {day}', content=str(day),
+                              created_at=datetime(2024, 1, day))
+                session.add(entry)
+                session.flush()
+                session.add(DiaryItem(entry_id=entry.id, item_name='読書', item_content=f'{day}0分',
+                                      created_at=datetime(2024, 1, day)))
+            session.commit()
+        return engine, Session
+
+    def replay_into(self, tmp_path, hot, archive=None, since=None, until=None):
+        """ベースのファイルにジャーナルを適用し、(ホット, アーカイブ) の (エントリー, 活動項目) を返す"""
+        directories = [str(tmp_path / 'archive'), str(tmp_path / 'journal')]
+        with sqlite3.connect(hot) as conn:
+            if archive:
+                conn.execute('ATTACH DATABASE ? AS archive', (str(archive),))
+            replay(conn, read_records(directories, since, until))
+            reconcile_archive(conn)
+            result = []
+            for schema in ('main', 'archive') if archive else ('main',):
+                result.append((
+                    conn.execute(f'SELECT id, title FROM {schema}.entries ORDER BY id').fetchall(),
+                    conn.execute(
+                        f'SELECT entry_id, item_content FROM {schema}.diary_items ORDER BY entry_id'
+                    ).fetchall()
+                ))
+        conn.close()
+        return result
+
+    def test_replay_archive_moves(self, tmp_path):
+        """アーカイブDBとの間の移動がジャーナルに記録され、適用できるテスト"""
+        engine, Session = self.open_archive_database(tmp_path)
+        engine.dispose()
+        shutil.copy(tmp_path / 'diary.db', tmp_path / 'base.db')
+        shutil.copy(tmp_path / 'archive.db', tmp_path / 'base_archive.db')
+        since = datetime.now()
+
+        with Session() as session:
+            # 最大IDのエントリーはホットに残る
+            assert ArchiveManager(session).archive_batch(datetime(2024, 2, 1)) == 2
+            session.commit()
+        with Session() as session:
+            # 編集のためにホットへ戻す
+            assert ArchiveManager(session).restore_entries([1]) == 1
+            session.get(Entry, 1).title = 'Edited 1'
+            session.commit()
+        with Session() as session:
+            # ロールバックした移動は記録されない
+            ArchiveManager(session).restore_entries([2])
+            session.rollback()
+        engine.dispose()
+        self.journals[-1].close()
+
+        ops = [record['op'] for record in read_records([str(tmp_path / 'journal')], since)]
+        assert ops == ['archive', 'restore', 'upsert', 'upsert', 'upsert']
+
+        hot, archive = self.replay_into(
+            tmp_path, tmp_path / 'base.db', tmp_path / 'base_archive.db', since
+        )
+        assert hot == ([(1, 'Edited 1'), (3, 'Entry 3')], [(1, '10分'), (3, '30分')])
+        assert archive == ([(2, 'Entry 2')], [(2, '20分')])
+
+    def test_replay_restore_between_snapshots(self, tmp_path):
+        """ホットとアーカイブのスナップショットの間にホットへ戻したエントリーも復元できるテスト"""
+        engine, Session = self.open_archive_database(tmp_path)
+        with Session() as session:
+            ArchiveManager(session).archive_batch(datetime(2024, 2, 1))
+            session.commit()
+        engine.dispose()
+        # ホットのスナップショットの後、アーカイブのスナップショットの前に戻される
+        shutil.copy(tmp_path / 'diary.db', tmp_path / 'base.db')
+        since = datetime.now()
+        with Session() as session:
+            ArchiveManager(session).restore_entries([1])
+            session.commit()
+        engine.dispose()
+        shutil.copy(tmp_path / 'archive.db', tmp_path / 'base_archive.db')
+        self.journals[-1].close()
+
+        hot, archive = self.replay_into(
+            tmp_path, tmp_path / 'base.db', tmp_path / 'base_archive.db', since
+        )
+        assert hot == ([(1, 'Entry 1'), (3, 'Entry 3')], [(1, '10分'), (3, '30分')])
+        assert archive == ([(2, 'Entry 2')], [(2, '20分')])
+
+    def test_replay_without_archive_keeps_entries(self, tmp_path):
+        """アーカイブDBをATTACHせずに適用した場合、移動したエントリーはホットに残るテスト"""
+        engine, Session = self.open_archive_database(tmp_path)
+        engine.dispose()
+        shutil.copy(tmp_path / 'diary.db', tmp_path / 'base.db')
+        since = datetime.now()
+        with Session() as session:
+            ArchiveManager(session).archive_batch(datetime(2024, 2, 1))
+            session.commit()
+        engine.dispose()
+        self.journals[-1].close()
+
+        [hot] = self.replay_into(tmp_path, tmp_path / 'base.db', since=since)
+        assert [entry_id for entry_id, _ in hot[0]] == [1, 2, 3]
+        assert len(hot[1]) == 3
+
+    def test_reconcile_archive(self, tmp_path):
+        """アーカイブDBを含まないバックアップとの重複はアーカイブを優先して解消されるテスト"""
+        engine, Session = self.open_archive_database(tmp_path)
+        engine.dispose()
+        # アーカイブ前のホットのDB（古いバックアップ）
+        shutil.copy(tmp_path / 'diary.db', tmp_path / 'base.db')
+        with Session() as session:
+            ArchiveManager(session).archive_batch(datetime(2024, 2, 1))
+            session.commit()
+        engine.dispose()
+
+        with sqlite3.connect(tmp_path / 'base.db') as conn:
+            conn.execute('ATTACH DATABASE ? AS archive', (str(tmp_path / 'archive.db'),))
+            assert reconcile_archive(conn) == 2
+            entries = conn.execute(
+                'SELECT id FROM entries UNION ALL SELECT id FROM archive.entries ORDER BY 1'
+            ).fetchall()
+            items = conn.execute('SELECT entry_id FROM diary_items').fetchall()
+        conn.close()
+        assert entries == [(1,), (2,), (3,)]
+        assert items == [(3,)]
@@ -0,0 +1,119 @@
+import gzip
+import zlib
+import pytest
+from flask import Flask, Response, jsonify, request
+from compression import ResponseCompressor, brotli
+
+BODY = {'entries': [{'title': f'日記{i}', 'content': '今日は一日中雨が降っていた。' * 5}
+                    for i in range(20)]}
+
+class TestResponseCompressor:
+    @pytest.fixture(autouse=True)
+    def setup_app(self):
+        """圧縮のafter_requestを登録したアプリを作成"""
+        self.closed = []
+        self.compressor = ResponseCompressor()
+        app = Flask(__name__)
+
+        @app.after_request
+        def compress_response(response):
+            return self.compressor.apply(response, request.accept_encodings)
+
+        @app.route('/json')
+        def large_json():
+            response = jsonify(BODY)
+            response.set_etag('abc')
+            return response
+
+        @app.route('/small')
+        def small_json():
+            return jsonify({'ok': True})
+
+        @app.route('/html')
+        def html():
+            return '<p>' + '日記' * 500 + '</p>'
+
+        def generate(lines):
+            try:
+                for line in lines:
+                    yield line
+            finally:
+                self.closed.append(True)
+
+        @app.route('/export')
+        def export():
+            return Response(generate([f'{{"id":{i}}}\n' for i in range(1000)]),
+                            mimetype='application/x-ndjson')
+
+        @app.route('/stream')
+        def stream():
+            return Response(generate(['event: ready\ndata: {}\n\n', ': heartbeat\n\n']),
+                            mimetype='text/event-stream')
+
+        self.client = app.test_client()
+
+    def get(self, path, encoding='gzip'):
+        return self.client.get(path, headers={'Accept-Encoding': encoding})
+
+    def test_gzip(self):
+        """JSONがgzipで圧縮され、ETagが弱いETagになるテスト"""
+        response = self.get('/json')
+        assert response.headers['Content-Encoding'] == 'gzip'
+        assert 'Accept-Encoding' in response.headers['Vary']
+        assert int(response.headers['Content-Length']) == len(response.data)
+        assert response.headers['ETag'] == 'W/"abc"'
+        assert gzip.decompress(response.data) == self.get('/json', 'identity').data
+
+    def test_not_compressed(self):
+        """小さなレスポンス・HTML・非対応のクライアントは圧縮しないテスト"""
+        assert 'Content-Encoding' not in self.get('/small').headers
+        assert 'Content-Encoding' not in self.get('/html').headers
+        response = self.get('/json', 'identity')
+        assert 'Content-Encoding' not in response.headers
+        assert response.headers['ETag'] == '"abc"'
+        assert 'Content-Encoding' not in self.get('/json', 'gzip;q=0').headers
+
+    def test_streaming(self):
+        """エクスポートはチャンクごとに逐次圧縮され、元のジェネレーターが閉じられるテスト"""
+        response = self.get('/export')
+        assert response.headers['Content-Encoding'] == 'gzip'
+        assert 'Content-Length' not in response.headers
+        assert gzip.decompress(response.data).decode('utf-8').count('\n') == 1000
+        assert self.closed == [True]
+
+    def test_event_stream_flush(self):
+        """SSEはイベントごとにフラッシュされ、届いた分だけで展開できるテスト"""
+        response = self.client.get('/stream', headers={'Accept-Encoding': 'gzip'}, buffered=False)
+        assert response.headers['Content-Encoding'] == 'gzip'
+        chunks = response.iter_encoded()
+        decompressor = zlib.decompressobj(31)
+        assert decompressor.decompress(next(chunks)) == b'event: ready\ndata: {}\n\n'
+        response.close()
+        assert self.closed == [True]
+
+    @pytest.mark.skipif(brotli is None, reason='brotliパッケージが必要')
+    def test_brotli(self):
+        """brotliが優先され、qの指定に従うテスト"""
+        response = self.get('/json', 'gzip, br')
+        assert response.headers['Content-Encoding'] == 'br'
+        assert brotli.decompress(response.data) == self.get('/json', 'identity').data
+        assert self.get('/json', 'gzip, br;q=0.5').headers['Content-Encoding'] == 'gzip'
+
+    def test_levels(self):
+        """圧縮レベルの設定が使われるテスト"""
+        data = self.get('/json', 'identity').data
+        fast = ResponseCompressor(level=1).compress(data, 'gzip')
+        best = ResponseCompressor(level=9).compress(data, 'gzip')
+        assert len(best) <= len(fast)
+        assert gzip.decompress(fast) == data
+
+@pytest.mark.slow
+def test_compression_benchmark():
+    """代表的なレスポンスの圧縮率と圧縮時間のベンチマーク"""
+    from benchmarks.compression import run
+    results = run(entries=200, repeat=2)
+    for result in results:
+        print(f"\n{result['payload']} {result['encoding']}-{result['level']}: "
+              f"{result['size'] / 1024:.1f}KB -> {result['compressed'] / 1024:.1f}KB, "
+              f"{result['time'] * 1000:.2f}ms")
+    assert all(result['compressed'] < result['size'] for result in results)
@@ -0,0 +1,113 @@
+import csv
+import io
+import json
+import pytest
+from datetime import datetime
+from models.user import User
+from models.entry import Entry
+from models.diary_item import DiaryItem
+from models.diary_exporter import DiaryExporter
+from database import db
+
+class TestDiaryExporter:
+    def setup_method(self):
+        """各テストメソッドの前にテストユーザーとエントリーを作成"""
+        with db.session() as session:
+            self.user = User(
+                userid='test_user',
+                name='Test User',
+                password='TestPass123',
+                created_at=datetime.now()
+            )
+            session.add(self.user)
+            session.commit()
+            self.user_id = self.user.id
+
+            for day in range(1, 4):
+                entry = Entry(
+                    user_id=self.user_id,
+                    title=f'Entry {day}',
+                    content=f'Content {day}',
+                    notes='天気：晴れ' if day == 3 else '',
+                    created_at=datetime(2024, 3, day)
+                )
+                session.add(entry)
+                session.flush()
+                session.add(DiaryItem(entry_id=entry.id, item_name='筋トレ', item_content=f'{day}セット'))
+            session.commit()
+
+    def teardown_method(self):
+        """各テストメソッドの後にデータベースをクリア"""
+        with db.session() as session:
+            session.query(DiaryItem).delete()
+            session.query(Entry).delete()
+            session.query(User).delete()
+            session.commit()
+
+    def test_iter_entries_in_batches(self, app):
+        """バッチをまたいでも全件が新しい順に出力されるテスト"""
+        with app.app_context():
+            entries = list(DiaryExporter(self.user_id, batch_size=2).iter_entries())
+            assert [e['title'] for e in entries] == ['Entry 3', 'Entry 2', 'Entry 1']
+            assert [e['items'][0]['item_content'] for e in entries] == ['3セット', '2セット', '1セット']
+
+    def test_ndjson(self, app):
+        """NDJSON形式の出力テスト"""
+        with app.app_context():
+            lines = ''.join(DiaryExporter(self.user_id).iter_format('ndjson')).splitlines()
+            assert len(lines) == 3
+            assert json.loads(lines[0])['notes'] == '天気：晴れ'
+
+    def test_csv(self, app):
+        """CSV形式の出力テスト"""
+        with app.app_context():
+            output = ''.join(DiaryExporter(self.user_id).iter_format('csv'))
+            rows = list(csv.reader(io.StringIO(output.lstrip('\ufeff'))))
+            assert rows[0] == DiaryExporter.CSV_COLUMNS
+            assert len(rows) == 4
+            assert json.loads(rows[1][4]) == [{'item_name': '筋トレ', 'item_content': '3セット'}]
+
+    def test_markdown(self, app):
+        """Markdown形式の出力テスト"""
+        with app.app_context():
+            output = ''.join(DiaryExporter(self.user_id).iter_format('md'))
+            assert '# Entry 3' in output
+            assert '## メモ' in output
+            assert '### 筋トレ' in output
+
+    def test_unsupported_format(self, app):
+        with app.app_context():
+            with pytest.raises(ValueError):
+                DiaryExporter(self.user_id).iter_format('xml')
+
+def test_writes_during_export(tmp_path):
+    """エクスポートのダウンロード中も他の書き込みがコミットできるテスト（ファイルのSQLite）"""
+    from sqlalchemy import create_engine, insert
+    engine = create_engine(f'sqlite:///{tmp_path / "diary.db"}', connect_args={'timeout': 0})
+    db.metadata.create_all(engine)
+    entries = Entry.__table__
+    with engine.begin() as conn:
+        conn.execute(insert(User.__table__).values(
+            id=1, userid='test_user', name='Test User', password='x', created_at=datetime.now()
+        ))
+        for day in range(1, 6):
+            conn.execute(insert(entries).values(
+                user_id=1, title=f'Entry {day}', content=f'Content {day}', notes='', excerpt='',
+                created_at=datetime(2024, 3, day), sort_ts=datetime(2024, 3, day)
+            ))
+
+    export = DiaryExporter(1, batch_size=2, engine=engine).iter_entries()
+    titles = [next(export)['title']]
+    # 書き出しの途中で投稿・編集する（ロックが残っていると database is locked になる）
+    with engine.begin() as conn:
+        conn.execute(insert(entries).values(
+            user_id=1, title='Entry 6', content='Content 6', notes='', excerpt='',
+            created_at=datetime(2024, 3, 6), sort_ts=datetime(2024, 3, 6)
+        ))
+        conn.execute(entries.update().where(entries.c.title == 'Entry 2').values(
+            title='Edited 2', sort_ts=datetime(2024, 4, 1)
+        ))
+    titles += [entry['title'] for entry in export]
+    # 途中の追加は含まず、編集したエントリーも漏れ・重複なく1回だけ出力される
+    assert titles == ['Entry 5', 'Entry 4', 'Entry 3', 'Edited 2', 'Entry 1']
+    engine.dispose()
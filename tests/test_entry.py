@@ -283,6 +283,22 @@ class TestEntry:
                 entry.update(nonexistent_field='value')
                 assert not hasattr(entry, 'nonexistent_field')
 
+    def test_sort_ts(self, app):
+        """sort_tsが更新日時（未更新の場合は作成日時）に追従するテスト"""
+        with app.app_context():
+            created = datetime(2024, 1, 1, 9, 0, 0)
+            entry = Entry(
+                user_id=self.user_id,
+                title='Test Entry',
+                content='Test Content',
+                created_at=created
+            )
+            assert entry.sort_ts == created
+
+            updated = datetime(2024, 1, 2, 9, 0, 0)
+            entry.updated_at = updated
+            assert entry.sort_ts == updated
+
     def test_repr(self, app):
         """__repr__メソッドのテスト"""
         with app.app_context():
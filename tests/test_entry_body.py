@@ -0,0 +1,191 @@
+import json
+import pytest
+from datetime import datetime
+from sqlalchemy import create_engine, select, func, text
+from sqlalchemy.orm import Session
+from models.user import User
+from models.entry import Entry
+from models.diary_item import DiaryItem
+from models.entry_body import BodyStorage, EntryBody, DiaryItemBody, make_excerpt, zstandard
+from models.body_manager import BodyManager
+from models.archive_manager import ArchiveManager
+from change_journal import serialize_value, deserialize_value
+from database import db, attach_archive
+
+LONG_TEXT = '今日は長い一日だった。\n' * 300
+
+class TestBodyStorage:
+    def teardown_method(self):
+        """各テストメソッドの後に設定を戻す"""
+        BodyStorage.configure()
+
+    def test_pack(self):
+        """しきい値を超える本文だけが圧縮されるテスト"""
+        assert BodyStorage.pack('短い本文') is None
+        codec, size, data = BodyStorage.pack(LONG_TEXT)
+        assert codec == 'zlib'
+        assert size == len(LONG_TEXT.encode('utf-8'))
+        assert len(data) < size
+        assert BodyStorage.decompress(data, codec) == LONG_TEXT
+
+    def test_incompressible(self):
+        """圧縮しても小さくならない本文はそのまま格納されるテスト"""
+        BodyStorage.configure(threshold=10)
+        codec, size, data = BodyStorage.pack('abcdefghijklmnop')
+        assert codec == 'none'
+        assert BodyStorage.decompress(data, codec) == 'abcdefghijklmnop'
+
+    def test_configure(self):
+        """圧縮方式の設定のテスト"""
+        with pytest.raises(ValueError):
+            BodyStorage.configure(codec='lz4')
+        if zstandard is None:
+            with pytest.raises(ValueError):
+                BodyStorage.configure(codec='zstd')
+
+    def test_make_excerpt(self):
+        """抜粋は空白・改行をまとめて先頭を切り出す"""
+        assert make_excerpt('一行目\n\n二行目  三') == '一行目 二行目 三'
+        assert len(make_excerpt(LONG_TEXT)) == 120
+        assert make_excerpt(None) == ''
+
+    def test_journal_serialize_bytes(self):
+        """本文のBLOBが変更ジャーナルのJSONで往復できるテスト"""
+        data = BodyStorage.pack(LONG_TEXT)[2]
+        value = json.loads(json.dumps(serialize_value(data)))
+        assert deserialize_value(value) == data
+
+class TestEntryBody:
+    @pytest.fixture(autouse=True)
+    def setup_session(self, tmp_path):
+        """アーカイブDBをATTACHしたエンジンでテストユーザーを作成"""
+        self.engine = create_engine(f'sqlite:///{tmp_path / "diary.db"}')
+        attach_archive(self.engine, str(tmp_path / 'archive.db'))
+        db.metadata.create_all(self.engine)
+        self.session = Session(self.engine)
+        user = User(userid='body', name='Body', password='Body1234')
+        self.session.add(user)
+        self.session.flush()
+        self.user_id = user.id
+        yield
+        self.session.close()
+        self.engine.dispose()
+
+    def add_entry(self, content=LONG_TEXT, notes='', item_content='30分', day=1):
+        entry = Entry(user_id=self.user_id, title=f'Entry {day}', content=content, notes=notes,
+                      created_at=datetime(2024, 1, day))
+        self.session.add(entry)
+        self.session.flush()
+        self.session.add(DiaryItem(entry_id=entry.id, item_name='読書', item_content=item_content,
+                                   created_at=datetime(2024, 1, day)))
+        self.session.commit()
+        entry_id = entry.id
+        self.session.expunge_all()
+        return entry_id
+
+    def count(self, model):
+        return self.session.execute(select(func.count()).select_from(model)).scalar()
+
+    def test_offrow_storage(self):
+        """大きな本文が本文テーブルに格納され、透過的に読めるテスト"""
+        entry_id = self.add_entry(notes=LONG_TEXT, item_content=LONG_TEXT)
+
+        row = self.session.execute(
+            text('SELECT content, notes, excerpt FROM entries WHERE id = :id'), {'id': entry_id}
+        ).one()
+        assert row.content == '' and row.notes == ''
+        assert row.excerpt == make_excerpt(LONG_TEXT)
+        assert self.count(EntryBody) == 2
+        assert self.count(DiaryItemBody) == 1
+
+        entry = self.session.get(Entry, entry_id)
+        assert entry.content == LONG_TEXT
+        assert entry.notes == LONG_TEXT
+        assert entry.items[0].item_content == LONG_TEXT
+
+    def test_shrink_and_delete(self):
+        """本文が小さくなると行内に戻り、削除で本文テーブルの行も消えるテスト"""
+        entry_id = self.add_entry(item_content=LONG_TEXT)
+        entry = self.session.get(Entry, entry_id)
+        entry.content = '短い本文'
+        entry.items[0].item_content = '10分'
+        self.session.commit()
+        assert self.count(EntryBody) == 0
+        assert self.count(DiaryItemBody) == 0
+
+        entry.content = LONG_TEXT
+        self.session.commit()
+        entry.content = LONG_TEXT + '追記'
+        self.session.commit()
+        assert self.count(EntryBody) == 1
+        assert self.session.get(Entry, entry_id).content == LONG_TEXT + '追記'
+
+        self.session.delete(entry)
+        self.session.commit()
+        assert self.count(EntryBody) == 0
+
+    def test_validation(self):
+        """本文・メモの検証が格納先によらず行われるテスト"""
+        with pytest.raises(ValueError):
+            Entry(user_id=self.user_id, title='T', content='  ')
+        with pytest.raises(ValueError):
+            Entry(user_id=self.user_id, title='T', content='C', notes=1)
+        assert Entry(user_id=self.user_id, title='T', content='C', notes=None).notes == ''
+
+    def test_compact(self):
+        """既存の本文を設定に従って格納し直すテスト"""
+        entry_id = self.add_entry()
+        try:
+            BodyStorage.configure(threshold=1 << 20)
+            assert BodyManager(self.session).compact() == 1
+            self.session.commit()
+            assert self.count(EntryBody) == 0
+        finally:
+            BodyStorage.configure()
+        BodyManager(self.session).compact()
+        self.session.commit()
+        stats = BodyManager(self.session).stats()
+        assert stats['bodies'] == 1
+        assert stats['raw_bytes'] == len(LONG_TEXT.encode('utf-8')) > stats['stored_bytes']
+        assert self.session.get(Entry, entry_id).content == LONG_TEXT
+
+    def test_archive_keeps_bodies(self):
+        """アーカイブしたエントリーの本文が読め、戻すと元の行に結び付くテスト"""
+        entry_id = self.add_entry(item_content=LONG_TEXT)
+        self.add_entry(content='最新', day=2)
+        archive_manager = ArchiveManager(self.session)
+        assert archive_manager.archive_batch(datetime(2024, 1, 2)) == 1
+        self.session.commit()
+
+        archived = archive_manager.get_entries([entry_id])[0]
+        assert archived.content == LONG_TEXT
+        assert archived.excerpt == make_excerpt(LONG_TEXT)
+        assert archived.items[0].item_content == LONG_TEXT
+
+        BodyManager(self.session).delete_orphans()
+        assert self.count(EntryBody) == 1
+
+        archive_manager.restore_entries([entry_id])
+        self.session.commit()
+        entry = self.session.get(Entry, entry_id)
+        assert entry.content == LONG_TEXT
+        assert entry.items[0].item_content == LONG_TEXT
+
+    def test_delete_orphans(self):
+        """一括削除されたエントリーの本文が削除されるテスト"""
+        self.add_entry(item_content=LONG_TEXT)
+        self.session.execute(DiaryItem.__table__.delete())
+        self.session.execute(Entry.__table__.delete())
+        BodyManager(self.session).delete_orphans()
+        assert self.count(EntryBody) == 0
+        assert self.count(DiaryItemBody) == 0
+
+@pytest.mark.slow
+def test_body_storage_benchmark(tmp_path):
+    """本文テーブルへの格納でDBが小さくなることのベンチマーク"""
+    from benchmarks.body_storage import run
+    results = {result['storage']: result for result in run(entries=300, directory=tmp_path)}
+    assert results['off-row']['size'] < results['inline']['size']
+    for result in results.values():
+        print(f"\n{result['storage']}: {result['size'] / 1024:.0f}KB, "
+              f"scan {result['scan'] * 1000:.1f}ms, load {result['load'] * 1000:.1f}ms")
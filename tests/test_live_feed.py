@@ -0,0 +1,126 @@
+import threading
+import time
+import pytest
+from live_feed import LiveFeedHub, FeedEvent, Subscriber, format_event
+
+class FakeChanges:
+    """変更通番の代わりに使うイベント列"""
+
+    def __init__(self):
+        self.events = []
+
+    def add(self, entry_id, user_id=1, entry=None, visible=True):
+        seq = len(self.events) + 1
+        self.events.append(FeedEvent(seq, entry_id, user_id, entry, visible))
+        return seq
+
+    def load(self, since, limit):
+        return [event for event in self.events if event.seq > since][:limit]
+
+    def latest(self):
+        return len(self.events)
+
+class TestFeedEvent:
+    def test_render_by_permission(self):
+        """閲覧者の権限に応じたイベントの選択テスト"""
+        event = FeedEvent(5, 10, 1, {'id': 10, 'title': 'T'})
+        assert event.render(Subscriber()) == format_event(
+            'upsert', {'id': 10, 'title': 'T', 'can_edit': False}, 5
+        )
+        assert '"can_edit":true' in event.render(Subscriber(user_id=1))
+        assert '"can_edit":true' in event.render(Subscriber(user_id=2, is_admin=True))
+
+    def test_render_hidden_and_deleted(self):
+        """退会済みユーザー・削除済みのエントリーは墓標になる"""
+        hidden = FeedEvent(1, 10, 1, {'id': 10}, visible=False)
+        assert hidden.render(Subscriber(user_id=1)) == 'id: 1\nevent: delete\ndata: {"id":10}\n\n'
+        assert '"can_edit":true' in hidden.render(Subscriber(is_admin=True))
+
+        deleted = FeedEvent(2, 10, 1)
+        assert deleted.render(Subscriber(is_admin=True)).startswith('id: 2\nevent: delete')
+
+class TestLiveFeedHub:
+    def setup_method(self):
+        """各テストメソッドの前にハブを作成"""
+        self.changes = FakeChanges()
+        self.changes.add(1)
+        self.hub = LiveFeedHub(
+            self.changes.load, self.changes.latest,
+            poll_interval=0.05, heartbeat_interval=0.05, max_queue=3
+        )
+
+    def teardown_method(self):
+        """各テストメソッドの後にポーリングを停止"""
+        self.hub.close()
+
+    def test_stream_new_changes(self):
+        """購読開始後の変更だけが配信されるテスト"""
+        subscriber = self.hub.subscribe()
+        stream = self.hub.stream(subscriber)
+        assert next(stream) == 'retry: 3000\n' + format_event('ready', {'since': 1})
+
+        self.changes.add(2, entry={'id': 2})
+        self.hub.notify()
+        assert next(stream).startswith('id: 2\nevent: upsert')
+        assert subscriber.last_seq == 2
+
+        # 変更がなければハートビートを送る
+        assert next(stream) == ': heartbeat\n\n'
+
+    def test_overflow_resync(self):
+        """溜まりすぎた購読者にはresyncを送って切断するテスト"""
+        subscriber = self.hub.subscribe()
+        stream = self.hub.stream(subscriber)
+        next(stream)
+        for entry_id in range(2, 7):
+            self.changes.add(entry_id)
+        self.hub.poll()
+
+        assert subscriber.overflowed
+        chunks = list(stream)
+        assert len(chunks) == 4
+        assert chunks[-1] == format_event('resync', {'since': 4})
+
+    def test_subscriber_limit(self):
+        """購読数の上限テスト"""
+        self.hub.max_subscribers = 1
+        subscriber = self.hub.subscribe()
+        assert self.hub.subscribe() is None
+        self.hub.unsubscribe(subscriber)
+        assert self.hub.last_seq is None
+        assert self.hub.subscribe() is not None
+
+    @pytest.mark.slow
+    def test_fan_out_5000_subscribers(self):
+        """5000件の同時購読者へのファンアウトの負荷テスト"""
+        self.hub.close()
+        self.hub = LiveFeedHub(self.changes.load, self.changes.latest, heartbeat_interval=30)
+        subscribers = [self.hub.subscribe(user_id=i % 50) for i in range(5000)]
+        received = [0] * len(subscribers)
+        done = threading.Barrier(len(subscribers) + 1)
+
+        def consume(index, subscriber):
+            stream = self.hub.stream(subscriber)
+            next(stream)
+            while received[index] < 3:
+                if next(stream).startswith('id:'):
+                    received[index] += 1
+            done.wait()
+
+        threads = [
+            threading.Thread(target=consume, args=(i, subscriber), daemon=True)
+            for i, subscriber in enumerate(subscribers)
+        ]
+        for thread in threads:
+            thread.start()
+
+        started = time.perf_counter()
+        for entry_id in range(2, 5):
+            self.changes.add(entry_id, user_id=entry_id, entry={'id': entry_id})
+        self.hub.notify()
+        done.wait(timeout=120)
+        elapsed = time.perf_counter() - started
+
+        assert received == [3] * len(subscribers)
+        assert not any(subscriber.overflowed for subscriber in subscribers)
+        print(f'\n5000 subscribers x 3 events delivered in {elapsed:.3f}s')
@@ -0,0 +1,115 @@
+import pytest
+import numpy as np
+from datetime import datetime
+from models.user import User
+from models.entry import Entry
+from models.diary_item import DiaryItem
+from models.entry_metric import EntryMetric
+from models.metric_manager import MetricManager, parse_metrics, parse_entry_metrics
+from database import db
+
+class TestParseMetrics:
+    def test_parse_metrics(self):
+        """メモからの数値抽出テスト"""
+        metrics = parse_metrics('体重：75kg\n体調：絶好調\n気温：20℃')
+        assert metrics == [('体重', 75.0, 'kg'), ('気温', 20.0, '°C')]
+
+    def test_parse_sub_value(self):
+        """括弧内の補足値の抽出テスト"""
+        assert parse_metrics('朝：10km（50分）') == [('朝', 10.0, 'km'), ('朝', 50.0, '分')]
+
+    def test_parse_entry_metrics(self):
+        """活動項目の数値は項目名付きのキーになる"""
+        metrics = parse_entry_metrics('', [('ランニング', '夜：5.5km'), ('筋トレ', 'スクワット 30回×3セット')])
+        assert metrics == [('ランニング/夜', 5.5, 'km')]
+
+    def test_parse_empty(self):
+        assert parse_metrics('') == []
+        assert parse_metrics(None) == []
+
+class TestComputeStats:
+    def test_compute_stats(self):
+        """移動平均・最小/最大・連続記録日数の計算テスト"""
+        timestamps = np.array([
+            '2024-03-01T08:00', '2024-03-02T08:00', '2024-03-02T20:00',
+            '2024-03-03T08:00', '2024-03-05T08:00'
+        ], dtype='datetime64[s]')
+        values = np.array([75.0, 74.0, 74.5, 73.0, 72.0])
+
+        stats = MetricManager.compute_stats(timestamps, values, window=2)
+        assert stats['count'] == 5
+        assert stats['min'] == 72.0
+        assert stats['max'] == 75.0
+        assert stats['latest'] == 72.0
+        assert stats['rolling_avg'] == [75.0, 74.5, 74.25, 73.75, 72.5]
+        assert stats['longest_streak'] == 3
+        assert stats['current_streak'] == 1
+
+    def test_compute_stats_empty(self):
+        stats = MetricManager.compute_stats(
+            np.array([], dtype='datetime64[s]'), np.array([], dtype=np.float64)
+        )
+        assert stats['count'] == 0
+        assert stats['current_streak'] == 0
+
+    def test_compute_stats_invalid_window(self):
+        with pytest.raises(ValueError):
+            MetricManager.compute_stats(np.array([], dtype='datetime64[s]'), np.array([]), window=0)
+
+class TestMetricManager:
+    def setup_method(self):
+        """各テストメソッドの前にデータベースをクリアし、テストユーザーを作成"""
+        self.metric_manager = MetricManager()
+        with db.session() as session:
+            session.query(EntryMetric).delete()
+            session.query(DiaryItem).delete()
+            session.query(Entry).delete()
+            session.commit()
+
+            self.user = User(
+                userid='test_user',
+                name='Test User',
+                password='TestPass123',
+                created_at=datetime.now()
+            )
+            session.add(self.user)
+            session.commit()
+            self.user_id = self.user.id
+
+    def teardown_method(self):
+        """各テストメソッドの後にデータベースをクリア"""
+        with db.session() as session:
+            session.query(EntryMetric).delete()
+            session.query(DiaryItem).delete()
+            session.query(Entry).delete()
+            session.query(User).delete()
+            session.commit()
+
+    def test_backfill_and_series(self, app):
+        """既存エントリーからのバックフィルと時系列取得のテスト"""
+        with app.app_context():
+            for day, weight in [(1, '75kg'), (2, '74kg')]:
+                entry = Entry(
+                    user_id=self.user_id,
+                    title='Test Entry',
+                    content='Test Content',
+                    notes=f'体重：{weight}',
+                    created_at=datetime(2024, 3, day)
+                )
+                db.session.add(entry)
+                db.session.flush()
+                db.session.add(DiaryItem(entry_id=entry.id, item_name='ランニング', item_content='朝：10km'))
+            db.session.commit()
+
+            assert self.metric_manager.backfill() == 4
+            db.session.commit()
+
+            keys = self.metric_manager.get_keys(self.user_id)
+            assert [(row.key, row.unit, row.count) for row in keys] == [
+                ('ランニング/朝', 'km', 2),
+                ('体重', 'kg', 2)
+            ]
+
+            timestamps, values = self.metric_manager.get_series(self.user_id, '体重', 'kg')
+            assert values.tolist() == [75.0, 74.0]
+            assert len(timestamps) == 2
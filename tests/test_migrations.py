@@ -0,0 +1,86 @@
+import os
+import sqlite3
+import pytest
+from alembic import command
+from alembic.config import Config
+
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+@pytest.fixture
+def baseline_db(tmp_path):
+    """schema.sql（初期リビジョン）で作成したデータベース"""
+    path = tmp_path / 'diary.db'
+    with open(os.path.join(project_root, 'schema.sql'), encoding='utf-8') as f:
+        schema = f.read()
+    conn = sqlite3.connect(path)
+    conn.executescript(schema)
+    conn.execute("UPDATE entries SET updated_at = '2024-06-01 12:00:00' WHERE id = 2")
+    conn.commit()
+    conn.close()
+    return path
+
+@pytest.fixture
+def alembic_config(baseline_db):
+    """alembic.ini のロギング設定を読み込まない設定"""
+    config = Config()
+    config.set_main_option('script_location', os.path.join(project_root, 'migrations'))
+    config.set_main_option('sqlalchemy.url', f'sqlite:///{baseline_db}')
+    command.stamp(config, '612831183f49')
+    return config
+
+class TestMigrations:
+    def test_upgrade_from_baseline_schema(self, baseline_db, alembic_config):
+        """既存のデータベースを最新リビジョンまで移行できるテスト"""
+        conn = sqlite3.connect(baseline_db)
+        conn.execute("UPDATE users SET is_visible = 0 WHERE userid = 'gento'")
+        conn.commit()
+        conn.close()
+        command.upgrade(alembic_config, 'head')
+
+        conn = sqlite3.connect(baseline_db)
+        rows = conn.execute('SELECT id, created_at, updated_at, sort_ts FROM entries').fetchall()
+        assert rows
+        for _, created_at, updated_at, sort_ts in rows:
+            assert sort_ts == (updated_at or created_at)
+        assert dict(conn.execute('SELECT id, sort_ts FROM entries').fetchall())[2] == '2024-06-01 12:00:00'
+
+        sort_ts = next(column for column in conn.execute('PRAGMA table_info(entries)') if column[1] == 'sort_ts')
+        assert sort_ts[3] == 1
+        indexes = {row[0] for row in conn.execute(
+            "SELECT name FROM sqlite_master WHERE type = 'index' AND tbl_name = 'entries'"
+        )}
+        assert {'ix_entries_sort_ts', 'ix_entries_user_sort_ts'} <= indexes
+
+        # NOT NULLにした後もsort_tsを省略した挿入は現在時刻で埋まり、idは再利用されない
+        conn.execute("INSERT INTO entries (user_id, title, content, created_at) VALUES (1, 't', 'c', '2024-01-01')")
+        assert conn.execute('SELECT sort_ts FROM entries ORDER BY id DESC LIMIT 1').fetchone()[0] is not None
+        assert 'AUTOINCREMENT' in conn.execute(
+            "SELECT sql FROM sqlite_master WHERE name = 'entries'"
+        ).fetchone()[0]
+        assert conn.execute('SELECT COUNT(*) FROM entry_changes').fetchone()[0] == len(rows)
+
+        # 活動項目の全期間の合計行と、非表示のユーザーを除く全体集計
+        item_count = conn.execute(
+            'SELECT COUNT(*) FROM diary_items i JOIN entries e ON e.id = i.entry_id '
+            'JOIN users u ON u.id = e.user_id WHERE u.is_visible = 1'
+        ).fetchone()[0]
+        assert item_count
+        assert conn.execute(
+            "SELECT SUM(item_count) FROM activity_frequencies WHERE user_id = 0 AND month = 'total'"
+        ).fetchone()[0] == item_count
+        assert conn.execute(
+            "SELECT SUM(item_count) FROM activity_frequencies WHERE user_id = 0 AND month != 'total'"
+        ).fetchone()[0] == item_count
+        conn.close()
+
+    def test_downgrade_to_baseline(self, baseline_db, alembic_config):
+        """最新リビジョンから初期リビジョンへ戻せるテスト"""
+        command.upgrade(alembic_config, 'head')
+        command.downgrade(alembic_config, '612831183f49')
+
+        conn = sqlite3.connect(baseline_db)
+        columns = {column[1] for column in conn.execute('PRAGMA table_info(entries)')}
+        assert 'sort_ts' not in columns
+        assert 'excerpt' not in columns
+        assert conn.execute('SELECT COUNT(*) FROM entries').fetchone()[0] > 0
+        conn.close()
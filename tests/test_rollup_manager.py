@@ -0,0 +1,75 @@
+import pytest
+from datetime import datetime, date
+from models.user import User
+from models.entry import Entry
+from models.diary_item import DiaryItem
+from models.activity_rollup import ActivityRollup
+from models.rollup_manager import RollupManager
+from database import db
+
+class TestRollupManager:
+    def setup_method(self):
+        """各テストメソッドの前にテストユーザーを作成"""
+        self.rollup_manager = RollupManager()
+        with db.session() as session:
+            self.user = User(
+                userid='test_user',
+                name='Test User',
+                password='TestPass123',
+                created_at=datetime.now()
+            )
+            session.add(self.user)
+            session.commit()
+            self.user_id = self.user.id
+
+    def teardown_method(self):
+        """各テストメソッドの後にデータベースをクリア"""
+        with db.session() as session:
+            session.query(ActivityRollup).delete()
+            session.query(DiaryItem).delete()
+            session.query(Entry).delete()
+            session.query(User).delete()
+            session.commit()
+
+    def test_apply(self, app):
+        """増減分の加算テスト"""
+        with app.app_context():
+            day = date(2024, 3, 1)
+            self.rollup_manager.apply(self.user_id, day, entries=1, items=2)
+            self.rollup_manager.apply(self.user_id, day, entries=1, items=1)
+            self.rollup_manager.apply(self.user_id, day, entries=-1, items=-2)
+            db.session.commit()
+
+            rollups = self.rollup_manager.get_daily(self.user_id, date(2024, 1, 1), date(2024, 12, 31))
+            assert len(rollups) == 1
+            assert rollups[0].day == day
+            assert rollups[0].entry_count == 1
+            assert rollups[0].item_count == 1
+
+    def test_rebuild(self, app):
+        """entriesからの再作成テスト"""
+        with app.app_context():
+            for day, item_names in [(1, ['筋トレ', 'ランニング']), (1, []), (15, ['読書'])]:
+                entry = Entry(
+                    user_id=self.user_id,
+                    title='Test Entry',
+                    content='Test Content',
+                    created_at=datetime(2024, 3, day, 12, 0, 0)
+                )
+                db.session.add(entry)
+                db.session.flush()
+                for name in item_names:
+                    db.session.add(DiaryItem(entry_id=entry.id, item_name=name, item_content='内容'))
+            db.session.commit()
+
+            assert self.rollup_manager.rebuild() == 2
+            db.session.commit()
+
+            rollups = self.rollup_manager.get_daily(self.user_id, date(2024, 3, 1), date(2024, 3, 31))
+            assert [(r.day, r.entry_count, r.item_count) for r in rollups] == [
+                (date(2024, 3, 1), 2, 2),
+                (date(2024, 3, 15), 1, 1)
+            ]
+
+            months = self.rollup_manager.get_monthly(self.user_id)
+            assert [(m.month, m.entry_count, m.item_count) for m in months] == [('2024-03', 3, 3)]
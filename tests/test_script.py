@@ -0,0 +1,185 @@
+import json
+import os
+import shutil
+import subprocess
+import pytest
+
+SCRIPT_PATH = os.path.join(os.path.dirname(__file__), '..', 'static', 'script.js')
+
+# static/script.js をNode.jsのvmで読み込み、DOM・fetch等の最小限のスタブで操作する
+HARNESS = r"""
+const vm = require('vm');
+const fs = require('fs');
+const [scriptPath, scenario] = process.argv.slice(1);
+
+const makeNode = () => ({
+    style: {}, dataset: {}, innerHTML: '', className: '', value: '', isConnected: false, offsetHeight: 150,
+    classList: { add() {}, remove() {} },
+    appendChild() {}, focus() {}, querySelector: () => makeNode(),
+    getBoundingClientRect: () => ({ top: 0, bottom: 1 })
+});
+const elements = {};
+const element = id => elements[id] || (elements[id] = makeNode());
+element('entries').replaceChildren = (...nodes) => nodes.forEach(node => node.isConnected = true);
+
+const responses = [];
+const requests = [];
+const frames = [];
+const context = {
+    console, setTimeout, Date, Math, JSON, Map, Promise, Error, Number, Boolean, Array, parseFloat,
+    document: {
+        addEventListener() {}, getElementById: element, createElement: makeNode, querySelectorAll: () => []
+    },
+    window: { scrollTo() {}, scrollBy() {}, scrollY: 0, innerHeight: 800, addEventListener() {},
+              location: {}, requestIdleCallback() {} },
+    navigator: {}, localStorage: { getItem: () => '', setItem() {} },
+    alert: message => { throw new Error(`alert: ${message}`); },
+    performance: { getEntriesByName: () => [1], mark() {}, now: () => 0 },
+    requestAnimationFrame: callback => frames.push(callback),
+    ResizeObserver: class { observe() {} unobserve() {} },
+    getComputedStyle: () => ({ marginBottom: '0px' }),
+    userSession: { author: { author_name: 'Test', author_userid: 'test' } },
+    fetch: async (url, options = {}) => {
+        requests.push(`${options.method || 'GET'} ${url}`);
+        const response = responses.shift();
+        return { ok: response.status < 400, status: response.status, json: async () => response.body };
+    }
+};
+vm.createContext(context);
+vm.runInContext(fs.readFileSync(scriptPath, 'utf8'), context);
+
+// 一覧のページ（idは新しい順）
+const page = (number, ids, total) => ({
+    entries: ids.map(id => ({ id, title: `Entry ${id}`, excerpt: '', created_at: '2024-01-01T00:00:00',
+                              updated_at: null, can_edit: true, item_count: 0 })),
+    pagination: { current_page: number, total_pages: Math.ceil(total / 10), total_entries: total,
+                  has_prev: number > 1, has_next: number < Math.ceil(total / 10) }
+});
+const range = (from, to) => Array.from({ length: from - to + 1 }, (_, i) => from - i);
+const settle = async () => {
+    for (let i = 0; i < 10; i++) {
+        await new Promise(resolve => setTimeout(resolve, 0));
+        while (frames.length) frames.shift()();
+    }
+};
+const form = (title, content) => {
+    element('diaryTitle').value = title;
+    element('diaryContent').value = content;
+};
+const helpers = { page, range, settle, form, responses, requests };
+
+vm.runInContext(`(async ({ page, range, settle, form, responses, requests }) => {
+    const result = {};
+    const ids = key => pageCache.has(key) ? pageCache.get(key).data.entries.map(entry => entry.id) : null;
+    const virtualIds = () => virtualFeed.entries.map(entry => entry.id);
+    ${scenario}
+    return result;
+})`, context)(helpers)
+    .then(result => console.log(JSON.stringify(result)))
+    .catch(error => { console.error(error); process.exit(1); });
+"""
+
+def run_script(scenario):
+    """シナリオを実行し、resultに設定した値を返す"""
+    node = shutil.which('node')
+    if node is None:
+        pytest.skip('node is not installed')
+    completed = subprocess.run(
+        [node, '-e', HARNESS, SCRIPT_PATH, scenario],
+        capture_output=True, text=True, timeout=30
+    )
+    assert completed.returncode == 0, completed.stderr
+    return json.loads(completed.stdout)
+
+class TestUpdateEntry:
+    def test_moves_edited_entry_to_first_page(self):
+        """編集したエントリーが先頭ページの先頭へ移り、境界がずれるページは破棄されるテスト"""
+        result = run_script("""
+            storePage('page=1', page(1, range(30, 21), 30), cacheGeneration);
+            storePage('page=2', page(2, range(20, 11), 30), cacheGeneration);
+            storePage('page=3', page(3, range(10, 1), 30), cacheGeneration);
+            storePage('jump=2024-01-01', page(undefined, range(12, 3), 30), cacheGeneration);
+            displayPage('page=2', pageCache.get('page=2').data);
+
+            form('Edited', 'Edited content');
+            currentEditId = 15;
+            responses.push({ status: 200, body: { entry: { ...page(1, [15], 1).entries[0], title: 'Edited',
+                                                           updated_at: '2024-02-01T00:00:00' } } });
+            const update = updateEntry();
+            result.optimistic = ids('page=1');
+            result.pending = pageCache.get('page=1').data.entries[0];
+            result.keys = [...pageCache.keys()];
+            result.currentKey = currentKey;
+            await update;
+            result.reconciled = pageCache.get('page=1').data.entries[0];
+            result.total = pageCache.get('page=1').data.pagination.total_entries;
+            result.requests = requests;
+        """)
+        assert result['optimistic'] == [15] + list(range(30, 21, -1))
+        assert result['pending']['title'] == 'Edited'
+        assert result['pending']['pending'] is True
+        assert result['keys'] == ['page=1']
+        assert result['currentKey'] == 'page=1'
+        assert result['reconciled']['title'] == 'Edited'
+        assert 'pending' not in result['reconciled']
+        assert result['total'] == 30
+        assert result['requests'] == ['PUT /entries/15']
+
+    def test_moves_entry_on_first_page(self):
+        """先頭ページ内のエントリーを編集すると先頭へ移り、件数は変わらないテスト"""
+        result = run_script("""
+            storePage('page=1', page(1, range(30, 21), 30), cacheGeneration);
+            displayPage('page=1', pageCache.get('page=1').data);
+            form('Edited', 'Edited content');
+            currentEditId = 25;
+            responses.push({ status: 200, body: { entry: { ...page(1, [25], 1).entries[0], title: 'Edited' } } });
+            await updateEntry();
+            result.ids = ids('page=1');
+            result.total = pageCache.get('page=1').data.pagination.total_entries;
+        """)
+        assert result['ids'] == [25, 30, 29, 28, 27, 26, 24, 23, 22, 21]
+        assert result['total'] == 30
+
+    def test_moves_edited_entry_in_virtual_feed(self):
+        """無限スクロールでも編集したエントリーが先頭へ移るテスト"""
+        result = run_script("""
+            storePage('page=1', page(1, range(30, 21), 30), cacheGeneration);
+            startVirtualFeed('page=1');
+            await settle();
+            form('Edited', 'Edited content');
+            currentEditId = 25;
+            responses.push({ status: 200, body: { entry: { ...page(1, [25], 1).entries[0], title: 'Edited' } } });
+            const update = updateEntry();
+            result.optimistic = virtualIds();
+            await update;
+            await settle();
+            result.reconciled = virtualFeed.entries[0];
+            result.ids = virtualIds();
+            result.page = ids('page=1');
+        """)
+        assert result['optimistic'] == [25, 30, 29, 28, 27, 26, 24, 23, 22, 21]
+        assert result['ids'] == result['optimistic']
+        assert result['page'] == result['optimistic']
+        assert result['reconciled']['title'] == 'Edited'
+        assert 'pending' not in result['reconciled']
+
+    def test_virtual_feed_after_jump_reloads_latest(self):
+        """日付ジャンプ後の無限スクロールでは一覧から外し、応答後に最新から読み込み直すテスト"""
+        result = run_script("""
+            storePage('page=1', page(1, range(30, 21), 30), cacheGeneration);
+            storePage('jump=2024-01-01', page(undefined, range(12, 3), 30), cacheGeneration);
+            startVirtualFeed('jump=2024-01-01');
+            await settle();
+            form('Edited', 'Edited content');
+            currentEditId = 8;
+            responses.push({ status: 200, body: { entry: { ...page(1, [8], 1).entries[0], title: 'Edited' } } });
+            const update = updateEntry();
+            result.optimistic = virtualIds();
+            await update;
+            await settle();
+            result.firstKey = virtualFeed.firstKey;
+            result.ids = virtualIds();
+        """)
+        assert result['optimistic'] == [12, 11, 10, 9, 7, 6, 5, 4, 3]
+        assert result['firstKey'] == 'page=1'
+        assert result['ids'] == [8] + list(range(30, 21, -1))
@@ -0,0 +1,95 @@
+import json
+import pytest
+from datetime import datetime, date
+from types import SimpleNamespace
+from flask import Flask, jsonify, request
+from models import EntryDTO, DiaryItemDTO, UserDTO
+from serializer import Serializer, SerializerJSONProvider, row_encoder, orjson
+
+BACKENDS = [backend for backend in Serializer.BACKENDS if backend != 'orjson' or orjson is not None]
+
+def make_entry():
+    user = SimpleNamespace(name='テスト', userid='test', is_visible=True)
+    return SimpleNamespace(
+        id=1, title='タイトル', content='本文', excerpt='本文', notes='', user_id=2, user=user,
+        items=[SimpleNamespace(item_name='運動', item_content='30分')],
+        created_at=datetime(2024, 1, 1, 9, 0, 0, 123456), updated_at=None
+    )
+
+class TestSerializer:
+    def teardown_method(self):
+        """各テストメソッドの後に設定を戻す"""
+        Serializer.configure()
+
+    @pytest.mark.parametrize('backend', BACKENDS)
+    def test_entry_dto(self, backend):
+        """DTOが従来の辞書と同じJSONに変換されるテスト"""
+        Serializer.configure(backend)
+        data = json.loads(Serializer.dumps([EntryDTO.from_entry(make_entry(), can_edit=True)]))
+        assert data == [{
+            'id': 1, 'title': 'タイトル', 'content': '本文', 'excerpt': '本文', 'notes': '',
+            'items': [{'item_name': '運動', 'item_content': '30分'}],
+            'created_at': '2024-01-01T09:00:00.123456', 'updated_at': None,
+            'author_name': 'テスト', 'author_userid': 'test', 'is_visible': True,
+            'user_id': 2, 'can_edit': True
+        }]
+
+    def test_backends_match(self):
+        """バックエンドによらず同じバイト列になるテスト"""
+        value = {
+            'entry': EntryDTO.from_entry(make_entry()),
+            'user': UserDTO(1, 'test', 'テスト', False, False, True, 0, None, 3),
+            'day': date(2024, 1, 1),
+            'counts': {1: 2}
+        }
+        outputs = set()
+        for backend in BACKENDS:
+            Serializer.configure(backend)
+            outputs.add(Serializer.dumps(value))
+        assert len(outputs) == 1
+        assert '"counts":{"1":2}' in outputs.pop().decode('utf-8')
+
+    def test_configure(self):
+        """バックエンドの設定のテスト"""
+        with pytest.raises(ValueError):
+            Serializer.configure('ujson')
+        if orjson is None:
+            with pytest.raises(ValueError):
+                Serializer.configure('orjson')
+        Serializer.configure('json')
+        with pytest.raises(TypeError):
+            Serializer.dumps({'value': object()})
+
+    def test_row_encoder(self):
+        """Coreの行を項目名の辞書に変換するテスト"""
+        encode = row_encoder(['id', 'name'])
+        assert encode([(1, 'a'), (2, 'b')]) == [{'id': 1, 'name': 'a'}, {'id': 2, 'name': 'b'}]
+
+    @pytest.mark.parametrize('backend', BACKENDS)
+    def test_provider(self, backend):
+        """jsonify・request.get_jsonがSerializerで処理されるテスト"""
+        Serializer.configure(backend)
+        app = Flask(__name__)
+        app.json = SerializerJSONProvider(app)
+
+        @app.route('/echo', methods=['POST'])
+        def echo():
+            return jsonify({**request.get_json(), 'item': DiaryItemDTO('読書', '1時間')})
+
+        response = app.test_client().post('/echo', json={'title': '日記'})
+        assert response.mimetype == 'application/json'
+        assert response.get_data() == (
+            '{"title":"日記","item":{"item_name":"読書","item_content":"1時間"}}'.encode('utf-8')
+        )
+
+@pytest.mark.slow
+def test_serializer_benchmark():
+    """DTOとSerializerによるレスポンスの作成のベンチマーク"""
+    from benchmarks.serializer import run
+    results = run(rows=(10, 100, 1000), repeat=3)
+    for result in results:
+        print(f"\n{result['payload']} {result['rows']} {result['path']}: "
+              f"{result['time'] * 1000:.2f}ms, {result['size'] / 1024:.1f}KB")
+    sizes = {(result['payload'], result['rows'], result['path']): result['size'] for result in results}
+    # 日本語を\\uエスケープしないため、レスポンスは従来より小さい
+    assert sizes[('entries', 1000, 'dto+json')] < sizes[('entries', 1000, 'jsonify')]
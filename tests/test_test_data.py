@@ -1,4 +1,10 @@
+import hashlib
 import os
+import shutil
+import sqlite3
+import time
+from contextlib import closing
+from pathlib import Path
 import pytest
 from datetime import datetime, timedelta
 from sqlalchemy.orm import Session
@@ -7,6 +13,7 @@ from manage_test_data.validator import DataValidator, ValidationError
 from manage_test_data.generator import TestDataGenerator, GeneratorError
 from manage_test_data.backup import DatabaseBackup, BackupError
 from manage_test_data.inserter import DataInserter, InsertError
+from models import User, DiaryItem, DiaryItemBody, ActivityRollup, ActivityFrequency, EntryMetric
 
 # テストデータ
 VALID_TEMPLATES = {
@@ -126,7 +133,10 @@ class TestBackup:
     def test_create_backup(self, backup, tmp_path):
         # テスト用のDBファイル作成
         db_path = tmp_path / 'test.db'
-        db_path.write_text('test data')
+        with sqlite3.connect(db_path) as conn:
+            conn.execute('CREATE TABLE t (v TEXT)')
+            conn.execute("INSERT INTO t VALUES ('test data')")
+        conn.close()
 
         # 正常系
         metadata = {
@@ -135,11 +145,284 @@ class TestBackup:
         }
         backup_path = backup.create_backup(str(db_path), metadata)
         assert os.path.exists(backup_path)
+        assert backup_path.endswith('.db.gz')
+        assert backup.load_manifest(backup_path)['compression'] == 'gzip'
+
+        restored_path = tmp_path / 'restored.db'
+        backup.restore_backup(backup_path, str(restored_path))
+        with sqlite3.connect(restored_path) as conn:
+            assert conn.execute('SELECT v FROM t').fetchall() == [('test data',)]
+        conn.close()
 
         # 異常系
         with pytest.raises(BackupError):
             backup.create_backup('non_existent.db')  # 存在しないファイル
 
+    def test_create_backup_online(self, tmp_path):
+        # WALモードで書き込み中のDBをページ単位でバックアップ
+        db_path = tmp_path / 'live.db'
+        conn = sqlite3.connect(db_path)
+        conn.execute('PRAGMA journal_mode=WAL')
+        conn.execute('CREATE TABLE t (v TEXT)')
+        conn.executemany('INSERT INTO t VALUES (?)', [('x' * 1000,)] * 100)
+        conn.commit()
+
+        progress = []
+        backup = DatabaseBackup(str(tmp_path / 'backups'), pages_per_step=5, step_sleep=0)
+        backup_path = backup.create_backup(
+            str(db_path), progress=lambda copied, total: progress.append((copied, total))
+        )
+        conn.close()
+
+        assert len(progress) > 1
+        assert progress[-1][0] == progress[-1][1]
+        restored_path = tmp_path / 'restored.db'
+        backup.restore_backup(backup_path, str(restored_path))
+        with sqlite3.connect(restored_path) as restored:
+            assert restored.execute('SELECT COUNT(*) FROM t').fetchone() == (100,)
+        restored.close()
+
+        # 異常系
+        with pytest.raises(BackupError):
+            DatabaseBackup(str(tmp_path), pages_per_step=0)
+
+    def test_compressed_chunks(self, tmp_path):
+        # 複数チャンクに分割して圧縮し、チェックサムを検証しながら復元
+        db_path = tmp_path / 'chunked.db'
+        with sqlite3.connect(db_path) as conn:
+            conn.execute('CREATE TABLE t (v TEXT)')
+            conn.executemany('INSERT INTO t VALUES (?)', [('y' * 500,)] * 200)
+        conn.close()
+
+        backup = DatabaseBackup(str(tmp_path / 'backups'), chunk_size=16 * 1024, level=1)
+        backup_path = backup.create_backup(str(db_path))
+        manifest = backup.load_manifest(backup_path)
+        assert len(manifest['chunks']) > 1
+        assert manifest['size'] == os.path.getsize(db_path)
+        assert os.path.getsize(backup_path) < manifest['size']
+
+        restored_path = tmp_path / 'restored.db'
+        backup.restore_backup(backup_path, str(restored_path))
+        restored_bytes = restored_path.read_bytes()
+        assert hashlib.sha256(restored_bytes).hexdigest() == manifest['sha256']
+        with sqlite3.connect(restored_path) as conn:
+            assert conn.execute('SELECT COUNT(*) FROM t').fetchone() == (200,)
+        conn.close()
+
+        # 異常系：破損したチャンクは検出され、復元先は変更されない
+        data = bytearray(open(backup_path, 'rb').read())
+        data[-20] ^= 0xFF
+        with open(backup_path, 'wb') as f:
+            f.write(data)
+        with pytest.raises(BackupError):
+            backup.restore_backup(backup_path, str(restored_path))
+        assert restored_path.read_bytes() == restored_bytes
+        assert not os.path.exists(f'{restored_path}.restoring')
+
+    def test_incremental_backup(self, tmp_path):
+        # 変更のないページはチャンクを共有し、どのスナップショットも復元できる
+        db_path = tmp_path / 'live.db'
+        with sqlite3.connect(db_path) as conn:
+            conn.execute('CREATE TABLE t (id INTEGER PRIMARY KEY, v TEXT)')
+            conn.executemany('INSERT INTO t (v) VALUES (?)', [(os.urandom(200).hex(),)] * 1000)
+        conn.close()
+
+        backup = DatabaseBackup(str(tmp_path / 'backups'), incremental=True)
+        first_path = backup.create_backup(str(db_path))
+        first_chunks = {c['sha256'] for c in backup.load_manifest(first_path)['chunks']}
+
+        with sqlite3.connect(db_path) as conn:
+            conn.execute("UPDATE t SET v = 'changed' WHERE id = 1000")
+        conn.close()
+        backup.BACKUP_NAME_FORMAT = 'diary_backup_{timestamp}_2'
+        second_path = backup.create_backup(str(db_path))
+        second_chunks = {c['sha256'] for c in backup.load_manifest(second_path)['chunks']}
+
+        assert first_path.endswith('.chunks.json')
+        assert len(first_chunks) > 2
+        assert len(second_chunks - first_chunks) <= 2
+        stored = sum(len(files) for _, _, files in os.walk(backup.chunk_dir))
+        assert stored == len(first_chunks | second_chunks)
+
+        for path, expected in ((first_path, 1000), (second_path, 999)):
+            restored_path = tmp_path / 'restored.db'
+            backup.restore_backup(path, str(restored_path))
+            with sqlite3.connect(restored_path) as conn:
+                count = conn.execute("SELECT COUNT(*) FROM t WHERE v != 'changed'").fetchone()[0]
+            conn.close()
+            assert count == expected
+
+        # 削除したバックアップだけが参照していたチャンクは回収される
+        backup.delete_backup(backup.split_backup_name(os.path.basename(first_path)))
+        assert backup.collect_garbage(grace=0) == len(first_chunks - second_chunks)
+        stored = sum(len(files) for _, _, files in os.walk(backup.chunk_dir))
+        assert stored == len(second_chunks)
+
+    def test_garbage_collection_keeps_fresh_chunks(self, tmp_path):
+        db_path = tmp_path / 'test.db'
+        with sqlite3.connect(db_path) as conn:
+            conn.execute('CREATE TABLE t (v TEXT)')
+        conn.close()
+        backup = DatabaseBackup(str(tmp_path / 'backups'), incremental=True)
+        backup_path = backup.create_backup(str(db_path))
+        referenced = {c['sha256'] for c in backup.load_manifest(backup_path)['chunks']}
+
+        # 実行中のバックアップがマニフェストより先に書き出したチャンク（未参照・新しい）
+        fresh = backup.chunk_path('f' * 64, backup.compression)
+        os.makedirs(os.path.dirname(fresh), exist_ok=True)
+        Path(fresh).write_bytes(b'fresh')
+        Path(fresh + '.tmp').write_bytes(b'writing')
+        # 古い未参照のチャンクと書きかけのまま残ったファイル
+        stale = backup.chunk_path('e' * 64, backup.compression)
+        os.makedirs(os.path.dirname(stale), exist_ok=True)
+        Path(stale).write_bytes(b'stale')
+        Path(stale + '.tmp').write_bytes(b'stale')
+        old = time.time() - backup.CHUNK_GC_GRACE - 60
+        for path in (stale, stale + '.tmp'):
+            os.utime(path, (old, old))
+        # 古い参照済みのチャンクは残る
+        for digest in referenced:
+            os.utime(backup.chunk_path(digest, backup.compression), (old, old))
+
+        # カタログに登録されていないファイルは、カタログを再作成するまで対象にならない
+        assert backup.collect_garbage() == 0
+        assert backup.rebuild_catalog() == 1
+        assert backup.collect_garbage() == 2
+        assert os.path.exists(fresh) and os.path.exists(fresh + '.tmp')
+        assert not os.path.exists(stale) and not os.path.exists(stale + '.tmp')
+        for digest in referenced:
+            assert os.path.exists(backup.chunk_path(digest, backup.compression))
+
+        # 再利用したチャンクは更新日時が進み、並行するガベージコレクションで削除されない
+        digest = next(iter(referenced))
+        backup.BACKUP_NAME_FORMAT = 'diary_backup_{timestamp}_2'
+        backup.create_backup(str(db_path))
+        assert os.path.getmtime(backup.chunk_path(digest, backup.compression)) > old + 60
+
+    def test_chunk_reference_counts(self, tmp_path, monkeypatch):
+        db_path = tmp_path / 'test.db'
+        with sqlite3.connect(db_path) as conn:
+            conn.execute('CREATE TABLE t (id INTEGER PRIMARY KEY, v TEXT)')
+            conn.executemany('INSERT INTO t (v) VALUES (?)', [(os.urandom(200).hex(),)] * 500)
+        conn.close()
+        backup = DatabaseBackup(str(tmp_path / 'backups'), incremental=True)
+        first = backup.create_backup(str(db_path))
+        with sqlite3.connect(db_path) as conn:
+            conn.execute("UPDATE t SET v = 'changed' WHERE id = 500")
+        conn.close()
+        backup.BACKUP_NAME_FORMAT = 'diary_backup_{timestamp}_2'
+        second = backup.create_backup(str(db_path))
+        first_chunks = set(backup.manifest_chunks(backup.load_manifest(first)))
+        second_chunks = set(backup.manifest_chunks(backup.load_manifest(second)))
+
+        def refs():
+            with closing(sqlite3.connect(backup.catalog.path)) as conn:
+                return dict(conn.execute('SELECT name, refs FROM chunks'))
+
+        counts = refs()
+        assert {name for name, count in counts.items() if count == 2} == first_chunks & second_chunks
+        assert backup.catalog.unreferenced_chunks() == []
+
+        # 削除とガベージコレクションはマニフェストを読まずにカタログの参照数で行う
+        backup.delete_backup(backup.split_backup_name(os.path.basename(first)))
+        monkeypatch.setattr(backup, 'load_manifest', lambda path: pytest.fail('manifest read'))
+        assert set(backup.catalog.unreferenced_chunks()) == first_chunks - second_chunks
+        assert backup.collect_garbage(grace=0) == len(first_chunks - second_chunks)
+        assert set(refs()) == second_chunks
+        monkeypatch.undo()
+
+        # 参照数を持たない旧形式のカタログは開くときに作り直される
+        with closing(sqlite3.connect(backup.catalog.path)) as conn, conn:
+            conn.execute('DROP TABLE chunks')
+            conn.execute('DROP TABLE backup_chunks')
+        backup = DatabaseBackup(str(tmp_path / 'backups'), incremental=True)
+        assert refs() == {name: 1 for name in second_chunks}
+
+    def test_backup_catalog(self, tmp_path):
+        db_path = tmp_path / 'test.db'
+        with sqlite3.connect(db_path) as conn:
+            conn.execute('CREATE TABLE t (v TEXT)')
+        conn.close()
+
+        backup_dir = tmp_path / 'backups'
+        backup = DatabaseBackup(str(backup_dir))
+        timestamp = datetime.now().strftime('%Y/%m/%d %H:%M:%S')
+        backup_path = backup.create_backup(
+            str(db_path), {'operation': 'backup', 'timestamp': timestamp}
+        )
+        backup.BACKUP_NAME_FORMAT = 'manual_backup_{timestamp}'
+        backup.create_backup(str(db_path), {'operation': 'manual', 'timestamp': timestamp})
+
+        # カタログから日時・操作タイプで絞り込んで取得
+        backups = backup.list_backups()
+        assert len(backups) == 2
+        assert all(os.path.exists(info['path']) for info in backups.values())
+        manual = backup.list_backups(operation='manual')
+        assert list(manual) == [name for name in backups if name.startswith('manual_backup_')]
+        assert backup.list_backups(end=datetime.now() - timedelta(days=1)) == {}
+        assert len(backup.list_backups(start=datetime.now() - timedelta(days=1))) == 2
+
+        # 削除はカタログにも反映され、保持期間内のものは残る
+        backup.delete_backup(next(iter(manual)))
+        backup.cleanup_old_backups(keep_days=0)
+        assert list(backup.list_backups()) == [
+            backup.split_backup_name(os.path.basename(backup_path))
+        ]
+
+        # カタログを失ってもディレクトリから再作成できる
+        os.remove(backup_dir / 'catalog.db')
+        rebuilt = DatabaseBackup(str(backup_dir))
+        assert rebuilt.list_backups(operation='backup').keys() == backups.keys() - manual.keys()
+        assert rebuilt.rebuild_catalog() == 1
+
+    def test_verify_backups(self, tmp_path):
+        db_path = tmp_path / 'test.db'
+        with sqlite3.connect(db_path) as conn:
+            conn.execute('CREATE TABLE t (v TEXT)')
+            conn.executemany('INSERT INTO t VALUES (?)', [('z' * 100,)] * 100)
+        conn.close()
+
+        backup = DatabaseBackup(str(tmp_path / 'backups'), chunk_size=4096)
+        good_path = backup.create_backup(str(db_path))
+        backup.BACKUP_NAME_FORMAT = 'diary_backup_{timestamp}_broken'
+        broken_path = backup.create_backup(str(db_path))
+        data = bytearray(open(broken_path, 'rb').read())
+        data[len(data) // 2] ^= 0xFF
+        with open(broken_path, 'wb') as f:
+            f.write(data)
+
+        # 正常なバックアップは検証を通過し、破損したものだけが失敗する
+        summary = backup.verify_backups(workers=2, integrity=True)
+        results = {result['path']: result for result in summary['results']}
+        assert not summary['ok']
+        assert results[good_path]['ok']
+        assert results[good_path]['size'] == os.path.getsize(db_path)
+        assert results[good_path]['mb_per_sec'] > 0
+        assert not results[broken_path]['ok']
+        assert results[broken_path]['error']
+        assert os.listdir(tmp_path / 'backups').count('verify.db') == 0
+
+        name = backup.split_backup_name(os.path.basename(good_path))
+        assert backup.verify_backups([name], workers=1)['ok']
+        with pytest.raises(BackupError):
+            backup.verify_backups(['missing'])
+
+    def test_check_free_space(self, tmp_path, monkeypatch):
+        backup = DatabaseBackup(str(tmp_path / 'backups'))
+        db_path = tmp_path / 'test.db'
+        with sqlite3.connect(db_path) as conn:
+            conn.execute('CREATE TABLE t (v TEXT)')
+        conn.close()
+
+        # 空き容量が不足している場合はバックアップを作成しない
+        monkeypatch.setattr(
+            'manage_test_data.backup.shutil.disk_usage',
+            lambda path: shutil._ntuple_diskusage(100, 100, 0)
+        )
+        with pytest.raises(BackupError):
+            backup.create_backup(str(db_path))
+        assert backup.list_backups() == {}
+
     def test_restore_backup(self, backup, tmp_path):
         # テスト用のバックアップファイル作成
         backup_path = tmp_path / 'backup.db'
@@ -156,6 +439,66 @@ class TestBackup:
         with pytest.raises(BackupError):
             backup.restore_backup('non_existent.db', str(target_path))
 
+    @pytest.mark.parametrize('incremental', [False, True])
+    def test_backup_with_archive(self, tmp_path, incremental):
+        def write(path, value):
+            with sqlite3.connect(path) as conn:
+                conn.execute('CREATE TABLE IF NOT EXISTS t (v TEXT)')
+                conn.execute('DELETE FROM t')
+                conn.execute('INSERT INTO t VALUES (?)', (value,))
+            conn.close()
+
+        def read(path):
+            with sqlite3.connect(path) as conn:
+                value = conn.execute('SELECT v FROM t').fetchone()[0]
+            conn.close()
+            return value
+
+        db_path, archive_path = tmp_path / 'diary.db', tmp_path / 'archive.db'
+        write(db_path, 'hot')
+        write(archive_path, 'archived')
+        backup = DatabaseBackup(str(tmp_path / 'backups'), incremental=incremental)
+        backup_path = backup.create_backup(str(db_path), archive_path=str(archive_path))
+
+        # アーカイブDBは本体のバックアップに付随し、一覧・カタログには本体のみが載る
+        archive_backup = backup.archive_backup_path(backup_path, backup.load_manifest(backup_path))
+        assert os.path.exists(archive_backup)
+        name = backup.split_backup_name(os.path.basename(backup_path))
+        assert list(backup.list_backups()) == [name]
+        assert backup.rebuild_catalog() == 1
+        result = backup.verify_backups(workers=1)['results'][0]
+        assert result['ok']
+        assert result['size'] == os.path.getsize(db_path) + os.path.getsize(archive_path)
+
+        # 両方を復元し、復元前の状態も両方がバックアップされる
+        write(db_path, 'hot changed')
+        write(archive_path, 'archive changed')
+        backup.restore_backup(backup_path, str(db_path), str(archive_path))
+        assert (read(db_path), read(archive_path)) == ('hot', 'archived')
+        pre_restore = [key for key in backup.list_backups() if key.startswith('pre_restore')]
+        assert len(pre_restore) == 1
+        backup.restore_backup(backup.list_backups()[pre_restore[0]]['path'],
+                              str(tmp_path / 'pre.db'), str(tmp_path / 'pre_archive.db'))
+        assert (read(tmp_path / 'pre.db'), read(tmp_path / 'pre_archive.db')) == (
+            'hot changed', 'archive changed'
+        )
+
+        # アーカイブDBを含まないバックアップでは既存のアーカイブDBを残す
+        backup.BACKUP_NAME_FORMAT = 'diary_backup_{timestamp}_hot'
+        hot_only = backup.create_backup(str(db_path))
+        write(archive_path, 'kept')
+        backup.restore_backup(hot_only, str(db_path), str(archive_path))
+        assert read(archive_path) == 'kept'
+
+        # 削除すると付随するバックアップも削除され、チャンクも回収される
+        for key in list(backup.list_backups()):
+            backup.delete_backup(key)
+        assert not os.path.exists(archive_backup)
+        assert not os.path.exists(backup.manifest_path(archive_backup))
+        backup.collect_garbage(grace=0)
+        assert sorted(os.listdir(tmp_path / 'backups')) in (['catalog.db'], ['catalog.db', 'chunks'])
+        assert not any(files for _, _, files in os.walk(backup.chunk_dir))
+
 class TestInserter:
     def test_insert_entries(self, inserter, session):
         # テストデータ作成
@@ -215,3 +558,50 @@ class TestInserter:
         assert len(conflicts) == 1
         assert conflicts[0]['user_id'] == 'admin'
         assert conflicts[0]['date'] == '2024/01/01'
+
+    def test_insert_entries_with_items(self, inserter, session):
+        """一括挿入で活動項目も保存され、集計・数値と一致するテスト"""
+        user = User(userid='importer', name='Importer', password='TestPass123', created_at=datetime.now())
+        session.add(user)
+        session.flush()
+        long_content = '腕立て 30回\n' * 300
+        entries = [
+            {
+                'user_id': 'importer',
+                'date': '2024/03/01',
+                'title': 'テスト1',
+                'content': 'テスト内容1',
+                'notes': '体重：70kg',
+                'items': [
+                    {'item_name': '筋トレ', 'item_content': long_content},
+                    {'item_name': 'ランニング', 'item_content': '距離：5km'}
+                ]
+            },
+            {
+                'user_id': 'importer',
+                'date': '2024/03/02',
+                'title': 'テスト2',
+                'content': 'テスト内容2',
+                'notes': '',
+                'items': [{'item_name': '筋トレ', 'item_content': 'スクワット 20回'}]
+            }
+        ]
+
+        assert inserter.insert_entries(entries) == 2
+
+        items = session.query(DiaryItem).join(DiaryItem.entry).filter_by(user_id=user.id).all()
+        assert sorted(item.item_name for item in items) == ['ランニング', '筋トレ', '筋トレ']
+        assert all(item.entry_id for item in items)
+        assert session.query(DiaryItemBody).count() == 1
+        assert {item.item_content for item in items} >= {long_content, '距離：5km'}
+
+        rollups = session.query(ActivityRollup).filter_by(user_id=user.id).all()
+        assert sum(rollup.item_count for rollup in rollups) == len(items)
+        assert {(rollup.day.day, rollup.item_count) for rollup in rollups} == {(1, 2), (2, 1)}
+        frequencies = {
+            row.item_name: row.item_count
+            for row in session.query(ActivityFrequency).filter_by(user_id=user.id, month='2024-03')
+        }
+        assert frequencies == {'筋トレ': 2, 'ランニング': 1}
+        metrics = {row.key for row in session.query(EntryMetric).filter_by(user_id=user.id)}
+        assert {'体重', 'ランニング/距離'} <= metrics